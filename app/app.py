@@ -2,14 +2,26 @@ from app.routes.auth import auth_router
 from app.routes.category import category_router
 from app.routes.products import products_router
 from app.routes.employees import employee_router
+from app.routes.profiles import profiles_router
+from app.routes.metrics import metrics_router
 from fastapi import FastAPI, HTTPException, Request
 from app.app_exception.app_exception import AppException
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 from app.dependencies import lifespan
+from app.profiling.middleware import ProfilingMiddleware
+from app.utils.aws_call_accounting import AWSCallAccountingMiddleware
+from app.metrics.middleware import MetricsMiddleware
+from app.tracing.middleware import TracingMiddleware
+from app.logs.middleware import RequestIdMiddleware
 
 
 app = FastAPI(lifespan=lifespan)
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(AWSCallAccountingMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
+app.add_middleware(RequestIdMiddleware)
 
 
 @app.exception_handler(AppException)
@@ -57,3 +69,5 @@ app.include_router(auth_router)
 app.include_router(products_router)
 app.include_router(category_router)
 app.include_router(employee_router)
+app.include_router(profiles_router)
+app.include_router(metrics_router)
@@ -1,6 +1,8 @@
 from contextlib import asynccontextmanager
 import os
-import boto3
+import tempfile
+import time
+from anyio import to_thread
 from dotenv import load_dotenv
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi import Depends, status, FastAPI, Request
@@ -8,6 +10,20 @@ import httpx
 
 from app.app_exception.app_exception import AppException
 from app.utils import jwt_verifier
+from app.utils.async_dynamodb import AsyncTable
+from app.utils.aws_client_manager import AWSClientManager
+from app.utils.category_snapshot import CategorySnapshot
+from app.utils.ttl_cache import LookupStats, TTLCache
+from app.logs.pipeline import configure_logging, parse_logger_levels
+from app.profiling.profile_store import ProfileStore
+from app.metrics.instruments import register_app_metrics
+from app.metrics.registry import REGISTRY, MetricsFileStore
+from app.tracing.exporters import BatchSpanProcessor, load_exporter
+from app.tracing.tracer import Tracer, traced
+from app.storage.local_table import LocalStorage
+from app.storage.memory_engine import MemoryEngine
+from app.storage.sqlite_engine import SQLiteEngine
+from app.services.stock_write_coalescer import StockWriteCoalescer
 from app.services.user_service import UserService
 
 
@@ -23,9 +39,32 @@ async def lifespan(app: FastAPI):
     ENV = os.getenv("ENV", "local")
     if ENV == "local":
         load_dotenv()
+    # records are written as JSON lines by a background thread, never on the
+    # request thread
+    app.state.log_pipeline = configure_logging(
+        os.getenv("LOG_LEVEL", "INFO"),
+        parse_logger_levels(os.getenv("LOG_LEVELS")),
+        int(os.getenv("LOG_QUEUE_SIZE", "10000")),
+    )
+
+    # sync handlers, and the boto3 calls they make, each hold one of these
+    # threads for the whole request
+    to_thread.current_default_thread_limiter().total_tokens = (
+        get_request_threadpool_size()
+    )
 
-    cognito = boto3.client("cognito-idp", region_name="ap-south-1")
-    app.state.cognito_client = cognito
+    aws = AWSClientManager(
+        region_name=os.getenv("AWS_REGION", "ap-south-1"),
+        # one connection per request thread so a full threadpool never has to
+        # open throwaway connections
+        max_pool_connections=int(
+            os.getenv("AWS_MAX_POOL_CONNECTIONS", str(get_request_threadpool_size()))
+        ),
+        retry_mode=os.getenv("AWS_RETRY_MODE", "standard"),
+        max_attempts=int(os.getenv("AWS_MAX_ATTEMPTS", "3")),
+    )
+    app.state.aws = aws
+    app.state.cognito_client = aws.client("cognito-idp", region_name="ap-south-1")
     app.state.cognito_client_id = os.getenv("COGNITO_CLIENT_ID")
     app.state.user_pool_id = os.getenv("USER_POOL_ID")
 
@@ -37,13 +76,145 @@ async def lifespan(app: FastAPI):
         raise Exception("JWKS_URL is not set")
     app.state.jwks = await fetch_jwks(JWKSURL)
 
-    ddb_resource = boto3.resource(
-        "dynamodb", region_name=os.getenv("AWS_REGION", "ap-south-1")
-    )
-    app.state.ddb_resource = ddb_resource
     app.state.table_name = str(os.getenv("table_name"))
+
+    storage_engine = get_storage_engine()
+    if storage_engine == "dynamodb":
+        app.state.storage = aws
+    elif storage_engine == "memory":
+        app.state.storage = LocalStorage(MemoryEngine())
+    else:
+        app.state.storage = LocalStorage(
+            SQLiteEngine(os.getenv("SQLITE_PATH", "inventory.db"))
+        )
+
+    app.state.async_dynamodb = None
+    if get_data_access_mode() == "async":
+        if storage_engine != "dynamodb":
+            raise Exception("DATA_ACCESS_MODE=async needs the dynamodb engine")
+        # imported here because the async routes depend on this module
+        from app.routes.async_category import mount_async_category_routes
+        from app.routes.async_products import mount_async_product_routes
+
+        app.state.async_dynamodb = aws.async_dynamodb_client()
+        # created now so the async routes never build a client on the loop
+        aws.client("sns", region_name="ap-south-1")
+        mount_async_product_routes(app)
+        mount_async_category_routes(app)
+
+    cache_entries = int(os.getenv("PRODUCT_CACHE_MAX_ENTRIES", "10000"))
+    app.state.product_cache = (
+        TTLCache(cache_entries, float(os.getenv("PRODUCT_CACHE_TTL_SECONDS", "5")))
+        if cache_entries > 0
+        else None
+    )
+    # stock writes take the product's shard count from the product cache
+    app.state.stock_shard_lookups = LookupStats() if cache_entries > 0 else None
+
+    app.state.category_snapshot = CategorySnapshot(
+        float(os.getenv("CATEGORY_SNAPSHOT_CHECK_SECONDS", "5"))
+    )
+
+    # 0 still batches: deltas queue up behind a write that is in flight
+    app.state.stock_coalescer = StockWriteCoalescer(
+        float(os.getenv("STOCK_COALESCE_WINDOW_MS", "0")) / 1000
+    )
+
+    app.state.aws_call_accounting = os.getenv("AWS_CALL_ACCOUNTING", "1") == "1"
+
+    app.state.profile_store = ProfileStore(
+        os.getenv(
+            "PROFILE_DIR", os.path.join(tempfile.gettempdir(), "inventory-profiles")
+        ),
+        max(1, int(os.getenv("PROFILE_MAX_FILES", "100"))),
+    )
+    app.state.profile_sample_rate = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+    app.state.profile_interval = float(os.getenv("PROFILE_INTERVAL_MS", "2")) / 1000
+
+    # imported here because the ledger repository depends on this module
+    from app.ledger.stock_ledger_writer import StockLedgerWriter
+    from app.repository.stock_ledger_repository import StockLedgerRepository
+
+    app.state.stock_ledger = StockLedgerWriter(
+        StockLedgerRepository(app.state.storage.table(app.state.table_name))
+    )
+    app.state.stock_ledger.start()
+
+    register_app_metrics(app.state, to_thread.current_default_thread_limiter())
+    metrics_dir = os.getenv("METRICS_DIR")
+    app.state.metrics_store = None
+    if metrics_dir:
+        # several uvicorn workers: each shares its metrics through the directory
+        app.state.metrics_store = MetricsFileStore(
+            metrics_dir, REGISTRY, float(os.getenv("METRICS_WRITE_SECONDS", "5"))
+        )
+        app.state.metrics_store.start()
+
+    # tracing is off unless some requests are sampled
+    app.state.tracer = None
+    trace_sample_rate = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+    if trace_sample_rate > 0:
+        processor = BatchSpanProcessor(
+            load_exporter(
+                os.getenv("TRACE_EXPORTER", "jsonl"),
+                os.getenv("TRACE_FILE", "traces.jsonl"),
+            )
+        )
+        processor.start()
+        app.state.tracer = Tracer(processor, trace_sample_rate)
+
+    projector_stop = None
+    stream_arn = os.getenv("LISTING_PROJECTOR_STREAM_ARN")
+    if get_product_listing_mode() == "projector":
+        # imported here because the projector depends on the repositories,
+        # which depend on this module
+        from app.projector.change_stream import (
+            DynamoDBChangeStream,
+            LocalChangeStream,
+        )
+        from app.projector.checkpoint_store import (
+            DynamoDBCheckpointStore,
+            DynamoDBLease,
+            InMemoryCheckpointStore,
+        )
+        from app.projector.listing_projector import start_listing_projector
+
+        table = app.state.storage.table(app.state.table_name)
+        if storage_engine != "dynamodb":
+            # the local stream only carries this process's writes, so each
+            # worker projects its own and keeps its checkpoint in memory.
+            # Sequences follow the clock, so they stay ahead of the ones that
+            # listing items stored in SQLite remember from earlier runs.
+            stream = LocalChangeStream(clock=time.time_ns)
+            table.attach_stream(stream)
+            projector_stop = start_listing_projector(
+                table, stream, InMemoryCheckpointStore(), get_product_listing_shards()
+            )
+        elif stream_arn:
+            # every worker starts one, but only the lease holder projects
+            projector_stop = start_listing_projector(
+                table,
+                DynamoDBChangeStream(aws.client("dynamodbstreams"), stream_arn),
+                DynamoDBCheckpointStore(table, "listing"),
+                get_product_listing_shards(),
+                lease=DynamoDBLease(table, "listing"),
+            )
+
     yield
 
+    if projector_stop is not None:
+        projector_stop.set()
+    app.state.stock_ledger.stop()
+    if app.state.async_dynamodb is not None:
+        await app.state.async_dynamodb.aclose()
+    if app.state.metrics_store is not None:
+        app.state.metrics_store.stop()
+    if app.state.tracer is not None:
+        app.state.tracer.processor.stop()
+    if isinstance(app.state.storage, LocalStorage):
+        app.state.storage.close()
+    app.state.log_pipeline.stop()
+
 
 def get_cognito_config(request: Request):
     return (
@@ -61,7 +232,9 @@ def get_user_service(request: Request) -> UserService:
 security = HTTPBearer()
 
 
-def get_current_user(
+# No I/O here, so it runs on the event loop rather than taking a thread.
+@traced("get_current_user")
+async def get_current_user(
     req: Request,
     creds: HTTPAuthorizationCredentials = Depends(security),
 ):
@@ -79,7 +252,7 @@ def get_current_user(
 
 
 def require_any_group(*allowed_groups: str):
-    def group_checker(current_user=Depends(get_current_user)):
+    async def group_checker(current_user=Depends(get_current_user)):
         user_groups = set(current_user.get("cognito:groups", []))
 
         if not user_groups.intersection(allowed_groups):
@@ -95,9 +268,43 @@ def require_any_group(*allowed_groups: str):
 
 
 def get_ddb_table(request: Request):
-    ddb_resource = request.app.state.ddb_resource
-    table_name = request.app.state.table_name
-    return ddb_resource.Table(table_name)
+    return request.app.state.storage.table(request.app.state.table_name)
+
+
+def get_async_ddb_table(request: Request) -> AsyncTable:
+    return AsyncTable(request.app.state.async_dynamodb, request.app.state.table_name)
+
+
+def get_product_cache(request: Request) -> TTLCache | None:
+    return getattr(request.app.state, "product_cache", None)
+
+
+def get_stock_shard_lookups(request: Request) -> LookupStats | None:
+    return getattr(request.app.state, "stock_shard_lookups", None)
+
+
+def get_category_snapshot(request: Request) -> CategorySnapshot | None:
+    return getattr(request.app.state, "category_snapshot", None)
+
+
+def get_stock_coalescer(request: Request) -> StockWriteCoalescer | None:
+    return getattr(request.app.state, "stock_coalescer", None)
+
+
+def get_stock_ledger(request: Request):
+    return getattr(request.app.state, "stock_ledger", None)
+
+
+def get_metrics_store(request: Request) -> MetricsFileStore | None:
+    return getattr(request.app.state, "metrics_store", None)
+
+
+def get_profile_store(request: Request) -> ProfileStore | None:
+    return getattr(request.app.state, "profile_store", None)
+
+
+def get_sns_client(request: Request):
+    return request.app.state.aws.client("sns", region_name="ap-south-1")
 
 
 def get_sns_topic_arn():
@@ -105,6 +312,44 @@ def get_sns_topic_arn():
     return topic_arn
 
 
+def get_request_threadpool_size() -> int:
+    return max(1, int(os.getenv("REQUEST_THREADPOOL_SIZE", "40")))
+
+
+def get_product_listing_shards() -> int:
+    return max(1, int(os.getenv("PRODUCT_LISTING_SHARDS", "1")))
+
+
+STORAGE_ENGINES = ("dynamodb", "memory", "sqlite")
+
+
+def get_storage_engine() -> str:
+    engine = os.getenv("STORAGE_ENGINE", "dynamodb")
+    if engine not in STORAGE_ENGINES:
+        raise Exception(f"STORAGE_ENGINE must be one of {STORAGE_ENGINES}")
+    return engine
+
+
+DATA_ACCESS_MODES = ("sync", "async")
+
+
+def get_data_access_mode() -> str:
+    mode = os.getenv("DATA_ACCESS_MODE", "sync")
+    if mode not in DATA_ACCESS_MODES:
+        raise Exception(f"DATA_ACCESS_MODE must be one of {DATA_ACCESS_MODES}")
+    return mode
+
+
+PRODUCT_LISTING_MODES = ("dual_write", "projector")
+
+
+def get_product_listing_mode() -> str:
+    mode = os.getenv("PRODUCT_LISTING_MODE", "dual_write")
+    if mode not in PRODUCT_LISTING_MODES:
+        raise Exception(f"PRODUCT_LISTING_MODE must be one of {PRODUCT_LISTING_MODES}")
+    return mode
+
+
 def get_cognito_client(request: Request):
     cognito_client = request.app.state.cognito_client
     return cognito_client
@@ -0,0 +1,10 @@
+from typing import Annotated
+from pydantic import BaseModel, Field
+
+MAX_BATCH_GET_IDS = 500
+
+
+class BatchGetProductsRequest(BaseModel):
+    product_ids: list[Annotated[str, Field(min_length=1)]] = Field(
+        ..., min_length=1, max_length=MAX_BATCH_GET_IDS
+    )
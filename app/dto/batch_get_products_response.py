@@ -0,0 +1,8 @@
+from pydantic import BaseModel
+
+from app.models.products import Product
+
+
+class BatchGetProductsResponse(BaseModel):
+    products: list[Product]
+    missing_ids: list[str]
@@ -0,0 +1,16 @@
+from typing import Literal
+from pydantic import BaseModel, Field
+
+MAX_BULK_STOCK_MOVEMENTS = 1000
+
+
+class StockMovement(BaseModel):
+    product_id: str = Field(..., min_length=1)
+    quantity: int = Field(..., gt=0)
+    direction: Literal["in", "out"]
+
+
+class BulkStockMovementRequest(BaseModel):
+    movements: list[StockMovement] = Field(
+        ..., min_length=1, max_length=MAX_BULK_STOCK_MOVEMENTS
+    )
@@ -0,0 +1,19 @@
+from typing import Optional
+from pydantic import BaseModel
+
+
+class AppliedStockMovement(BaseModel):
+    product_id: str
+    delta: int
+    quantity: Optional[int] = None
+
+
+class FailedStockMovement(BaseModel):
+    product_id: str
+    delta: int
+    error_code: str
+
+
+class BulkStockMovementResponse(BaseModel):
+    applied: list[AppliedStockMovement]
+    failed: list[FailedStockMovement]
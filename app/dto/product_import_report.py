@@ -0,0 +1,23 @@
+from pydantic import BaseModel, Field
+
+MAX_REPORTED_IMPORT_ERRORS = 1000
+
+
+class ImportRowError(BaseModel):
+    row: int
+    errors: list[str]
+
+
+class ProductImportReport(BaseModel):
+    total_rows: int = 0
+    imported: int = 0
+    failed: int = 0
+    errors: list[ImportRowError] = Field(default_factory=list)
+    errors_truncated: bool = False
+
+    def add_error(self, row: int, errors: list[str]):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_IMPORT_ERRORS:
+            self.errors.append(ImportRowError(row=row, errors=errors))
+        else:
+            self.errors_truncated = True
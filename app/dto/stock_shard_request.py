@@ -0,0 +1,10 @@
+from pydantic import BaseModel, Field
+
+# the reshard transaction touches META, the listing copy and every old and
+# new counter, which has to stay within the 100-action transaction limit
+MAX_STOCK_SHARDS = 32
+
+
+class StockShardRequest(BaseModel):
+    product_id: str = Field(..., min_length=1)
+    shards: int = Field(..., ge=1, le=MAX_STOCK_SHARDS)
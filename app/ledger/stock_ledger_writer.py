@@ -0,0 +1,150 @@
+from datetime import datetime, timedelta, timezone
+import logging
+import queue
+import threading
+import time
+import uuid
+
+from botocore.exceptions import ClientError
+
+from app.repository.stock_ledger_repository import (
+    StockLedgerRepository,
+    entry_timestamp,
+    ledger_entry_item,
+    restamp_entry,
+)
+
+logger = logging.getLogger(__name__)
+
+LEDGER_FLUSH_INTERVAL = 1.0
+LEDGER_COMPACT_INTERVAL = 300.0
+# compaction leaves entries younger than this in the tail; a write must land
+# well within it (see StockLedgerWriter.flush)
+LEDGER_COMPACTION_LAG = timedelta(minutes=1)
+
+
+class StockLedgerWriter:
+    """Writes ledger entries on the request path and compacts them off it.
+
+    ``record_all`` batch-writes a request's entries before it returns, so a
+    movement the caller was told about is already in the ledger. Entries the
+    batch could not write are logged and queued for a background thread,
+    which retries them every ``flush_interval`` and periodically compacts the
+    snapshots of the products written for. A queued entry is re-keyed when it
+    finally goes out, so a compaction that ran meanwhile never skips it.
+    """
+
+    def __init__(
+        self,
+        repository: StockLedgerRepository,
+        flush_interval: float = LEDGER_FLUSH_INTERVAL,
+        compact_interval: float = LEDGER_COMPACT_INTERVAL,
+        compaction_lag: timedelta = LEDGER_COMPACTION_LAG,
+    ):
+        self.repository = repository
+        self.flush_interval = flush_interval
+        self.compact_interval = compact_interval
+        self.compaction_lag = compaction_lag
+        self._queue: queue.SimpleQueue[dict] = queue.SimpleQueue()
+        # product id -> when its newest entry was recorded
+        self._touched: dict[str, datetime] = {}
+        self._touched_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def record(self, product_id: str, delta: int, reason: str):
+        self.record_all([(product_id, delta, reason)])
+
+    # One batch write for all of a request's movements, e.g. every caller of
+    # a coalesced stock write. It never raises: the stock write has already
+    # committed, so failing the request would invite a retry that repeats it.
+    def record_all(self, movements: list[tuple[str, int, str]]):
+        if not movements:
+            return
+        now = datetime.now(timezone.utc)
+        items = [
+            ledger_entry_item(product_id, delta, reason, now, uuid.uuid4().hex[:12])
+            for product_id, delta, reason in movements
+        ]
+
+        unprocessed = self.repository.append_entries(items)
+        self._mark_written(items, unprocessed)
+        for item in unprocessed:
+            logger.warning(
+                "ledger_write_deferred",
+                extra={"product_id": item["product_id"], "entry": item["sk"]},
+            )
+            self._queue.put(item)
+
+    def _mark_written(self, items: list[dict], unprocessed: list[dict]):
+        unwritten = {item["sk"] for item in unprocessed}
+        with self._touched_lock:
+            for item in items:
+                if item["sk"] in unwritten:
+                    continue
+                written = entry_timestamp(item)
+                touched = self._touched.get(item["product_id"])
+                if touched is None or written > touched:
+                    self._touched[item["product_id"]] = written
+
+    # Retries the entries ``record_all`` could not write.
+    def flush(self) -> int:
+        items = []
+        while True:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if not items:
+            return 0
+
+        # Compaction folds every entry keyed before now minus the lag. An
+        # entry keyed further back than half of that, say after being retried
+        # for a while, could land behind a snapshot and never be counted, so
+        # it is keyed to now instead; recorded_at still says when it happened.
+        now = datetime.now(timezone.utc)
+        late = now - self.compaction_lag / 2
+        items = [
+            restamp_entry(item, now) if entry_timestamp(item) < late else item
+            for item in items
+        ]
+
+        unprocessed = self.repository.append_entries(items)
+        for item in unprocessed:
+            self._queue.put(item)
+        self._mark_written(items, unprocessed)
+        return len(items) - len(unprocessed)
+
+    def compact(self):
+        before = datetime.now(timezone.utc) - self.compaction_lag
+        with self._touched_lock:
+            touched = list(self._touched.items())
+        for product_id, newest in touched:
+            try:
+                self.repository.compact(product_id, before)
+            except ClientError:
+                continue
+            with self._touched_lock:
+                # a request may have written a newer entry meanwhile
+                if self._touched.get(product_id) == newest and newest < before:
+                    del self._touched[product_id]
+
+    def run_forever(self):
+        next_compaction = time.monotonic() + self.compact_interval
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+            if time.monotonic() >= next_compaction:
+                self.compact()
+                next_compaction = time.monotonic() + self.compact_interval
+        self.flush()
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self.run_forever, name="stock-ledger-writer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float | None = 10.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
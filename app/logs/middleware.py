@@ -0,0 +1,51 @@
+import re
+import secrets
+
+from app.logs.pipeline import _request_id
+
+REQUEST_ID_HEADER = b"x-request-id"
+
+# ids from callers are echoed into logs and headers, so keep them short and
+# printable
+_VALID_REQUEST_ID = re.compile(rb"[A-Za-z0-9._:-]{1,128}")
+
+
+class RequestIdMiddleware:
+    """Tags everything logged while handling a request with its id.
+
+    A well-formed ``X-Request-Id`` from the caller is kept, otherwise a new one
+    is generated. Either way it is returned in the response's ``X-Request-Id``.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for key, value in scope["headers"]:
+            if key == REQUEST_ID_HEADER and _VALID_REQUEST_ID.fullmatch(value):
+                request_id = value.decode("ascii")
+                break
+        if request_id is None:
+            request_id = secrets.token_hex(8)
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message = {
+                    **message,
+                    "headers": [
+                        *message.get("headers", []),
+                        (REQUEST_ID_HEADER, request_id.encode()),
+                    ],
+                }
+            await send(message)
+
+        token = _request_id.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            _request_id.reset(token)
@@ -0,0 +1,149 @@
+from contextvars import ContextVar
+from datetime import datetime, timezone
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+from typing import TextIO
+
+from app.metrics.instruments import LOG_RECORDS_DROPPED
+from app.tracing.tracer import current_span
+
+# id of the request being handled, set by RequestIdMiddleware; request
+# threads see it through their copy of the request's context
+_request_id: ContextVar[str | None] = ContextVar("request_id", default=None)
+
+# libraries that log every connection or retry at INFO
+DEFAULT_LOGGER_LEVELS = {
+    "botocore": "WARNING",
+    "boto3": "WARNING",
+    "urllib3": "WARNING",
+    "httpx": "WARNING",
+    "httpcore": "WARNING",
+}
+
+# attributes every LogRecord has; anything else came in through ``extra``
+_RECORD_ATTRIBUTES = frozenset(
+    vars(logging.LogRecord("", logging.INFO, "", 0, "", (), None))
+) | {"message", "asctime", "request_id", "trace_id"}
+
+
+def parse_logger_levels(spec: str | None) -> dict[str, str]:
+    # "app.aws_calls=WARNING,botocore=DEBUG"
+    levels = {}
+    for part in (spec or "").split(","):
+        name, _, level = part.strip().partition("=")
+        if name and level:
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with ``extra`` fields at the top level."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "trace_id": getattr(record, "trace_id", None),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Hands records to the listener thread without waiting.
+
+    The request and trace ids are read here, on the thread that logged, since
+    the listener runs outside every request's context. The message is merged
+    with its arguments now, as they may change once the caller moves on;
+    JSON encoding, tracebacks and the write itself are left to the listener.
+    When the queue is full the record is dropped and counted.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        record.request_id = _request_id.get()
+        record.trace_id = getattr(current_span(), "trace_id", None)
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+            LOG_RECORDS_DROPPED.inc()
+
+
+class _QueueListener(logging.handlers.QueueListener):
+    # the stock listener puts its stop sentinel without waiting, which fails
+    # on a full bounded queue; the listener is draining it, so wait instead
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+class LogPipeline:
+    def __init__(self, handler: NonBlockingQueueHandler, listener: _QueueListener):
+        self.handler = handler
+        self.listener = listener
+
+    @property
+    def dropped(self) -> int:
+        return self.handler.dropped
+
+    # flushes what is queued, then detaches the pipeline from the root logger
+    def stop(self):
+        logging.getLogger().removeHandler(self.handler)
+        self.listener.stop()
+
+
+# Routes every record through a bounded queue to a background thread that
+# writes JSON lines to ``stream``. Replaces the root logger's handlers, so
+# calling it again swaps in a fresh pipeline.
+def configure_logging(
+    level: str = "INFO",
+    logger_levels: dict[str, str] | None = None,
+    queue_size: int = 10000,
+    stream: TextIO | None = None,
+) -> LogPipeline:
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter())
+    handler = NonBlockingQueueHandler(log_queue)
+    listener = _QueueListener(log_queue, output, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for previous in root.handlers[:]:
+        root.removeHandler(previous)
+    root.addHandler(handler)
+    root.setLevel(level.upper())
+    for name, logger_level in {
+        **DEFAULT_LOGGER_LEVELS,
+        **(logger_levels or {}),
+    }.items():
+        logging.getLogger(name).setLevel(logger_level)
+
+    listener.start()
+    return LogPipeline(handler, listener)
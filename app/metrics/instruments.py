@@ -0,0 +1,126 @@
+from app.metrics.registry import REGISTRY
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total",
+    "HTTP requests handled, by route template and status code.",
+    ("method", "route", "status"),
+)
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to sending the last body byte.",
+    ("method", "route"),
+)
+
+AWS_CALLS = REGISTRY.counter(
+    "aws_calls_total",
+    "AWS API calls, by outcome (ok or the error code).",
+    ("service", "operation", "outcome"),
+)
+AWS_CALL_DURATION = REGISTRY.histogram(
+    "aws_call_duration_seconds",
+    "AWS API call latency, retries included.",
+    ("service", "operation"),
+)
+AWS_CALL_RETRIES = REGISTRY.counter(
+    "aws_call_retries_total",
+    "Retried AWS API call attempts.",
+    ("service", "operation"),
+)
+AWS_CALL_THROTTLES = REGISTRY.counter(
+    "aws_call_throttles_total",
+    "AWS API call attempts rejected by throttling.",
+    ("service", "operation"),
+)
+DYNAMODB_CONSUMED_CAPACITY = REGISTRY.counter(
+    "dynamodb_consumed_capacity_units_total",
+    "Capacity units reported by DynamoDB calls made during requests.",
+    ("operation",),
+)
+
+LOW_STOCK_EVENTS = REGISTRY.counter(
+    "low_stock_events_published_total",
+    "Low-stock events published to SNS.",
+)
+
+LOG_RECORDS_DROPPED = REGISTRY.counter(
+    "log_records_dropped_total",
+    "Log records dropped because the logging queue was full.",
+)
+
+
+# Metrics read from app state at collection time. ``limiter`` is the
+# threadpool's capacity limiter, captured on the event loop at startup.
+def register_app_metrics(state, limiter):
+    def threadpool(field: str):
+        return lambda: {(): getattr(limiter.statistics(), field)}
+
+    REGISTRY.collected(
+        "gauge",
+        "threadpool_size",
+        "Threads available to sync handlers.",
+        (),
+        threadpool("total_tokens"),
+    )
+    REGISTRY.collected(
+        "gauge",
+        "threadpool_busy_threads",
+        "Threads running a sync handler or dependency.",
+        (),
+        threadpool("borrowed_tokens"),
+    )
+    REGISTRY.collected(
+        "gauge",
+        "threadpool_queue_depth",
+        "Sync calls waiting for a free thread.",
+        (),
+        threadpool("tasks_waiting"),
+    )
+
+    def cache_stat(field: str):
+        def collect():
+            samples = {}
+            cache = getattr(state, "product_cache", None)
+            if cache is not None:
+                samples[("product",)] = cache.stats()[field]
+            lookups = getattr(state, "stock_shard_lookups", None)
+            if lookups is not None and field in ("hits", "misses", "stale"):
+                samples[("stock_shards",)] = lookups.stats()[field]
+            return samples
+
+        return collect
+
+    REGISTRY.collected(
+        "counter",
+        "cache_hits_total",
+        "Cache lookups that found a live entry.",
+        ("cache",),
+        cache_stat("hits"),
+    )
+    REGISTRY.collected(
+        "counter",
+        "cache_misses_total",
+        "Cache lookups that found nothing or an expired entry.",
+        ("cache",),
+        cache_stat("misses"),
+    )
+    REGISTRY.collected(
+        "counter",
+        "cache_stale_hits_total",
+        "Cache hits whose value a later write found to be outdated.",
+        ("cache",),
+        cache_stat("stale"),
+    )
+    REGISTRY.collected(
+        "counter",
+        "cache_evictions_total",
+        "Entries dropped to stay within the cache size.",
+        ("cache",),
+        cache_stat("evictions"),
+    )
+    REGISTRY.collected(
+        "gauge",
+        "cache_entries",
+        "Entries currently cached.",
+        ("cache",),
+        cache_stat("entries"),
+    )
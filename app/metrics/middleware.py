@@ -0,0 +1,38 @@
+import time
+
+from app.metrics.instruments import HTTP_REQUEST_DURATION, HTTP_REQUESTS
+
+
+class MetricsMiddleware:
+    """Counts requests and times them by route template, so path parameters
+    do not multiply the series. Requests that match no route are labelled
+    ``unmatched``.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # the router adds the matched route to the scope
+            route = getattr(scope.get("route"), "path", "unmatched")
+            method = scope["method"]
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - started, (method, route)
+            )
+            HTTP_REQUESTS.inc((method, route, str(status_code)))
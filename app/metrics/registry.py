@@ -0,0 +1,340 @@
+from bisect import bisect_left
+import json
+import math
+import os
+import threading
+from typing import Callable, Iterable
+
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+class _ShardedMetric:
+    """Values are kept per thread, so recording never takes a lock; only a
+    thread's first write registers its shard. Collection sums the shards,
+    and folds those of threads that have exited into a retired total, so
+    threadpool churn does not leave a growing list behind.
+    """
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: list[tuple[threading.Thread, dict]] = []
+        self._retired: dict = {}
+        self._lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "values", None)
+        if shard is None:
+            shard = self._local.values = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    # Adds ``shard``'s values into ``totals``, copying what it takes over.
+    def _merge(self, totals: dict, shard: dict):
+        raise NotImplementedError
+
+    def _totals(self) -> dict:
+        with self._lock:
+            live = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    live.append((thread, shard))
+                else:
+                    # the thread is gone, so nothing writes this shard again
+                    self._merge(self._retired, shard)
+            self._shards = live
+            totals: dict = {}
+            self._merge(totals, self._retired)
+        for _, shard in live:
+            # another thread may add a label set while this one copies
+            self._merge(totals, dict(shard))
+        return totals
+
+
+class Counter(_ShardedMetric):
+    kind = "counter"
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def _merge(self, totals: dict, shard: dict):
+        for labels, value in shard.items():
+            totals[labels] = totals.get(labels, 0) + value
+
+    def samples(self) -> dict[tuple, float]:
+        return self._totals()
+
+
+class Histogram(_ShardedMetric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple = (),
+        buckets: tuple = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    # per label set: a count for each bucket, one for +Inf, then the sum
+    def observe(self, value: float, labels: tuple = ()):
+        shard = self._shard()
+        counts = shard.get(labels)
+        if counts is None:
+            counts = shard[labels] = [0] * (len(self.buckets) + 2)
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def _merge(self, totals: dict, shard: dict):
+        for labels, counts in shard.items():
+            total = totals.get(labels)
+            if total is None:
+                totals[labels] = list(counts)
+            else:
+                for index, count in enumerate(counts):
+                    total[index] += count
+
+    def samples(self) -> dict[tuple, list]:
+        return self._totals()
+
+
+class CollectedMetric:
+    """A counter or gauge read from elsewhere when metrics are collected,
+    e.g. cache statistics or threadpool state.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        name: str,
+        documentation: str,
+        labelnames: tuple,
+        collect: Callable[[], dict[tuple, float]],
+    ):
+        self.kind = kind
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+
+    def samples(self) -> dict[tuple, float]:
+        return self.collect()
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None and not isinstance(metric, CollectedMetric):
+                return existing
+            # collectors are replaced so a restarted app reads its new state
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self._add(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def collected(
+        self, kind: str, name: str, documentation: str, labelnames, collect
+    ) -> CollectedMetric:
+        return self._add(
+            CollectedMetric(kind, name, documentation, labelnames, collect)
+        )
+
+    # JSON-safe form, written by each worker and merged by merge_snapshots
+    def snapshot(self) -> dict:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        snapshot = {}
+        for metric in metrics:
+            entry = {
+                "type": metric.kind,
+                "help": metric.documentation,
+                "labelnames": list(metric.labelnames),
+                "samples": [
+                    [list(labels), value] for labels, value in metric.samples().items()
+                ],
+            }
+            if isinstance(metric, Histogram):
+                entry["buckets"] = list(metric.buckets)
+            snapshot[metric.name] = entry
+        return snapshot
+
+
+REGISTRY = MetricsRegistry()
+
+
+# Sums the snapshots of several workers. Counters and histograms keep the
+# totals of workers that have exited; gauges only count live workers.
+def merge_snapshots(snapshots: Iterable[tuple[dict, bool]]) -> dict:
+    merged: dict[str, dict] = {}
+    for snapshot, alive in snapshots:
+        for name, entry in snapshot.items():
+            if entry["type"] == "gauge" and not alive:
+                continue
+            target = merged.setdefault(name, {**entry, "samples": {}})
+            for labels, value in entry["samples"]:
+                key = tuple(labels)
+                current = target["samples"].get(key)
+                if current is None:
+                    target["samples"][key] = (
+                        list(value) if isinstance(value, list) else value
+                    )
+                elif isinstance(value, list):
+                    for index, count in enumerate(value):
+                        current[index] += count
+                else:
+                    target["samples"][key] = current + value
+    for entry in merged.values():
+        entry["samples"] = [[list(k), v] for k, v in entry["samples"].items()]
+    return merged
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames, labels, extra: str = "") -> str:
+    pairs = [
+        f'{name}="{_escape(str(value))}"' for name, value in zip(labelnames, labels)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, float):
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        if value.is_integer():
+            return str(int(value))
+    return repr(value)
+
+
+# Prometheus text exposition format 0.0.4
+def render(snapshot: dict) -> str:
+    lines = []
+    for name in sorted(snapshot):
+        entry = snapshot[name]
+        labelnames = entry["labelnames"]
+        lines.append(f"# HELP {name} {_escape(entry['help'])}")
+        lines.append(f"# TYPE {name} {entry['type']}")
+        for labels, value in sorted(entry["samples"]):
+            if entry["type"] != "histogram":
+                lines.append(
+                    f"{name}{_format_labels(labelnames, labels)} {_format_value(value)}"
+                )
+                continue
+            cumulative = 0
+            for bound, count in zip([*entry["buckets"], math.inf], value[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(float(bound))}"'
+                lines.append(
+                    f"{name}_bucket{_format_labels(labelnames, labels, le)} "
+                    f"{cumulative}"
+                )
+            series = _format_labels(labelnames, labels)
+            lines.append(f"{name}_sum{series} {_format_value(value[-1])}")
+            lines.append(f"{name}_count{series} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class MetricsFileStore:
+    """Shares metrics between uvicorn workers through a directory.
+
+    Each worker writes its registry snapshot to ``metrics-<pid>.json`` every
+    ``interval`` seconds and right before serving a scrape; the scraped
+    worker merges every file. Clear the directory when the service (not a
+    single worker) starts.
+    """
+
+    def __init__(self, directory: str, registry: MetricsRegistry, interval: float):
+        self.directory = directory
+        self.registry = registry
+        self.interval = interval
+        self.pid = os.getpid()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, pid: int) -> str:
+        return os.path.join(self.directory, f"metrics-{pid}.json")
+
+    def write(self):
+        path = self._path(self.pid)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as handle:
+            json.dump(self.registry.snapshot(), handle, separators=(",", ":"))
+        os.replace(f"{path}.tmp", path)
+
+    def collect(self) -> dict:
+        self.write()
+        snapshots = []
+        for name in os.listdir(self.directory):
+            if not (name.startswith("metrics-") and name.endswith(".json")):
+                continue
+            pid = int(name[len("metrics-") : -len(".json")])
+            try:
+                with open(os.path.join(self.directory, name), encoding="utf-8") as f:
+                    snapshot = json.load(f)
+            except (FileNotFoundError, ValueError):
+                continue
+            snapshots.append((snapshot, pid == self.pid or _pid_alive(pid)))
+        return merge_snapshots(snapshots)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name="metrics-writer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.write()
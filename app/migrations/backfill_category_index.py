@@ -0,0 +1,56 @@
+import argparse
+import os
+
+import boto3
+from botocore.exceptions import ClientError
+
+
+def backfill_category_index(table) -> int:
+    params = {
+        "FilterExpression": "sk = :meta AND begins_with(pk, :prefix) "
+        "AND attribute_not_exists(category_key)",
+        "ExpressionAttributeValues": {":meta": "META", ":prefix": "PRODUCT#"},
+    }
+    updated = 0
+
+    while True:
+        response = table.scan(**params)
+        for item in response.get("Items", []):
+            try:
+                table.update_item(
+                    Key={"pk": item["pk"], "sk": item["sk"]},
+                    UpdateExpression="SET category_key = category",
+                    ConditionExpression="attribute_exists(pk)",
+                )
+            except ClientError as e:
+                # deleted since the scan saw it
+                if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                    continue
+                raise
+            updated += 1
+
+        start_key = response.get("LastEvaluatedKey")
+        if not start_key:
+            return updated
+        params["ExclusiveStartKey"] = start_key
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Set category_key on product META items created before the "
+        "category index existed."
+    )
+    parser.add_argument("--table-name", default=os.getenv("table_name"))
+    parser.add_argument("--region", default=os.getenv("AWS_REGION", "ap-south-1"))
+    args = parser.parse_args()
+
+    if not args.table_name:
+        parser.error("--table-name or the table_name env var is required")
+
+    table = boto3.resource("dynamodb", region_name=args.region).Table(args.table_name)
+    updated = backfill_category_index(table)
+    print(f"Backfilled {updated} products")
+
+
+if __name__ == "__main__":
+    main()
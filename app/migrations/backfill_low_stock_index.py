@@ -0,0 +1,66 @@
+import argparse
+import os
+
+import boto3
+from botocore.exceptions import ClientError
+
+from app.repository.product_repository import LOW_STOCK_KEY
+
+
+def backfill_low_stock_index(table) -> int:
+    params = {
+        "FilterExpression": "sk = :meta AND begins_with(pk, :prefix) "
+        "AND low_stock_alert_sent = :sent AND attribute_not_exists(low_stock_key)",
+        "ExpressionAttributeValues": {
+            ":meta": "META",
+            ":prefix": "PRODUCT#",
+            ":sent": True,
+        },
+    }
+    updated = 0
+
+    while True:
+        response = table.scan(**params)
+        for item in response.get("Items", []):
+            try:
+                table.update_item(
+                    Key={"pk": item["pk"], "sk": item["sk"]},
+                    UpdateExpression="SET low_stock_key = :low_stock_key",
+                    # the alert may have been cleared since the scan saw it
+                    ConditionExpression="low_stock_alert_sent = :sent",
+                    ExpressionAttributeValues={
+                        ":low_stock_key": LOW_STOCK_KEY,
+                        ":sent": True,
+                    },
+                )
+            except ClientError as e:
+                if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                    continue
+                raise
+            updated += 1
+
+        start_key = response.get("LastEvaluatedKey")
+        if not start_key:
+            return updated
+        params["ExclusiveStartKey"] = start_key
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Set low_stock_key on products whose low-stock alert was "
+        "raised before the low-stock index existed."
+    )
+    parser.add_argument("--table-name", default=os.getenv("table_name"))
+    parser.add_argument("--region", default=os.getenv("AWS_REGION", "ap-south-1"))
+    args = parser.parse_args()
+
+    if not args.table_name:
+        parser.error("--table-name or the table_name env var is required")
+
+    table = boto3.resource("dynamodb", region_name=args.region).Table(args.table_name)
+    updated = backfill_low_stock_index(table)
+    print(f"Backfilled {updated} products")
+
+
+if __name__ == "__main__":
+    main()
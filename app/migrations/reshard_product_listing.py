@@ -0,0 +1,60 @@
+import argparse
+import os
+
+import boto3
+
+from app.repository.product_repository import (
+    listing_partition_key,
+    listing_partition_keys,
+)
+
+
+def reshard_product_listing(table, from_shards: int, to_shards: int) -> int:
+    moved = 0
+    with table.batch_writer() as batch:
+        for partition_key in listing_partition_keys(from_shards):
+            params = {
+                "KeyConditionExpression": "pk = :pk",
+                "ExpressionAttributeValues": {":pk": partition_key},
+            }
+            while True:
+                response = table.query(**params)
+                for item in response.get("Items", []):
+                    target = listing_partition_key(item["id"], to_shards)
+                    if target == item["pk"]:
+                        continue
+
+                    batch.put_item(Item={**item, "pk": target})
+                    batch.delete_item(Key={"pk": item["pk"], "sk": item["sk"]})
+                    moved += 1
+
+                start_key = response.get("LastEvaluatedKey")
+                if not start_key:
+                    break
+                params["ExclusiveStartKey"] = start_key
+
+    return moved
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Move product listing items between PRODUCTS shard layouts. "
+        "Pause product writes while this runs, then deploy with "
+        "PRODUCT_LISTING_SHARDS set to the new shard count."
+    )
+    parser.add_argument("--from-shards", type=int, required=True)
+    parser.add_argument("--to-shards", type=int, required=True)
+    parser.add_argument("--table-name", default=os.getenv("table_name"))
+    parser.add_argument("--region", default=os.getenv("AWS_REGION", "ap-south-1"))
+    args = parser.parse_args()
+
+    if not args.table_name:
+        parser.error("--table-name or the table_name env var is required")
+
+    table = boto3.resource("dynamodb", region_name=args.region).Table(args.table_name)
+    moved = reshard_product_listing(table, args.from_shards, args.to_shards)
+    print(f"Moved {moved} listing items")
+
+
+if __name__ == "__main__":
+    main()
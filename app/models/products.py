@@ -10,5 +10,9 @@ class Product(BaseModel):
     category: str
     override_threshold: Optional[int] = Field(None, ge=0)
     low_stock_alert_sent: Optional[bool] = Field(False)
+    stock_shards: Optional[int] = Field(None, ge=2)
+    # bumped by every write to the product; items stored before versioning
+    # was introduced read as 0
+    version: int = Field(0, ge=0)
 
     model_config = ConfigDict(extra="ignore")
@@ -0,0 +1,14 @@
+from typing import Literal
+
+from pydantic import BaseModel, ConfigDict
+
+MovementReason = Literal["create", "import", "stock_in", "stock_out", "bulk"]
+
+
+class StockMovementEntry(BaseModel):
+    product_id: str
+    delta: int
+    reason: MovementReason
+    recorded_at: str
+
+    model_config = ConfigDict(extra="ignore")
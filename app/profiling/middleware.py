@@ -0,0 +1,149 @@
+from contextvars import ContextVar
+import os
+import random
+import threading
+import time
+
+from anyio import to_thread
+
+from app.models.user_group import UserGroup
+from app.profiling.profile_store import ProfileStore
+from app.profiling.sampler import SamplingProfiler
+from app.utils import jwt_verifier
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+
+# set to a fresh marker for the profiled request; threadpool jobs run in a
+# copy of the request's context, so the sampler can tell its jobs apart from
+# those of other requests
+_profiled_request: ContextVar[object | None] = ContextVar(
+    "profiled_request", default=None
+)
+
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# code that runs on behalf of a request: handlers and their dependencies,
+# the services they call and response encoding
+REQUEST_CODE_PATHS = (
+    os.path.join(_APP_DIR, "routes") + os.sep,
+    os.path.join(_APP_DIR, "services") + os.sep,
+    os.path.join(_APP_DIR, "response") + os.sep,
+    os.path.join(_APP_DIR, "dependencies.py"),
+    os.path.join(_APP_DIR, "app.py"),
+)
+
+
+def _header(scope, name: bytes) -> bytes | None:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value
+    return None
+
+
+def _is_manager(scope, state) -> bool:
+    authorization = _header(scope, b"authorization")
+    if authorization is None or not authorization.startswith(b"Bearer "):
+        return False
+    try:
+        claims = jwt_verifier.verify_access_token(
+            authorization[7:].decode("latin-1"), state.jwks, state.cognito_issuer
+        )
+    except Exception:
+        return False
+    return UserGroup.MANAGER in claims.get("cognito:groups", [])
+
+
+class ProfilingMiddleware:
+    """Samples the stacks of one request at a time into the app's profile
+    store. A request is profiled when a manager sends ``X-Profile: 1`` or
+    when it falls in the ``profile_sample_rate`` fraction; the profile id is
+    returned in ``X-Profile-Id``. Other requests only pay for a header scan.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        # one profile at a time keeps the sampling overhead bounded
+        self._profiling = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self._profiling:
+            await self.app(scope, receive, send)
+            return
+
+        state = scope["app"].state
+        store: ProfileStore | None = getattr(state, "profile_store", None)
+        trigger = None if store is None else self._trigger(scope, state)
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        await self._profile(scope, receive, send, state, store, trigger)
+
+    @staticmethod
+    def _trigger(scope, state) -> str | None:
+        if _header(scope, PROFILE_HEADER) == b"1" and _is_manager(scope, state):
+            return "header"
+        rate = state.profile_sample_rate
+        if rate and random.random() < rate:
+            return "sampled"
+        return None
+
+    async def _profile(self, scope, receive, send, state, store, trigger):
+        profile_id = store.new_id()
+        status_code = 500
+
+        async def send_with_profile_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message = {
+                    **message,
+                    "headers": [
+                        *message.get("headers", []),
+                        (PROFILE_ID_HEADER, profile_id.encode()),
+                    ],
+                }
+            await send(message)
+
+        # on the event loop, this request's task is the one running under
+        # this frame; the other requests only pass through __call__. On the
+        # threadpool, only jobs started from this request's context count.
+        marker = object()
+        profiler = SamplingProfiler(
+            state.profile_interval,
+            REQUEST_CODE_PATHS,
+            frozenset([ProfilingMiddleware._profile.__code__]),
+            (_profiled_request, marker),
+            threading.get_ident(),
+        )
+        self._profiling = True
+        started_at = time.time()
+        started = time.perf_counter()
+        token = _profiled_request.set(marker)
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            stacks = profiler.stop()
+            _profiled_request.reset(token)
+            duration = time.perf_counter() - started
+            self._profiling = False
+            try:
+                await to_thread.run_sync(
+                    store.save,
+                    {
+                        "id": profile_id,
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "status_code": status_code,
+                        "trigger": trigger,
+                        "started_at": started_at,
+                        "duration_ms": round(duration * 1000, 3),
+                        "interval_ms": state.profile_interval * 1000,
+                        "samples": profiler.samples,
+                        "stacks": stacks,
+                    },
+                )
+            except OSError:
+                # losing a profile must not fail the request it describes
+                pass
@@ -0,0 +1,72 @@
+import json
+import os
+import re
+import secrets
+import threading
+import time
+
+_PROFILE_ID = re.compile(r"^\d{19}-[0-9a-f]{8}$")
+
+
+class ProfileStore:
+    """Keeps the newest ``max_profiles`` request profiles as JSON files.
+
+    Ids start with the creation time in nanoseconds, so file names sort
+    oldest first and the oldest files are the ones dropped.
+    """
+
+    def __init__(self, directory: str, max_profiles: int):
+        self.directory = directory
+        self.max_profiles = max_profiles
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def new_id() -> str:
+        return f"{time.time_ns():019d}-{secrets.token_hex(4)}"
+
+    def _path(self, profile_id: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}.json")
+
+    def _profile_ids(self) -> list[str]:
+        return sorted(
+            name[:-5]
+            for name in os.listdir(self.directory)
+            if name.endswith(".json") and _PROFILE_ID.match(name[:-5])
+        )
+
+    def save(self, profile: dict):
+        path = self._path(profile["id"])
+        with open(path + ".tmp", "w", encoding="utf-8") as handle:
+            json.dump(profile, handle, separators=(",", ":"))
+        os.replace(path + ".tmp", path)
+
+        with self._lock:
+            profile_ids = self._profile_ids()
+            for profile_id in profile_ids[
+                : max(0, len(profile_ids) - self.max_profiles)
+            ]:
+                try:
+                    os.remove(self._path(profile_id))
+                except FileNotFoundError:
+                    pass
+
+    def get(self, profile_id: str) -> dict | None:
+        # the id becomes a file name, so anything else is rejected outright
+        if not _PROFILE_ID.match(profile_id):
+            return None
+        try:
+            with open(self._path(profile_id), encoding="utf-8") as handle:
+                return json.load(handle)
+        except FileNotFoundError:
+            return None
+
+    # newest first, without the stacks
+    def list(self) -> list[dict]:
+        summaries = []
+        for profile_id in reversed(self._profile_ids()):
+            profile = self.get(profile_id)
+            if profile is not None:
+                profile.pop("stacks", None)
+                summaries.append(profile)
+        return summaries
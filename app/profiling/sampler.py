@@ -0,0 +1,138 @@
+from collections import Counter
+from contextvars import Context, ContextVar
+import os
+import sys
+import threading
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _short_path(filename: str) -> str:
+    _, marker, rest = filename.rpartition("site-packages" + os.sep)
+    if marker:
+        return rest
+    if filename.startswith(_ROOT + os.sep):
+        return os.path.relpath(filename, _ROOT)
+    return os.path.basename(filename)
+
+
+class SamplingProfiler:
+    """Records the Python stacks of other threads every ``interval`` seconds.
+
+    Only stacks that pass through a file under one of ``include_paths``, or
+    through one of ``include_codes``, are kept, so idle workers and unrelated
+    background threads drop out. To profile one request among many:
+
+    - ``context_marker`` (a context variable and a value): an anyio worker's
+      stack is kept only while it runs a job whose context holds the value,
+      so workers busy with other requests drop out;
+    - ``task_thread``: on this thread, the event loop's, only stacks through
+      ``include_codes`` are kept, since every request's task passes through
+      the include paths.
+
+    Nothing is traced between
+    samples, so the profiled code runs at full speed apart from the sampler
+    briefly holding the GIL.
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        include_paths: tuple[str, ...],
+        include_codes: frozenset = frozenset(),
+        context_marker: tuple[ContextVar, object] | None = None,
+        task_thread: int | None = None,
+    ):
+        self.interval = interval
+        self.include_paths = include_paths
+        self.include_codes = include_codes
+        self.context_marker = context_marker
+        self.task_thread = task_thread
+        self.samples = 0
+        self._stacks: Counter = Counter()
+        self._included: dict = {}
+        self._worker_loops: dict = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _is_included(self, code) -> bool:
+        included = self._included.get(code)
+        if included is None:
+            included = self._included[code] = (
+                code in self.include_codes
+                or code.co_filename.startswith(self.include_paths)
+            )
+        return included
+
+    def _is_worker_loop(self, code) -> bool:
+        # anyio's WorkerThread.run, which runs each job as context.run(func)
+        worker = self._worker_loops.get(code)
+        if worker is None:
+            worker = self._worker_loops[code] = (
+                code.co_name == "run" and f"{os.sep}anyio{os.sep}" in code.co_filename
+            )
+        return worker
+
+    def _sample(self, own_ident: int):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            codes, included, in_codes, worker = [], False, False, None
+            while frame is not None:
+                code = frame.f_code
+                included = included or self._is_included(code)
+                in_codes = in_codes or code in self.include_codes
+                if worker is None and self._is_worker_loop(code):
+                    worker = frame
+                codes.append(code)
+                frame = frame.f_back
+            if ident == self.task_thread:
+                keep = in_codes
+            elif worker is not None and self.context_marker is not None:
+                keep = self._runs_marked_job(worker)
+            else:
+                keep = included
+            if keep:
+                codes.reverse()
+                self._stacks[(names.get(ident, str(ident)), tuple(codes))] += 1
+        self.samples += 1
+
+    def _runs_marked_job(self, worker_frame) -> bool:
+        # the job's context is a local of the worker loop while it runs
+        context = worker_frame.f_locals.get("context")
+        var, value = self.context_marker
+        return isinstance(context, Context) and context.get(var) is value
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self._sample(own_ident)
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name="request-profiler", daemon=True
+        )
+        self._thread.start()
+
+    # Stops sampling and returns the stacks in the folded format flame graph
+    # tools read: "thread;outermost;...;innermost" -> sample count.
+    def stop(self) -> dict[str, int]:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+        labels = {}
+        folded: Counter = Counter()
+        for (thread_name, codes), count in self._stacks.items():
+            frames = [thread_name]
+            for code in codes:
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = (
+                        f"{code.co_name} "
+                        f"({_short_path(code.co_filename)}:{code.co_firstlineno})"
+                    )
+                frames.append(label)
+            folded[";".join(frames)] += count
+        return dict(folded)
@@ -0,0 +1,164 @@
+import bisect
+import threading
+from typing import Callable, NamedTuple, Protocol
+
+from boto3.dynamodb.types import TypeSerializer
+from botocore.exceptions import ClientError
+
+_serializer = TypeSerializer()
+
+LOCAL_STREAM_TRIM_BATCH = 1024
+
+
+class StreamShard(NamedTuple):
+    shard_id: str
+    parent_shard_id: str | None = None
+    # a closed shard takes no new records and ends once read to its end
+    closed: bool = False
+
+
+class ShardPage(NamedTuple):
+    records: list[dict]
+    # no records remain in the shard, now or later
+    exhausted: bool = False
+
+
+class ChangeStream(Protocol):
+    def shards(self) -> list[StreamShard]: ...
+
+    def read(
+        self, shard_id: str, after_sequence: str | None, limit: int
+    ) -> ShardPage: ...
+
+
+def _serialize_image(image: dict | None) -> dict | None:
+    if image is None:
+        return None
+    return {key: _serializer.serialize(value) for key, value in image.items()}
+
+
+# In-process stand-in for a DynamoDB stream, fed by ``LocalTable`` writes on
+# the memory and SQLite engines. Records use the DynamoDB Streams record shape
+# so consumers cannot tell the two sources apart.
+class LocalChangeStream:
+    SHARD_ID = "local-0"
+
+    # With a ``clock``, e.g. time.time_ns, sequence numbers never fall behind
+    # it, so they keep growing across restarts of the process.
+    def __init__(self, clock: Callable[[], int] | None = None):
+        self._lock = threading.Lock()
+        self._records: list[dict] = []
+        self._sequences: list[int] = []
+        self._next_sequence = 1
+        self._clock = clock
+
+    def append(
+        self,
+        event_name: str,
+        keys: dict,
+        new_image: dict | None = None,
+        old_image: dict | None = None,
+    ) -> str:
+        with self._lock:
+            sequence = self._next_sequence
+            if self._clock is not None:
+                sequence = max(sequence, self._clock())
+            self._next_sequence = sequence + 1
+
+            change = {
+                "Keys": _serialize_image(keys),
+                "SequenceNumber": str(sequence),
+                "StreamViewType": "NEW_AND_OLD_IMAGES",
+            }
+            if new_image is not None:
+                change["NewImage"] = _serialize_image(new_image)
+            if old_image is not None:
+                change["OldImage"] = _serialize_image(old_image)
+
+            self._records.append({"eventName": event_name, "dynamodb": change})
+            self._sequences.append(sequence)
+            return str(sequence)
+
+    def shards(self) -> list[StreamShard]:
+        return [StreamShard(self.SHARD_ID)]
+
+    # The stream has a single reader, so records it has read past are dropped,
+    # a batch at a time to keep the cost per read constant.
+    def read(self, shard_id: str, after_sequence: str | None, limit: int) -> ShardPage:
+        with self._lock:
+            start = bisect.bisect_right(self._sequences, int(after_sequence or 0))
+            if start >= LOCAL_STREAM_TRIM_BATCH and start * 2 >= len(self._records):
+                del self._records[:start]
+                del self._sequences[:start]
+                start = 0
+            return ShardPage(self._records[start : start + limit])
+
+
+# GetRecords pages can be empty or short while more records follow, so a
+# shard is read by following NextShardIterator, not by asking for a fresh
+# iterator at the checkpoint each time. The iterator left by the last page is
+# kept together with the sequence it continues after and reused when the
+# caller resumes from that same sequence.
+class DynamoDBChangeStream:
+    def __init__(self, streams_client, stream_arn: str):
+        self.client = streams_client
+        self.stream_arn = stream_arn
+        self._iterators: dict[str, tuple[str | None, str]] = {}
+
+    def shards(self) -> list[StreamShard]:
+        shards = []
+        params = {"StreamArn": self.stream_arn}
+        while True:
+            description = self.client.describe_stream(**params)["StreamDescription"]
+            shards.extend(
+                StreamShard(
+                    shard["ShardId"],
+                    shard.get("ParentShardId"),
+                    "EndingSequenceNumber" in shard.get("SequenceNumberRange", {}),
+                )
+                for shard in description["Shards"]
+            )
+
+            last_shard_id = description.get("LastEvaluatedShardId")
+            if not last_shard_id:
+                self._forget_iterators({shard.shard_id for shard in shards})
+                return shards
+            params["ExclusiveStartShardId"] = last_shard_id
+
+    def _forget_iterators(self, shard_ids: set[str]):
+        for shard_id in list(self._iterators):
+            if shard_id not in shard_ids:
+                del self._iterators[shard_id]
+
+    def _shard_iterator(self, shard_id: str, after_sequence: str | None) -> str:
+        params = {"StreamArn": self.stream_arn, "ShardId": shard_id}
+        if after_sequence:
+            params["ShardIteratorType"] = "AFTER_SEQUENCE_NUMBER"
+            params["SequenceNumber"] = after_sequence
+        else:
+            params["ShardIteratorType"] = "TRIM_HORIZON"
+
+        return self.client.get_shard_iterator(**params)["ShardIterator"]
+
+    def read(self, shard_id: str, after_sequence: str | None, limit: int) -> ShardPage:
+        # a failed read drops the iterator, so the retry starts at the checkpoint
+        position, iterator = self._iterators.pop(shard_id, (None, None))
+        if iterator is None or position != after_sequence:
+            iterator = self._shard_iterator(shard_id, after_sequence)
+
+        try:
+            response = self.client.get_records(ShardIterator=iterator, Limit=limit)
+        except ClientError as e:
+            # iterators expire after 15 minutes, e.g. while a parent is read
+            if e.response["Error"]["Code"] != "ExpiredIteratorException":
+                raise
+            iterator = self._shard_iterator(shard_id, after_sequence)
+            response = self.client.get_records(ShardIterator=iterator, Limit=limit)
+
+        records = response["Records"]
+        next_iterator = response.get("NextShardIterator")
+        if next_iterator:
+            if records:
+                after_sequence = records[-1]["dynamodb"]["SequenceNumber"]
+            self._iterators[shard_id] = (after_sequence, next_iterator)
+        return ShardPage(records, exhausted=next_iterator is None)
@@ -0,0 +1,134 @@
+import threading
+import time
+from typing import Callable, Protocol
+import uuid
+
+from botocore.exceptions import ClientError
+
+# Checkpoint of a closed shard that has been read to its end.
+SHARD_END = "SHARD_END"
+SEQUENCE_WIDTH = 40
+LEASE_DURATION = 60.0
+
+
+# Stream sequence numbers are decimal strings of varying length, so they are
+# padded to compare correctly as strings. SHARD_END sorts after all of them.
+def checkpoint_position(sequence_number: str) -> str:
+    if sequence_number == SHARD_END:
+        return SHARD_END
+    return sequence_number.zfill(SEQUENCE_WIDTH)
+
+
+class CheckpointStore(Protocol):
+    def get(self, shard_id: str) -> str | None: ...
+
+    # Moves the checkpoint forward; False when it is already at or past
+    # ``sequence_number``.
+    def put(self, shard_id: str, sequence_number: str) -> bool: ...
+
+
+class InMemoryCheckpointStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checkpoints: dict[str, str] = {}
+
+    def get(self, shard_id: str) -> str | None:
+        with self._lock:
+            return self._checkpoints.get(shard_id)
+
+    def put(self, shard_id: str, sequence_number: str) -> bool:
+        with self._lock:
+            current = self._checkpoints.get(shard_id)
+            if current is not None and checkpoint_position(
+                current
+            ) >= checkpoint_position(sequence_number):
+                return False
+            self._checkpoints[shard_id] = sequence_number
+            return True
+
+
+class DynamoDBCheckpointStore:
+    """Checkpoints in the table itself, one item per stream shard.
+
+    Writes are conditional on moving forward, so a consumer that fell behind
+    can never move a checkpoint back or reopen a shard marked SHARD_END.
+    """
+
+    def __init__(self, table, consumer: str):
+        self.table = table
+        self.pk = f"PROJECTOR#{consumer}"
+
+    def get(self, shard_id: str) -> str | None:
+        response = self.table.get_item(
+            Key={"pk": self.pk, "sk": f"SHARD#{shard_id}"},
+            ConsistentRead=True,
+        )
+        item = response.get("Item")
+        return item["sequence_number"] if item else None
+
+    def put(self, shard_id: str, sequence_number: str) -> bool:
+        position = checkpoint_position(sequence_number)
+        try:
+            self.table.put_item(
+                Item={
+                    "pk": self.pk,
+                    "sk": f"SHARD#{shard_id}",
+                    "sequence_number": sequence_number,
+                    "checkpoint_position": position,
+                },
+                ConditionExpression=(
+                    "attribute_not_exists(checkpoint_position) "
+                    "OR checkpoint_position < :position"
+                ),
+                ExpressionAttributeValues={":position": position},
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                return False
+            raise
+        return True
+
+
+class DynamoDBLease:
+    """Lets one process at a time run a consumer, e.g. one uvicorn worker.
+
+    The holder renews the lease as it goes; one left to expire, say by a
+    worker that died, is taken over by the next process that asks. Around an
+    expiry two holders may briefly overlap, which the forward-only checkpoints
+    and the projection's own sequence checks make harmless.
+    """
+
+    def __init__(
+        self,
+        table,
+        consumer: str,
+        duration: float = LEASE_DURATION,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.table = table
+        self.key = {"pk": f"PROJECTOR#{consumer}", "sk": "LEASE"}
+        self.owner = uuid.uuid4().hex
+        self.duration = duration
+        self._clock = clock
+
+    # Takes or renews the lease; False while another process holds it.
+    def acquire(self) -> bool:
+        now = int(self._clock() * 1000)
+        try:
+            self.table.put_item(
+                Item={
+                    **self.key,
+                    "lease_owner": self.owner,
+                    "expires_at": now + int(self.duration * 1000),
+                },
+                ConditionExpression=(
+                    "attribute_not_exists(pk) OR lease_owner = :owner "
+                    "OR expires_at < :now"
+                ),
+                ExpressionAttributeValues={":owner": self.owner, ":now": now},
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                return False
+            raise
+        return True
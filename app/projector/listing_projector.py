@@ -0,0 +1,196 @@
+import threading
+
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.exceptions import ClientError
+
+from app.models.products import Product
+from app.projector.change_stream import ChangeStream, StreamShard
+from app.projector.checkpoint_store import (
+    SHARD_END,
+    CheckpointStore,
+    DynamoDBLease,
+    checkpoint_position,
+)
+from app.repository.product_repository import (
+    build_listing_item,
+    listing_partition_key,
+)
+
+PROJECTOR_BATCH_SIZE = 100
+
+_deserializer = TypeDeserializer()
+
+
+def _deserialize_image(image: dict | None) -> dict:
+    return {
+        key: _deserializer.deserialize(value) for key, value in (image or {}).items()
+    }
+
+
+# Orders shards so every listed parent comes before its children.
+def _parents_first(shards: list[StreamShard]) -> list[StreamShard]:
+    by_id = {shard.shard_id: shard for shard in shards}
+    ordered: list[StreamShard] = []
+    seen: set[str] = set()
+
+    def visit(shard: StreamShard):
+        if shard.shard_id in seen:
+            return
+        seen.add(shard.shard_id)
+        parent = by_id.get(shard.parent_shard_id)
+        if parent is not None:
+            visit(parent)
+        ordered.append(shard)
+
+    for shard in shards:
+        visit(shard)
+    return ordered
+
+
+class ListingProjector:
+    def __init__(
+        self,
+        table,
+        stream: ChangeStream,
+        checkpoints: CheckpointStore,
+        listing_shards: int,
+        batch_size: int = PROJECTOR_BATCH_SIZE,
+        lease: DynamoDBLease | None = None,
+    ):
+        self.table = table
+        self.stream = stream
+        self.checkpoints = checkpoints
+        self.listing_shards = listing_shards
+        self.batch_size = batch_size
+        # without a lease every process projects; with one, only its holder
+        self.lease = lease
+        self._retired: set[str] = set()
+
+    def apply(self, record: dict) -> bool:
+        change = record["dynamodb"]
+        keys = _deserialize_image(change["Keys"])
+        if keys.get("sk") != "META" or not str(keys.get("pk", "")).startswith(
+            "PRODUCT#"
+        ):
+            return False
+
+        sequence = checkpoint_position(change["SequenceNumber"])
+        product_id = keys["pk"].removeprefix("PRODUCT#")
+
+        # Each listing item remembers the newest record applied to it, so a
+        # replay after a crash skips anything already projected. Within a
+        # shard records arrive in order, so replaying from a checkpoint
+        # converges on the same state.
+        try:
+            if record["eventName"] == "REMOVE":
+                self.table.delete_item(
+                    Key={
+                        "pk": listing_partition_key(product_id, self.listing_shards),
+                        "sk": f"PRODUCT#{product_id}",
+                    },
+                    ConditionExpression="attribute_not_exists(pk) OR source_sequence < :seq",
+                    ExpressionAttributeValues={":seq": sequence},
+                )
+            else:
+                product = Product(**_deserialize_image(change["NewImage"]))
+                item = build_listing_item(product, self.listing_shards)
+                item["source_sequence"] = sequence
+                self.table.put_item(
+                    Item=item,
+                    ConditionExpression="attribute_not_exists(pk) OR source_sequence < :seq",
+                    ExpressionAttributeValues={":seq": sequence},
+                )
+        except ClientError as e:
+            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                return False
+            raise
+
+        return True
+
+    def _is_retired(self, shard_id: str) -> bool:
+        if shard_id in self._retired:
+            return True
+        if self.checkpoints.get(shard_id) == SHARD_END:
+            self._retired.add(shard_id)
+            return True
+        return False
+
+    # Reads one shard from its checkpoint. Open shards are read until a page
+    # comes back empty; closed ones until the stream reports their end, which
+    # retires them. A lost lease, or a checkpoint another consumer has moved
+    # past this page, ends the read. Returns the number of records read.
+    def _read_shard(self, shard: StreamShard) -> int:
+        processed = 0
+        while True:
+            if self.lease is not None and not self.lease.acquire():
+                return processed
+            after = self.checkpoints.get(shard.shard_id)
+            page = self.stream.read(shard.shard_id, after, self.batch_size)
+
+            for record in page.records:
+                self.apply(record)
+            if page.records:
+                processed += len(page.records)
+                moved = self.checkpoints.put(
+                    shard.shard_id, page.records[-1]["dynamodb"]["SequenceNumber"]
+                )
+                if not moved:
+                    return processed
+
+            if page.exhausted:
+                self.checkpoints.put(shard.shard_id, SHARD_END)
+                self._retired.add(shard.shard_id)
+                return processed
+            if not page.records and not shard.closed:
+                return processed
+
+    def run_once(self) -> int:
+        shards = _parents_first(self.stream.shards())
+        listed = {shard.shard_id for shard in shards}
+        # trimmed shards drop out of the listing, and out of this set with them
+        self._retired &= listed
+
+        processed = 0
+        for shard in shards:
+            if self._is_retired(shard.shard_id):
+                continue
+            # a child holds the later versions of its parent's keys, so it
+            # waits until the parent has been read to its end
+            parent = shard.parent_shard_id
+            if parent in listed and not self._is_retired(parent):
+                continue
+            processed += self._read_shard(shard)
+
+        return processed
+
+    def run_forever(self, stop_event: threading.Event, poll_interval: float = 1.0):
+        while not stop_event.is_set():
+            try:
+                if self.lease is None or self.lease.acquire():
+                    processed = self.run_once()
+                else:
+                    processed = 0
+            except ClientError:
+                processed = 0
+            if not processed:
+                stop_event.wait(poll_interval)
+
+
+def start_listing_projector(
+    table,
+    stream: ChangeStream,
+    checkpoints: CheckpointStore,
+    listing_shards: int,
+    lease: DynamoDBLease | None = None,
+) -> threading.Event:
+    projector = ListingProjector(
+        table, stream, checkpoints, listing_shards, lease=lease
+    )
+    stop_event = threading.Event()
+    threading.Thread(
+        target=projector.run_forever,
+        args=(stop_event,),
+        name="listing-projector",
+        daemon=True,
+    ).start()
+    return stop_event
@@ -0,0 +1,159 @@
+from anyio import to_thread
+from botocore.exceptions import ClientError
+
+from app.dto.category_request import CreateCategoryRequest, UpdateCategoryRequest
+from app.models.category import Category
+from app.repository.cached_category_repository import CATEGORY_VERSION_KEY
+from app.repository.category_repository import CategoryTableLayout, category_key
+from app.utils.async_dynamodb import AsyncTable
+from app.utils.category_snapshot import CategorySnapshot
+from app.tracing.tracer import trace_methods
+
+
+@trace_methods
+class AsyncCategoryRepository(CategoryTableLayout):
+    """``CategoryRepository`` for the event loop."""
+
+    def __init__(self, table: AsyncTable):
+        super().__init__(table)
+
+    async def create_category(self, req: CreateCategoryRequest) -> Category:
+        item = self._new_category_item(req)
+        try:
+            await self.table.put_item(
+                Item=item,
+                ConditionExpression="attribute_not_exists(pk)",
+            )
+        except ClientError as e:
+            raise self._create_failed(req, e)
+
+        return Category(**item)
+
+    async def get_category(self, name: str) -> Category | None:
+        try:
+            response = await self.table.get_item(Key=category_key(name))
+        except ClientError as e:
+            raise self._read_failed("Failed to fetch category", e)
+
+        item = response.get("Item")
+        return Category(**item) if item else None
+
+    async def get_all_categories(self) -> list[Category]:
+        params = self._all_categories_params()
+        categories = []
+
+        try:
+            while True:
+                response = await self.table.query(**params)
+                categories.extend(
+                    Category(**item) for item in response.get("Items", [])
+                )
+
+                start_key = response.get("LastEvaluatedKey")
+                if not start_key:
+                    return categories
+                params["ExclusiveStartKey"] = start_key
+
+        except ClientError as e:
+            raise self._read_failed("Failed to fetch categories", e)
+
+    async def update_category(self, name: str, req: UpdateCategoryRequest):
+        params = self._category_update(name, req)
+        if params is None:
+            return
+
+        try:
+            await self.table.update_item(**params)
+        except ClientError as e:
+            raise self._write_failed("Failed to update category", e)
+
+    async def delete_category(self, name: str):
+        try:
+            await self.table.delete_item(**self._category_delete(name))
+        except ClientError as e:
+            raise self._write_failed("Failed to delete category", e)
+
+
+@trace_methods
+class AsyncCachedCategoryRepository(AsyncCategoryRepository):
+    """``CachedCategoryRepository`` for the event loop.
+
+    Reads and versions the same snapshot. Sync readers hold the snapshot's
+    lock while they reload, so the loop never waits on it: its own readers
+    queue on ``snapshot.async_lock`` instead, and a reload they make is only
+    stored when no sync reload is running.
+    """
+
+    def __init__(self, table: AsyncTable, snapshot: CategorySnapshot | None = None):
+        super().__init__(table)
+        self.snapshot = snapshot
+
+    async def _read_version(self):
+        try:
+            response = await self.table.get_item(Key=CATEGORY_VERSION_KEY)
+        except ClientError as e:
+            raise self._read_failed("Failed to fetch categories", e)
+        return response.get("Item", {}).get("version", 0)
+
+    async def _bump_version(self):
+        try:
+            await self.table.update_item(
+                Key=CATEGORY_VERSION_KEY,
+                UpdateExpression="ADD version :one",
+                ExpressionAttributeValues={":one": 1},
+            )
+        except ClientError as e:
+            raise self._write_failed("Failed to publish category change", e)
+        finally:
+            # expire() waits for a sync reload in progress
+            await to_thread.run_sync(self.snapshot.expire)
+
+    async def _categories(self) -> dict[str, Category]:
+        snapshot = self.snapshot
+        if snapshot.is_fresh():
+            return snapshot.categories
+
+        async with snapshot.async_lock:
+            if snapshot.is_fresh():
+                return snapshot.categories
+
+            version = await self._read_version()
+            categories = None
+            if snapshot.categories is None or version != snapshot.version:
+                categories = {
+                    category.name: category
+                    for category in await super().get_all_categories()
+                }
+
+            if snapshot.lock.acquire(blocking=False):
+                try:
+                    snapshot.replace(version, categories)
+                finally:
+                    snapshot.lock.release()
+            return categories if categories is not None else snapshot.categories
+
+    async def get_category(self, name: str) -> Category | None:
+        if self.snapshot is None:
+            return await super().get_category(name)
+        return (await self._categories()).get(name)
+
+    async def get_all_categories(self) -> list[Category]:
+        if self.snapshot is None:
+            return await super().get_all_categories()
+        return list((await self._categories()).values())
+
+    async def create_category(self, req: CreateCategoryRequest) -> Category:
+        category = await super().create_category(req)
+        if self.snapshot is not None:
+            await self._bump_version()
+        return category
+
+    async def update_category(self, name: str, req: UpdateCategoryRequest):
+        await super().update_category(name, req)
+        if self.snapshot is not None:
+            await self._bump_version()
+
+    async def delete_category(self, name: str):
+        await super().delete_category(name)
+        if self.snapshot is not None:
+            await self._bump_version()
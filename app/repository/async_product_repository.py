@@ -0,0 +1,434 @@
+import asyncio
+import heapq
+import random
+from typing import AsyncIterator, List
+
+from botocore.exceptions import ClientError
+
+from app.models.products import Product
+from app.repository.cached_product_repository import ProductCacheLayer
+from app.repository.product_repository import (
+    BATCH_GET_CHUNK_SIZE,
+    BATCH_MAX_ATTEMPTS,
+    CATEGORY_INDEX_NAME,
+    CONDITION_FAILED_CODES,
+    LOW_STOCK_INDEX_NAME,
+    LOW_STOCK_KEY,
+    ProductTableLayout,
+    listing_partition_keys,
+    stock_shard_key,
+)
+from app.app_exception.app_exception import AppException
+from app.utils.async_dynamodb import AsyncTable
+from app.utils.pagination import decode_cursor, encode_cursor
+from app.utils.retry import backoff_delay
+from app.tracing.tracer import trace_methods
+
+
+@trace_methods
+class AsyncProductRepository(ProductTableLayout):
+    """The product reads and stock writes of ``ProductRepository``, awaited.
+
+    Requests, conditions and failure handling are the shared ones of
+    ``ProductTableLayout``, so both repositories read and write the same
+    items the same way.
+    """
+
+    def __init__(self, table: AsyncTable):
+        super().__init__(table)
+
+    async def _write(self, actions: List[dict]):
+        if len(actions) > 1:
+            await self.ddb_client.transact_write_items(TransactItems=actions)
+            return
+
+        # a single action needs no transaction, which halves its write cost
+        ((kind, params),) = actions[0].items()
+        params = {key: value for key, value in params.items() if key != "TableName"}
+        if kind == "Put":
+            await self.table.put_item(**params)
+        elif kind == "Update":
+            await self.table.update_item(**params)
+        else:
+            await self.table.delete_item(**params)
+
+    async def _query(
+        self,
+        key_name: str,
+        key_value: str,
+        start_key: dict | None = None,
+        limit: int | None = None,
+        index_name: str | None = None,
+    ):
+        try:
+            return await self.table.query(
+                **self._query_params(key_name, key_value, start_key, limit, index_name)
+            )
+        except ClientError as e:
+            raise self._query_failed(e)
+
+    async def _query_index_page(
+        self, index_name: str, key_name: str, key_value: str, limit: int, cursor
+    ) -> tuple[List[Product], str | None]:
+        start_key = decode_cursor(cursor)
+        products: List[Product] = []
+
+        while len(products) < limit:
+            response = await self._query(
+                key_name, key_value, start_key, limit - len(products), index_name
+            )
+            products.extend(Product(**item) for item in response.get("Items", []))
+            start_key = response.get("LastEvaluatedKey")
+            if not start_key:
+                break
+
+        return await self._resolve_stock_totals(products), encode_cursor(start_key)
+
+    async def get_products_by_category_page(
+        self, category: str, limit: int, cursor: str | None = None
+    ) -> tuple[List[Product], str | None]:
+        return await self._query_index_page(
+            CATEGORY_INDEX_NAME, "category_key", category, limit, cursor
+        )
+
+    async def get_low_stock_products_page(
+        self, limit: int, cursor: str | None = None
+    ) -> tuple[List[Product], str | None]:
+        return await self._query_index_page(
+            LOW_STOCK_INDEX_NAME, "low_stock_key", LOW_STOCK_KEY, limit, cursor
+        )
+
+    async def get_products_page(
+        self, limit: int, cursor: str | None = None
+    ) -> tuple[List[Product], str | None]:
+        partition_keys = listing_partition_keys(self.listing_shards)
+        shard, start_key = self._listing_position(cursor)
+        products: List[Product] = []
+
+        while len(products) < limit:
+            response = await self._query(
+                "pk", partition_keys[shard], start_key, limit - len(products)
+            )
+            products.extend(Product(**item) for item in response.get("Items", []))
+            start_key = response.get("LastEvaluatedKey")
+            if not start_key:
+                shard += 1
+                if shard == len(partition_keys):
+                    return await self._resolve_stock_totals(products), None
+
+        return await self._resolve_stock_totals(products), encode_cursor(
+            {"shard": shard, "key": start_key}
+        )
+
+    # Pages of one listing partition, empty pages skipped.
+    async def _partition_pages(
+        self, partition_key: str, page_size: int | None = None
+    ) -> AsyncIterator[List[Product]]:
+        start_key = None
+        while True:
+            response = await self._query("pk", partition_key, start_key, page_size)
+            products = [Product(**item) for item in response.get("Items", [])]
+            if products:
+                yield await self._resolve_stock_totals(products)
+
+            start_key = response.get("LastEvaluatedKey")
+            if not start_key:
+                return
+
+    # Every shard's first page is read at once; the shards are then merged by
+    # id, each reading its next page when the merge has used up the last one.
+    async def iter_products(
+        self, page_size: int | None = None
+    ) -> AsyncIterator[Product]:
+        partitions = [
+            self._partition_pages(partition_key, page_size)
+            for partition_key in listing_partition_keys(self.listing_shards)
+        ]
+        try:
+            pages = await asyncio.gather(
+                *(anext(partition, None) for partition in partitions)
+            )
+            heads = [
+                (page[0].id, index, 0, page) for index, page in enumerate(pages) if page
+            ]
+            heapq.heapify(heads)
+
+            while heads:
+                _, index, position, page = heads[0]
+                yield page[position]
+
+                position += 1
+                if position == len(page):
+                    page, position = await anext(partitions[index], None), 0
+                if page:
+                    heapq.heapreplace(heads, (page[position].id, index, position, page))
+                else:
+                    heapq.heappop(heads)
+        finally:
+            for partition in partitions:
+                await partition.aclose()
+
+    async def get_product_by_id(
+        self, product_id: str, consistent_read: bool = False
+    ) -> Product:
+        response = await self.table.get_item(
+            Key={
+                "pk": f"PRODUCT#{product_id}",
+                "sk": "META",
+            },
+            ConsistentRead=consistent_read,
+        )
+        item = response.get("Item")
+        if item is None:
+            raise self._product_not_found(product_id)
+        return (await self._resolve_stock_totals([Product(**item)], consistent_read))[0]
+
+    async def _batch_get_items(
+        self, keys: List[dict], consistent_read: bool = False
+    ) -> List[dict]:
+        items = []
+        request = self._batch_get_request(keys, consistent_read)
+
+        for attempt in range(BATCH_MAX_ATTEMPTS):
+            if attempt:
+                await asyncio.sleep(backoff_delay(attempt))
+
+            try:
+                response = await self.ddb_client.batch_get_item(RequestItems=request)
+            except ClientError as e:
+                raise self._query_failed(e)
+
+            items.extend(response.get("Responses", {}).get(self.table.name, []))
+            request = response.get("UnprocessedKeys") or {}
+            if not request:
+                return items
+
+        raise self._batch_get_throttled(request)
+
+    # Chunks are read concurrently; none of them holds a thread while waiting.
+    async def _read_stock_shards(
+        self, keys: List[dict], consistent_read: bool = False
+    ) -> List[dict]:
+        chunks = await asyncio.gather(
+            *(
+                self._batch_get_items(
+                    keys[start : start + BATCH_GET_CHUNK_SIZE], consistent_read
+                )
+                for start in range(0, len(keys), BATCH_GET_CHUNK_SIZE)
+            )
+        )
+        return [item for chunk in chunks for item in chunk]
+
+    async def _resolve_stock_totals(
+        self, products: List[Product], consistent_read: bool = False
+    ) -> List[Product]:
+        keys = self._stock_shard_keys(products)
+        if not keys:
+            return products
+        return self._apply_stock_totals(
+            products, await self._read_stock_shards(keys, consistent_read)
+        )
+
+    async def _stock_shard_quantities(
+        self, product_id: str, shards: int
+    ) -> dict[int, int]:
+        items = await self._read_stock_shards(
+            [stock_shard_key(product_id, shard) for shard in range(shards)],
+            consistent_read=True,
+        )
+        return self._shard_quantities(items, shards)
+
+    async def _sync_listing(self, product: Product):
+        if not self.dual_write_listing:
+            return
+
+        try:
+            await self.table.update_item(**self._listing_sync_update(product))
+        except ClientError as e:
+            self._listing_sync_failed(product, e)
+
+    def _known_stock_shards(self, product_id: str) -> int | None:
+        # unknown without a cache; the META write reports it when it matters
+        return None
+
+    def _stale_stock_shards(self, product_id: str):
+        pass
+
+    async def _current_stock_shards(self, product_id: str) -> int:
+        item = (
+            await self.table.get_item(
+                Key={"pk": f"PRODUCT#{product_id}", "sk": "META"},
+                ConsistentRead=True,
+            )
+        ).get("Item")
+        if item is None:
+            raise self._product_not_found(product_id)
+        return int(item.get("stock_shards") or 1)
+
+    # Returns the updated product, or the shard count if the product turned
+    # out to be sharded.
+    async def _update_meta_stock(
+        self, product_id: str, delta: int, expected_version: int | None = None
+    ) -> Product | int:
+        try:
+            response = await self.table.update_item(
+                **self._meta_stock_update(product_id, delta, expected_version)
+            )
+        except ClientError as e:
+            return self._meta_stock_rejected(product_id, delta, expected_version, e)
+
+        product = Product(**response["Attributes"])
+        await self._sync_listing(product)
+        return product
+
+    # Returns the updated product, or the current shard count if the shard
+    # layout changed underneath.
+    async def _update_sharded_stock(
+        self, product_id: str, delta: int, shards: int
+    ) -> Product | int:
+        shard = random.randrange(shards)
+        try:
+            await self.table.update_item(
+                **self._stock_delta_update(
+                    stock_shard_key(product_id, shard), delta, "attribute_exists(pk)"
+                )
+            )
+
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise self._stock_write_failed(delta, e)
+            if not e.response.get("Item"):
+                return await self._current_stock_shards(product_id)
+            await self._borrow_stock(product_id, -delta, shards)
+
+        # read past any cache, and strongly, so the caller sees its own write
+        return await AsyncProductRepository.get_product_by_id(
+            self, product_id, consistent_read=True
+        )
+
+    # Takes ``need`` units across shards when the picked one ran dry.
+    async def _borrow_stock(self, product_id: str, need: int, shards: int):
+        for attempt in range(BATCH_MAX_ATTEMPTS):
+            if attempt:
+                await asyncio.sleep(backoff_delay(attempt))
+
+            quantities = await self._stock_shard_quantities(product_id, shards)
+            actions = self._borrow_actions(product_id, need, quantities)
+            try:
+                await self._write(actions)
+                return
+            except ClientError as e:
+                if e.response["Error"]["Code"] not in CONDITION_FAILED_CODES:
+                    raise self._stock_write_failed(-need, e)
+
+        raise self._stock_layout_conflict()
+
+    async def _change_stock(
+        self, product_id: str, delta: int, expected_version: int | None = None
+    ) -> Product:
+        shards = self._known_stock_shards(product_id)
+        for attempt in range(BATCH_MAX_ATTEMPTS):
+            if shards and shards > 1:
+                if expected_version is not None:
+                    raise self._sharded_stock_versioned(product_id)
+                result = await self._update_sharded_stock(product_id, delta, shards)
+            else:
+                result = await self._update_meta_stock(
+                    product_id, delta, expected_version
+                )
+            if isinstance(result, Product):
+                return result
+            if not attempt and shards is not None:
+                self._stale_stock_shards(product_id)
+            shards = result
+
+        raise self._stock_layout_conflict()
+
+    async def stock_in(
+        self, product_id: str, quantity: int, expected_version: int | None = None
+    ) -> Product:
+        return await self._change_stock(product_id, quantity, expected_version)
+
+    async def stock_out(
+        self, product_id: str, quantity: int, expected_version: int | None = None
+    ) -> Product:
+        return await self._change_stock(product_id, -quantity, expected_version)
+
+    # Returns the product's new version.
+    async def update_low_stock_alert_sent(
+        self,
+        product_id: str,
+        sent: bool,
+        expected_version: int | None = None,
+    ) -> int:
+        try:
+            response = await self.table.update_item(
+                **self._low_stock_flag_update(product_id, sent, expected_version)
+            )
+        except ClientError as e:
+            raise self._low_stock_flag_failed(product_id, e)
+
+        product = Product(**response["Attributes"])
+        await self._sync_listing(product)
+        return product.version
+
+
+@trace_methods
+class AsyncCachedProductRepository(ProductCacheLayer, AsyncProductRepository):
+    """``CachedProductRepository`` for the async repository.
+
+    Both share the app's product cache, so a write on either path refreshes
+    or drops the entry the other one reads.
+    """
+
+    def __init__(self, table: AsyncTable, cache=None, shard_lookups=None):
+        super().__init__(table)
+        self.cache = cache
+        self.shard_lookups = shard_lookups
+
+    async def get_product_by_id(
+        self, product_id: str, consistent_read: bool = False
+    ) -> Product:
+        if self.cache is None:
+            return await super().get_product_by_id(product_id, consistent_read)
+
+        if not consistent_read:
+            cached = self.cache.get(product_id)
+            if cached is not None:
+                return cached.model_copy()
+
+        return self._remember(
+            await super().get_product_by_id(product_id, consistent_read)
+        )
+
+    async def stock_in(
+        self, product_id: str, quantity: int, expected_version: int | None = None
+    ) -> Product:
+        try:
+            return self._remember(
+                await super().stock_in(product_id, quantity, expected_version)
+            )
+        except AppException:
+            self._forget([product_id])
+            raise
+
+    async def stock_out(
+        self, product_id: str, quantity: int, expected_version: int | None = None
+    ) -> Product:
+        try:
+            return self._remember(
+                await super().stock_out(product_id, quantity, expected_version)
+            )
+        except AppException:
+            self._forget([product_id])
+            raise
+
+    async def update_low_stock_alert_sent(
+        self, product_id: str, sent: bool, expected_version: int | None = None
+    ) -> int:
+        try:
+            return await super().update_low_stock_alert_sent(
+                product_id, sent, expected_version
+            )
+        finally:
+            self._forget([product_id])
@@ -0,0 +1,102 @@
+from botocore.exceptions import ClientError
+from fastapi import Depends, status
+
+from app.app_exception.app_exception import AppException
+from app.dependencies import get_category_snapshot, get_ddb_table
+from app.dto.category_request import CreateCategoryRequest, UpdateCategoryRequest
+from app.models.category import Category
+from app.repository.category_repository import CategoryRepository
+from app.utils.category_snapshot import CategorySnapshot
+from app.tracing.tracer import trace_methods
+
+# kept outside the CATEGORY partition so it never shows up as a category
+CATEGORY_VERSION_KEY = {"pk": "CATEGORY_VERSION", "sk": "META"}
+
+
+@trace_methods
+class CachedCategoryRepository(CategoryRepository):
+    """Serves category reads from the app-scoped snapshot.
+
+    Every category write bumps the version item, and readers reload the
+    snapshot when they see a new version. Names missing from the snapshot
+    are reported as unknown without another read until the version moves.
+    """
+
+    def __init__(
+        self,
+        table=Depends(get_ddb_table),
+        snapshot: CategorySnapshot | None = Depends(get_category_snapshot),
+    ):
+        super().__init__(table)
+        self.snapshot = snapshot
+
+    def _read_version(self):
+        try:
+            response = self.table.get_item(Key=CATEGORY_VERSION_KEY)
+        except ClientError as e:
+            raise AppException(
+                message="Failed to fetch categories",
+                error_code="DATABASE_ERROR",
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                details={"error": str(e)},
+            )
+        return response.get("Item", {}).get("version", 0)
+
+    def _bump_version(self):
+        try:
+            self.table.update_item(
+                Key=CATEGORY_VERSION_KEY,
+                UpdateExpression="ADD version :one",
+                ExpressionAttributeValues={":one": 1},
+            )
+        except ClientError as e:
+            raise AppException(
+                message="Failed to publish category change",
+                error_code="DATABASE_ERROR",
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                details={"error": str(e)},
+            )
+        finally:
+            self.snapshot.expire()
+
+    def _categories(self) -> dict[str, Category]:
+        snapshot = self.snapshot
+        # one reader refreshes while the others wait for its result
+        with snapshot.lock:
+            if not snapshot.is_fresh():
+                version = self._read_version()
+                if snapshot.categories is None or version != snapshot.version:
+                    categories = {
+                        category.name: category
+                        for category in super().get_all_categories()
+                    }
+                    snapshot.replace(version, categories)
+                else:
+                    snapshot.replace(version, None)
+            return snapshot.categories
+
+    def get_category(self, name: str) -> Category | None:
+        if self.snapshot is None:
+            return super().get_category(name)
+        return self._categories().get(name)
+
+    def get_all_categories(self) -> list[Category]:
+        if self.snapshot is None:
+            return super().get_all_categories()
+        return list(self._categories().values())
+
+    def create_category(self, req: CreateCategoryRequest) -> Category:
+        category = super().create_category(req)
+        if self.snapshot is not None:
+            self._bump_version()
+        return category
+
+    def update_category(self, name: str, req: UpdateCategoryRequest):
+        super().update_category(name, req)
+        if self.snapshot is not None:
+            self._bump_version()
+
+    def delete_category(self, name: str):
+        super().delete_category(name)
+        if self.snapshot is not None:
+            self._bump_version()
@@ -0,0 +1,146 @@
+from typing import List
+
+from fastapi import Depends
+
+from app.app_exception.app_exception import AppException
+from app.dependencies import (
+    get_ddb_table,
+    get_product_cache,
+    get_stock_shard_lookups,
+)
+from app.models.products import Product
+from app.repository.product_repository import ProductRepository
+from app.utils.ttl_cache import LookupStats, TTLCache
+from app.tracing.tracer import trace_methods
+
+
+# Responses can land out of order, say a slow read behind a write, so the
+# cached product is only replaced by a newer version. Sharded stock moves
+# without a version bump, so two copies of the same version cannot be ordered
+# and the entry is dropped instead.
+def _newer(cached: Product | None, product: Product) -> Product | None:
+    if cached is None or product.version > cached.version:
+        # callers mutate the returned model, so the cache keeps its own copy
+        return product.model_copy()
+    if product.version == cached.version and product.stock_shards:
+        return None
+    return cached
+
+
+class ProductCacheLayer:
+    """Cache bookkeeping shared by the sync and async cached repositories."""
+
+    def _remember(self, product: Product) -> Product:
+        if self.cache is not None:
+            self.cache.compute(product.id, lambda cached: _newer(cached, product))
+        return product
+
+    def _forget(self, product_ids: List[str]):
+        if self.cache is not None:
+            for product_id in product_ids:
+                self.cache.invalidate(product_id)
+
+    # Not a read of the product, so it stays out of the product cache's hit
+    # ratio and is counted in ``shard_lookups`` instead.
+    def _known_stock_shards(self, product_id: str) -> int | None:
+        if self.cache is None:
+            return None
+        cached = self.cache.peek(product_id)
+        if self.shard_lookups is not None:
+            if cached is None:
+                self.shard_lookups.miss()
+            else:
+                self.shard_lookups.hit()
+        if cached is None:
+            return None
+        return cached.stock_shards or 1
+
+    # The write found another shard layout than the cached product had.
+    def _stale_stock_shards(self, product_id: str):
+        if self.shard_lookups is not None:
+            self.shard_lookups.stale_hit()
+        self._forget([product_id])
+
+
+@trace_methods
+class CachedProductRepository(ProductCacheLayer, ProductRepository):
+    """Read-through cache over ``get_product_by_id``.
+
+    Writes made through this process refresh or drop the cached entry. Writes
+    from other tasks are only picked up once the entry expires, so callers
+    that must see them pass ``consistent_read=True``.
+    """
+
+    def __init__(
+        self,
+        table=Depends(get_ddb_table),
+        cache: TTLCache | None = Depends(get_product_cache),
+        shard_lookups: LookupStats | None = Depends(get_stock_shard_lookups),
+    ):
+        super().__init__(table)
+        self.cache = cache
+        self.shard_lookups = shard_lookups
+
+    def get_product_by_id(
+        self, product_id: str, consistent_read: bool = False
+    ) -> Product:
+        if self.cache is None:
+            return super().get_product_by_id(product_id, consistent_read)
+
+        if not consistent_read:
+            cached = self.cache.get(product_id)
+            if cached is not None:
+                return cached.model_copy()
+
+        return self._remember(super().get_product_by_id(product_id, consistent_read))
+
+    def stock_in(
+        self, product_id: str, quantity: int, expected_version: int | None = None
+    ) -> Product:
+        try:
+            return self._remember(
+                super().stock_in(product_id, quantity, expected_version)
+            )
+        except AppException:
+            self._forget([product_id])
+            raise
+
+    def stock_out(
+        self, product_id: str, quantity: int, expected_version: int | None = None
+    ) -> Product:
+        try:
+            return self._remember(
+                super().stock_out(product_id, quantity, expected_version)
+            )
+        except AppException:
+            self._forget([product_id])
+            raise
+
+    def set_stock_shards(self, product_id: str, shards: int) -> Product:
+        try:
+            return self._remember(super().set_stock_shards(product_id, shards))
+        except AppException:
+            self._forget([product_id])
+            raise
+
+    def apply_stock_deltas(self, deltas: dict[str, int]) -> dict[str, str]:
+        try:
+            return super().apply_stock_deltas(deltas)
+        finally:
+            self._forget(list(deltas))
+
+    def update_low_stock_alert_sent(
+        self, product_id: str, sent: bool, expected_version: int | None = None
+    ) -> int:
+        try:
+            return super().update_low_stock_alert_sent(
+                product_id, sent, expected_version
+            )
+        finally:
+            self._forget([product_id])
+
+    def delete_product(self, product_id: str, expected_version: int | None = None):
+        try:
+            super().delete_product(product_id, expected_version)
+        finally:
+            self._forget([product_id])
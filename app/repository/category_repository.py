@@ -6,143 +6,164 @@ from app.app_exception.app_exception import AppException
 from app.dependencies import get_ddb_table
 from app.dto.category_request import CreateCategoryRequest, UpdateCategoryRequest
 from app.models.category import Category
+from app.tracing.tracer import trace_methods
 
 
-class CategoryRepository:
-    def __init__(self, table=Depends(get_ddb_table)):
+def category_key(name: str) -> dict:
+    return {
+        "pk": "CATEGORY",
+        "sk": f"CATEGORY#{name}",
+    }
+
+
+class CategoryTableLayout:
+    """Items, request parameters and errors of the category partition.
+    Shared by the sync and async repositories; nothing here does I/O.
+    """
+
+    def __init__(self, table):
         self.table = table
 
+    def _new_category_item(self, req: CreateCategoryRequest) -> dict:
+        return {
+            **category_key(req.name),
+            "name": req.name,
+            "default_threshold": req.default_threshold,
+            "description": req.description,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+
+    def _create_failed(self, req: CreateCategoryRequest, e: ClientError):
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            return AppException(
+                message=f"Category '{req.name}' already exists",
+                error_code="CATEGORY_ALREADY_EXISTS",
+                status_code=status.HTTP_409_CONFLICT,
+            )
+
+        return AppException(
+            message="Failed to create category",
+            error_code="CATEGORY_CREATION_FAILED",
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            details={"error": str(e)},
+        )
+
+    def _read_failed(self, message: str, e: ClientError) -> AppException:
+        return AppException(
+            message=message,
+            error_code="DATABASE_ERROR",
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            details={"error": str(e)},
+        )
+
+    def _all_categories_params(self) -> dict:
+        return {
+            "KeyConditionExpression": "pk = :pk",
+            "ExpressionAttributeValues": {":pk": "CATEGORY"},
+        }
+
+    # None when the request changes nothing.
+    def _category_update(self, name: str, req: UpdateCategoryRequest) -> dict | None:
+        update_expressions = []
+        expression_values = {}
+
+        if req.default_threshold is not None:
+            update_expressions.append("default_threshold = :threshold")
+            expression_values[":threshold"] = req.default_threshold
+
+        if req.description is not None:
+            update_expressions.append("description = :description")
+            expression_values[":description"] = req.description
+
+        if not update_expressions:
+            return None
+
+        return {
+            "Key": category_key(name),
+            "UpdateExpression": "SET " + ", ".join(update_expressions),
+            "ExpressionAttributeValues": expression_values,
+            "ConditionExpression": "attribute_exists(pk) AND attribute_exists(sk)",
+        }
+
+    def _category_delete(self, name: str) -> dict:
+        return {
+            "Key": category_key(name),
+            "ConditionExpression": "attribute_exists(pk) AND attribute_exists(sk)",
+        }
+
+    def _write_failed(self, message: str, e: ClientError) -> AppException:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            return AppException(
+                message="Category not found",
+                error_code="CATEGORY_NOT_FOUND",
+                status_code=status.HTTP_404_NOT_FOUND,
+            )
+
+        return AppException(
+            message=message,
+            error_code="DATABASE_ERROR",
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            details={"error": str(e)},
+        )
+
+
+@trace_methods
+class CategoryRepository(CategoryTableLayout):
+    def __init__(self, table=Depends(get_ddb_table)):
+        super().__init__(table)
+
     def create_category(self, req: CreateCategoryRequest) -> Category:
+        item = self._new_category_item(req)
         try:
-            item = {
-                "pk": "CATEGORY",
-                "sk": f"CATEGORY#{req.name}",
-                "name": req.name,
-                "default_threshold": req.default_threshold,
-                "description": req.description,
-                "created_at": datetime.now(timezone.utc).isoformat(),
-            }
-
             self.table.put_item(
                 Item=item,
                 ConditionExpression="attribute_not_exists(pk)",
             )
-
-            return Category(**item)
-
         except ClientError as e:
-            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
-                raise AppException(
-                    message=f"Category '{req.name}' already exists",
-                    error_code="CATEGORY_ALREADY_EXISTS",
-                    status_code=status.HTTP_409_CONFLICT,
-                )
+            raise self._create_failed(req, e)
 
-            raise AppException(
-                message="Failed to create category",
-                error_code="CATEGORY_CREATION_FAILED",
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                details={"error": str(e)},
-            )
+        return Category(**item)
 
     def get_category(self, name: str) -> Category | None:
         try:
-            response = self.table.get_item(
-                Key={
-                    "pk": "CATEGORY",
-                    "sk": f"CATEGORY#{name}",
-                }
-            )
-            item = response.get("Item")
-            return Category(**item) if item else None
-
+            response = self.table.get_item(Key=category_key(name))
         except ClientError as e:
-            raise AppException(
-                message="Failed to fetch category",
-                error_code="DATABASE_ERROR",
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                details={"error": str(e)},
-            )
+            raise self._read_failed("Failed to fetch category", e)
+
+        item = response.get("Item")
+        return Category(**item) if item else None
 
     def get_all_categories(self) -> list[Category]:
+        params = self._all_categories_params()
+        categories = []
+
         try:
-            response = self.table.query(
-                KeyConditionExpression="pk = :pk",
-                ExpressionAttributeValues={":pk": "CATEGORY"},
-            )
+            while True:
+                response = self.table.query(**params)
+                categories.extend(
+                    Category(**item) for item in response.get("Items", [])
+                )
 
-            return [Category(**item) for item in response.get("Items", [])]
+                start_key = response.get("LastEvaluatedKey")
+                if not start_key:
+                    return categories
+                params["ExclusiveStartKey"] = start_key
 
         except ClientError as e:
-            raise AppException(
-                message="Failed to fetch categories",
-                error_code="DATABASE_ERROR",
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                details={"error": str(e)},
-            )
+            raise self._read_failed("Failed to fetch categories", e)
 
     def update_category(self, name: str, req: UpdateCategoryRequest):
-        update_expressions = []
-        expression_values = {}
-
-        if req.default_threshold is not None:
-            update_expressions.append("default_threshold = :threshold")
-            expression_values[":threshold"] = req.default_threshold
-
-        if req.description is not None:
-            update_expressions.append("description = :description")
-            expression_values[":description"] = req.description
-
-        if not update_expressions:
+        params = self._category_update(name, req)
+        if params is None:
             return
 
         try:
-            self.table.update_item(
-                Key={
-                    "pk": "CATEGORY",
-                    "sk": f"CATEGORY#{name}",
-                },
-                UpdateExpression="SET " + ", ".join(update_expressions),
-                ExpressionAttributeValues=expression_values,
-                ConditionExpression="attribute_exists(pk) AND attribute_exists(sk)",
-            )
-
+            self.table.update_item(**params)
         except ClientError as e:
-            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
-                raise AppException(
-                    message="Category not found",
-                    error_code="CATEGORY_NOT_FOUND",
-                    status_code=status.HTTP_404_NOT_FOUND,
-                )
-
-            raise AppException(
-                message="Failed to update category",
-                error_code="DATABASE_ERROR",
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                details={"error": str(e)},
-            )
+            raise self._write_failed("Failed to update category", e)
 
     def delete_category(self, name: str):
         try:
-            self.table.delete_item(
-                Key={
-                    "pk": "CATEGORY",
-                    "sk": f"CATEGORY#{name}",
-                },
-                ConditionExpression="attribute_exists(pk) AND attribute_exists(sk)",
-            )
-
+            self.table.delete_item(**self._category_delete(name))
         except ClientError as e:
-            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
-                raise AppException(
-                    message="Category not found",
-                    error_code="CATEGORY_NOT_FOUND",
-                    status_code=status.HTTP_404_NOT_FOUND,
-                )
-
-            raise AppException(
-                message="Failed to delete category",
-                error_code="DATABASE_ERROR",
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                details={"error": str(e)},
-            )
+            raise self._write_failed("Failed to delete category", e)
@@ -1,56 +1,514 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
 from decimal import Decimal
-from typing import List
+import heapq
+import logging
+import random
+import time
+from typing import Iterator, List
+import zlib
+from boto3.dynamodb.types import TypeDeserializer
 from botocore.exceptions import ClientError
 from fastapi import Depends, status
-from app.dependencies import get_ddb_table
+from app.dependencies import (
+    get_ddb_table,
+    get_product_listing_mode,
+    get_product_listing_shards,
+)
 from app.models.products import Product
 from app.app_exception.app_exception import AppException
+from app.utils.pagination import decode_cursor, encode_cursor
+from app.utils.retry import backoff_delay
+from app.tracing.tracer import trace_methods
 
+logger = logging.getLogger(__name__)
 
-class ProductRepository:
-    def __init__(self, table=Depends(get_ddb_table)):
+MAX_SCATTER_WORKERS = 16
+BATCH_GET_CHUNK_SIZE = 100
+BATCH_WRITE_CHUNK_SIZE = 25
+TRANSACT_MAX_ACTIONS = 100
+
+# GSI over META items only: category_key (hash) + id (range)
+CATEGORY_INDEX_NAME = "category-index"
+
+# sparse GSI over META items: low_stock_key is only present while the
+# low-stock alert is raised, so the index holds low-stock products only
+LOW_STOCK_INDEX_NAME = "low-stock-index"
+LOW_STOCK_KEY = "LOW_STOCK"
+
+# a lone write reports ConditionalCheckFailedException, a transaction reports
+# TransactionCanceledException
+CONDITION_FAILED_CODES = (
+    "ConditionalCheckFailedException",
+    "TransactionCanceledException",
+)
+
+# condition-failure items come back in the low-level attribute-value format
+_deserializer = TypeDeserializer()
+BATCH_MAX_ATTEMPTS = 5
+
+# hot products can spread their quantity over counter items that live in
+# partitions of their own; META then only records how many there are
+STOCK_SHARD_SK = "STOCK"
+
+
+def listing_partition_key(product_id: str, shards: int) -> str:
+    # a single shard keeps the original unsharded layout
+    if shards <= 1:
+        return "PRODUCTS"
+    return f"PRODUCTS#{zlib.crc32(product_id.encode()) % shards}"
+
+
+def listing_partition_keys(shards: int) -> List[str]:
+    if shards <= 1:
+        return ["PRODUCTS"]
+    return [f"PRODUCTS#{shard}" for shard in range(shards)]
+
+
+def stock_shard_key(product_id: str, shard: int) -> dict:
+    return {"pk": f"PRODUCT#{product_id}#STOCK#{shard}", "sk": STOCK_SHARD_SK}
+
+
+def _stock_shard_owner(item: dict) -> tuple[str, int]:
+    product_id, shard = item["pk"][len("PRODUCT#") :].rsplit("#STOCK#", 1)
+    return product_id, int(shard)
+
+
+def build_listing_item(product: Product, shards: int) -> dict:
+    item = {
+        "pk": listing_partition_key(product.id, shards),
+        "sk": f"PRODUCT#{product.id}",
+        "id": product.id,
+        "name": product.name,
+        "price": Decimal(str(product.price)),
+        "quantity": product.quantity,
+        "category": product.category,
+        "low_stock_alert_sent": bool(product.low_stock_alert_sent),
+        "version": product.version,
+    }
+    if product.stock_shards:
+        item["stock_shards"] = product.stock_shards
+    return item
+
+
+class ProductTableLayout:
+    """Keys, items, request parameters and errors of the product table.
+
+    Shared by the sync and async repositories; nothing here does I/O.
+    """
+
+    def __init__(self, table):
         self.table = table
         self.ddb_client = table.meta.client
+        self.listing_shards = get_product_listing_shards()
+        # in projector mode the listing copy is maintained from the table's
+        # change stream and only the META item is written here
+        self.dual_write_listing = get_product_listing_mode() == "dual_write"
+
+    def _listing_pk(self, product_id: str) -> str:
+        return listing_partition_key(product_id, self.listing_shards)
+
+    def _listing_key(self, product_id: str) -> dict:
+        return {"pk": self._listing_pk(product_id), "sk": f"PRODUCT#{product_id}"}
+
+    def _meta_item(self, product: Product) -> dict:
+        return {
+            "pk": f"PRODUCT#{product.id}",
+            "sk": "META",
+            "id": product.id,
+            "name": product.name,
+            "price": Decimal(str(product.price)),
+            "quantity": product.quantity,
+            "category": product.category,
+            "category_key": product.category,
+            "override_threshold": product.override_threshold,
+            "version": product.version,
+        }
+
+    def _listing_item(self, product: Product) -> dict:
+        return build_listing_item(product, self.listing_shards)
+
+    def _stock_write_failed(self, delta: int, e: ClientError) -> AppException:
+        return AppException(
+            message="Failed to stock in" if delta >= 0 else "Failed to stock out",
+            status_code=500,
+            error_code="STOCK_IN_FAILED" if delta >= 0 else "STOCK_OUT_FAILED",
+            details=e.response,
+        )
+
+    def _product_not_found(self, product_id: str) -> AppException:
+        return AppException(
+            message="Product not found",
+            status_code=status.HTTP_404_NOT_FOUND,
+            error_code="PRODUCT_NOT_FOUND",
+            details={"product_id": product_id},
+        )
+
+    def _insufficient_stock(self, product_id: str, available: int) -> AppException:
+        return AppException(
+            message=f"Insufficient stock for product {product_id}",
+            status_code=status.HTTP_400_BAD_REQUEST,
+            error_code="INSUFFICIENT_STOCK",
+            details={"available_stock": available},
+        )
+
+    def _version_mismatch(self, product_id: str, current: int) -> AppException:
+        return AppException(
+            message="Product was modified by another request",
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            error_code="VERSION_MISMATCH",
+            details={"product_id": product_id, "current_version": current},
+        )
+
+    def _version_condition(
+        self, condition: str, expected_version: int | None
+    ) -> tuple[str, dict]:
+        if expected_version is None:
+            return condition, {}
+        # items written before versioning have no attribute and count as 0
+        if expected_version == 0:
+            return f"{condition} AND attribute_not_exists(version)", {}
+        return f"{condition} AND version = :expected", {":expected": expected_version}
+
+    def _check_failed_version(self, item: dict) -> int:
+        return (
+            int(_deserializer.deserialize(item["version"])) if "version" in item else 0
+        )
+
+    def _stock_layout_conflict(self) -> AppException:
+        return AppException(
+            message="Stock was updated concurrently, please retry",
+            status_code=status.HTTP_409_CONFLICT,
+            error_code="STOCK_UPDATE_CONFLICT",
+        )
+
+    def _stock_delta_update(
+        self,
+        key: dict,
+        delta: int,
+        condition: str,
+        values: dict | None = None,
+        bump_version: bool = False,
+    ) -> dict:
+        values = {**(values or {}), ":d": Decimal(str(delta))}
+        if delta < 0:
+            condition += " AND quantity >= :need"
+            values[":need"] = Decimal(str(-delta))
+        update = "ADD quantity :d"
+        if bump_version:
+            update += ", version :one"
+            values[":one"] = 1
+        return {
+            "Key": key,
+            "UpdateExpression": update,
+            "ConditionExpression": condition,
+            "ExpressionAttributeValues": values,
+            "ReturnValuesOnConditionCheckFailure": "ALL_OLD",
+        }
+
+    def _query_params(
+        self,
+        key_name: str,
+        key_value: str,
+        start_key: dict | None = None,
+        limit: int | None = None,
+        index_name: str | None = None,
+    ) -> dict:
+        params = {
+            "KeyConditionExpression": f"{key_name} = :{key_name}",
+            "ExpressionAttributeValues": {f":{key_name}": key_value},
+        }
+        if index_name:
+            params["IndexName"] = index_name
+        if start_key:
+            params["ExclusiveStartKey"] = start_key
+        if limit:
+            params["Limit"] = limit
+        return params
+
+    def _query_failed(self, e: ClientError) -> AppException:
+        return AppException(
+            message="Failed to fetch products",
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            error_code="DATABASE_ERROR",
+            details=e.response,
+        )
+
+    # Returns the listing shard and start key a page cursor points at.
+    def _listing_position(self, cursor: str | None) -> tuple[int, dict | None]:
+        position = decode_cursor(cursor) or {"shard": 0, "key": None}
+        shard, start_key = position.get("shard"), position.get("key")
+        if not isinstance(shard, int) or not 0 <= shard < len(
+            listing_partition_keys(self.listing_shards)
+        ):
+            raise AppException(
+                message="Invalid pagination cursor",
+                error_code="INVALID_CURSOR",
+                status_code=status.HTTP_400_BAD_REQUEST,
+            )
+        return shard, start_key
+
+    def _batch_get_request(self, keys: List[dict], consistent_read: bool) -> dict:
+        request = {self.table.name: {"Keys": keys}}
+        if consistent_read:
+            request[self.table.name]["ConsistentRead"] = True
+        return request
+
+    def _batch_get_throttled(self, request: dict) -> AppException:
+        return AppException(
+            message="Product lookup was throttled, please retry",
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            error_code="DATABASE_THROTTLED",
+            details={
+                "unprocessed_keys": len(
+                    request.get(self.table.name, {}).get("Keys", [])
+                )
+            },
+        )
+
+    def _stock_shard_keys(self, products: List[Product]) -> List[dict]:
+        return [
+            stock_shard_key(product.id, shard)
+            for product in products
+            if product.stock_shards
+            for shard in range(product.stock_shards)
+        ]
+
+    def _apply_stock_totals(
+        self, products: List[Product], shard_items: List[dict]
+    ) -> List[Product]:
+        totals: dict[str, int] = {}
+        for item in shard_items:
+            product_id, _ = _stock_shard_owner(item)
+            totals[product_id] = totals.get(product_id, 0) + int(item["quantity"])
+
+        for product in products:
+            if product.stock_shards:
+                product.quantity = totals.get(product.id, 0)
+        return products
+
+    def _shard_quantities(self, items: List[dict], shards: int) -> dict[int, int]:
+        quantities = {
+            _stock_shard_owner(item)[1]: int(item["quantity"]) for item in items
+        }
+        if len(quantities) != shards:
+            raise self._stock_layout_conflict()
+        return quantities
+
+    def _listing_sync_update(self, product: Product) -> dict:
+        return {
+            "Key": self._listing_key(product.id),
+            "UpdateExpression": (
+                "SET quantity = :quantity, "
+                "low_stock_alert_sent = :sent, version = :version"
+            ),
+            "ConditionExpression": (
+                "attribute_exists(pk) AND "
+                "(attribute_not_exists(version) OR version < :version)"
+            ),
+            "ExpressionAttributeValues": {
+                ":quantity": product.quantity,
+                ":sent": bool(product.low_stock_alert_sent),
+                ":version": product.version,
+            },
+        }
+
+    # A lone write's condition failed, or a transaction's first action did.
+    def _condition_failed(self, e: ClientError) -> bool:
+        code = e.response["Error"]["Code"]
+        if code == "ConditionalCheckFailedException":
+            return True
+        if code != "TransactionCanceledException":
+            return False
+        reasons = e.response.get("CancellationReasons") or [{}]
+        return reasons[0].get("Code") == "ConditionalCheckFailed"
+
+    # The write to META has committed by now, so failing the request would
+    # invite a retry that applies it twice. The listing copy stays behind
+    # until the product's next write, whose versioned sync repairs it.
+    def _listing_sync_failed(self, product: Product, e: ClientError):
+        # the product was deleted, or a newer write already landed
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            return
+
+        logger.warning(
+            "listing_sync_failed",
+            extra={
+                "product_id": product.id,
+                "version": product.version,
+                "error": str(e),
+            },
+        )
+
+    def _meta_stock_update(
+        self, product_id: str, delta: int, expected_version: int | None
+    ) -> dict:
+        condition, values = self._version_condition(
+            "attribute_exists(pk) AND attribute_not_exists(stock_shards)",
+            expected_version,
+        )
+        return {
+            **self._stock_delta_update(
+                {"pk": f"PRODUCT#{product_id}", "sk": "META"},
+                delta,
+                condition,
+                values,
+                bump_version=True,
+            ),
+            "ReturnValues": "ALL_NEW",
+        }
 
+    # Returns the shard count when the META write failed because the product
+    # is sharded, otherwise raises what the failure means for the caller.
+    def _meta_stock_rejected(
+        self,
+        product_id: str,
+        delta: int,
+        expected_version: int | None,
+        e: ClientError,
+    ) -> int:
+        if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+            raise self._stock_write_failed(delta, e)
+
+        item = e.response.get("Item")
+        if not item:
+            raise self._product_not_found(product_id)
+        if "stock_shards" in item:
+            return int(_deserializer.deserialize(item["stock_shards"]))
+        current = self._check_failed_version(item)
+        if expected_version is not None and current != expected_version:
+            raise self._version_mismatch(product_id, current)
+        raise self._insufficient_stock(
+            product_id, int(_deserializer.deserialize(item["quantity"]))
+        )
+
+    def _sharded_stock_versioned(self, product_id: str) -> AppException:
+        # shard counters move without touching META, so its version says
+        # nothing about the stock a caller last saw
+        return AppException(
+            message="Sharded stock does not support If-Match",
+            status_code=status.HTTP_409_CONFLICT,
+            error_code="STOCK_SHARDED",
+            details={"product_id": product_id},
+        )
+
+    # Takes ``need`` units from the fullest shards first.
+    def _borrow_actions(
+        self, product_id: str, need: int, quantities: dict[int, int]
+    ) -> List[dict]:
+        available = sum(quantities.values())
+        if available < need:
+            raise self._insufficient_stock(product_id, available)
+
+        actions, remaining = [], need
+        for shard, quantity in sorted(
+            quantities.items(), key=lambda entry: entry[1], reverse=True
+        ):
+            take = min(quantity, remaining)
+            if not take:
+                break
+            remaining -= take
+            update = self._stock_delta_update(
+                stock_shard_key(product_id, shard), -take, "attribute_exists(pk)"
+            )
+            actions.append({"Update": {"TableName": self.table.name, **update}})
+        return actions
+
+    def _low_stock_flag_update(
+        self, product_id: str, sent: bool, expected_version: int | None
+    ) -> dict:
+        condition, values = self._version_condition(
+            "attribute_exists(pk)", expected_version
+        )
+        if sent:
+            update = (
+                "SET low_stock_alert_sent = :sent, low_stock_key = :low_stock_key "
+                "ADD version :one"
+            )
+            values[":low_stock_key"] = LOW_STOCK_KEY
+        else:
+            update = (
+                "SET low_stock_alert_sent = :sent REMOVE low_stock_key "
+                "ADD version :one"
+            )
+        return {
+            "Key": {
+                "pk": f"PRODUCT#{product_id}",
+                "sk": "META",
+            },
+            "UpdateExpression": update,
+            "ConditionExpression": condition,
+            "ExpressionAttributeValues": {**values, ":sent": sent, ":one": 1},
+            "ReturnValues": "ALL_NEW",
+            "ReturnValuesOnConditionCheckFailure": "ALL_OLD",
+        }
+
+    def _low_stock_flag_failed(self, product_id: str, e: ClientError) -> AppException:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            item = e.response.get("Item")
+            if not item:
+                return AppException(
+                    message="Product not found",
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    error_code="PRODUCT_NOT_FOUND",
+                )
+            return self._version_mismatch(product_id, self._check_failed_version(item))
+
+        return AppException(
+            message="Failed to update low stock alert flag",
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            error_code="DATABASE_ERROR",
+            details=e.response,
+        )
+
+
+@trace_methods
+class ProductRepository(ProductTableLayout):
+    def __init__(self, table=Depends(get_ddb_table)):
+        super().__init__(table)
+
+    def _write(self, actions: List[dict]):
+        if len(actions) > 1:
+            self.ddb_client.transact_write_items(TransactItems=actions)
+            return
+
+        # a single action needs no transaction, which halves its write cost
+        ((kind, params),) = actions[0].items()
+        params = {key: value for key, value in params.items() if key != "TableName"}
+        if kind == "Put":
+            self.table.put_item(**params)
+        elif kind == "Update":
+            self.table.update_item(**params)
+        else:
+            self.table.delete_item(**params)
+
+    # META and its listing copy go in one transaction: a create that fails
+    # leaves nothing behind, so the caller can simply retry it.
     def save_product(self, product: Product):
-        try:
-            self.ddb_client.transact_write_items(
-                TransactItems=[
-                    {
-                        "Put": {
-                            "TableName": self.table.name,
-                            "Item": {
-                                "pk": f"PRODUCT#{product.id}",
-                                "sk": "META",
-                                "id": product.id,
-                                "name": product.name,
-                                "price": Decimal(str(product.price)),
-                                "quantity": product.quantity,
-                                "category": product.category,
-                                "override_threshold": product.override_threshold,
-                            },
-                            "ConditionExpression": "attribute_not_exists(pk)",
-                        }
-                    },
-                    {
-                        "Put": {
-                            "TableName": self.table.name,
-                            "Item": {
-                                "pk": "PRODUCTS",
-                                "sk": f"PRODUCT#{product.id}",
-                                "id": product.id,
-                                "name": product.name,
-                                "price": Decimal(str(product.price)),
-                                "quantity": product.quantity,
-                                "category": product.category,
-                            },
-                        }
-                    },
-                ]
+        actions = [
+            {
+                "Put": {
+                    "TableName": self.table.name,
+                    "Item": self._meta_item(product),
+                    "ConditionExpression": "attribute_not_exists(pk)",
+                }
+            }
+        ]
+        if self.dual_write_listing:
+            actions.append(
+                {
+                    "Put": {
+                        "TableName": self.table.name,
+                        "Item": self._listing_item(product),
+                    }
+                }
             )
 
+        try:
+            self._write(actions)
+
         except ClientError as e:
-            if e.response["Error"]["Code"] == "TransactionCanceledException":
+            if self._condition_failed(e):
                 raise AppException(
                     message="Product already exists",
                     status_code=409,
@@ -64,20 +522,168 @@ class ProductRepository:
                 details=e.response,
             )
 
-    def get_all_products(self) -> List[Product]:
-        response = self.table.query(
-            KeyConditionExpression="pk = :pk",
-            ExpressionAttributeValues={":pk": "PRODUCTS"},
+    def _query(
+        self,
+        key_name: str,
+        key_value: str,
+        start_key: dict | None = None,
+        limit: int | None = None,
+        index_name: str | None = None,
+        client=None,
+    ):
+        params = self._query_params(key_name, key_value, start_key, limit, index_name)
+        try:
+            # the resource-level Table is not thread-safe, so scatter workers
+            # go through the shared client instead
+            if client is not None:
+                return client.query(TableName=self.table.name, **params)
+            return self.table.query(**params)
+        except ClientError as e:
+            raise self._query_failed(e)
+
+    def _query_listing(
+        self,
+        partition_key: str,
+        start_key: dict | None = None,
+        limit: int | None = None,
+        client=None,
+    ):
+        return self._query("pk", partition_key, start_key, limit, client=client)
+
+    def _query_index_page(
+        self, index_name: str, key_name: str, key_value: str, limit: int, cursor
+    ) -> tuple[List[Product], str | None]:
+        start_key = decode_cursor(cursor)
+        products: List[Product] = []
+
+        while len(products) < limit:
+            response = self._query(
+                key_name, key_value, start_key, limit - len(products), index_name
+            )
+            products.extend(Product(**item) for item in response.get("Items", []))
+            start_key = response.get("LastEvaluatedKey")
+            if not start_key:
+                break
+
+        return self._resolve_stock_totals(products), encode_cursor(start_key)
+
+    def get_products_by_category_page(
+        self, category: str, limit: int, cursor: str | None = None
+    ) -> tuple[List[Product], str | None]:
+        return self._query_index_page(
+            CATEGORY_INDEX_NAME, "category_key", category, limit, cursor
+        )
+
+    def get_low_stock_products_page(
+        self, limit: int, cursor: str | None = None
+    ) -> tuple[List[Product], str | None]:
+        return self._query_index_page(
+            LOW_STOCK_INDEX_NAME, "low_stock_key", LOW_STOCK_KEY, limit, cursor
+        )
+
+    def _partition_pages(
+        self, partition_key: str, page_size: int | None = None, client=None
+    ) -> Iterator[List[Product]]:
+        start_key = None
+        while True:
+            response = self._query_listing(partition_key, start_key, page_size, client)
+            products = [Product(**item) for item in response.get("Items", [])]
+            if products:
+                yield self._resolve_stock_totals(products)
+
+            start_key = response.get("LastEvaluatedKey")
+            if not start_key:
+                return
+
+    def iter_products(self, page_size: int | None = None) -> Iterator[Product]:
+        partition_keys = listing_partition_keys(self.listing_shards)
+        if len(partition_keys) == 1:
+            return (
+                product
+                for page in self._partition_pages(partition_keys[0], page_size)
+                for product in page
+            )
+        return self._merge_partitions(partition_keys, page_size)
+
+    # Every shard reads one page ahead in the pool, so the shards are queried
+    # at once and a shard's next page is on its way while the merge by id
+    # still uses the current one.
+    def _merge_partitions(
+        self, partition_keys: List[str], page_size: int | None
+    ) -> Iterator[Product]:
+        partitions = [
+            self._partition_pages(partition_key, page_size, client=self.ddb_client)
+            for partition_key in partition_keys
+        ]
+        pool = ThreadPoolExecutor(max_workers=min(len(partitions), MAX_SCATTER_WORKERS))
+
+        # each read runs in its own copy of the request's context, so its
+        # spans and AWS calls are attributed to the request
+        def read_ahead(index: int):
+            return pool.submit(copy_context().run, next, partitions[index], None)
+
+        try:
+            pending = [read_ahead(index) for index in range(len(partitions))]
+            heads = []
+            for index, future in enumerate(pending):
+                page = future.result()
+                if page:
+                    heads.append((page[0].id, index, 0, page))
+                    pending[index] = read_ahead(index)
+            heapq.heapify(heads)
+
+            while heads:
+                _, index, position, page = heads[0]
+                yield page[position]
+
+                position += 1
+                if position == len(page):
+                    page, position = pending[index].result(), 0
+                    if page:
+                        pending[index] = read_ahead(index)
+                if page:
+                    heapq.heapreplace(heads, (page[position].id, index, position, page))
+                else:
+                    heapq.heappop(heads)
+        finally:
+            # a partition still running in the pool cannot be closed yet
+            pool.shutdown(wait=True, cancel_futures=True)
+            for partition in partitions:
+                partition.close()
+
+    def get_products_page(
+        self, limit: int, cursor: str | None = None
+    ) -> tuple[List[Product], str | None]:
+        partition_keys = listing_partition_keys(self.listing_shards)
+        shard, start_key = self._listing_position(cursor)
+        products: List[Product] = []
+
+        # walk the shards in order; a query page can also stop short of Limit
+        # at the 1 MB boundary, so keep going until the page is full
+        while len(products) < limit:
+            response = self._query_listing(
+                partition_keys[shard], start_key, limit - len(products)
+            )
+            products.extend(Product(**item) for item in response.get("Items", []))
+            start_key = response.get("LastEvaluatedKey")
+            if not start_key:
+                shard += 1
+                if shard == len(partition_keys):
+                    return self._resolve_stock_totals(products), None
+
+        return self._resolve_stock_totals(products), encode_cursor(
+            {"shard": shard, "key": start_key}
         )
-        items = response["Items"]
-        return [Product(**item) for item in items]
 
-    def get_product_by_id(self, product_id: str) -> Product:
+    def get_product_by_id(
+        self, product_id: str, consistent_read: bool = False
+    ) -> Product:
         response = self.table.get_item(
             Key={
                 "pk": f"PRODUCT#{product_id}",
                 "sk": "META",
-            }
+            },
+            ConsistentRead=consistent_read,
         )
         item = response.get("Item")
         if item is None:
@@ -87,189 +693,581 @@ class ProductRepository:
                 status_code=status.HTTP_404_NOT_FOUND,
                 details={"product_id": product_id},
             )
-        return Product(**item)
+        return self._resolve_stock_totals([Product(**item)], consistent_read)[0]
 
-    def stock_in(self, product_id: str, quantity: int):
-        try:
-            self.ddb_client.transact_write_items(
-                TransactItems=[
-                    {
-                        "Update": {
-                            "TableName": self.table.name,
-                            "Key": {
-                                "pk": f"PRODUCT#{product_id}",
-                                "sk": "META",
-                            },
-                            "UpdateExpression": "ADD quantity :q",
-                            "ExpressionAttributeValues": {
-                                ":q": Decimal(str(quantity)),
-                            },
-                            "ConditionExpression": "attribute_exists(pk)",
-                        }
-                    },
-                    {
-                        "Update": {
-                            "TableName": self.table.name,
-                            "Key": {
-                                "pk": "PRODUCTS",
-                                "sk": f"PRODUCT#{product_id}",
-                            },
-                            "UpdateExpression": "ADD quantity :q",
-                            "ExpressionAttributeValues": {
-                                ":q": Decimal(str(quantity)),
-                            },
-                        }
-                    },
-                ]
+    def _batch_get_items(
+        self, keys: List[dict], consistent_read: bool = False
+    ) -> List[dict]:
+        items = []
+        request = self._batch_get_request(keys, consistent_read)
+
+        for attempt in range(BATCH_MAX_ATTEMPTS):
+            if attempt:
+                time.sleep(backoff_delay(attempt))
+
+            try:
+                response = self.ddb_client.batch_get_item(RequestItems=request)
+            except ClientError as e:
+                raise self._query_failed(e)
+
+            items.extend(response.get("Responses", {}).get(self.table.name, []))
+            request = response.get("UnprocessedKeys") or {}
+            if not request:
+                return items
+
+        raise self._batch_get_throttled(request)
+
+    def batch_get_products(
+        self, product_ids: List[str], consistent_read: bool = False
+    ) -> tuple[List[Product], List[str]]:
+        unique_ids = list(dict.fromkeys(product_ids))
+        found = {}
+
+        for start in range(0, len(unique_ids), BATCH_GET_CHUNK_SIZE):
+            keys = [
+                {"pk": f"PRODUCT#{product_id}", "sk": "META"}
+                for product_id in unique_ids[start : start + BATCH_GET_CHUNK_SIZE]
+            ]
+            for item in self._batch_get_items(keys, consistent_read):
+                found[item["id"]] = Product(**item)
+
+        products = [found[pid] for pid in unique_ids if pid in found]
+        missing_ids = [pid for pid in unique_ids if pid not in found]
+        return self._resolve_stock_totals(products, consistent_read), missing_ids
+
+    def _read_stock_shards(
+        self, keys: List[dict], consistent_read: bool = False
+    ) -> List[dict]:
+        items = []
+        for start in range(0, len(keys), BATCH_GET_CHUNK_SIZE):
+            items.extend(
+                self._batch_get_items(
+                    keys[start : start + BATCH_GET_CHUNK_SIZE], consistent_read
+                )
             )
+        return items
+
+    # Replaces the META quantity of sharded products with the sum of their
+    # counter items, fetched together in as few BatchGetItem calls as possible.
+    def _resolve_stock_totals(
+        self, products: List[Product], consistent_read: bool = False
+    ) -> List[Product]:
+        keys = self._stock_shard_keys(products)
+        if not keys:
+            return products
+        return self._apply_stock_totals(
+            products, self._read_stock_shards(keys, consistent_read)
+        )
+
+    def _stock_shard_quantities(self, product_id: str, shards: int) -> dict[int, int]:
+        items = self._read_stock_shards(
+            [stock_shard_key(product_id, shard) for shard in range(shards)],
+            consistent_read=True,
+        )
+        return self._shard_quantities(items, shards)
+
+    def _batch_write_chunk(self, requests: List[dict]) -> List[dict]:
+        request = {self.table.name: requests}
+
+        for attempt in range(BATCH_MAX_ATTEMPTS):
+            if attempt:
+                time.sleep(backoff_delay(attempt))
+
+            try:
+                response = self.ddb_client.batch_write_item(RequestItems=request)
+            except ClientError as e:
+                raise AppException(
+                    message="Failed to save products",
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    error_code="DATABASE_ERROR",
+                    details=e.response,
+                )
+
+            request = response.get("UnprocessedItems") or {}
+            if not request:
+                return []
+
+        return request.get(self.table.name, [])
+
+    # BatchWriteItem has no condition support, so callers must pass fresh ids.
+    # Returns the ids that were still unprocessed after retrying.
+    def batch_save_products(self, products: List[Product]) -> List[str]:
+        requests = []
+        for product in products:
+            requests.append({"PutRequest": {"Item": self._meta_item(product)}})
+            if self.dual_write_listing:
+                requests.append({"PutRequest": {"Item": self._listing_item(product)}})
+
+        unwritten = set()
+        for start in range(0, len(requests), BATCH_WRITE_CHUNK_SIZE):
+            chunk = requests[start : start + BATCH_WRITE_CHUNK_SIZE]
+            for request in self._batch_write_chunk(chunk):
+                unwritten.add(request["PutRequest"]["Item"]["id"])
+
+        return [product.id for product in products if product.id in unwritten]
+
+    # Copies the META state onto the listing item. The version guard keeps a
+    # late write from overwriting a newer one, so no transaction is needed.
+    def _sync_listing(self, product: Product):
+        if not self.dual_write_listing:
+            return
 
+        try:
+            self.table.update_item(**self._listing_sync_update(product))
         except ClientError as e:
-            raise AppException(
-                message="Failed to stock in",
-                status_code=500,
-                error_code="STOCK_IN_FAILED",
-                details=e.response,
+            self._listing_sync_failed(product, e)
+
+    def _known_stock_shards(self, product_id: str) -> int | None:
+        # unknown without a cache; the META write reports it when it matters
+        return None
+
+    def _stale_stock_shards(self, product_id: str):
+        pass
+
+    def _current_stock_shards(self, product_id: str) -> int:
+        item = self.table.get_item(
+            Key={"pk": f"PRODUCT#{product_id}", "sk": "META"},
+            ConsistentRead=True,
+        ).get("Item")
+        if item is None:
+            raise self._product_not_found(product_id)
+        return int(item.get("stock_shards") or 1)
+
+    # Returns the updated product, or the shard count if the product turned
+    # out to be sharded.
+    def _update_meta_stock(
+        self, product_id: str, delta: int, expected_version: int | None = None
+    ) -> Product | int:
+        try:
+            response = self.table.update_item(
+                **self._meta_stock_update(product_id, delta, expected_version)
             )
+        except ClientError as e:
+            return self._meta_stock_rejected(product_id, delta, expected_version, e)
+
+        product = Product(**response["Attributes"])
+        self._sync_listing(product)
+        return product
 
-    def stock_out(self, product_id: str, quantity: int):
+    # Returns the updated product, or the current shard count if the shard
+    # layout changed underneath.
+    def _update_sharded_stock(
+        self, product_id: str, delta: int, shards: int
+    ) -> Product | int:
+        shard = random.randrange(shards)
         try:
-            self.ddb_client.transact_write_items(
-                TransactItems=[
-                    {
-                        "Update": {
-                            "TableName": self.table.name,
-                            "Key": {
-                                "pk": f"PRODUCT#{product_id}",
-                                "sk": "META",
-                            },
-                            "UpdateExpression": "ADD quantity :neg_q",
-                            "ConditionExpression": "quantity >= :q",
-                            "ExpressionAttributeValues": {
-                                ":neg_q": Decimal(str(-quantity)),
-                                ":q": Decimal(str(quantity)),
-                            },
-                        }
-                    },
-                    {
-                        "Update": {
-                            "TableName": self.table.name,
-                            "Key": {
-                                "pk": "PRODUCTS",
-                                "sk": f"PRODUCT#{product_id}",
-                            },
-                            "UpdateExpression": "ADD quantity :neg_q",
-                            "ExpressionAttributeValues": {
-                                ":neg_q": Decimal(str(-quantity)),
-                            },
-                        }
+            self.table.update_item(
+                **self._stock_delta_update(
+                    stock_shard_key(product_id, shard), delta, "attribute_exists(pk)"
+                )
+            )
+
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise self._stock_write_failed(delta, e)
+            if not e.response.get("Item"):
+                return self._current_stock_shards(product_id)
+            self._borrow_stock(product_id, -delta, shards)
+
+        # read past any cache, and strongly, so the caller sees its own write
+        return ProductRepository.get_product_by_id(
+            self, product_id, consistent_read=True
+        )
+
+    # Takes ``need`` units across shards when the picked one ran dry.
+    def _borrow_stock(self, product_id: str, need: int, shards: int):
+        for attempt in range(BATCH_MAX_ATTEMPTS):
+            if attempt:
+                time.sleep(backoff_delay(attempt))
+
+            quantities = self._stock_shard_quantities(product_id, shards)
+            actions = self._borrow_actions(product_id, need, quantities)
+            try:
+                self._write(actions)
+                return
+            except ClientError as e:
+                if e.response["Error"]["Code"] not in CONDITION_FAILED_CODES:
+                    raise self._stock_write_failed(-need, e)
+
+        raise self._stock_layout_conflict()
+
+    def _change_stock(
+        self, product_id: str, delta: int, expected_version: int | None = None
+    ) -> Product:
+        shards = self._known_stock_shards(product_id)
+        for attempt in range(BATCH_MAX_ATTEMPTS):
+            if shards and shards > 1:
+                if expected_version is not None:
+                    raise self._sharded_stock_versioned(product_id)
+                result = self._update_sharded_stock(product_id, delta, shards)
+            else:
+                result = self._update_meta_stock(product_id, delta, expected_version)
+            if isinstance(result, Product):
+                return result
+            if not attempt and shards is not None:
+                self._stale_stock_shards(product_id)
+            shards = result
+
+        raise self._stock_layout_conflict()
+
+    def stock_in(
+        self, product_id: str, quantity: int, expected_version: int | None = None
+    ) -> Product:
+        return self._change_stock(product_id, quantity, expected_version)
+
+    def stock_out(
+        self, product_id: str, quantity: int, expected_version: int | None = None
+    ) -> Product:
+        return self._change_stock(product_id, -quantity, expected_version)
+
+    # Spreads the product's stock evenly over ``shards`` counter items, or
+    # folds it back into META when ``shards`` is 1. The layout is read, then
+    # written back guarded by the META version and the counters seen, and the
+    # whole round is retried with jitter when a concurrent write gets in first.
+    def set_stock_shards(self, product_id: str, shards: int) -> Product:
+        for attempt in range(BATCH_MAX_ATTEMPTS):
+            if attempt:
+                time.sleep(backoff_delay(attempt))
+
+            product = self._try_set_stock_shards(product_id, shards)
+            if product is not None:
+                return product
+
+        raise self._stock_layout_conflict()
+
+    def _try_set_stock_shards(self, product_id: str, shards: int) -> Product | None:
+        meta_key = {"pk": f"PRODUCT#{product_id}", "sk": "META"}
+        meta = self.table.get_item(Key=meta_key, ConsistentRead=True).get("Item")
+        if meta is None:
+            raise self._product_not_found(product_id)
+
+        current = int(meta.get("stock_shards") or 1)
+        version = int(meta.get("version") or 0)
+        if current > 1:
+            quantities = self._stock_shard_quantities(product_id, current)
+            total = sum(quantities.values())
+        else:
+            quantities = {}
+            total = int(meta["quantity"])
+        condition, values = self._version_condition("attribute_exists(pk)", version)
+
+        if shards > 1:
+            layout = "SET quantity = :total, stock_shards = :shards"
+            layout_values = {":total": total, ":shards": shards}
+            listing_update = f"{layout}, version = :version"
+        else:
+            layout = "SET quantity = :total"
+            layout_values = {":total": total}
+            listing_update = f"{layout}, version = :version REMOVE stock_shards"
+            layout += " REMOVE stock_shards"
+
+        actions = [
+            {
+                "Update": {
+                    "TableName": self.table.name,
+                    "Key": meta_key,
+                    "UpdateExpression": f"{layout} ADD version :one",
+                    "ConditionExpression": condition,
+                    "ExpressionAttributeValues": {
+                        **values,
+                        **layout_values,
+                        ":one": 1,
                     },
-                ]
+                }
+            }
+        ]
+        if self.dual_write_listing:
+            actions.append(
+                {
+                    "Update": {
+                        "TableName": self.table.name,
+                        "Key": self._listing_key(product_id),
+                        "UpdateExpression": listing_update,
+                        "ConditionExpression": "attribute_exists(pk)",
+                        "ExpressionAttributeValues": {
+                            **layout_values,
+                            ":version": version + 1,
+                        },
+                    }
+                }
             )
 
+        shares = [
+            total // shards + (1 if shard < total % shards else 0)
+            for shard in range(shards if shards > 1 else 0)
+        ]
+        # every existing counter must still hold what was read, otherwise a
+        # concurrent stock movement would be lost
+        for shard, seen in quantities.items():
+            key = stock_shard_key(product_id, shard)
+            if shard < len(shares):
+                action = {
+                    "Update": {
+                        "Key": key,
+                        "UpdateExpression": "SET quantity = :quantity",
+                        "ExpressionAttributeValues": {
+                            ":quantity": shares[shard],
+                            ":seen": seen,
+                        },
+                    }
+                }
+            else:
+                action = {
+                    "Delete": {"Key": key, "ExpressionAttributeValues": {":seen": seen}}
+                }
+            body = next(iter(action.values()))
+            body["TableName"] = self.table.name
+            body["ConditionExpression"] = "quantity = :seen"
+            actions.append(action)
+        for shard in range(len(quantities), len(shares)):
+            actions.append(
+                {
+                    "Put": {
+                        "TableName": self.table.name,
+                        "Item": {
+                            **stock_shard_key(product_id, shard),
+                            "quantity": shares[shard],
+                        },
+                        "ConditionExpression": "attribute_not_exists(pk)",
+                    }
+                }
+            )
+
+        try:
+            self.ddb_client.transact_write_items(TransactItems=actions)
         except ClientError as e:
             if e.response["Error"]["Code"] == "TransactionCanceledException":
-                raise AppException(
-                    message="Insufficient stock",
-                    status_code=400,
-                    error_code="INSUFFICIENT_STOCK",
-                )
+                return None
 
             raise AppException(
-                message="Failed to stock out",
-                status_code=500,
-                error_code="STOCK_OUT_FAILED",
+                message="Failed to reshard product stock",
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                error_code="DATABASE_ERROR",
                 details=e.response,
             )
 
+        meta.update(
+            quantity=total,
+            stock_shards=shards if shards > 1 else None,
+            version=version + 1,
+        )
+        return Product(**meta)
+
+    def _stock_delta_actions(self, product_id: str, delta: int) -> List[dict]:
+        meta_key = {"pk": f"PRODUCT#{product_id}", "sk": "META"}
+        if delta == 0:
+            return [
+                {
+                    "ConditionCheck": {
+                        "TableName": self.table.name,
+                        "Key": meta_key,
+                        "ConditionExpression": "attribute_exists(pk)",
+                    }
+                }
+            ]
+
+        actions = [
+            {
+                "Update": {
+                    "TableName": self.table.name,
+                    **self._stock_delta_update(
+                        meta_key,
+                        delta,
+                        "attribute_exists(pk) AND attribute_not_exists(stock_shards)",
+                        bump_version=True,
+                    ),
+                }
+            }
+        ]
+        if self.dual_write_listing:
+            actions.append(
+                {
+                    "Update": {
+                        "TableName": self.table.name,
+                        "Key": self._listing_key(product_id),
+                        "UpdateExpression": "ADD quantity :d, version :one",
+                        "ExpressionAttributeValues": {
+                            ":d": Decimal(str(delta)),
+                            ":one": 1,
+                        },
+                    }
+                }
+            )
+        return actions
+
+    def _apply_stock_delta_group(
+        self, product_ids: List[str], deltas: dict[str, int]
+    ) -> dict[str, str]:
+        failures = {}
+        remaining = list(product_ids)
+        attempt = 0
+
+        while remaining:
+            owners, actions = [], []
+            for product_id in remaining:
+                for action in self._stock_delta_actions(product_id, deltas[product_id]):
+                    owners.append(product_id)
+                    actions.append(action)
+
+            try:
+                self.ddb_client.transact_write_items(TransactItems=actions)
+                return failures
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "TransactionCanceledException":
+                    failures.update({pid: "DATABASE_ERROR" for pid in remaining})
+                    return failures
+                reasons = e.response.get("CancellationReasons", [])
+
+            # drop the products whose own conditions failed and retry the
+            # rest; anything else (conflicts, throttling) retries as is
+            rejected = {}
+            for product_id, reason in zip(owners, reasons):
+                if reason.get("Code") == "ConditionalCheckFailed":
+                    item = reason.get("Item")
+                    if not item:
+                        rejected[product_id] = "PRODUCT_NOT_FOUND"
+                    elif "stock_shards" in item:
+                        rejected[product_id] = "STOCK_SHARDED"
+                    else:
+                        rejected[product_id] = "INSUFFICIENT_STOCK"
+
+            if rejected:
+                failures.update(rejected)
+                remaining = [pid for pid in remaining if pid not in rejected]
+                continue
+
+            attempt += 1
+            if attempt >= BATCH_MAX_ATTEMPTS:
+                failures.update({pid: "STOCK_UPDATE_CONFLICT" for pid in remaining})
+                return failures
+            time.sleep(backoff_delay(attempt))
+
+        return failures
+
+    # Applies net per-product deltas packed into transactions of at most
+    # TRANSACT_MAX_ACTIONS actions. Returns error codes for products that
+    # were not updated.
+    def apply_stock_deltas(self, deltas: dict[str, int]) -> dict[str, str]:
+        groups, group, size = [], [], 0
+        for product_id, delta in deltas.items():
+            actions = len(self._stock_delta_actions(product_id, delta))
+            if size + actions > TRANSACT_MAX_ACTIONS:
+                groups.append(group)
+                group, size = [], 0
+            group.append(product_id)
+            size += actions
+        if group:
+            groups.append(group)
+
+        failures = {}
+        for product_ids in groups:
+            failures.update(self._apply_stock_delta_group(product_ids, deltas))
+
+        # sharded products cannot join the transactions; apply them one by one
+        for product_id, error_code in list(failures.items()):
+            if error_code != "STOCK_SHARDED":
+                continue
+            try:
+                self._change_stock(product_id, deltas[product_id])
+            except AppException as e:
+                failures[product_id] = e.error_code
+            else:
+                del failures[product_id]
+        return failures
+
+    # Returns the product's new version.
     def update_low_stock_alert_sent(
         self,
         product_id: str,
         sent: bool,
-    ):
+        expected_version: int | None = None,
+    ) -> int:
         try:
-            self.ddb_client.transact_write_items(
-                TransactItems=[
-                    {
-                        "Update": {
-                            "TableName": self.table.name,
-                            "Key": {
-                                "pk": f"PRODUCT#{product_id}",
-                                "sk": "META",
-                            },
-                            "UpdateExpression": "SET low_stock_alert_sent = :sent",
-                            "ExpressionAttributeValues": {
-                                ":sent": sent,
-                            },
-                            "ConditionExpression": "attribute_exists(pk)",
-                        }
-                    },
-                    {
-                        "Update": {
-                            "TableName": self.table.name,
-                            "Key": {
-                                "pk": "PRODUCTS",
-                                "sk": f"PRODUCT#{product_id}",
-                            },
-                            "UpdateExpression": "SET low_stock_alert_sent = :sent",
-                            "ExpressionAttributeValues": {
-                                ":sent": sent,
-                            },
-                            "ConditionExpression": "attribute_exists(pk)",
-                        }
-                    },
-                ]
+            response = self.table.update_item(
+                **self._low_stock_flag_update(product_id, sent, expected_version)
             )
-
         except ClientError as e:
-            if e.response["Error"]["Code"] == "TransactionCanceledException":
-                raise AppException(
-                    message="Product not found",
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    error_code="PRODUCT_NOT_FOUND",
-                )
+            raise self._low_stock_flag_failed(product_id, e)
 
-            raise AppException(
-                message="Failed to update low stock alert flag",
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                error_code="DATABASE_ERROR",
-                details=e.response,
-            )
+        product = Product(**response["Attributes"])
+        self._sync_listing(product)
+        return product.version
 
-    def delete_product(self, product_id: str):
-        try:
-            self.ddb_client.transact_write_items(
-                TransactItems=[
-                    {
-                        "Delete": {
-                            "TableName": self.table.name,
-                            "Key": {
-                                "pk": f"PRODUCT#{product_id}",
-                                "sk": "META",
-                            },
-                            "ConditionExpression": "attribute_exists(pk)",
-                        }
-                    },
-                    {
-                        "Delete": {
-                            "TableName": self.table.name,
-                            "Key": {
-                                "pk": "PRODUCTS",
-                                "sk": f"PRODUCT#{product_id}",
-                            },
-                            "ConditionExpression": "attribute_exists(pk)",
-                        }
-                    },
-                ]
+    # Deletes META, its listing copy and any stock counters in one
+    # transaction, so a failed delete leaves the product whole and can be
+    # retried. The counters are read first; if the layout changes before the
+    # write, the whole round is retried.
+    def delete_product(self, product_id: str, expected_version: int | None = None):
+        for attempt in range(BATCH_MAX_ATTEMPTS):
+            if attempt:
+                time.sleep(backoff_delay(attempt))
+
+            if self._try_delete_product(product_id, expected_version):
+                return
+
+        raise AppException(
+            message="Product was modified concurrently, please retry",
+            status_code=status.HTTP_409_CONFLICT,
+            error_code="PRODUCT_DELETE_CONFLICT",
+            details={"product_id": product_id},
+        )
+
+    def _try_delete_product(
+        self, product_id: str, expected_version: int | None
+    ) -> bool:
+        meta_key = {"pk": f"PRODUCT#{product_id}", "sk": "META"}
+        meta = self.table.get_item(Key=meta_key, ConsistentRead=True).get("Item")
+        if meta is None:
+            raise self._product_not_found(product_id)
+        current = int(meta.get("version") or 0)
+        if expected_version is not None and current != expected_version:
+            raise self._version_mismatch(product_id, current)
+
+        shards = int(meta.get("stock_shards") or 1)
+        if shards > 1:
+            condition = "stock_shards = :shards"
+            values = {":shards": shards}
+        else:
+            condition, values = "attribute_not_exists(stock_shards)", {}
+        condition, version_values = self._version_condition(
+            f"attribute_exists(pk) AND {condition}", expected_version
+        )
+        meta_delete = {
+            "TableName": self.table.name,
+            "Key": meta_key,
+            "ConditionExpression": condition,
+        }
+        if values or version_values:
+            meta_delete["ExpressionAttributeValues"] = {**values, **version_values}
+
+        actions = [{"Delete": meta_delete}]
+        if self.dual_write_listing:
+            actions.append(
+                {
+                    "Delete": {
+                        "TableName": self.table.name,
+                        "Key": self._listing_key(product_id),
+                    }
+                }
+            )
+        if shards > 1:
+            actions.extend(
+                {
+                    "Delete": {
+                        "TableName": self.table.name,
+                        "Key": stock_shard_key(product_id, shard),
+                    }
+                }
+                for shard in range(shards)
             )
 
+        try:
+            self._write(actions)
         except ClientError as e:
-            if e.response["Error"]["Code"] == "TransactionCanceledException":
-                raise AppException(
-                    message="Product not found",
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    error_code="PRODUCT_NOT_FOUND",
-                    details={"product_id": product_id},
-                )
+            # lost a race, e.g. with a delete, a reshard or a write holding
+            # one of the items; the next round sees the new state
+            if e.response["Error"]["Code"] in CONDITION_FAILED_CODES:
+                return False
 
             raise AppException(
                 message="Failed to delete product",
@@ -277,3 +1275,4 @@ class ProductRepository:
                 error_code="DATABASE_ERROR",
                 details=e.response,
             )
+        return True
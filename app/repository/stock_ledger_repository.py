@@ -0,0 +1,211 @@
+from datetime import datetime, timezone
+import time
+from typing import Iterator, List
+
+from botocore.exceptions import ClientError
+from fastapi import Depends, status
+
+from app.app_exception.app_exception import AppException
+from app.dependencies import get_ddb_table
+from app.models.stock_movement_entry import StockMovementEntry
+from app.utils.pagination import decode_cursor, encode_cursor
+from app.utils.retry import backoff_delay
+
+LEDGER_WRITE_CHUNK_SIZE = 25
+LEDGER_MAX_ATTEMPTS = 5
+
+# entry sort keys start with an ISO timestamp, so they all sort before this
+SNAPSHOT_SK = "SNAPSHOT"
+
+
+def ledger_partition_key(product_id: str) -> str:
+    return f"LEDGER#{product_id}"
+
+
+def _timestamp(moment: datetime) -> str:
+    # naive datetimes from query strings are taken as UTC
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc).isoformat(timespec="microseconds")
+
+
+def ledger_entry_item(
+    product_id: str, delta: int, reason: str, recorded_at: datetime, entry_id: str
+) -> dict:
+    timestamp = _timestamp(recorded_at)
+    return {
+        "pk": ledger_partition_key(product_id),
+        "sk": f"{timestamp}#{entry_id}",
+        "product_id": product_id,
+        "delta": delta,
+        "reason": reason,
+        "recorded_at": timestamp,
+    }
+
+
+# Moves an entry to ``written_at`` in its partition, keeping its id and
+# recorded_at; see StockLedgerWriter.flush.
+def restamp_entry(item: dict, written_at: datetime) -> dict:
+    entry_id = item["sk"].rpartition("#")[2]
+    return {**item, "sk": f"{_timestamp(written_at)}#{entry_id}"}
+
+
+def entry_timestamp(item: dict) -> datetime:
+    return datetime.fromisoformat(item["sk"].partition("#")[0])
+
+
+class StockLedgerRepository:
+    def __init__(self, table=Depends(get_ddb_table)):
+        self.table = table
+        self.ddb_client = table.meta.client
+
+    def _write_chunk(self, items: List[dict]) -> List[dict]:
+        request = {self.table.name: [{"PutRequest": {"Item": item}} for item in items]}
+
+        for attempt in range(LEDGER_MAX_ATTEMPTS):
+            if attempt:
+                time.sleep(backoff_delay(attempt))
+
+            try:
+                response = self.ddb_client.batch_write_item(RequestItems=request)
+            except ClientError:
+                # a failed call writes nothing, so what is left is exactly
+                # the request
+                break
+            request = response.get("UnprocessedItems") or {}
+            if not request:
+                return []
+
+        return [put["PutRequest"]["Item"] for put in request.get(self.table.name, [])]
+
+    # Entries are immutable and carry unique sort keys, so a plain batch put
+    # is safe to retry. Returns the items that were not written.
+    def append_entries(self, items: List[dict]) -> List[dict]:
+        unprocessed = []
+        for start in range(0, len(items), LEDGER_WRITE_CHUNK_SIZE):
+            unprocessed.extend(
+                self._write_chunk(items[start : start + LEDGER_WRITE_CHUNK_SIZE])
+            )
+        return unprocessed
+
+    def _query(self, product_id: str, params: dict) -> dict:
+        try:
+            return self.table.query(
+                ExpressionAttributeValues={
+                    ":pk": ledger_partition_key(product_id),
+                    **params.pop("values"),
+                },
+                **params,
+            )
+        except ClientError as e:
+            raise AppException(
+                message="Failed to fetch stock movements",
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                error_code="DATABASE_ERROR",
+                details=e.response,
+            )
+
+    def get_movements_page(
+        self,
+        product_id: str,
+        limit: int,
+        cursor: str | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+    ) -> tuple[List[StockMovementEntry], str | None]:
+        # newest first; the bounds stay below SNAPSHOT_SK
+        lower = _timestamp(since) if since else "0"
+        upper = _timestamp(until) + "#~" if until else "9"
+        start_key = decode_cursor(cursor)
+        entries: List[StockMovementEntry] = []
+
+        while len(entries) < limit:
+            params = {
+                "KeyConditionExpression": "pk = :pk AND sk BETWEEN :lower AND :upper",
+                "values": {":lower": lower, ":upper": upper},
+                "ScanIndexForward": False,
+                "Limit": limit - len(entries),
+            }
+            if start_key:
+                params["ExclusiveStartKey"] = start_key
+            response = self._query(product_id, params)
+            entries.extend(
+                StockMovementEntry(**item) for item in response.get("Items", [])
+            )
+            start_key = response.get("LastEvaluatedKey")
+            if not start_key:
+                break
+
+        return entries, encode_cursor(start_key)
+
+    def get_snapshot(self, product_id: str) -> dict:
+        item = self.table.get_item(
+            Key={"pk": ledger_partition_key(product_id), "sk": SNAPSHOT_SK},
+            ConsistentRead=True,
+        ).get("Item")
+        return item or {"quantity": 0, "as_of": ""}
+
+    def _iter_tail(self, product_id: str, as_of: str) -> Iterator[dict]:
+        start_key = None
+        while True:
+            params = {
+                "KeyConditionExpression": "pk = :pk AND sk > :as_of",
+                "values": {":as_of": as_of},
+                "ConsistentRead": True,
+            }
+            if start_key:
+                params["ExclusiveStartKey"] = start_key
+            response = self._query(product_id, params)
+            for item in response.get("Items", []):
+                if item["sk"] == SNAPSHOT_SK:
+                    return
+                yield item
+
+            start_key = response.get("LastEvaluatedKey")
+            if not start_key:
+                return
+
+    # Current quantity according to the ledger: snapshot plus the entries
+    # recorded after it.
+    def ledger_quantity(self, product_id: str) -> int:
+        snapshot = self.get_snapshot(product_id)
+        return int(snapshot["quantity"]) + sum(
+            int(item["delta"])
+            for item in self._iter_tail(product_id, snapshot["as_of"])
+        )
+
+    # Folds entries recorded before ``before`` into the snapshot. Entries that
+    # may still be in flight from another task's writer stay in the tail.
+    def compact(self, product_id: str, before: datetime) -> bool:
+        cutoff = _timestamp(before)
+        snapshot = self.get_snapshot(product_id)
+        quantity, as_of = int(snapshot["quantity"]), snapshot["as_of"]
+
+        folded = False
+        for item in self._iter_tail(product_id, snapshot["as_of"]):
+            if item["sk"] >= cutoff:
+                break
+            quantity += int(item["delta"])
+            as_of = item["sk"]
+            folded = True
+
+        if not folded:
+            return False
+
+        try:
+            self.table.put_item(
+                Item={
+                    "pk": ledger_partition_key(product_id),
+                    "sk": SNAPSHOT_SK,
+                    "quantity": quantity,
+                    "as_of": as_of,
+                },
+                ConditionExpression="attribute_not_exists(pk) OR as_of = :as_of",
+                ExpressionAttributeValues={":as_of": snapshot["as_of"]},
+            )
+        except ClientError as e:
+            # another task compacted first; its snapshot is just as good
+            if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                return False
+            raise
+        return True
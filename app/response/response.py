@@ -1,6 +1,11 @@
-from typing import Any, Optional
+import json
+from itertools import chain
+from typing import Any, AsyncIterator, Iterable, Iterator, Optional
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
+STREAM_CHUNK_SIZE = 64 * 1024
+
 
 class APIResponse(BaseModel):
     status_code: int
@@ -11,3 +16,71 @@ class APIResponse(BaseModel):
 class ErrorResponse(APIResponse):
     status_code: int = 400
     message: str
+
+
+def _envelope_start(status_code: int, message: str) -> bytearray:
+    envelope = json.dumps({"status_code": status_code, "message": message})
+    return bytearray(envelope[:-1].encode() + b',"data":[')
+
+
+def _encode_list_envelope(
+    status_code: int, message: str, items: Iterable[BaseModel]
+) -> Iterator[bytes]:
+    buffer = _envelope_start(status_code, message)
+
+    for index, item in enumerate(items):
+        if index:
+            buffer += b","
+        buffer += item.model_dump_json().encode()
+        if len(buffer) >= STREAM_CHUNK_SIZE:
+            yield bytes(buffer)
+            buffer.clear()
+
+    buffer += b"]}"
+    yield bytes(buffer)
+
+
+def stream_api_response(
+    status_code: int, message: str, items: Iterable[BaseModel]
+) -> StreamingResponse:
+    items = iter(items)
+    # pull the first page before headers go out so storage errors still map
+    # to a proper error response
+    first = next(items, None)
+    if first is not None:
+        items = chain([first], items)
+
+    return StreamingResponse(
+        _encode_list_envelope(status_code, message, items),
+        status_code=status_code,
+        media_type="application/json",
+    )
+
+
+async def _aencode_list_envelope(
+    status_code: int, message: str, first: BaseModel | None, items: AsyncIterator
+) -> AsyncIterator[bytes]:
+    buffer = _envelope_start(status_code, message)
+    if first is not None:
+        buffer += first.model_dump_json().encode()
+        async for item in items:
+            buffer += b","
+            buffer += item.model_dump_json().encode()
+            if len(buffer) >= STREAM_CHUNK_SIZE:
+                yield bytes(buffer)
+                buffer.clear()
+
+    buffer += b"]}"
+    yield bytes(buffer)
+
+
+# ``stream_api_response`` for an async iterator, drained on the event loop.
+async def astream_api_response(
+    status_code: int, message: str, items: AsyncIterator[BaseModel]
+) -> StreamingResponse:
+    first = await anext(items, None)
+    return StreamingResponse(
+        _aencode_list_envelope(status_code, message, first, items),
+        status_code=status_code,
+        media_type="application/json",
+    )
@@ -0,0 +1,76 @@
+from fastapi import APIRouter, Depends, FastAPI, status
+
+from app.dependencies import require_any_group
+from app.dto.category_request import CreateCategoryRequest, UpdateCategoryRequest
+from app.models.user_group import UserGroup
+from app.response.response import APIResponse
+from app.routes.async_products import mount_in_front
+from app.services.async_category_service import (
+    AsyncCategoryService,
+    get_async_category_service,
+)
+
+# Same paths and contracts as category.py, mounted in front of it when
+# DATA_ACCESS_MODE=async.
+async_category_router = APIRouter(
+    prefix="/category",
+    tags=["category"],
+    dependencies=[Depends(require_any_group(UserGroup.MANAGER))],
+    include_in_schema=False,
+)
+
+
+@async_category_router.post(
+    "/", response_model=APIResponse, status_code=status.HTTP_201_CREATED
+)
+async def create_category_handler(
+    req: CreateCategoryRequest,
+    category_service: AsyncCategoryService = Depends(get_async_category_service),
+):
+    data = await category_service.create_category(req)
+    return APIResponse(
+        status_code=201, message="Category created successfully", data=data
+    )
+
+
+@async_category_router.get(
+    "/",
+    response_model=APIResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def get_category_handler(
+    category_service: AsyncCategoryService = Depends(get_async_category_service),
+    name: str | None = None,
+):
+    if name:
+        data = await category_service.get_category_by_name(name)
+        return APIResponse(status_code=200, message="Category found", data=data)
+    data = await category_service.get_all_category()
+    return APIResponse(status_code=200, message="Categories found", data=data)
+
+
+@async_category_router.patch(
+    "/{name}", status_code=status.HTTP_200_OK, response_model=APIResponse
+)
+async def update_threshold_handler(
+    req: UpdateCategoryRequest,
+    name: str,
+    category_service: AsyncCategoryService = Depends(get_async_category_service),
+):
+    await category_service.update_threshold(req, name)
+    return APIResponse(status_code=200, message="Category updated successfully")
+
+
+@async_category_router.delete(
+    "/{name}", status_code=status.HTTP_200_OK, response_model=APIResponse
+)
+async def delete_category_handler(
+    name: str,
+    category_service: AsyncCategoryService = Depends(get_async_category_service),
+):
+    await category_service.delete_category(name)
+    return APIResponse(status_code=200, message="Category deleted successfully")
+
+
+def mount_async_category_routes(app: FastAPI):
+    mount_in_front(app, async_category_router)
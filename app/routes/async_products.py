@@ -0,0 +1,111 @@
+from fastapi import APIRouter, Depends, FastAPI, Header, Query, Response
+
+from app.dependencies import require_any_group
+from app.dto.stock_update_request import StockUpdateRequest
+from app.models.user_group import UserGroup
+from app.response.response import APIResponse, astream_api_response
+from app.services.async_product_service import (
+    AsyncProductService,
+    get_async_product_service,
+)
+from app.utils.etag import format_etag, parse_if_match
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+# Same paths and contracts as the matching routes in products.py, which stay
+# in the OpenAPI schema; these are mounted in front of them when
+# DATA_ACCESS_MODE=async.
+async_products_router = APIRouter(
+    prefix="/products",
+    tags=["products"],
+    include_in_schema=False,
+)
+
+
+@async_products_router.get("/", status_code=200, response_model=APIResponse)
+async def get_products_handler(
+    response: Response,
+    product_service: AsyncProductService = Depends(get_async_product_service),
+    _=Depends(require_any_group(UserGroup.MANAGER, UserGroup.STAFF)),
+    product_id: str | None = None,
+    category: str | None = None,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    consistent_read: bool = False,
+):
+    if product_id:
+        data = await product_service.get_product_by_id(product_id, consistent_read)
+        response.headers["ETag"] = format_etag(data.version)
+        return APIResponse(status_code=200, message="Product found", data=data)
+    if category:
+        data = await product_service.get_products_by_category(
+            category, limit or DEFAULT_PAGE_SIZE, cursor
+        )
+        return APIResponse(status_code=200, message="Products found", data=data)
+    if limit is not None or cursor is not None:
+        data = await product_service.get_products_page(
+            limit or DEFAULT_PAGE_SIZE, cursor
+        )
+        return APIResponse(status_code=200, message="Products found", data=data)
+    return await astream_api_response(
+        200, "Products found", product_service.iter_products()
+    )
+
+
+@async_products_router.get("/low-stock", status_code=200, response_model=APIResponse)
+async def get_low_stock_products_handler(
+    product_service: AsyncProductService = Depends(get_async_product_service),
+    _=Depends(require_any_group(UserGroup.MANAGER)),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+):
+    data = await product_service.get_low_stock_products(limit, cursor)
+    return APIResponse(status_code=200, message="Low stock products found", data=data)
+
+
+@async_products_router.patch("/stockin", status_code=200, response_model=APIResponse)
+async def stock_in_handler(
+    req: StockUpdateRequest,
+    response: Response,
+    if_match: str | None = Header(None),
+    product_service: AsyncProductService = Depends(get_async_product_service),
+    _=Depends(require_any_group(UserGroup.MANAGER)),
+):
+    data = await product_service.stock_in(req, parse_if_match(if_match))
+    response.headers["ETag"] = format_etag(data.version)
+    return APIResponse(
+        status_code=200, message="Product's stock updated successfully", data=data
+    )
+
+
+@async_products_router.patch("/stockout", status_code=200, response_model=APIResponse)
+async def stock_out_handler(
+    req: StockUpdateRequest,
+    response: Response,
+    if_match: str | None = Header(None),
+    product_service: AsyncProductService = Depends(get_async_product_service),
+    _=Depends(require_any_group(UserGroup.MANAGER, UserGroup.STAFF)),
+):
+    data = await product_service.stock_out(req, parse_if_match(if_match))
+    response.headers["ETag"] = format_etag(data.version)
+    return APIResponse(
+        status_code=200, message="Product's stock updated successfully", data=data
+    )
+
+
+# Routes match in order, so the router's routes take over their paths from
+# the sync routes. Safe to call again for the same app, e.g. on a second
+# lifespan in tests.
+def mount_in_front(app: FastAPI, router: APIRouter):
+    endpoints = {route.endpoint for route in router.routes}
+    if any(getattr(route, "endpoint", None) in endpoints for route in app.routes):
+        return
+    # include_router binds the routes to the app, dependency overrides included
+    count = len(app.router.routes)
+    app.include_router(router)
+    mounted = app.router.routes[count:]
+    del app.router.routes[count:]
+    app.router.routes[:0] = mounted
+
+
+def mount_async_product_routes(app: FastAPI):
+    mount_in_front(app, async_products_router)
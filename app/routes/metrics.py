@@ -0,0 +1,26 @@
+import anyio
+from anyio import to_thread
+from fastapi import APIRouter, Request, Response
+
+from app.dependencies import get_metrics_store
+from app.metrics.registry import REGISTRY, render
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+metrics_router = APIRouter(tags=["metrics"])
+
+# reading the other workers' files blocks, so it runs on a thread of its own
+# rather than waiting behind request handlers for one of theirs
+_collect_limiter = anyio.CapacityLimiter(1)
+
+
+# async, with no sync dependencies, so a scrape is answered even while every
+# threadpool thread is busy
+@metrics_router.get("/metrics", include_in_schema=False)
+async def metrics_handler(request: Request):
+    store = get_metrics_store(request)
+    if store is None:
+        snapshot = REGISTRY.snapshot()
+    else:
+        snapshot = await to_thread.run_sync(store.collect, limiter=_collect_limiter)
+    return Response(render(snapshot), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,11 +1,20 @@
-from fastapi import APIRouter, Depends
+from datetime import datetime
+from typing import Literal
+
+from fastapi import APIRouter, Depends, File, Header, Query, Response, UploadFile
 
 from app.dependencies import require_any_group
+from app.dto.batch_get_products_request import BatchGetProductsRequest
+from app.dto.bulk_stock_movement_request import BulkStockMovementRequest
 from app.dto.create_product_request import CreateProductRequest
+from app.dto.stock_shard_request import StockShardRequest
 from app.dto.stock_update_request import StockUpdateRequest
 from app.models.user_group import UserGroup
-from app.response.response import APIResponse
+from app.response.response import APIResponse, stream_api_response
 from app.services.product_service import ProductService
+from app.utils.etag import format_etag, parse_if_match
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.utils.product_import import detect_import_format
 
 products_router = APIRouter(
     prefix="/products",
@@ -25,26 +34,92 @@ def create_product_handler(
     )
 
 
+@products_router.post("/import", status_code=200, response_model=APIResponse)
+def import_products_handler(
+    file: UploadFile = File(...),
+    file_format: Literal["csv", "ndjson"] | None = Query(None, alias="format"),
+    product_service: ProductService = Depends(ProductService),
+    _=Depends(require_any_group(UserGroup.MANAGER)),
+):
+    fmt = detect_import_format(file.filename, file.content_type, file_format)
+    data = product_service.import_products(file.file, fmt)
+    return APIResponse(status_code=200, message="Products imported", data=data)
+
+
 @products_router.get("/", status_code=200, response_model=APIResponse)
 def get_products_handler(
+    response: Response,
     product_service: ProductService = Depends(ProductService),
     _=Depends(require_any_group(UserGroup.MANAGER, UserGroup.STAFF)),
     product_id: str | None = None,
+    category: str | None = None,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    consistent_read: bool = False,
 ):
     if product_id:
-        data = product_service.get_product_by_id(product_id)
+        data = product_service.get_product_by_id(product_id, consistent_read)
+        response.headers["ETag"] = format_etag(data.version)
         return APIResponse(status_code=200, message="Product found", data=data)
-    data = product_service.get_all_products()
+    if category:
+        data = product_service.get_products_by_category(
+            category, limit or DEFAULT_PAGE_SIZE, cursor
+        )
+        return APIResponse(status_code=200, message="Products found", data=data)
+    if limit is not None or cursor is not None:
+        data = product_service.get_products_page(limit or DEFAULT_PAGE_SIZE, cursor)
+        return APIResponse(status_code=200, message="Products found", data=data)
+    products = product_service.iter_products()
+    return stream_api_response(200, "Products found", products)
+
+
+@products_router.get("/low-stock", status_code=200, response_model=APIResponse)
+def get_low_stock_products_handler(
+    product_service: ProductService = Depends(ProductService),
+    _=Depends(require_any_group(UserGroup.MANAGER)),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+):
+    data = product_service.get_low_stock_products(limit, cursor)
+    return APIResponse(status_code=200, message="Low stock products found", data=data)
+
+
+@products_router.get(
+    "/{product_id}/movements", status_code=200, response_model=APIResponse
+)
+def get_stock_movements_handler(
+    product_id: str,
+    product_service: ProductService = Depends(ProductService),
+    _=Depends(require_any_group(UserGroup.MANAGER, UserGroup.STAFF)),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+):
+    data = product_service.get_stock_movements(product_id, limit, cursor, since, until)
+    return APIResponse(status_code=200, message="Stock movements found", data=data)
+
+
+@products_router.post("/batch-get", status_code=200, response_model=APIResponse)
+def batch_get_products_handler(
+    req: BatchGetProductsRequest,
+    product_service: ProductService = Depends(ProductService),
+    _=Depends(require_any_group(UserGroup.MANAGER, UserGroup.STAFF)),
+):
+    data = product_service.batch_get_products(req)
     return APIResponse(status_code=200, message="Products found", data=data)
 
 
 @products_router.patch("/stockin", status_code=200, response_model=APIResponse)
 def stock_in_handler(
     req: StockUpdateRequest,
+    response: Response,
+    if_match: str | None = Header(None),
     product_service: ProductService = Depends(ProductService),
     _=Depends(require_any_group(UserGroup.MANAGER)),
 ):
-    data = product_service.stock_in(req)
+    data = product_service.stock_in(req, parse_if_match(if_match))
+    response.headers["ETag"] = format_etag(data.version)
     return APIResponse(
         status_code=200, message="Product's stock updated successfully", data=data
     )
@@ -53,20 +128,44 @@ def stock_in_handler(
 @products_router.patch("/stockout", status_code=200, response_model=APIResponse)
 def stock_out_handler(
     req: StockUpdateRequest,
+    response: Response,
+    if_match: str | None = Header(None),
     product_service: ProductService = Depends(ProductService),
     _=Depends(require_any_group(UserGroup.MANAGER, UserGroup.STAFF)),
 ):
-    data = product_service.stock_out(req)
+    data = product_service.stock_out(req, parse_if_match(if_match))
+    response.headers["ETag"] = format_etag(data.version)
     return APIResponse(
         status_code=200, message="Product's stock updated successfully", data=data
     )
 
 
+@products_router.post("/stock/bulk", status_code=200, response_model=APIResponse)
+def bulk_stock_movement_handler(
+    req: BulkStockMovementRequest,
+    product_service: ProductService = Depends(ProductService),
+    _=Depends(require_any_group(UserGroup.MANAGER)),
+):
+    data = product_service.bulk_stock_movements(req)
+    return APIResponse(status_code=200, message="Stock movements processed", data=data)
+
+
+@products_router.put("/stock/shards", status_code=200, response_model=APIResponse)
+def set_stock_shards_handler(
+    req: StockShardRequest,
+    product_service: ProductService = Depends(ProductService),
+    _=Depends(require_any_group(UserGroup.MANAGER)),
+):
+    data = product_service.set_stock_shards(req)
+    return APIResponse(status_code=200, message="Stock shards updated", data=data)
+
+
 @products_router.delete("/", status_code=200, response_model=APIResponse)
 def delete_product_handler(
     product_id: str,
+    if_match: str | None = Header(None),
     product_service: ProductService = Depends(ProductService),
     _=Depends(require_any_group(UserGroup.MANAGER)),
 ):
-    product_service.delete_product(product_id)
+    product_service.delete_product(product_id, parse_if_match(if_match))
     return APIResponse(status_code=200, message="Product deleted successfully")
@@ -0,0 +1,59 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, status
+from fastapi.responses import PlainTextResponse
+
+from app.app_exception.app_exception import AppException
+from app.dependencies import get_profile_store, require_any_group
+from app.models.user_group import UserGroup
+from app.profiling.profile_store import ProfileStore
+from app.response.response import APIResponse
+
+profiles_router = APIRouter(
+    prefix="/profiles",
+    tags=["profiles"],
+)
+
+
+def _require_store(store: ProfileStore | None) -> ProfileStore:
+    if store is None:
+        raise AppException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            message="Profiling is not enabled",
+            error_code="PROFILING_DISABLED",
+        )
+    return store
+
+
+@profiles_router.get("/", status_code=200, response_model=APIResponse)
+def list_profiles_handler(
+    store: ProfileStore | None = Depends(get_profile_store),
+    _=Depends(require_any_group(UserGroup.MANAGER)),
+):
+    data = _require_store(store).list()
+    return APIResponse(status_code=200, message="Profiles found", data=data)
+
+
+# "folded" is the collapsed-stack text that flamegraph.pl and speedscope load
+@profiles_router.get("/{profile_id}", status_code=200)
+def get_profile_handler(
+    profile_id: str,
+    format: Literal["folded", "json"] = "folded",
+    store: ProfileStore | None = Depends(get_profile_store),
+    _=Depends(require_any_group(UserGroup.MANAGER)),
+):
+    profile = _require_store(store).get(profile_id)
+    if profile is None:
+        raise AppException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            message="Profile not found",
+            error_code="PROFILE_NOT_FOUND",
+        )
+
+    if format == "json":
+        return APIResponse(status_code=200, message="Profile found", data=profile)
+    folded = "".join(f"{stack} {count}\n" for stack, count in profile["stacks"].items())
+    return PlainTextResponse(
+        folded,
+        headers={"Content-Disposition": f'attachment; filename="{profile_id}.folded"'},
+    )
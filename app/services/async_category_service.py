@@ -0,0 +1,76 @@
+from fastapi import Request, status
+
+from app.app_exception.app_exception import AppException
+from app.dependencies import get_async_ddb_table, get_category_snapshot
+from app.dto.category_request import CreateCategoryRequest, UpdateCategoryRequest
+from app.dto.category_response import CategoryResponse
+from app.repository.async_category_repository import (
+    AsyncCachedCategoryRepository,
+    AsyncCategoryRepository,
+)
+from app.tracing.tracer import trace_methods
+
+
+@trace_methods
+class AsyncCategoryService:
+    """``CategoryService`` over the async category repository."""
+
+    def __init__(self, category_repository: AsyncCategoryRepository):
+        self.category_repository = category_repository
+
+    async def create_category(self, req: CreateCategoryRequest) -> CategoryResponse:
+        existing = await self.category_repository.get_category(req.name)
+        if existing:
+            raise AppException(
+                message=f"Category {req.name} already exists",
+                error_code="CATEGORY_ALREADY_EXISTS",
+                status_code=status.HTTP_409_CONFLICT,
+            )
+
+        await self.category_repository.create_category(req)
+
+        return CategoryResponse(
+            name=req.name,
+            description=req.description,
+            default_threshold=req.default_threshold,
+        )
+
+    async def get_category_by_name(self, name: str) -> CategoryResponse:
+        category = await self.category_repository.get_category(name)
+        if not category:
+            raise AppException(
+                message=f"Category {name} not found",
+                error_code="CATEGORY_NOT_FOUND",
+                status_code=status.HTTP_404_NOT_FOUND,
+            )
+
+        return CategoryResponse(
+            name=name,
+            description=category.description,
+            default_threshold=category.default_threshold,
+        )
+
+    async def get_all_category(self) -> list[CategoryResponse]:
+        categories = await self.category_repository.get_all_categories()
+        return [
+            CategoryResponse(
+                name=category.name,
+                description=category.description,
+                default_threshold=category.default_threshold,
+            )
+            for category in categories
+        ]
+
+    async def update_threshold(self, req: UpdateCategoryRequest, name):
+        await self.category_repository.update_category(name, req)
+
+    async def delete_category(self, name):
+        await self.category_repository.delete_category(name)
+
+
+async def get_async_category_service(request: Request) -> AsyncCategoryService:
+    return AsyncCategoryService(
+        AsyncCachedCategoryRepository(
+            get_async_ddb_table(request), get_category_snapshot(request)
+        )
+    )
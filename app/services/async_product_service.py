@@ -0,0 +1,163 @@
+from typing import AsyncIterator
+
+from fastapi import Request
+from starlette.concurrency import run_in_threadpool
+
+from app.dependencies import (
+    get_async_ddb_table,
+    get_category_snapshot,
+    get_cognito_config,
+    get_product_cache,
+    get_sns_client,
+    get_stock_ledger,
+    get_stock_shard_lookups,
+)
+from app.dto.page_response import PageResponse
+from app.dto.stock_update_request import StockUpdateRequest
+from app.ledger.stock_ledger_writer import StockLedgerWriter
+from app.models.products import Product
+from app.repository.async_product_repository import (
+    AsyncCachedProductRepository,
+    AsyncProductRepository,
+)
+from app.repository.async_category_repository import AsyncCachedCategoryRepository
+from app.services.product_service import LowStockAlerting
+from app.tracing.tracer import trace_methods
+
+
+@trace_methods
+class AsyncProductService(LowStockAlerting):
+    """The hot product reads and single stock updates, on the event loop.
+
+    Product and category reads and writes await the async repositories, so a
+    request holds no thread while DynamoDB answers. Publishing a low-stock
+    alert uses the sync SNS and Cognito clients and runs on the threadpool.
+    Stock updates are not coalesced: each one is a single atomic write that
+    waits on the network, not on a thread.
+    """
+
+    def __init__(
+        self,
+        cognito_config,
+        product_repo: AsyncProductRepository,
+        category_repo: AsyncCachedCategoryRepository,
+        sns_client,
+        stock_ledger: StockLedgerWriter | None,
+    ):
+        self.cognito_client = cognito_config[0]
+        self.user_pool_id = cognito_config[2]
+        self.product_repo = product_repo
+        self.category_repo = category_repo
+        self._manager_emails: list[str] | None = None
+        self.sns_client = sns_client
+        self.stock_ledger = stock_ledger
+        self._sns_publisher = None
+
+    async def _effective_threshold(self, product: Product) -> int:
+        # the category is only needed when the product has no override
+        if product.override_threshold is not None:
+            return product.override_threshold
+        category = await self.category_repo.get_category(product.category)
+        return self._get_effective_threshold(product, category)
+
+    async def get_product_by_id(
+        self, product_id: str, consistent_read: bool = False
+    ) -> Product:
+        return await self.product_repo.get_product_by_id(product_id, consistent_read)
+
+    def iter_products(self) -> AsyncIterator[Product]:
+        return self.product_repo.iter_products()
+
+    async def get_products_page(
+        self, limit: int, cursor: str | None = None
+    ) -> PageResponse[Product]:
+        products, next_cursor = await self.product_repo.get_products_page(limit, cursor)
+        return PageResponse[Product](items=products, next_cursor=next_cursor)
+
+    async def get_products_by_category(
+        self, category: str, limit: int, cursor: str | None = None
+    ) -> PageResponse[Product]:
+        products, next_cursor = await self.product_repo.get_products_by_category_page(
+            category, limit, cursor
+        )
+        return PageResponse[Product](items=products, next_cursor=next_cursor)
+
+    async def get_low_stock_products(
+        self, limit: int, cursor: str | None = None
+    ) -> PageResponse[Product]:
+        products, next_cursor = await self.product_repo.get_low_stock_products_page(
+            limit, cursor
+        )
+        return PageResponse[Product](items=products, next_cursor=next_cursor)
+
+    # Same alert rules as ProductService._apply_stock_delta, for one caller.
+    async def _apply_stock_delta(
+        self, product_id: str, delta: int, expected_version: int | None = None
+    ) -> Product:
+        if delta >= 0:
+            product = await self.product_repo.stock_in(
+                product_id, delta, expected_version
+            )
+            # the ledger write uses boto3, so it runs on the threadpool
+            await run_in_threadpool(self._record_stock_movements, product_id, [delta])
+
+            if delta and product.low_stock_alert_sent:
+                if product.quantity > await self._effective_threshold(product):
+                    product.version = (
+                        await self.product_repo.update_low_stock_alert_sent(
+                            product.id, False
+                        )
+                    )
+                    product.low_stock_alert_sent = False
+
+            return product
+
+        product = await self.product_repo.stock_out(
+            product_id, -delta, expected_version
+        )
+        await run_in_threadpool(self._record_stock_movements, product_id, [delta])
+
+        if not product.low_stock_alert_sent:
+            threshold = await self._effective_threshold(product)
+            if product.quantity <= threshold:
+                await run_in_threadpool(
+                    self._publish_low_stock_event, product, threshold
+                )
+                product.version = await self.product_repo.update_low_stock_alert_sent(
+                    product.id, True
+                )
+                product.low_stock_alert_sent = True
+
+        return product
+
+    async def stock_in(
+        self, req: StockUpdateRequest, expected_version: int | None = None
+    ) -> Product:
+        return await self._apply_stock_delta(
+            req.product_id, req.quantity, expected_version
+        )
+
+    async def stock_out(
+        self, req: StockUpdateRequest, expected_version: int | None = None
+    ) -> Product:
+        return await self._apply_stock_delta(
+            req.product_id, -req.quantity, expected_version
+        )
+
+
+# A coroutine, like every dependency of the async routes: FastAPI runs sync
+# dependencies (classes included) on the threadpool.
+async def get_async_product_service(request: Request) -> AsyncProductService:
+    return AsyncProductService(
+        cognito_config=get_cognito_config(request),
+        product_repo=AsyncCachedProductRepository(
+            get_async_ddb_table(request),
+            get_product_cache(request),
+            get_stock_shard_lookups(request),
+        ),
+        category_repo=AsyncCachedCategoryRepository(
+            get_async_ddb_table(request), get_category_snapshot(request)
+        ),
+        sns_client=get_sns_client(request),
+        stock_ledger=get_stock_ledger(request),
+    )
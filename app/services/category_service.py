@@ -3,13 +3,16 @@ from fastapi import Depends, status
 from app.app_exception.app_exception import AppException
 from app.dto.category_request import CreateCategoryRequest, UpdateCategoryRequest
 from app.dto.category_response import CategoryResponse
+from app.repository.cached_category_repository import CachedCategoryRepository
 from app.repository.category_repository import CategoryRepository
+from app.tracing.tracer import trace_methods
 
 
+@trace_methods
 class CategoryService:
     def __init__(
         self,
-        category_repository: CategoryRepository = Depends(),
+        category_repository: CategoryRepository = Depends(CachedCategoryRepository),
     ):
         self.category_repository = category_repository
 
@@ -1,134 +1,434 @@
-from typing import List
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import copy_context
+from datetime import datetime
+from typing import BinaryIO, Iterator, List
 import uuid
 
 from botocore.utils import ClientError
 from fastapi import Depends, status
+from pydantic import ValidationError
 
 from app.app_exception.app_exception import AppException
-from app.dependencies import get_cognito_config
+from app.dependencies import (
+    get_cognito_config,
+    get_sns_client,
+    get_stock_coalescer,
+    get_stock_ledger,
+)
+from app.dto.batch_get_products_request import BatchGetProductsRequest
+from app.dto.batch_get_products_response import BatchGetProductsResponse
+from app.dto.bulk_stock_movement_request import BulkStockMovementRequest
+from app.dto.bulk_stock_movement_response import (
+    AppliedStockMovement,
+    BulkStockMovementResponse,
+    FailedStockMovement,
+)
 from app.dto.create_product_request import CreateProductRequest
+from app.dto.page_response import PageResponse
+from app.dto.product_import_report import ProductImportReport
+from app.dto.stock_shard_request import StockShardRequest
 from app.dto.stock_update_request import StockUpdateRequest
+from app.ledger.stock_ledger_writer import StockLedgerWriter
 from app.models.products import Product
+from app.models.stock_movement_entry import StockMovementEntry
 from app.models.user_group import UserGroup
+from app.repository.cached_category_repository import CachedCategoryRepository
 from app.repository.category_repository import CategoryRepository
+from app.repository.cached_product_repository import CachedProductRepository
 from app.repository.product_repository import ProductRepository
+from app.repository.stock_ledger_repository import StockLedgerRepository
+from app.services.stock_write_coalescer import StockWriteCoalescer
 from app.sns_event_publisher.sns_event_publisher import SNSEventPublisher
+from app.metrics.instruments import LOW_STOCK_EVENTS
+from app.utils.product_import import iter_import_rows
+from app.tracing.tracer import trace_methods
 
+IMPORT_CHUNK_SIZE = 100
+IMPORT_WORKERS = 4
 
-class ProductService:
+
+class LowStockAlerting:
+    """Alert and ledger helpers shared by the sync and async product services.
+
+    The SNS and Cognito clients are sync, so async callers run
+    ``_publish_low_stock_event`` on the threadpool.
+    """
+
+    def _get_effective_threshold(self, product: Product, category) -> int:
+        if product.override_threshold is not None:
+            return product.override_threshold
+        if category is None:
+            raise AppException(
+                message=f"Category {product.category} not found",
+                error_code="CATEGORY_NOT_FOUND",
+                status_code=status.HTTP_404_NOT_FOUND,
+                details={"product_id": product.id, "category": product.category},
+            )
+        return category.default_threshold
+
+    def _get_manager_emails(self) -> list[str]:
+        if self._manager_emails is not None:
+            return self._manager_emails
+
+        try:
+            users_list = self.cognito_client.list_users_in_group(
+                UserPoolId=self.user_pool_id,
+                GroupName=UserGroup.MANAGER,
+            )
+        except ClientError as e:
+            raise AppException(
+                status_code=500,
+                message="Failed to list managers",
+                details={"error": str(e)},
+            )
+
+        manager_emails = []
+        for user in users_list["Users"]:
+            for attr in user["Attributes"]:
+                if attr["Name"] == "email":
+                    manager_emails.append(attr["Value"])
+
+        self._manager_emails = manager_emails
+        return manager_emails
+
+    def _publish_low_stock_event(self, product: Product, threshold: int):
+        if self._sns_publisher is None:
+            self._sns_publisher = SNSEventPublisher(self.sns_client)
+
+        payload = {
+            "event_type": "LOW_STOCK",
+            "product_id": product.id,
+            "product_name": product.name,
+            "category": product.category,
+            "current_quantity": product.quantity,
+            "threshold": threshold,
+            "manager_email": self._get_manager_emails(),
+        }
+        self._sns_publisher.publish_event(payload)
+        LOW_STOCK_EVENTS.inc()
+
+    def _record_movement(self, product_id: str, delta: int, reason: str):
+        if self.stock_ledger is not None and delta:
+            self.stock_ledger.record(product_id, delta, reason)
+
+    def _record_movements(self, movements: list[tuple[str, int, str]]):
+        if self.stock_ledger is not None:
+            self.stock_ledger.record_all(
+                [movement for movement in movements if movement[1]]
+            )
+
+    def _record_stock_movements(self, product_id: str, deltas: list[int]):
+        self._record_movements(
+            [
+                (product_id, delta, "stock_in" if delta > 0 else "stock_out")
+                for delta in deltas
+            ]
+        )
+
+
+@trace_methods
+class ProductService(LowStockAlerting):
     def __init__(
         self,
         cognito_config=Depends(get_cognito_config),
-        product_repo: ProductRepository = Depends(ProductRepository),
-        category_repo: CategoryRepository = Depends(CategoryRepository),
+        product_repo: ProductRepository = Depends(CachedProductRepository),
+        category_repo: CategoryRepository = Depends(CachedCategoryRepository),
+        sns_client=Depends(get_sns_client),
+        stock_coalescer: StockWriteCoalescer | None = Depends(get_stock_coalescer),
+        stock_ledger: StockLedgerWriter | None = Depends(get_stock_ledger),
+        ledger_repo: StockLedgerRepository = Depends(StockLedgerRepository),
     ):
         self.cognito_client = cognito_config[0]
         self.user_pool_id = cognito_config[2]
         self.product_repo = product_repo
         self.category_repo = category_repo
+        self._manager_emails: list[str] | None = None
+        self.sns_client = sns_client
+        self.stock_coalescer = stock_coalescer
+        self.stock_ledger = stock_ledger
+        self.ledger_repo = ledger_repo
+        self._sns_publisher: SNSEventPublisher | None = None
 
     def _is_low_stock(self, product: Product, category) -> bool:
-        effective_threshold = (
-            product.override_threshold
-            if product.override_threshold is not None
-            else category.default_threshold
-        )
-
-        return product.quantity <= effective_threshold
+        return product.quantity <= self._get_effective_threshold(product, category)
 
-    def _get_effective_threshold(self, product: Product, category) -> int:
-        return (
-            product.override_threshold
-            if product.override_threshold is not None
-            else category.default_threshold
-        )
-
-    def create_product(self, req: CreateProductRequest):
-        _ = self.category_repo.get_category(req.category)
-        product_id = str(uuid.uuid4())
+    def _sync_low_stock_alert(self, product: Product, category):
+        threshold = self._get_effective_threshold(product, category)
+        if product.quantity <= threshold:
+            if not product.low_stock_alert_sent:
+                self._publish_low_stock_event(product, threshold)
+                self.product_repo.update_low_stock_alert_sent(product.id, True)
+        elif product.low_stock_alert_sent:
+            self.product_repo.update_low_stock_alert_sent(product.id, False)
 
-        product = Product(
-            id=product_id,
+    def _new_product(self, req: CreateProductRequest) -> Product:
+        return Product(
+            id=str(uuid.uuid4()),
             name=req.name,
             price=req.price,
             quantity=req.quantity,
             category=req.category,
             override_threshold=req.override_threshold,
             low_stock_alert_sent=False,
+            version=1,
         )
 
+    def create_product(self, req: CreateProductRequest):
+        _ = self.category_repo.get_category(req.category)
+        product = self._new_product(req)
+
         self.product_repo.save_product(product)
+        self._record_movement(product.id, product.quantity, "create")
 
         return product
 
-    def get_all_products(self) -> List[Product]:
-        return self.product_repo.get_all_products()
+    def _settle_import_chunk(
+        self,
+        report: ProductImportReport,
+        future: Future,
+        rows: list[tuple[int, Product]],
+    ):
+        try:
+            unwritten = set(future.result())
+            reason = "Write was throttled, please retry this row"
+        except AppException as e:
+            unwritten = {product.id for _, product in rows}
+            reason = e.message
 
-    def get_product_by_id(self, product_id: str) -> Product:
-        return self.product_repo.get_product_by_id(product_id)
+        imported = []
+        for row_number, product in rows:
+            if product.id in unwritten:
+                report.add_error(row_number, [reason])
+            else:
+                report.imported += 1
+                imported.append((product.id, product.quantity, "import"))
+        self._record_movements(imported)
 
-    def stock_in(self, req: StockUpdateRequest):
-        product_id = req.product_id
-        quantity = req.quantity
+    def import_products(self, file: BinaryIO, fmt: str) -> ProductImportReport:
+        report = ProductImportReport()
+        pending: deque[tuple[Future, list[tuple[int, Product]]]] = deque()
+        chunk: list[tuple[int, Product]] = []
 
-        self.product_repo.stock_in(product_id, quantity)
+        with ThreadPoolExecutor(max_workers=IMPORT_WORKERS) as pool:
 
-        product = self.product_repo.get_product_by_id(product_id)
-        category = self.category_repo.get_category(product.category)
+            def submit(rows: list[tuple[int, Product]]):
+                products = [product for _, product in rows]
+                future = pool.submit(
+                    copy_context().run, self.product_repo.batch_save_products, products
+                )
+                pending.append((future, rows))
+                # cap the chunks held in memory while the writers catch up
+                while len(pending) > IMPORT_WORKERS * 2:
+                    self._settle_import_chunk(report, *pending.popleft())
 
-        product_threshold = self._get_effective_threshold(product, category)
-        product = self.product_repo.get_product_by_id(product_id)
-        if product.low_stock_alert_sent and product.quantity > product_threshold:
-            self.product_repo.update_low_stock_alert_sent(product.id, False)
+            for row_number, data, error in iter_import_rows(file, fmt):
+                report.total_rows += 1
+                if error:
+                    report.add_error(row_number, [error])
+                    continue
+
+                try:
+                    req = CreateProductRequest.model_validate(data)
+                except ValidationError as e:
+                    report.add_error(
+                        row_number,
+                        [
+                            f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}"
+                            for err in e.errors()
+                        ],
+                    )
+                    continue
+
+                chunk.append((row_number, self._new_product(req)))
+                if len(chunk) == IMPORT_CHUNK_SIZE:
+                    submit(chunk)
+                    chunk = []
+
+            if chunk:
+                submit(chunk)
+
+            while pending:
+                self._settle_import_chunk(report, *pending.popleft())
+
+        report.errors.sort(key=lambda error: error.row)
+        return report
+
+    def iter_products(self) -> Iterator[Product]:
+        return self.product_repo.iter_products()
+
+    def get_products_page(
+        self, limit: int, cursor: str | None = None
+    ) -> PageResponse[Product]:
+        products, next_cursor = self.product_repo.get_products_page(limit, cursor)
+        return PageResponse[Product](items=products, next_cursor=next_cursor)
+
+    def get_product_by_id(
+        self, product_id: str, consistent_read: bool = False
+    ) -> Product:
+        return self.product_repo.get_product_by_id(product_id, consistent_read)
 
-    def stock_out(self, req: StockUpdateRequest):
-        product_id = req.product_id
-        quantity = req.quantity
-        product = self.product_repo.get_product_by_id(product_id)
+    def get_products_by_category(
+        self, category: str, limit: int, cursor: str | None = None
+    ) -> PageResponse[Product]:
+        products, next_cursor = self.product_repo.get_products_by_category_page(
+            category, limit, cursor
+        )
+        return PageResponse[Product](items=products, next_cursor=next_cursor)
+
+    def get_low_stock_products(
+        self, limit: int, cursor: str | None = None
+    ) -> PageResponse[Product]:
+        products, next_cursor = self.product_repo.get_low_stock_products_page(
+            limit, cursor
+        )
+        return PageResponse[Product](items=products, next_cursor=next_cursor)
+
+    def batch_get_products(
+        self, req: BatchGetProductsRequest
+    ) -> BatchGetProductsResponse:
+        products, missing_ids = self.product_repo.batch_get_products(req.product_ids)
+        return BatchGetProductsResponse(products=products, missing_ids=missing_ids)
+
+    def _effective_threshold(self, product: Product) -> int:
+        # the category is only needed when the product has no override
+        if product.override_threshold is not None:
+            return product.override_threshold
         category = self.category_repo.get_category(product.category)
-        if quantity > product.quantity:
-            raise AppException(
-                message=f"Insufficient stock for product {product_id}",
-                error_code="INSUFFICIENT_STOCK",
-                status_code=status.HTTP_400_BAD_REQUEST,
-                details={"available_stock": product.quantity},
+        return self._get_effective_threshold(product, category)
+
+    # Applies the deltas of one or more callers as a single write, coalesced
+    # by the caller. Each movement goes to the ledger as soon as the write
+    # lands, so a failing alert afterwards cannot keep it out of the ledger.
+    def _apply_stock_delta(
+        self, product_id: str, deltas: list[int], expected_version: int | None = None
+    ) -> Product:
+        delta = sum(deltas)
+        if delta >= 0:
+            product = self.product_repo.stock_in(product_id, delta, expected_version)
+            self._record_stock_movements(product_id, deltas)
+
+            if delta and product.low_stock_alert_sent:
+                if product.quantity > self._effective_threshold(product):
+                    product.version = self.product_repo.update_low_stock_alert_sent(
+                        product.id, False
+                    )
+                    product.low_stock_alert_sent = False
+
+            return product
+
+        product = self.product_repo.stock_out(product_id, -delta, expected_version)
+        self._record_stock_movements(product_id, deltas)
+
+        if not product.low_stock_alert_sent:
+            threshold = self._effective_threshold(product)
+            if product.quantity <= threshold:
+                self._publish_low_stock_event(product, threshold)
+                product.version = self.product_repo.update_low_stock_alert_sent(
+                    product.id, True
+                )
+                product.low_stock_alert_sent = True
+
+        return product
+
+    def _submit_stock_delta(
+        self, product_id: str, delta: int, expected_version: int | None = None
+    ) -> Product:
+        # a compare-and-set update cannot be folded into someone else's batch
+        if self.stock_coalescer is None or expected_version is not None:
+            return self._apply_stock_delta(product_id, [delta], expected_version)
+        return self.stock_coalescer.submit(product_id, delta, self._apply_stock_delta)
+
+    def stock_in(
+        self, req: StockUpdateRequest, expected_version: int | None = None
+    ) -> Product:
+        return self._submit_stock_delta(req.product_id, req.quantity, expected_version)
+
+    def stock_out(
+        self, req: StockUpdateRequest, expected_version: int | None = None
+    ) -> Product:
+        return self._submit_stock_delta(req.product_id, -req.quantity, expected_version)
+
+    def set_stock_shards(self, req: StockShardRequest) -> Product:
+        return self.product_repo.set_stock_shards(req.product_id, req.shards)
+
+    def bulk_stock_movements(
+        self, req: BulkStockMovementRequest
+    ) -> BulkStockMovementResponse:
+        deltas: dict[str, int] = {}
+        for movement in req.movements:
+            signed = (
+                movement.quantity if movement.direction == "in" else -movement.quantity
             )
+            deltas[movement.product_id] = deltas.get(movement.product_id, 0) + signed
 
-        default_threshold = category.default_threshold
+        failures = self.product_repo.apply_stock_deltas(deltas)
+        self._record_movements(
+            [
+                (product_id, delta, "bulk")
+                for product_id, delta in deltas.items()
+                if product_id not in failures
+            ]
+        )
 
-        self.product_repo.stock_out(product_id, quantity)
-        product = self.product_repo.get_product_by_id(product_id)
+        changed_ids = [
+            product_id
+            for product_id, delta in deltas.items()
+            if delta and product_id not in failures
+        ]
+        products = {}
+        if changed_ids:
+            # read after our own writes: a stale quantity would skip or repeat
+            # a low-stock alert
+            found, _ = self.product_repo.batch_get_products(
+                changed_ids, consistent_read=True
+            )
+            products = {product.id: product for product in found}
+
+        categories = {}
+        for product in products.values():
+            if product.category not in categories:
+                categories[product.category] = self.category_repo.get_category(
+                    product.category
+                )
+            self._sync_low_stock_alert(product, categories[product.category])
 
-        if not product.low_stock_alert_sent and self._is_low_stock(product, category):
-            sns_publisher = SNSEventPublisher()
-            manager_emails = []
-            try:
-                users_list = self.cognito_client.list_users_in_group(
-                    UserPoolId=self.user_pool_id,
-                    GroupName=UserGroup.MANAGER,
+        return BulkStockMovementResponse(
+            applied=[
+                AppliedStockMovement(
+                    product_id=product_id,
+                    delta=delta,
+                    quantity=(
+                        products[product_id].quantity
+                        if product_id in products
+                        else None
+                    ),
                 )
-            except ClientError as e:
-                raise AppException(
-                    status_code=500,
-                    message="Failed to list managers",
-                    details={"error": str(e)},
+                for product_id, delta in deltas.items()
+                if product_id not in failures
+            ],
+            failed=[
+                FailedStockMovement(
+                    product_id=product_id,
+                    delta=deltas[product_id],
+                    error_code=error_code,
                 )
+                for product_id, error_code in failures.items()
+            ],
+        )
+
+    def get_stock_movements(
+        self,
+        product_id: str,
+        limit: int,
+        cursor: str | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+    ) -> PageResponse[StockMovementEntry]:
+        entries, next_cursor = self.ledger_repo.get_movements_page(
+            product_id, limit, cursor, since, until
+        )
+        return PageResponse[StockMovementEntry](items=entries, next_cursor=next_cursor)
 
-            for user in users_list["Users"]:
-                for attr in user["Attributes"]:
-                    if attr["Name"] == "email":
-                        manager_emails.append(attr["Value"])
-            payload = {
-                "event_type": "LOW_STOCK",
-                "product_id": product_id,
-                "product_name": product.name,
-                "category": product.category,
-                "current_quantity": product.quantity,
-                "threshold": default_threshold,
-                "manager_email": manager_emails,
-            }
-            sns_publisher.publish_event(payload)
-            self.product_repo.update_low_stock_alert_sent(product.id, True)
-
-    def delete_product(self, product_id: str):
-        self.product_repo.delete_product(product_id)
+    def delete_product(self, product_id: str, expected_version: int | None = None):
+        self.product_repo.delete_product(product_id, expected_version)
@@ -0,0 +1,149 @@
+import threading
+import time
+from typing import Callable
+
+from fastapi import status
+
+from app.app_exception.app_exception import AppException
+from app.models.products import Product
+
+COALESCE_MAX_ATTEMPTS = 5
+
+
+class _PendingDelta:
+    def __init__(self, delta: int):
+        self.delta = delta
+        self.leader = False
+        self.ready = threading.Event()
+        self.product: Product | None = None
+        self.error: Exception | None = None
+
+    def outcome(self) -> Product:
+        if self.error is not None:
+            raise self.error
+        return self.product.model_copy()
+
+
+class StockWriteCoalescer:
+    """Group commit for stock deltas on the same product.
+
+    The first caller for a product becomes the leader. Callers arriving while
+    it writes queue up behind it, and the next leader applies all of them as
+    one conditional update. Ins are applied before outs, so the batch only
+    fails when the stock cannot cover every out; the leader then admits outs
+    in arrival order against the reported stock and rejects the rest.
+
+    ``apply`` gets the admitted callers' deltas and must write their sum.
+    """
+
+    def __init__(self, window: float = 0.0):
+        self.window = window
+        self._lock = threading.Lock()
+        # product id -> callers queued behind the active leader
+        self._queues: dict[str, list[_PendingDelta]] = {}
+
+    def submit(
+        self,
+        product_id: str,
+        delta: int,
+        apply: Callable[[str, list[int]], Product],
+    ) -> Product:
+        pending = _PendingDelta(delta)
+        with self._lock:
+            queue = self._queues.get(product_id)
+            if queue is None:
+                self._queues[product_id] = []
+                pending.leader = True
+            else:
+                queue.append(pending)
+
+        if not pending.leader:
+            pending.ready.wait()
+        if pending.leader:
+            self._lead(product_id, pending, apply)
+
+        return pending.outcome()
+
+    def _lead(
+        self,
+        product_id: str,
+        leader: _PendingDelta,
+        apply: Callable[[str, list[int]], Product],
+    ):
+        if self.window:
+            time.sleep(self.window)
+
+        with self._lock:
+            batch = [leader, *self._queues[product_id]]
+            self._queues[product_id] = []
+
+        try:
+            self._apply_batch(product_id, batch, apply)
+        except Exception as e:
+            for pending in batch:
+                if pending.product is None and pending.error is None:
+                    pending.error = e
+
+        with self._lock:
+            queue = self._queues[product_id]
+            if queue:
+                successor = queue.pop(0)
+                successor.leader = True
+            else:
+                successor = None
+                del self._queues[product_id]
+
+        for pending in batch:
+            if pending is not leader:
+                pending.ready.set()
+        if successor is not None:
+            successor.ready.set()
+
+    def _apply_batch(
+        self,
+        product_id: str,
+        batch: list[_PendingDelta],
+        apply: Callable[[str, list[int]], Product],
+    ):
+        admitted = batch
+        for attempt in range(COALESCE_MAX_ATTEMPTS):
+            if not admitted:
+                return
+            try:
+                product = apply(product_id, [p.delta for p in admitted])
+            except AppException as e:
+                if e.error_code != "INSUFFICIENT_STOCK" or (
+                    attempt == COALESCE_MAX_ATTEMPTS - 1
+                ):
+                    raise
+                admitted = self._admit(product_id, admitted, e)
+                continue
+
+            for pending in admitted:
+                pending.product = product
+            return
+
+    def _admit(
+        self,
+        product_id: str,
+        admitted: list[_PendingDelta],
+        error: AppException,
+    ) -> list[_PendingDelta]:
+        stock = error.details["available_stock"] + sum(
+            p.delta for p in admitted if p.delta > 0
+        )
+        kept = [p for p in admitted if p.delta >= 0]
+        for pending in admitted:
+            if pending.delta >= 0:
+                continue
+            if stock + pending.delta >= 0:
+                stock += pending.delta
+                kept.append(pending)
+            else:
+                pending.error = AppException(
+                    message=f"Insufficient stock for product {product_id}",
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    error_code="INSUFFICIENT_STOCK",
+                    details={"available_stock": stock},
+                )
+        return kept
@@ -3,8 +3,10 @@ from botocore.utils import ClientError
 from app.app_exception.app_exception import AppException
 from app.dto.create_employee_request import CreateEmployeeRequest
 from app.models.user_group import UserGroup
+from app.tracing.tracer import trace_methods
 
 
+@trace_methods
 class UserService:
     def __init__(self, cognito_client, cognito_client_id: str, user_pool_id: str):
         self.cognito_client = cognito_client
@@ -1,34 +1,58 @@
 import json
+import logging
 import boto3
 from botocore.utils import ClientError
 from fastapi import status
 
 from app.app_exception.app_exception import AppException
 from app.dependencies import get_sns_topic_arn
+from app.tracing.tracer import current_span
+
+logger = logging.getLogger(__name__)
 
 
 class SNSEventPublisher:
     def __init__(
         self,
+        client=None,
     ) -> None:
-        self.client = boto3.client("sns", region_name="ap-south-1")
+        self.client = client or boto3.client("sns", region_name="ap-south-1")
         self.topic_arn = get_sns_topic_arn()
-        print(self.client)
-        print("TOPIC ARN =", repr(self.topic_arn))
 
     def publish_event(self, payload: dict):
+        attributes = {
+            "eventType": {"DataType": "String", "StringValue": "LOW_STOCK"},
+        }
+        # lets the alert pipeline continue the request's trace
+        span = current_span()
+        if span is not None:
+            attributes["traceparent"] = {
+                "DataType": "String",
+                "StringValue": span.traceparent,
+            }
+
         try:
             self.client.publish(
                 TopicArn=self.topic_arn,
                 Message=json.dumps(payload),
-                MessageAttributes={
-                    "eventType": {"DataType": "String", "StringValue": "LOW_STOCK"},
-                },
+                MessageAttributes=attributes,
             )
         except ClientError as e:
+            logger.warning(
+                "sns_publish_failed",
+                extra={"topic_arn": self.topic_arn, "error": str(e)},
+            )
             raise AppException(
                 message="Failed to publish SNS event",
                 error_code="SNS_ERROR",
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 details={"error": str(e)},
             )
+        logger.info(
+            "sns_event_published",
+            extra={
+                "topic_arn": self.topic_arn,
+                "event_type": payload.get("event_type"),
+                "product_id": payload.get("product_id"),
+            },
+        )
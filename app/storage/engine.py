@@ -0,0 +1,116 @@
+from abc import ABC, abstractmethod
+from contextlib import AbstractContextManager
+from typing import Callable, List, NamedTuple
+
+# every table the app uses has a string partition key ``pk`` and string sort
+# key ``sk``
+HASH_KEY = "pk"
+RANGE_KEY = "sk"
+
+# the table's global secondary indexes: name -> (hash attribute, range
+# attribute). Items missing either attribute are left out, as in DynamoDB.
+TABLE_INDEXES = {
+    "category-index": ("category_key", "id"),
+    "low-stock-index": ("low_stock_key", "id"),
+}
+
+
+class KeyRange(NamedTuple):
+    lower: str | None = None
+    lower_inclusive: bool = True
+    upper: str | None = None
+    upper_inclusive: bool = True
+
+    def contains(self, key: str) -> bool:
+        if self.lower is not None and (
+            key < self.lower or (key == self.lower and not self.lower_inclusive)
+        ):
+            return False
+        if self.upper is not None and (
+            key > self.upper or (key == self.upper and not self.upper_inclusive)
+        ):
+            return False
+        return True
+
+
+def index_entry(item: dict, index: tuple[str, str]) -> tuple[str, str] | None:
+    # items are in the low-level attribute-value format; only string index
+    # keys are supported
+    hash_value, range_value = (item.get(name, {}).get("S") for name in index)
+    if hash_value is None or range_value is None:
+        return None
+    return hash_value, range_value
+
+
+class StorageEngine(ABC):
+    """Keyed item storage behind the local DynamoDB-compatible tables.
+
+    Items are stored in the low-level attribute-value format. Engines only
+    deal with keys and ordering; conditions, updates and pagination are
+    evaluated by ``LocalTable`` inside ``atomic()``, which must make a
+    sequence of reads and writes atomic with respect to other threads.
+    """
+
+    def __init__(self, indexes: dict[str, tuple[str, str]] | None = None):
+        self.indexes = TABLE_INDEXES if indexes is None else indexes
+
+    @abstractmethod
+    def atomic(self) -> AbstractContextManager:
+        pass
+
+    # Runs ``callback`` once the surrounding ``atomic()`` is sure to commit,
+    # still inside it, so callbacks run in commit order. Engines that apply
+    # writes at once run it straight away.
+    def on_commit(self, callback: Callable[[], None]):
+        callback()
+
+    @abstractmethod
+    def get(self, table: str, pk: str, sk: str) -> dict | None:
+        pass
+
+    @abstractmethod
+    def put(self, table: str, item: dict):
+        pass
+
+    @abstractmethod
+    def delete(self, table: str, pk: str, sk: str):
+        pass
+
+    # Items of partition ``pk`` whose sort key is in ``key_range`` and after
+    # ``start_sk``, in sort key order.
+    @abstractmethod
+    def query(
+        self,
+        table: str,
+        pk: str,
+        key_range: KeyRange,
+        forward: bool,
+        start_sk: str | None,
+        limit: int | None,
+    ) -> List[dict]:
+        pass
+
+    # Items indexed under ``hash_value``, ordered by (range key, pk, sk) and
+    # starting after ``start``, a tuple in the same order.
+    @abstractmethod
+    def query_index(
+        self,
+        table: str,
+        index_name: str,
+        hash_value: str,
+        key_range: KeyRange,
+        forward: bool,
+        start: tuple[str, str, str] | None,
+        limit: int | None,
+    ) -> List[dict]:
+        pass
+
+    # All items ordered by (pk, sk), starting after ``start``.
+    @abstractmethod
+    def scan(
+        self, table: str, start: tuple[str, str] | None, limit: int | None
+    ) -> List[dict]:
+        pass
+
+    def close(self):
+        pass
@@ -0,0 +1,414 @@
+from decimal import Decimal
+from functools import lru_cache
+import re
+
+# Parses and evaluates the subset of DynamoDB expression syntax the
+# repositories use, so local engines can honour the same conditions and
+# updates as the real table. Attribute paths are top-level names only.
+
+_TOKEN = re.compile(
+    r"\s*(?:(<>|<=|>=|[=<>(),+\-])|(#[A-Za-z0-9_]+)|(:[A-Za-z0-9_]+)"
+    r"|([A-Za-z_][A-Za-z0-9_]*))"
+)
+
+_CLAUSES = ("SET", "REMOVE", "ADD", "DELETE")
+_COMPARATORS = ("=", "<>", "<", "<=", ">", ">=")
+_CONDITION_FUNCTIONS = (
+    "attribute_exists",
+    "attribute_not_exists",
+    "attribute_type",
+    "begins_with",
+    "contains",
+)
+
+
+class ExpressionError(ValueError):
+    pass
+
+
+class _Missing:
+    def __repr__(self):
+        return "MISSING"
+
+
+MISSING = _Missing()
+
+
+def _tokenize(expression: str) -> list[str]:
+    tokens, position = [], 0
+    expression = expression.rstrip()
+    while position < len(expression):
+        match = _TOKEN.match(expression, position)
+        if match is None or match.end() == position:
+            raise ExpressionError(f"Invalid expression near {expression[position:]!r}")
+        tokens.append(next(group for group in match.groups() if group is not None))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+    def __init__(self, expression: str):
+        self.tokens = _tokenize(expression)
+        self.position = 0
+
+    def peek(self, offset: int = 0) -> str | None:
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else None
+
+    def keyword(self, offset: int = 0) -> str | None:
+        token = self.peek(offset)
+        return token.upper() if token is not None else None
+
+    def next(self) -> str:
+        token = self.peek()
+        if token is None:
+            raise ExpressionError("Unexpected end of expression")
+        self.position += 1
+        return token
+
+    def expect(self, expected: str):
+        token = self.next()
+        if token.upper() != expected:
+            raise ExpressionError(f"Expected {expected!r}, got {token!r}")
+
+    def done(self):
+        if self.peek() is not None:
+            raise ExpressionError(f"Unexpected token {self.peek()!r}")
+
+    # condition := conj (OR conj)*
+    def condition(self):
+        node = self.conjunction()
+        while self.keyword() == "OR":
+            self.next()
+            node = ("or", node, self.conjunction())
+        return node
+
+    def conjunction(self):
+        node = self.negation()
+        while self.keyword() == "AND":
+            self.next()
+            node = ("and", node, self.negation())
+        return node
+
+    def negation(self):
+        if self.keyword() == "NOT":
+            self.next()
+            return ("not", self.negation())
+        return self.atom()
+
+    def atom(self):
+        if self.peek() == "(":
+            self.next()
+            node = self.condition()
+            self.expect(")")
+            return node
+
+        if self.peek() in _CONDITION_FUNCTIONS and self.peek(1) == "(":
+            name = self.next()
+            self.next()
+            args = [self.operand()]
+            while self.peek() == ",":
+                self.next()
+                args.append(self.operand())
+            self.expect(")")
+            return ("func", name, args)
+
+        left = self.operand()
+        if self.peek() in _COMPARATORS:
+            return ("cmp", self.next(), left, self.operand())
+        if self.keyword() == "BETWEEN":
+            self.next()
+            lower = self.operand()
+            self.expect("AND")
+            return ("between", left, lower, self.operand())
+        if self.keyword() == "IN":
+            self.next()
+            self.expect("(")
+            options = [self.operand()]
+            while self.peek() == ",":
+                self.next()
+                options.append(self.operand())
+            self.expect(")")
+            return ("in", left, options)
+        raise ExpressionError(f"Expected a comparison after {left!r}")
+
+    def path(self):
+        token = self.next()
+        if token.startswith(":") or not (token[0] == "#" or token[0].isalpha()):
+            raise ExpressionError(f"Expected an attribute name, got {token!r}")
+        return ("path", token)
+
+    def operand(self):
+        token = self.peek()
+        if token is not None and token.startswith(":"):
+            return ("value", self.next())
+        if token == "size" and self.peek(1) == "(":
+            self.next()
+            self.next()
+            node = ("size", self.path())
+            self.expect(")")
+            return node
+        return self.path()
+
+    # update := (SET|REMOVE|ADD|DELETE) action (',' action)* ...
+    def update(self):
+        clauses = []
+        while self.peek() is not None:
+            clause = self.keyword()
+            if clause not in _CLAUSES:
+                raise ExpressionError(f"Expected an update clause, got {self.peek()!r}")
+            self.next()
+            while True:
+                clauses.append(self.update_action(clause))
+                if self.peek() != ",":
+                    break
+                self.next()
+        if not clauses:
+            raise ExpressionError("Empty update expression")
+        return clauses
+
+    def update_action(self, clause: str):
+        path = self.path()
+        if clause == "REMOVE":
+            return ("remove", path)
+        if clause in ("ADD", "DELETE"):
+            return (clause.lower(), path, self.operand())
+
+        self.expect("=")
+        value = self.set_operand()
+        if self.peek() in ("+", "-"):
+            operator = self.next()
+            value = (operator, value, self.set_operand())
+        return ("set", path, value)
+
+    def set_operand(self):
+        token = self.peek()
+        if token in ("if_not_exists", "list_append") and self.peek(1) == "(":
+            self.next()
+            self.next()
+            first = self.path() if token == "if_not_exists" else self.set_operand()
+            self.expect(",")
+            second = self.set_operand()
+            self.expect(")")
+            return (token, first, second)
+        return self.operand()
+
+
+@lru_cache(maxsize=512)
+def parse_condition(expression: str):
+    parser = _Parser(expression)
+    node = parser.condition()
+    parser.done()
+    return node
+
+
+@lru_cache(maxsize=512)
+def parse_update(expression: str):
+    parser = _Parser(expression)
+    actions = parser.update()
+    parser.done()
+    return tuple(actions)
+
+
+def _attribute_name(token: str, names: dict | None) -> str:
+    if not token.startswith("#"):
+        return token
+    if not names or token not in names:
+        raise ExpressionError(f"Undefined attribute name {token}")
+    return names[token]
+
+
+def _type_of(value) -> str:
+    if isinstance(value, bool):
+        return "BOOL"
+    if isinstance(value, (Decimal, int, float)):
+        return "N"
+    if isinstance(value, str):
+        return "S"
+    if isinstance(value, (bytes, bytearray)):
+        return "B"
+    if value is None:
+        return "NULL"
+    if isinstance(value, dict):
+        return "M"
+    if isinstance(value, list):
+        return "L"
+    if isinstance(value, (set, frozenset)):
+        kinds = {_type_of(member) for member in value}
+        return f"{kinds.pop() if len(kinds) == 1 else 'S'}S"
+    return type(value).__name__
+
+
+def _resolve(node, item: dict, names: dict | None, values: dict | None):
+    kind = node[0]
+    if kind == "path":
+        return item.get(_attribute_name(node[1], names), MISSING)
+    if kind == "value":
+        if not values or node[1] not in values:
+            raise ExpressionError(f"Undefined attribute value {node[1]}")
+        return values[node[1]]
+    if kind == "size":
+        value = _resolve(node[1], item, names, values)
+        if isinstance(value, (str, bytes, list, dict, set, frozenset)):
+            return Decimal(len(value))
+        return MISSING
+    raise ExpressionError(f"Unsupported operand {kind}")
+
+
+def _compare(operator: str, left, right) -> bool:
+    comparable = (
+        left is not MISSING
+        and right is not MISSING
+        and _type_of(left) == _type_of(right)
+    )
+    if operator == "=":
+        return comparable and left == right
+    if operator == "<>":
+        return not comparable or left != right
+    if not comparable or _type_of(left) not in ("N", "S", "B"):
+        return False
+    if operator == "<":
+        return left < right
+    if operator == "<=":
+        return left <= right
+    if operator == ">":
+        return left > right
+    return left >= right
+
+
+def _call(name: str, args: list, item: dict, names: dict | None, values: dict | None):
+    if name in ("attribute_exists", "attribute_not_exists"):
+        exists = _resolve(args[0], item, names, values) is not MISSING
+        return exists if name == "attribute_exists" else not exists
+
+    target = _resolve(args[0], item, names, values)
+    operand = _resolve(args[1], item, names, values)
+    if target is MISSING:
+        return False
+    if name == "attribute_type":
+        return _type_of(target) == operand
+    if name == "begins_with":
+        return isinstance(target, (str, bytes)) and target[: len(operand)] == operand
+    # contains
+    if isinstance(target, str):
+        return isinstance(operand, str) and operand in target
+    if isinstance(target, (set, frozenset, list)):
+        return operand in target
+    return False
+
+
+def evaluate(node, item: dict, names: dict | None, values: dict | None) -> bool:
+    kind = node[0]
+    if kind == "and":
+        return evaluate(node[1], item, names, values) and evaluate(
+            node[2], item, names, values
+        )
+    if kind == "or":
+        return evaluate(node[1], item, names, values) or evaluate(
+            node[2], item, names, values
+        )
+    if kind == "not":
+        return not evaluate(node[1], item, names, values)
+    if kind == "cmp":
+        return _compare(
+            node[1],
+            _resolve(node[2], item, names, values),
+            _resolve(node[3], item, names, values),
+        )
+    if kind == "between":
+        value = _resolve(node[1], item, names, values)
+        return _compare(
+            ">=", value, _resolve(node[2], item, names, values)
+        ) and _compare("<=", value, _resolve(node[3], item, names, values))
+    if kind == "in":
+        value = _resolve(node[1], item, names, values)
+        return any(
+            _compare("=", value, _resolve(option, item, names, values))
+            for option in node[2]
+        )
+    if kind == "func":
+        return _call(node[1], node[2], item, names, values)
+    raise ExpressionError(f"Unsupported condition {kind}")
+
+
+def matches(
+    expression: str | None,
+    item: dict | None,
+    names: dict | None = None,
+    values: dict | None = None,
+) -> bool:
+    if not expression:
+        return True
+    return evaluate(parse_condition(expression), item or {}, names, values)
+
+
+def _set_value(node, item: dict, names: dict | None, values: dict | None):
+    kind = node[0]
+    if kind in ("+", "-"):
+        left = _set_value(node[1], item, names, values)
+        right = _set_value(node[2], item, names, values)
+        if _type_of(left) != "N" or _type_of(right) != "N":
+            raise ExpressionError("Arithmetic needs two numbers")
+        return left + right if kind == "+" else left - right
+    if kind == "if_not_exists":
+        current = _resolve(node[1], item, names, values)
+        if current is not MISSING:
+            return current
+        return _set_value(node[2], item, names, values)
+    if kind == "list_append":
+        first = _set_value(node[1], item, names, values)
+        second = _set_value(node[2], item, names, values)
+        if not isinstance(first, list) or not isinstance(second, list):
+            raise ExpressionError("list_append needs two lists")
+        return first + second
+
+    value = _resolve(node, item, names, values)
+    if value is MISSING:
+        raise ExpressionError("The update references a missing attribute")
+    return value
+
+
+# Returns the updated copy of ``item``. Every operand reads the item as it
+# was before the update, as DynamoDB does.
+def apply_update(
+    expression: str,
+    item: dict,
+    names: dict | None = None,
+    values: dict | None = None,
+    key_attributes: tuple[str, ...] = (),
+) -> dict:
+    updated = dict(item)
+    for action in parse_update(expression):
+        kind, name = action[0], _attribute_name(action[1][1], names)
+        if name in key_attributes:
+            raise ExpressionError(f"Cannot update key attribute {name}")
+
+        if kind == "remove":
+            updated.pop(name, None)
+            continue
+        if kind == "set":
+            updated[name] = _set_value(action[2], item, names, values)
+            continue
+
+        operand = _resolve(action[2], item, names, values)
+        current = item.get(name, MISSING)
+        if kind == "add" and _type_of(operand) == "N":
+            if current is MISSING:
+                updated[name] = operand
+            elif _type_of(current) == "N":
+                updated[name] = current + operand
+            else:
+                raise ExpressionError(f"ADD needs {name} to be a number")
+        elif isinstance(operand, (set, frozenset)):
+            if current is MISSING:
+                current = set()
+            elif not isinstance(current, (set, frozenset)):
+                raise ExpressionError(f"{kind.upper()} needs {name} to be a set")
+            result = current | operand if kind == "add" else current - operand
+            if result:
+                updated[name] = set(result)
+            else:
+                updated.pop(name, None)
+        else:
+            raise ExpressionError(f"{kind.upper()} needs a number or a set")
+    return updated
@@ -0,0 +1,492 @@
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, List
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.exceptions import ClientError
+
+from app.storage.engine import HASH_KEY, RANGE_KEY, KeyRange, StorageEngine
+from app.storage.expressions import (
+    ExpressionError,
+    apply_update,
+    matches,
+    parse_condition,
+)
+
+if TYPE_CHECKING:
+    from app.projector.change_stream import LocalChangeStream
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+_RETURN_VALUES = ("NONE", "ALL_OLD", "ALL_NEW")
+
+# the largest string a sort key can realistically hold under a prefix
+_PREFIX_END = "\U0010ffff"
+
+
+def _dump(item: dict) -> dict:
+    return {name: _serializer.serialize(value) for name, value in item.items()}
+
+
+def _load(item: dict | None) -> dict | None:
+    if item is None:
+        return None
+    return {name: _deserializer.deserialize(value) for name, value in item.items()}
+
+
+def _normalize(values: dict | None) -> dict | None:
+    # round-trip through the attribute-value format so ints become Decimals
+    # and floats are rejected, exactly as boto3 does
+    if not values:
+        return values
+    return _load(_dump(values))
+
+
+def _client_error(operation: str, code: str, message: str, **extra) -> ClientError:
+    return ClientError(
+        {"Error": {"Code": code, "Message": message}, **extra}, operation
+    )
+
+
+def _validation_error(operation: str, message: str) -> ClientError:
+    return _client_error(operation, "ValidationException", message)
+
+
+def _key_of(key: dict, operation: str) -> tuple[str, str]:
+    pk, sk = key.get(HASH_KEY), key.get(RANGE_KEY)
+    if not isinstance(pk, str) or not isinstance(sk, str):
+        raise _validation_error(
+            operation, "The provided key element does not match the schema"
+        )
+    return pk, sk
+
+
+class _ConditionFailed(Exception):
+    def __init__(self, old: dict | None):
+        self.old = old
+
+
+class _Write:
+    def __init__(self, table: str, key: tuple[str, str], old, new, return_values):
+        self.table = table
+        self.key = key
+        self.old = old
+        self.new = new
+        self.return_values = return_values
+
+    def attributes(self) -> dict:
+        if self.return_values == "ALL_OLD" and self.old is not None:
+            return {"Attributes": _load(self.old)}
+        if self.return_values == "ALL_NEW" and self.new is not None:
+            return {"Attributes": _load(self.new)}
+        return {}
+
+
+def _key_condition(
+    expression: str, names: dict | None, values: dict | None, hash_attr, range_attr
+) -> tuple[str, KeyRange, str | None]:
+    def attribute(node) -> str | None:
+        if node[0] != "path":
+            return None
+        token = node[1]
+        return (names or {}).get(token) if token.startswith("#") else token
+
+    def value(node):
+        if node[0] != "value" or not values or node[1] not in values:
+            raise ExpressionError("Key conditions compare against values")
+        return values[node[1]]
+
+    node = parse_condition(expression)
+    parts = [node[1], node[2]] if node[0] == "and" else [node]
+    hash_value, key_range, prefix = None, KeyRange(), None
+    for part in parts:
+        if part[0] == "cmp" and part[1] == "=" and attribute(part[2]) == hash_attr:
+            hash_value = value(part[3])
+        elif part[0] == "cmp" and attribute(part[2]) == range_attr:
+            operator, bound = part[1], value(part[3])
+            key_range = {
+                "=": KeyRange(bound, True, bound, True),
+                "<": KeyRange(upper=bound, upper_inclusive=False),
+                "<=": KeyRange(upper=bound),
+                ">": KeyRange(bound, False),
+                ">=": KeyRange(bound),
+            }.get(operator)
+            if key_range is None:
+                raise ExpressionError(f"Unsupported key comparison {operator}")
+        elif part[0] == "between" and attribute(part[1]) == range_attr:
+            key_range = KeyRange(value(part[2]), True, value(part[3]), True)
+        elif (
+            part[0] == "func"
+            and part[1] == "begins_with"
+            and attribute(part[2][0]) == range_attr
+        ):
+            prefix = value(part[2][1])
+            key_range = KeyRange(prefix, True, prefix + _PREFIX_END, True)
+        else:
+            raise ExpressionError("Unsupported key condition")
+
+    if not isinstance(hash_value, str):
+        raise ExpressionError("Key conditions need an equality on the hash key")
+    return hash_value, key_range, prefix
+
+
+class _BatchWriter:
+    def __init__(self, table: "LocalTable"):
+        self.table = table
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def put_item(self, Item: dict):
+        self.table.put_item(Item=Item)
+
+    def delete_item(self, Key: dict):
+        self.table.delete_item(Key=Key)
+
+
+class LocalTable:
+    """The part of the boto3 ``Table`` API the repositories use, served from
+    a local ``StorageEngine``. Errors are raised as the ``ClientError`` codes
+    DynamoDB would return, so repository error handling works unchanged.
+    """
+
+    def __init__(self, storage: "LocalStorage", name: str):
+        self.name = name
+        self.engine = storage.engine
+        self.meta = SimpleNamespace(client=storage.client)
+        self.stream: "LocalChangeStream | None" = None
+
+    # Records every change committed to this table in ``stream``, as a
+    # DynamoDB stream with NEW_AND_OLD_IMAGES would.
+    def attach_stream(self, stream: "LocalChangeStream"):
+        self.stream = stream
+
+    # Evaluates one write against the current item; must run inside
+    # engine.atomic() together with the commit.
+    def _plan(self, kind: str, params: dict, operation: str) -> _Write:
+        names = params.get("ExpressionAttributeNames")
+        values = _normalize(params.get("ExpressionAttributeValues"))
+        return_values = params.get("ReturnValues", "NONE")
+        if return_values not in _RETURN_VALUES:
+            raise _validation_error(
+                operation, f"ReturnValues {return_values} is not supported"
+            )
+
+        if kind == "Put":
+            item = _normalize(params["Item"])
+            key = _key_of(item, operation)
+        else:
+            key = _key_of(params["Key"], operation)
+
+        old = self.engine.get(self.name, *key)
+        try:
+            if not matches(
+                params.get("ConditionExpression"), _load(old), names, values
+            ):
+                raise _ConditionFailed(old)
+
+            if kind == "Put":
+                new = _dump(item)
+            elif kind == "Update":
+                current = _load(old) or {HASH_KEY: key[0], RANGE_KEY: key[1]}
+                new = _dump(
+                    apply_update(
+                        params["UpdateExpression"],
+                        current,
+                        names,
+                        values,
+                        key_attributes=(HASH_KEY, RANGE_KEY),
+                    )
+                )
+            else:
+                new = None
+        except ExpressionError as e:
+            raise _validation_error(operation, str(e))
+
+        return _Write(self.name, key, old, new, return_values)
+
+    def _commit(self, write: _Write):
+        if write.new is None:
+            self.engine.delete(write.table, *write.key)
+        else:
+            self.engine.put(write.table, write.new)
+        # like DynamoDB, a write that changes nothing leaves no record
+        if self.stream is not None and write.old != write.new:
+            self.engine.on_commit(lambda: self._publish(write))
+
+    def _publish(self, write: _Write):
+        if write.old is None:
+            event_name = "INSERT"
+        elif write.new is None:
+            event_name = "REMOVE"
+        else:
+            event_name = "MODIFY"
+        self.stream.append(
+            event_name,
+            {HASH_KEY: write.key[0], RANGE_KEY: write.key[1]},
+            _load(write.new),
+            _load(write.old),
+        )
+
+    def _write(self, kind: str, params: dict, operation: str) -> dict:
+        with self.engine.atomic():
+            try:
+                write = self._plan(kind, params, operation)
+            except _ConditionFailed as e:
+                extra = {}
+                if (
+                    params.get("ReturnValuesOnConditionCheckFailure") == "ALL_OLD"
+                    and e.old is not None
+                ):
+                    extra["Item"] = e.old
+                raise _client_error(
+                    operation,
+                    "ConditionalCheckFailedException",
+                    "The conditional request failed",
+                    **extra,
+                )
+            self._commit(write)
+        return write.attributes()
+
+    def get_item(self, Key: dict, ConsistentRead: bool = False, **_) -> dict:
+        item = self.engine.get(self.name, *_key_of(Key, "GetItem"))
+        return {"Item": _load(item)} if item is not None else {}
+
+    def put_item(self, **params) -> dict:
+        return self._write("Put", params, "PutItem")
+
+    def update_item(self, **params) -> dict:
+        return self._write("Update", params, "UpdateItem")
+
+    def delete_item(self, **params) -> dict:
+        return self._write("Delete", params, "DeleteItem")
+
+    def batch_writer(self) -> _BatchWriter:
+        return _BatchWriter(self)
+
+    def _page(self, items: List[dict], limit: int | None, key_of, params: dict) -> dict:
+        names = params.get("ExpressionAttributeNames")
+        values = _normalize(params.get("ExpressionAttributeValues"))
+        loaded = [_load(item) for item in items]
+        response = {"ScannedCount": len(loaded)}
+        # like DynamoDB, Limit counts items read, before the filter
+        if limit and len(loaded) == limit:
+            response["LastEvaluatedKey"] = key_of(loaded[-1])
+
+        try:
+            loaded = [
+                item
+                for item in loaded
+                if matches(params.get("FilterExpression"), item, names, values)
+            ]
+        except ExpressionError as e:
+            raise _validation_error("Query", str(e))
+        response["Items"] = loaded
+        response["Count"] = len(loaded)
+        return response
+
+    def query(self, **params) -> dict:
+        names = params.get("ExpressionAttributeNames")
+        values = _normalize(params.get("ExpressionAttributeValues"))
+        index_name = params.get("IndexName")
+        forward = params.get("ScanIndexForward", True)
+        limit = params.get("Limit")
+        start_key = params.get("ExclusiveStartKey")
+
+        if index_name is None:
+            hash_attr, range_attr = HASH_KEY, RANGE_KEY
+        elif index_name in self.engine.indexes:
+            hash_attr, range_attr = self.engine.indexes[index_name]
+        else:
+            raise _validation_error("Query", f"Unknown index {index_name}")
+
+        try:
+            hash_value, key_range, prefix = _key_condition(
+                params["KeyConditionExpression"], names, values, hash_attr, range_attr
+            )
+        except ExpressionError as e:
+            raise _validation_error("Query", str(e))
+
+        if index_name is None:
+            items = self.engine.query(
+                self.name,
+                hash_value,
+                key_range,
+                forward,
+                start_key[RANGE_KEY] if start_key else None,
+                limit,
+            )
+
+            def key_of(item: dict) -> dict:
+                return {HASH_KEY: item[HASH_KEY], RANGE_KEY: item[RANGE_KEY]}
+
+        else:
+            items = self.engine.query_index(
+                self.name,
+                index_name,
+                hash_value,
+                key_range,
+                forward,
+                (
+                    (start_key[range_attr], start_key[HASH_KEY], start_key[RANGE_KEY])
+                    if start_key
+                    else None
+                ),
+                limit,
+            )
+
+            def key_of(item: dict) -> dict:
+                return {
+                    HASH_KEY: item[HASH_KEY],
+                    RANGE_KEY: item[RANGE_KEY],
+                    hash_attr: item[hash_attr],
+                    range_attr: item[range_attr],
+                }
+
+        if prefix is not None:
+            # the prefix range is inclusive of keys past the prefix itself
+            items = [
+                item
+                for item in items
+                if _deserializer.deserialize(item[range_attr]).startswith(prefix)
+            ]
+        return self._page(items, limit, key_of, params)
+
+    def scan(self, **params) -> dict:
+        limit = params.get("Limit")
+        start_key = params.get("ExclusiveStartKey")
+        items = self.engine.scan(
+            self.name,
+            (start_key[HASH_KEY], start_key[RANGE_KEY]) if start_key else None,
+            limit,
+        )
+        return self._page(
+            items,
+            limit,
+            lambda item: {HASH_KEY: item[HASH_KEY], RANGE_KEY: item[RANGE_KEY]},
+            params,
+        )
+
+
+class LocalClient:
+    """The client-level calls the repositories make through
+    ``table.meta.client``. Local batches never leave anything unprocessed.
+    """
+
+    def __init__(self, storage: "LocalStorage"):
+        self.storage = storage
+
+    def get_item(self, TableName: str, **params) -> dict:
+        return self.storage.table(TableName).get_item(**params)
+
+    def put_item(self, TableName: str, **params) -> dict:
+        return self.storage.table(TableName).put_item(**params)
+
+    def update_item(self, TableName: str, **params) -> dict:
+        return self.storage.table(TableName).update_item(**params)
+
+    def delete_item(self, TableName: str, **params) -> dict:
+        return self.storage.table(TableName).delete_item(**params)
+
+    def query(self, TableName: str, **params) -> dict:
+        return self.storage.table(TableName).query(**params)
+
+    def scan(self, TableName: str, **params) -> dict:
+        return self.storage.table(TableName).scan(**params)
+
+    def batch_get_item(self, RequestItems: dict) -> dict:
+        responses = {}
+        for name, request in RequestItems.items():
+            table = self.storage.table(name)
+            responses[name] = [
+                response["Item"]
+                for response in (table.get_item(Key=key) for key in request["Keys"])
+                if "Item" in response
+            ]
+        return {"Responses": responses, "UnprocessedKeys": {}}
+
+    def batch_write_item(self, RequestItems: dict) -> dict:
+        for name, requests in RequestItems.items():
+            table = self.storage.table(name)
+            for request in requests:
+                if "PutRequest" in request:
+                    table.put_item(Item=request["PutRequest"]["Item"])
+                else:
+                    table.delete_item(Key=request["DeleteRequest"]["Key"])
+        return {"UnprocessedItems": {}}
+
+    def transact_write_items(self, TransactItems: List[dict]) -> dict:
+        engine = self.storage.engine
+        with engine.atomic():
+            writes, reasons, failed, seen = [], [], False, set()
+            for action in TransactItems:
+                ((kind, params),) = action.items()
+                table = self.storage.table(params["TableName"])
+                key_params = params["Item"] if kind == "Put" else params["Key"]
+                key = (table.name, *_key_of(key_params, "TransactWriteItems"))
+                if key in seen:
+                    raise _validation_error(
+                        "TransactWriteItems",
+                        "Transaction request cannot include multiple operations "
+                        "on one item",
+                    )
+                seen.add(key)
+
+                try:
+                    if kind == "ConditionCheck":
+                        table._plan("Delete", params, "TransactWriteItems")
+                        write = None
+                    else:
+                        write = table._plan(kind, params, "TransactWriteItems")
+                except _ConditionFailed as e:
+                    failed = True
+                    reason = {
+                        "Code": "ConditionalCheckFailed",
+                        "Message": "The conditional request failed",
+                    }
+                    if (
+                        params.get("ReturnValuesOnConditionCheckFailure") == "ALL_OLD"
+                        and e.old is not None
+                    ):
+                        reason["Item"] = e.old
+                    reasons.append(reason)
+                    continue
+
+                reasons.append({"Code": "None"})
+                if write is not None:
+                    writes.append((table, write))
+
+            if failed:
+                raise _client_error(
+                    "TransactWriteItems",
+                    "TransactionCanceledException",
+                    "Transaction cancelled, please refer cancellation reasons "
+                    "for specific reasons",
+                    CancellationReasons=reasons,
+                )
+            for table, write in writes:
+                table._commit(write)
+        return {}
+
+
+class LocalStorage:
+    """DynamoDB-compatible tables over a local engine. Stands in for
+    ``AWSClientManager`` where the app asks for a table.
+    """
+
+    def __init__(self, engine: StorageEngine):
+        self.engine = engine
+        self.client = LocalClient(self)
+        self._tables: dict[str, LocalTable] = {}
+
+    def table(self, name: str) -> LocalTable:
+        table = self._tables.get(name)
+        if table is None:
+            table = self._tables.setdefault(name, LocalTable(self, name))
+        return table
+
+    def close(self):
+        self.engine.close()
@@ -0,0 +1,174 @@
+from bisect import bisect_left, bisect_right, insort
+import threading
+from typing import List
+
+from app.storage.engine import (
+    HASH_KEY,
+    RANGE_KEY,
+    KeyRange,
+    StorageEngine,
+    index_entry,
+)
+
+
+class _MemoryTable:
+    def __init__(self, indexes: dict[str, tuple[str, str]]):
+        self.partitions: dict[str, dict[str, dict]] = {}
+        # sort keys of each partition, kept in order for range queries
+        self.sort_keys: dict[str, List[str]] = {}
+        # index name -> hash value -> sorted (range value, pk, sk) entries
+        self.indexes: dict[str, dict[str, List[tuple[str, str, str]]]] = {
+            name: {} for name in indexes
+        }
+
+
+def _slice(
+    keys: list, key_range: KeyRange, forward: bool, start, limit: int | None, key
+) -> list:
+    lower, upper = 0, len(keys)
+    if key_range.lower is not None:
+        bound = bisect_left if key_range.lower_inclusive else bisect_right
+        lower = bound(keys, key_range.lower, key=key)
+    if key_range.upper is not None:
+        bound = bisect_right if key_range.upper_inclusive else bisect_left
+        upper = bound(keys, key_range.upper, key=key)
+    if start is not None:
+        if forward:
+            lower = max(lower, bisect_right(keys, start))
+        else:
+            upper = min(upper, bisect_left(keys, start))
+
+    selected = keys[lower:upper]
+    if not forward:
+        selected.reverse()
+    return selected[:limit] if limit else selected
+
+
+class MemoryEngine(StorageEngine):
+    """Thread-safe in-process storage; everything is lost on restart."""
+
+    def __init__(self, indexes: dict[str, tuple[str, str]] | None = None):
+        super().__init__(indexes)
+        self._lock = threading.RLock()
+        self._tables: dict[str, _MemoryTable] = {}
+
+    def _table(self, name: str) -> _MemoryTable:
+        table = self._tables.get(name)
+        if table is None:
+            table = self._tables[name] = _MemoryTable(self.indexes)
+        return table
+
+    def atomic(self) -> threading.RLock:
+        return self._lock
+
+    def get(self, table: str, pk: str, sk: str) -> dict | None:
+        with self._lock:
+            return self._table(table).partitions.get(pk, {}).get(sk)
+
+    def _unindex(self, table: _MemoryTable, item: dict):
+        for name, index in self.indexes.items():
+            entry = index_entry(item, index)
+            if entry is None:
+                continue
+            entries = table.indexes[name][entry[0]]
+            position = bisect_left(
+                entries, (entry[1], item[HASH_KEY]["S"], item[RANGE_KEY]["S"])
+            )
+            del entries[position]
+            if not entries:
+                del table.indexes[name][entry[0]]
+
+    def put(self, table: str, item: dict):
+        pk, sk = item[HASH_KEY]["S"], item[RANGE_KEY]["S"]
+        with self._lock:
+            stored = self._table(table)
+            partition = stored.partitions.setdefault(pk, {})
+            previous = partition.get(sk)
+            if previous is None:
+                insort(stored.sort_keys.setdefault(pk, []), sk)
+            else:
+                self._unindex(stored, previous)
+
+            partition[sk] = item
+            for name, index in self.indexes.items():
+                entry = index_entry(item, index)
+                if entry is not None:
+                    insort(
+                        stored.indexes[name].setdefault(entry[0], []),
+                        (entry[1], pk, sk),
+                    )
+
+    def delete(self, table: str, pk: str, sk: str):
+        with self._lock:
+            stored = self._table(table)
+            previous = stored.partitions.get(pk, {}).pop(sk, None)
+            if previous is None:
+                return
+
+            self._unindex(stored, previous)
+            sort_keys = stored.sort_keys[pk]
+            del sort_keys[bisect_left(sort_keys, sk)]
+            if not sort_keys:
+                del stored.sort_keys[pk]
+                del stored.partitions[pk]
+
+    def query(
+        self,
+        table: str,
+        pk: str,
+        key_range: KeyRange,
+        forward: bool,
+        start_sk: str | None,
+        limit: int | None,
+    ) -> List[dict]:
+        with self._lock:
+            stored = self._table(table)
+            partition = stored.partitions.get(pk, {})
+            keys = _slice(
+                stored.sort_keys.get(pk, []),
+                key_range,
+                forward,
+                start_sk,
+                limit,
+                key=None,
+            )
+            return [partition[sk] for sk in keys]
+
+    def query_index(
+        self,
+        table: str,
+        index_name: str,
+        hash_value: str,
+        key_range: KeyRange,
+        forward: bool,
+        start: tuple[str, str, str] | None,
+        limit: int | None,
+    ) -> List[dict]:
+        with self._lock:
+            stored = self._table(table)
+            entries = _slice(
+                stored.indexes[index_name].get(hash_value, []),
+                key_range,
+                forward,
+                start,
+                limit,
+                key=lambda entry: entry[0],
+            )
+            return [stored.partitions[pk][sk] for _, pk, sk in entries]
+
+    def scan(
+        self, table: str, start: tuple[str, str] | None, limit: int | None
+    ) -> List[dict]:
+        with self._lock:
+            stored = self._table(table)
+            items = []
+            for pk in sorted(stored.partitions):
+                if start is not None and pk < start[0]:
+                    continue
+                for sk in stored.sort_keys[pk]:
+                    if start is not None and (pk, sk) <= start:
+                        continue
+                    items.append(stored.partitions[pk][sk])
+                    if limit and len(items) == limit:
+                        return items
+            return items
@@ -0,0 +1,234 @@
+from contextlib import contextmanager
+import json
+import sqlite3
+import threading
+from typing import Callable, Iterator, List
+
+from app.storage.engine import (
+    HASH_KEY,
+    RANGE_KEY,
+    KeyRange,
+    StorageEngine,
+    index_entry,
+)
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS items ("
+    " table_name TEXT NOT NULL, pk TEXT NOT NULL, sk TEXT NOT NULL,"
+    " item TEXT NOT NULL, PRIMARY KEY (table_name, pk, sk)) WITHOUT ROWID",
+    "CREATE TABLE IF NOT EXISTS index_entries ("
+    " table_name TEXT NOT NULL, index_name TEXT NOT NULL,"
+    " hash_key TEXT NOT NULL, range_key TEXT NOT NULL,"
+    " pk TEXT NOT NULL, sk TEXT NOT NULL,"
+    " PRIMARY KEY (table_name, index_name, hash_key, range_key, pk, sk)"
+    ") WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS index_entries_by_item"
+    " ON index_entries (table_name, pk, sk)",
+)
+
+
+def _range_clauses(column: str, key_range: KeyRange) -> tuple[str, list]:
+    sql, params = "", []
+    if key_range.lower is not None:
+        sql += f" AND {column} {'>=' if key_range.lower_inclusive else '>'} ?"
+        params.append(key_range.lower)
+    if key_range.upper is not None:
+        sql += f" AND {column} {'<=' if key_range.upper_inclusive else '<'} ?"
+        params.append(key_range.upper)
+    return sql, params
+
+
+class SQLiteEngine(StorageEngine):
+    """Single-file storage for small deployments.
+
+    Every thread gets its own connection. WAL mode lets readers run while a
+    write is in progress, and ``atomic()`` holds SQLite's write lock for the
+    whole check-and-write sequence. Statements are built from a fixed set of
+    shapes with bound parameters, so each connection's statement cache keeps
+    them prepared.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        indexes: dict[str, tuple[str, str]] | None = None,
+        busy_timeout: float = 30.0,
+    ):
+        super().__init__(indexes)
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        for statement in _SCHEMA:
+            connection.execute(statement)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # autocommit; transactions are opened explicitly in atomic()
+            connection = sqlite3.connect(
+                self.path,
+                timeout=self.busy_timeout,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.depth = 0
+            self._local.on_commit = []
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+
+    @contextmanager
+    def atomic(self) -> Iterator[None]:
+        connection = self._connection()
+        depth = self._local.depth
+        if depth == 0:
+            connection.execute("BEGIN IMMEDIATE")
+        self._local.depth = depth + 1
+        try:
+            yield
+            if depth == 0:
+                # the write lock is still held, so no other commit comes between
+                callbacks, self._local.on_commit = self._local.on_commit, []
+                for callback in callbacks:
+                    callback()
+        except BaseException:
+            self._local.depth = depth
+            if depth == 0:
+                self._local.on_commit = []
+                connection.execute("ROLLBACK")
+            raise
+        self._local.depth = depth
+        if depth == 0:
+            connection.execute("COMMIT")
+
+    def on_commit(self, callback: Callable[[], None]):
+        self._connection()
+        if self._local.depth == 0:
+            callback()
+        else:
+            self._local.on_commit.append(callback)
+
+    def get(self, table: str, pk: str, sk: str) -> dict | None:
+        row = (
+            self._connection()
+            .execute(
+                "SELECT item FROM items WHERE table_name = ? AND pk = ? AND sk = ?",
+                (table, pk, sk),
+            )
+            .fetchone()
+        )
+        return json.loads(row[0]) if row else None
+
+    def _unindex(self, connection: sqlite3.Connection, table: str, pk: str, sk: str):
+        connection.execute(
+            "DELETE FROM index_entries WHERE table_name = ? AND pk = ? AND sk = ?",
+            (table, pk, sk),
+        )
+
+    def put(self, table: str, item: dict):
+        pk, sk = item[HASH_KEY]["S"], item[RANGE_KEY]["S"]
+        with self.atomic():
+            connection = self._connection()
+            connection.execute(
+                "INSERT OR REPLACE INTO items (table_name, pk, sk, item)"
+                " VALUES (?, ?, ?, ?)",
+                (table, pk, sk, json.dumps(item, separators=(",", ":"))),
+            )
+            self._unindex(connection, table, pk, sk)
+            for name, index in self.indexes.items():
+                entry = index_entry(item, index)
+                if entry is not None:
+                    connection.execute(
+                        "INSERT INTO index_entries (table_name, index_name,"
+                        " hash_key, range_key, pk, sk) VALUES (?, ?, ?, ?, ?, ?)",
+                        (table, name, entry[0], entry[1], pk, sk),
+                    )
+
+    def delete(self, table: str, pk: str, sk: str):
+        with self.atomic():
+            connection = self._connection()
+            connection.execute(
+                "DELETE FROM items WHERE table_name = ? AND pk = ? AND sk = ?",
+                (table, pk, sk),
+            )
+            self._unindex(connection, table, pk, sk)
+
+    def query(
+        self,
+        table: str,
+        pk: str,
+        key_range: KeyRange,
+        forward: bool,
+        start_sk: str | None,
+        limit: int | None,
+    ) -> List[dict]:
+        range_sql, params = _range_clauses("sk", key_range)
+        sql = "SELECT item FROM items WHERE table_name = ? AND pk = ?" + range_sql
+        params = [table, pk, *params]
+        if start_sk is not None:
+            sql += " AND sk > ?" if forward else " AND sk < ?"
+            params.append(start_sk)
+        sql += " ORDER BY sk" if forward else " ORDER BY sk DESC"
+        sql += " LIMIT ?"
+        params.append(limit or -1)
+
+        rows = self._connection().execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def query_index(
+        self,
+        table: str,
+        index_name: str,
+        hash_value: str,
+        key_range: KeyRange,
+        forward: bool,
+        start: tuple[str, str, str] | None,
+        limit: int | None,
+    ) -> List[dict]:
+        range_sql, params = _range_clauses("e.range_key", key_range)
+        sql = (
+            "SELECT i.item FROM index_entries e JOIN items i"
+            " ON i.table_name = e.table_name AND i.pk = e.pk AND i.sk = e.sk"
+            " WHERE e.table_name = ? AND e.index_name = ? AND e.hash_key = ?"
+            + range_sql
+        )
+        params = [table, index_name, hash_value, *params]
+        if start is not None:
+            sql += (
+                " AND (e.range_key, e.pk, e.sk) > (?, ?, ?)"
+                if forward
+                else " AND (e.range_key, e.pk, e.sk) < (?, ?, ?)"
+            )
+            params.extend(start)
+        order = "" if forward else " DESC"
+        sql += f" ORDER BY e.range_key{order}, e.pk{order}, e.sk{order} LIMIT ?"
+        params.append(limit or -1)
+
+        rows = self._connection().execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def scan(
+        self, table: str, start: tuple[str, str] | None, limit: int | None
+    ) -> List[dict]:
+        sql, params = "SELECT item FROM items WHERE table_name = ?", [table]
+        if start is not None:
+            sql += " AND (pk, sk) > (?, ?)"
+            params.extend(start)
+        sql += " ORDER BY pk, sk LIMIT ?"
+        params.append(limit or -1)
+
+        rows = self._connection().execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def close(self):
+        with self._connections_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
@@ -0,0 +1,41 @@
+from app.tracing.tracer import current_span
+
+
+# Outbound calls are leaf spans, so they are never made current; the span
+# travels in botocore's per-call context instead.
+def _on_provide_client_params(model, context, **kwargs):
+    parent = current_span()
+    if parent is None:
+        return
+    service = model.service_model.service_name
+    context["trace_span"] = parent.child(
+        f"{service}.{model.name}",
+        "client",
+        {"aws.service": service, "aws.operation": model.name},
+    )
+
+
+def _on_after_call(http_response, parsed, context, **kwargs):
+    span = context.pop("trace_span", None)
+    if span is None:
+        return
+    metadata = parsed.get("ResponseMetadata", {})
+    span.attributes["http.status_code"] = http_response.status_code
+    span.attributes["aws.retries"] = metadata.get("RetryAttempts", 0)
+    error_code = parsed.get("Error", {}).get("Code")
+    if error_code:
+        span.attributes["aws.error_code"] = error_code
+    span.end()
+
+
+def _on_after_call_error(exception, context, **kwargs):
+    span = context.pop("trace_span", None)
+    if span is not None:
+        span.end(exception)
+
+
+def register_call_tracing(client):
+    events = client.meta.events
+    events.register("provide-client-params", _on_provide_client_params)
+    events.register("after-call", _on_after_call)
+    events.register("after-call-error", _on_after_call_error)
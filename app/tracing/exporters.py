@@ -0,0 +1,117 @@
+import importlib
+import json
+import queue
+import threading
+
+
+class SpanExporter:
+    """Receives finished spans in batches, on the processor's thread."""
+
+    def export(self, spans: list[dict]):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class JsonLinesExporter(SpanExporter):
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def export(self, spans: list[dict]):
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.writelines(
+            json.dumps(span, separators=(",", ":"), default=str) + "\n"
+            for span in spans
+        )
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+# "jsonl" or "package.module:factory", where the factory takes no arguments
+def load_exporter(spec: str, jsonl_path: str) -> SpanExporter:
+    if spec == "jsonl":
+        return JsonLinesExporter(jsonl_path)
+    module_name, _, attr = spec.partition(":")
+    if not attr:
+        raise Exception("TRACE_EXPORTER must be 'jsonl' or 'module:factory'")
+    return getattr(importlib.import_module(module_name), attr)()
+
+
+class BatchSpanProcessor:
+    """Hands spans to the exporter from a background thread, so request
+    threads only enqueue. When the queue is full spans are dropped and
+    counted rather than slowing requests down.
+    """
+
+    def __init__(
+        self,
+        exporter: SpanExporter,
+        max_queue_size: int = 10000,
+        max_batch_size: int = 512,
+        flush_interval: float = 1.0,
+    ):
+        self.exporter = exporter
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.export_failures = 0
+        self._queue: queue.Queue = queue.Queue(max_queue_size)
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def submit(self, span: dict):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _drain(self, first: dict) -> list[dict]:
+        batch = [first]
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _export(self, batch: list[dict]):
+        try:
+            self.exporter.export(batch)
+        except Exception:
+            self.export_failures += 1
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            self._export(self._drain(first))
+        self.flush()
+
+    def flush(self):
+        while True:
+            try:
+                first = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            self._export(self._drain(first))
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self.run_forever, name="span-exporter", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float | None = 10.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.exporter.close()
@@ -0,0 +1,63 @@
+from app.tracing.tracer import Tracer, activate
+
+TRACE_ID_HEADER = b"x-trace-id"
+
+
+class TracingMiddleware:
+    """Opens the root span of each sampled request and returns its trace id
+    in ``X-Trace-Id``. The span is named after the matched route template.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        tracer: Tracer | None = (
+            getattr(scope["app"].state, "tracer", None)
+            if scope["type"] == "http"
+            else None
+        )
+        if tracer is None:
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for key, value in scope["headers"]:
+            if key == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+        root = tracer.start_trace(scope["method"], traceparent)
+        if root is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_trace_id(message):
+            if message["type"] == "http.response.start":
+                root.attributes["http.status_code"] = message["status"]
+                message = {
+                    **message,
+                    "headers": [
+                        *message.get("headers", []),
+                        (TRACE_ID_HEADER, root.trace_id.encode()),
+                    ],
+                }
+            await send(message)
+
+        error = None
+        try:
+            with activate(root):
+                await self.app(scope, receive, send_with_trace_id)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            route = getattr(scope.get("route"), "path", "unmatched")
+            root.name = f"{scope['method']} {route}"
+            root.attributes.update(
+                {
+                    "http.method": scope["method"],
+                    "http.route": route,
+                    "http.target": scope["path"],
+                }
+            )
+            root.end(error)
@@ -0,0 +1,188 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+import functools
+import inspect
+import random
+import secrets
+import time
+from typing import Iterator
+
+# the span code is currently running in; sync handlers run on threadpool
+# threads with a copy of the request's context, so they nest under it
+_current_span: ContextVar["Span | None"] = ContextVar("trace_span", default=None)
+
+
+class Span:
+    __slots__ = (
+        "tracer",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "name",
+        "kind",
+        "attributes",
+        "start_time",
+        "_started",
+    )
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        trace_id: str,
+        parent_id: str | None,
+        name: str,
+        kind: str = "internal",
+        attributes: dict | None = None,
+    ):
+        self.tracer = tracer
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes or {}
+        self.start_time = time.time()
+        self._started = time.perf_counter()
+
+    def child(self, name: str, kind: str = "internal", attributes=None) -> "Span":
+        return Span(self.tracer, self.trace_id, self.span_id, name, kind, attributes)
+
+    def end(self, error: BaseException | None = None):
+        self.tracer.processor.submit(
+            {
+                "trace_id": self.trace_id,
+                "span_id": self.span_id,
+                "parent_id": self.parent_id,
+                "name": self.name,
+                "kind": self.kind,
+                "start_time": self.start_time,
+                "duration_ms": round((time.perf_counter() - self._started) * 1000, 3),
+                "status": "error" if error is not None else "ok",
+                "error": type(error).__name__ if error is not None else None,
+                "attributes": self.attributes,
+            }
+        )
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+
+def _parse_traceparent(value: str | None) -> tuple[str, str, bool] | None:
+    parts = (value or "").split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+        sampled = bool(int(parts[3], 16) & 1)
+    except ValueError:
+        return None
+    return parts[1], parts[2], sampled
+
+
+class Tracer:
+    """Starts the root span of sampled requests. A ``traceparent`` from the
+    caller decides sampling and continues its trace; other requests are
+    sampled at ``sample_rate``.
+    """
+
+    def __init__(self, processor, sample_rate: float):
+        self.processor = processor
+        self.sample_rate = sample_rate
+
+    def start_trace(self, name: str, traceparent: str | None = None) -> Span | None:
+        parent = _parse_traceparent(traceparent)
+        if parent is not None:
+            trace_id, parent_id, sampled = parent
+        else:
+            trace_id, parent_id = None, None
+            sampled = random.random() < self.sample_rate
+        if not sampled:
+            return None
+        return Span(self, trace_id or secrets.token_hex(16), parent_id, name, "server")
+
+
+def current_span() -> Span | None:
+    return _current_span.get()
+
+
+@contextmanager
+def activate(span: Span) -> Iterator[Span]:
+    token = _current_span.set(span)
+    try:
+        yield span
+    finally:
+        _current_span.reset(token)
+
+
+@contextmanager
+def start_span(
+    name: str, kind: str = "internal", attributes: dict | None = None
+) -> Iterator[Span | None]:
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    span = parent.child(name, kind, attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        _current_span.reset(token)
+        span.end(e)
+        raise
+    _current_span.reset(token)
+    span.end()
+
+
+# Outside a sampled request the wrapper costs one ContextVar lookup.
+def traced(name: str | None = None):
+    def decorate(func):
+        span_name = name or func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with start_span(span_name):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            parent = _current_span.get()
+            if parent is None:
+                return func(*args, **kwargs)
+
+            span = parent.child(span_name)
+            token = _current_span.set(span)
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as e:
+                _current_span.reset(token)
+                span.end(e)
+                raise
+            _current_span.reset(token)
+            span.end()
+            return result
+
+        return wrapper
+
+    return decorate
+
+
+# Traces every public method defined on the class, coroutines included.
+# Generator methods are left alone: their work happens after the call returns.
+def trace_methods(cls):
+    for attr_name, attr in list(vars(cls).items()):
+        if (
+            attr_name.startswith("_")
+            or not inspect.isfunction(attr)
+            or inspect.isgeneratorfunction(attr)
+            or inspect.isasyncgenfunction(attr)
+        ):
+            continue
+        setattr(cls, attr_name, traced(f"{cls.__name__}.{attr_name}")(attr))
+    return cls
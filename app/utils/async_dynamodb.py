@@ -0,0 +1,227 @@
+import asyncio
+from types import SimpleNamespace
+
+from anyio import to_thread
+from boto3.dynamodb.transform import TransformationInjector, copy_dynamodb_params
+from botocore.auth import SigV4Auth
+from botocore.awsrequest import create_request_object, prepare_request_dict
+from botocore.exceptions import ClientError, HTTPClientError
+from botocore.hooks import HierarchicalEmitter, first_non_none_response
+from botocore.parsers import create_parser
+from botocore.serialize import create_serializer
+import httpx
+
+from app.utils.retry import backoff_delay
+
+# error codes the standard retry mode treats as transient
+RETRYABLE_CODES = frozenset(
+    [
+        "ProvisionedThroughputExceededException",
+        "RequestLimitExceeded",
+        "ThrottlingException",
+        "Throttling",
+        "TransactionInProgressException",
+        "RequestTimeout",
+        "RequestTimeoutException",
+        "InternalServerError",
+        "ServiceUnavailable",
+    ]
+)
+RETRYABLE_STATUS_CODES = frozenset([500, 502, 503, 504])
+
+
+class AsyncDynamoDBClient:
+    """DynamoDB client for the event loop.
+
+    botocore does the modelled work: validating and serializing params,
+    signing and parsing responses. httpx sends the requests, so a call waits
+    on the network without holding a thread and one worker can keep as many
+    calls in flight as its connection pool allows. Like a client bound to a
+    boto3 resource, it takes and returns plain Python values rather than the
+    attribute-value format. Condition-failure items and cancellation reasons
+    stay in the low-level format, as they do with boto3.
+
+    The same botocore events as a regular client are emitted
+    (provide-client-params, needs-retry, after-call and after-call-error), so
+    call accounting and tracing register on ``meta.events`` unchanged.
+    Retries follow the standard mode: throttling and transient errors, with
+    exponential backoff, up to ``max_attempts``.
+    """
+
+    def __init__(
+        self,
+        client,
+        credentials,
+        max_connections: int,
+        max_attempts: int = 3,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        # model, endpoint and region come from a regular client, so endpoint
+        # overrides such as AWS_ENDPOINT_URL apply here too
+        self.service_model = client.meta.service_model
+        self.endpoint_url = client.meta.endpoint_url
+        self.region_name = client.meta.region_name
+        self.credentials = credentials
+        self.max_attempts = max_attempts
+        self.meta = SimpleNamespace(
+            events=HierarchicalEmitter(),
+            service_model=self.service_model,
+            region_name=self.region_name,
+        )
+        self._operations = client.meta.method_to_api_mapping
+        self._serializer = create_serializer(self.service_model.protocol)
+        self._parser = create_parser(self.service_model.protocol)
+        self._transform = TransformationInjector()
+        self._http = httpx.AsyncClient(
+            transport=transport,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            timeout=httpx.Timeout(60.0, connect=60.0),
+        )
+
+    def __getattr__(self, name: str):
+        operation_name = self._operations.get(name)
+        if operation_name is None:
+            raise AttributeError(name)
+
+        async def call(**params):
+            return await self._make_api_call(operation_name, params)
+
+        call.__name__ = name
+        return call
+
+    async def _frozen_credentials(self):
+        # refreshing may call STS or the metadata endpoint, which blocks
+        if getattr(self.credentials, "refresh_needed", lambda: False)():
+            return await to_thread.run_sync(self.credentials.get_frozen_credentials)
+        return self.credentials.get_frozen_credentials()
+
+    async def _send(self, request_dict: dict) -> httpx.Response:
+        request = create_request_object(request_dict)
+        SigV4Auth(
+            await self._frozen_credentials(),
+            self.service_model.signing_name,
+            self.region_name,
+        ).add_auth(request)
+        prepared = request.prepare()
+        return await self._http.request(
+            prepared.method,
+            prepared.url,
+            headers=dict(prepared.headers.items()),
+            content=prepared.body,
+        )
+
+    # e.g. the item a failed condition returns, as botocore's endpoint adds it
+    def _add_modeled_error_fields(self, response_dict: dict, parsed: dict):
+        code = parsed.get("Error", {}).get("Code")
+        shape = self.service_model.shape_for_error_code(code) if code else None
+        if shape is not None:
+            parsed.update(self._parser.parse(response_dict, shape))
+
+    def _emit(self, event: str, model, **kwargs) -> list:
+        return self.meta.events.emit(
+            f"{event}.{self.service_model.service_id.hyphenize()}.{model.name}",
+            model=model,
+            **kwargs,
+        )
+
+    async def _make_api_call(self, operation_name: str, params: dict) -> dict:
+        model = self.service_model.operation_model(operation_name)
+        context = {}
+        params = first_non_none_response(
+            self._emit("provide-client-params", model, params=params, context=context),
+            params,
+        )
+        # the injectors rewrite params in place, nested maps included, so they
+        # work on a deep copy as boto3's own client does
+        params = copy_dynamodb_params(params)
+        self._transform.inject_condition_expressions(params, model)
+        self._transform.inject_attribute_value_input(params, model)
+
+        request_dict = self._serializer.serialize_to_request(params, model)
+        prepare_request_dict(request_dict, self.endpoint_url, context)
+
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                http_response = await self._send(request_dict)
+            except httpx.TransportError as e:
+                self._emit(
+                    "needs-retry",
+                    model,
+                    request_dict=request_dict,
+                    response=None,
+                    attempts=attempt,
+                    caught_exception=e,
+                )
+                if attempt < self.max_attempts:
+                    await asyncio.sleep(backoff_delay(attempt))
+                    continue
+                error = HTTPClientError(error=e)
+                self._emit("after-call-error", model, exception=error, context=context)
+                raise error from e
+
+            response_dict = {
+                "status_code": http_response.status_code,
+                "headers": http_response.headers,
+                "body": http_response.content,
+            }
+            parsed = self._parser.parse(response_dict, model.output_shape)
+            if http_response.status_code >= 300:
+                self._add_modeled_error_fields(response_dict, parsed)
+            self._emit(
+                "needs-retry",
+                model,
+                request_dict=request_dict,
+                response=(http_response, parsed),
+                attempts=attempt,
+                caught_exception=None,
+            )
+            code = parsed.get("Error", {}).get("Code")
+            retryable = (
+                http_response.status_code in RETRYABLE_STATUS_CODES
+                or code in RETRYABLE_CODES
+            )
+            if not retryable or attempt == self.max_attempts:
+                break
+            await asyncio.sleep(backoff_delay(attempt))
+
+        parsed.setdefault("ResponseMetadata", {})["RetryAttempts"] = attempt - 1
+        self._emit(
+            "after-call",
+            model,
+            http_response=http_response,
+            parsed=parsed,
+            context=context,
+        )
+        if http_response.status_code >= 300:
+            raise ClientError(parsed, operation_name)
+        self._transform.inject_attribute_value_output(parsed, model)
+        return parsed
+
+    async def aclose(self):
+        await self._http.aclose()
+
+
+class AsyncTable:
+    """The subset of boto3's ``Table`` the async repositories use."""
+
+    def __init__(self, client: AsyncDynamoDBClient, name: str):
+        self.name = name
+        self.meta = SimpleNamespace(client=client)
+
+    async def get_item(self, **kwargs) -> dict:
+        return await self.meta.client.get_item(TableName=self.name, **kwargs)
+
+    async def put_item(self, **kwargs) -> dict:
+        return await self.meta.client.put_item(TableName=self.name, **kwargs)
+
+    async def update_item(self, **kwargs) -> dict:
+        return await self.meta.client.update_item(TableName=self.name, **kwargs)
+
+    async def delete_item(self, **kwargs) -> dict:
+        return await self.meta.client.delete_item(TableName=self.name, **kwargs)
+
+    async def query(self, **kwargs) -> dict:
+        return await self.meta.client.query(TableName=self.name, **kwargs)
@@ -0,0 +1,234 @@
+from contextvars import ContextVar
+import logging
+import time
+
+from app.metrics.instruments import (
+    AWS_CALL_DURATION,
+    AWS_CALL_RETRIES,
+    AWS_CALL_THROTTLES,
+    AWS_CALLS,
+    DYNAMODB_CONSUMED_CAPACITY,
+)
+
+logger = logging.getLogger("app.aws_calls")
+
+THROTTLE_CODES = frozenset(
+    [
+        "ProvisionedThroughputExceededException",
+        "RequestLimitExceeded",
+        "ThrottlingException",
+        "Throttling",
+        "TooManyRequestsException",
+    ]
+)
+# DynamoDB operations that report ConsumedCapacity when asked to
+CAPACITY_OPERATIONS = frozenset(
+    [
+        "GetItem",
+        "PutItem",
+        "UpdateItem",
+        "DeleteItem",
+        "Query",
+        "Scan",
+        "BatchGetItem",
+        "BatchWriteItem",
+        "TransactGetItems",
+        "TransactWriteItems",
+    ]
+)
+
+# the calls of the request being handled; sync handlers run on threadpool
+# threads with a copy of the request's context, so they see the same list
+_current_calls: ContextVar[list | None] = ContextVar("aws_calls", default=None)
+
+
+def _consumed_units(parsed: dict) -> float | None:
+    consumed = parsed.get("ConsumedCapacity")
+    if consumed is None:
+        return None
+    if isinstance(consumed, dict):
+        consumed = [consumed]
+    return sum(float(entry.get("CapacityUnits", 0)) for entry in consumed)
+
+
+# Every call is timed for the metrics; only calls made during a request are
+# also added to its list.
+def _on_provide_client_params(params, model, context, **kwargs):
+    context["aws_call"] = {
+        "calls": _current_calls.get(),
+        "model": model,
+        "started": time.perf_counter(),
+        "attempts": 0,
+        "throttles": 0,
+    }
+
+
+# DynamoDB calls made during a request ask for their consumed capacity. The
+# params are returned as a new dict rather than edited: the first non-None
+# response replaces them, and this handler is registered on the most specific
+# event so it runs before boto3's copy_dynamodb_params, which resource calls
+# go through and which would otherwise drop in-place edits with its copy.
+def _with_consumed_capacity(params, model, **kwargs):
+    if (
+        _current_calls.get() is not None
+        and model.name in CAPACITY_OPERATIONS
+        and "ReturnConsumedCapacity" not in params
+    ):
+        return {**params, "ReturnConsumedCapacity": "TOTAL"}
+
+
+def _on_needs_retry(request_dict=None, response=None, **kwargs):
+    # returning None leaves the retry decision to the retry handler
+    state = (request_dict or {}).get("context", {}).get("aws_call")
+    if state is None:
+        return
+    state["attempts"] += 1
+    if response is not None:
+        code = response[1].get("Error", {}).get("Code")
+        if code in THROTTLE_CODES:
+            state["throttles"] += 1
+
+
+def _record(context: dict, parsed: dict | None, error: str | None):
+    state = context.pop("aws_call", None)
+    if state is None:
+        return
+    model = state["model"]
+    service, operation = model.service_model.service_name, model.name
+    if parsed is not None and error is None:
+        error = parsed.get("Error", {}).get("Code")
+    duration = time.perf_counter() - state["started"]
+    retries = max(0, state["attempts"] - 1)
+    consumed = _consumed_units(parsed) if parsed is not None else None
+
+    AWS_CALLS.inc((service, operation, error or "ok"))
+    AWS_CALL_DURATION.observe(duration, (service, operation))
+    if retries:
+        AWS_CALL_RETRIES.inc((service, operation), retries)
+    if state["throttles"]:
+        AWS_CALL_THROTTLES.inc((service, operation), state["throttles"])
+    if consumed is not None:
+        DYNAMODB_CONSUMED_CAPACITY.inc((operation,), consumed)
+
+    if state["calls"] is not None:
+        state["calls"].append(
+            {
+                "service": service,
+                "operation": operation,
+                "duration_ms": round(duration * 1000, 3),
+                "retries": retries,
+                "throttles": state["throttles"],
+                "consumed_capacity": consumed,
+                "error": error,
+            }
+        )
+
+
+def _on_after_call(parsed, context, **kwargs):
+    _record(context, parsed, None)
+
+
+# raised when no response came back at all, e.g. connection errors
+def _on_after_call_error(exception, context, **kwargs):
+    _record(context, None, type(exception).__name__)
+
+
+def register_call_accounting(client):
+    events = client.meta.events
+    events.register("provide-client-params", _on_provide_client_params)
+    events.register_first("provide-client-params.dynamodb.*", _with_consumed_capacity)
+    events.register("needs-retry", _on_needs_retry)
+    events.register("after-call", _on_after_call)
+    events.register("after-call-error", _on_after_call_error)
+
+
+def summarize_calls(calls: list[dict]) -> dict[str, dict]:
+    totals: dict[str, dict] = {}
+    for call in calls:
+        total = totals.setdefault(
+            call["service"],
+            {
+                "calls": 0,
+                "duration_ms": 0.0,
+                "retries": 0,
+                "throttles": 0,
+                "consumed_capacity": 0.0,
+                "errors": 0,
+            },
+        )
+        total["calls"] += 1
+        total["duration_ms"] += call["duration_ms"]
+        total["retries"] += call["retries"]
+        total["throttles"] += call["throttles"]
+        total["consumed_capacity"] += call["consumed_capacity"] or 0.0
+        total["errors"] += call["error"] is not None
+    return totals
+
+
+# one Server-Timing metric per AWS service, e.g.
+# dynamodb;dur=12.5;desc="4 calls, 0 retries, 0 throttles, 3.5 CU"
+def server_timing(calls: list[dict]) -> str:
+    metrics = []
+    for service, total in summarize_calls(calls).items():
+        description = (
+            f"{total['calls']} calls, {total['retries']} retries, "
+            f"{total['throttles']} throttles"
+        )
+        if total["consumed_capacity"]:
+            description += f", {total['consumed_capacity']:g} CU"
+        metrics.append(f'{service};dur={total["duration_ms"]:.3f};desc="{description}"')
+    return ", ".join(metrics)
+
+
+class AWSCallAccountingMiddleware:
+    """Collects the AWS calls each request makes on the shared clients. The
+    totals made before the response starts go out in ``Server-Timing``;
+    every call, including those made while a body streams, is logged as one
+    JSON line when the request ends.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not getattr(
+            scope["app"].state, "aws_call_accounting", False
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        calls: list[dict] = []
+        status_code = 500
+
+        async def send_with_server_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if calls:
+                    message = {
+                        **message,
+                        "headers": [
+                            *message.get("headers", []),
+                            (b"server-timing", server_timing(calls).encode()),
+                        ],
+                    }
+            await send(message)
+
+        token = _current_calls.set(calls)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_server_timing)
+        finally:
+            _current_calls.reset(token)
+            if calls:
+                logger.info(
+                    "aws_calls",
+                    extra={
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "status_code": status_code,
+                        "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+                        "totals": summarize_calls(calls),
+                        "calls": calls,
+                    },
+                )
@@ -0,0 +1,149 @@
+import threading
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import NoCredentialsError
+
+from app.tracing.aws import register_call_tracing
+from app.utils.async_dynamodb import AsyncDynamoDBClient
+from app.utils.aws_call_accounting import register_call_accounting
+
+
+class _PoolStats:
+    """Tracks how many requests one client has on the wire.
+
+    botocore's urllib3 pools never block: once ``max_pool_connections`` are
+    busy, further requests open a throwaway connection (with a fresh TLS
+    handshake) instead of waiting. ``overflow_requests`` counts those.
+    """
+
+    def __init__(self, max_pool_connections: int):
+        self.max_pool_connections = max_pool_connections
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.requests = 0
+        self.overflow_requests = 0
+
+    def on_before_send(self, **kwargs):
+        with self._lock:
+            self.in_flight += 1
+            self.requests += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            if self.in_flight > self.max_pool_connections:
+                self.overflow_requests += 1
+
+    def on_attempt_done(self, **kwargs):
+        # needs-retry fires once per attempt, whether it succeeded or not;
+        # returning None leaves the retry decision to the retry handler
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "max_pool_connections": self.max_pool_connections,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "requests": self.requests,
+                "overflow_requests": self.overflow_requests,
+            }
+
+
+class AWSClientManager:
+    """Owns the app's long-lived boto3 clients.
+
+    Low-level clients are thread-safe and shared. Resources are not, so each
+    thread gets its own DynamoDB resource, but all of them are bound to the
+    one shared client and therefore its connection pool.
+    """
+
+    def __init__(
+        self,
+        region_name: str,
+        max_pool_connections: int,
+        retry_mode: str = "standard",
+        max_attempts: int = 3,
+        session: boto3.session.Session | None = None,
+    ):
+        self.region_name = region_name
+        self.max_attempts = max_attempts
+        self.session = session or boto3.session.Session()
+        self.config = Config(
+            max_pool_connections=max_pool_connections,
+            tcp_keepalive=True,
+            retries={"mode": retry_mode, "max_attempts": max_attempts},
+        )
+        self._clients: dict[tuple[str, str], object] = {}
+        self._stats: dict[str, _PoolStats] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._ddb_resource_cls = None
+
+    def client(self, service_name: str, region_name: str | None = None):
+        key = (service_name, region_name or self.region_name)
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self.session.client(
+                    service_name, region_name=key[1], config=self.config
+                )
+                stats = _PoolStats(self.config.max_pool_connections)
+                client.meta.events.register("before-send", stats.on_before_send)
+                client.meta.events.register("needs-retry", stats.on_attempt_done)
+                register_call_accounting(client)
+                register_call_tracing(client)
+                self._clients[key] = client
+                self._stats[f"{service_name}:{key[1]}"] = stats
+            return client
+
+    def dynamodb_resource(self):
+        resource = getattr(self._local, "ddb_resource", None)
+        if resource is None:
+            client = self.client("dynamodb")
+            with self._lock:
+                if self._ddb_resource_cls is None:
+                    self._ddb_resource_cls = type(
+                        self.session.resource(
+                            "dynamodb",
+                            region_name=self.region_name,
+                            config=self.config,
+                        )
+                    )
+            resource = self._ddb_resource_cls(client=client)
+            self._local.ddb_resource = resource
+            self._local.tables = {}
+        return resource
+
+    def table(self, table_name: str):
+        resource = self.dynamodb_resource()
+        table = self._local.tables.get(table_name)
+        if table is None:
+            table = resource.Table(table_name)
+            self._local.tables[table_name] = table
+        return table
+
+    # The caller owns the returned client and closes it with ``aclose``.
+    def async_dynamodb_client(self, transport=None) -> AsyncDynamoDBClient:
+        credentials = self.session.get_credentials()
+        if credentials is None:
+            raise NoCredentialsError()
+        client = AsyncDynamoDBClient(
+            self.client("dynamodb"),
+            credentials,
+            self.config.max_pool_connections,
+            self.max_attempts,
+            transport,
+        )
+        register_call_accounting(client)
+        register_call_tracing(client)
+        return client
+
+    def pool_stats(self) -> dict[str, dict]:
+        with self._lock:
+            stats = dict(self._stats)
+        return {name: pool.snapshot() for name, pool in stats.items()}
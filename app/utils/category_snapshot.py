@@ -0,0 +1,45 @@
+import asyncio
+import threading
+import time
+from typing import Callable
+
+from app.models.category import Category
+
+
+class CategorySnapshot:
+    """App-scoped copy of every category plus the version it was loaded at.
+
+    The copy is only trusted for ``check_interval`` seconds; after that the
+    next reader compares the stored version with the table and reloads on a
+    mismatch.
+    """
+
+    def __init__(
+        self,
+        check_interval: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.check_interval = check_interval
+        self.clock = clock
+        self.lock = threading.Lock()
+        # single-flights reloads among the async routes on the event loop
+        self.async_lock = asyncio.Lock()
+        self.version = None
+        self.categories: dict[str, Category] | None = None
+        self.checked_at = 0.0
+
+    def is_fresh(self) -> bool:
+        return (
+            self.categories is not None
+            and self.clock() - self.checked_at < self.check_interval
+        )
+
+    def replace(self, version, categories: dict[str, Category] | None):
+        self.version = version
+        if categories is not None:
+            self.categories = categories
+        self.checked_at = self.clock()
+
+    def expire(self):
+        with self.lock:
+            self.checked_at = 0.0
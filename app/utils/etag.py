@@ -0,0 +1,27 @@
+from fastapi import status
+
+from app.app_exception.app_exception import AppException
+
+
+def format_etag(version: int) -> str:
+    return f'"{version}"'
+
+
+# Returns the version an If-Match header pins, or None when the write is
+# unconditional. Only a single strong tag is accepted; a weak tag can never
+# satisfy If-Match.
+def parse_if_match(value: str | None) -> int | None:
+    if value is None or value.strip() == "*":
+        return None
+
+    tag = value.strip()
+    if len(tag) > 2 and tag[0] == tag[-1] == '"':
+        tag = tag[1:-1]
+    if not tag.isdigit():
+        raise AppException(
+            message="If-Match must be a single product ETag",
+            error_code="INVALID_IF_MATCH",
+            status_code=status.HTTP_400_BAD_REQUEST,
+        )
+
+    return int(tag)
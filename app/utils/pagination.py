@@ -0,0 +1,37 @@
+import base64
+import binascii
+import json
+
+from fastapi import status
+
+from app.app_exception.app_exception import AppException
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(last_evaluated_key: dict | None) -> str | None:
+    if not last_evaluated_key:
+        return None
+
+    raw = json.dumps(last_evaluated_key, separators=(",", ":"), sort_keys=True)
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str | None) -> dict | None:
+    if not cursor:
+        return None
+
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, ValueError):
+        key = None
+
+    if not isinstance(key, dict):
+        raise AppException(
+            message="Invalid pagination cursor",
+            error_code="INVALID_CURSOR",
+            status_code=status.HTTP_400_BAD_REQUEST,
+        )
+
+    return key
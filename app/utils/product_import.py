@@ -0,0 +1,90 @@
+import csv
+import io
+import json
+from typing import BinaryIO, Iterator
+
+from fastapi import status
+
+from app.app_exception.app_exception import AppException
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+_CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+_EXTENSIONS = {
+    ".csv": "csv",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+}
+
+
+def detect_import_format(
+    filename: str | None, content_type: str | None, requested: str | None = None
+) -> str:
+    if requested:
+        fmt = requested.lower()
+    else:
+        fmt = _CONTENT_TYPES.get((content_type or "").split(";")[0].strip())
+        if fmt is None and filename:
+            fmt = next(
+                (
+                    value
+                    for ext, value in _EXTENSIONS.items()
+                    if filename.lower().endswith(ext)
+                ),
+                None,
+            )
+
+    if fmt not in IMPORT_FORMATS:
+        raise AppException(
+            message="Unsupported import format, expected CSV or NDJSON",
+            error_code="UNSUPPORTED_IMPORT_FORMAT",
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            details={"supported": list(IMPORT_FORMATS)},
+        )
+
+    return fmt
+
+
+def _clean_row(row: dict) -> dict:
+    # empty CSV cells mean "not set" and extra columns are ignored
+    return {
+        key.strip(): value.strip()
+        for key, value in row.items()
+        if key is not None and isinstance(value, str) and value.strip() != ""
+    }
+
+
+def iter_import_rows(
+    file: BinaryIO, fmt: str
+) -> Iterator[tuple[int, dict | None, str | None]]:
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        if fmt == "csv":
+            for row_number, row in enumerate(csv.DictReader(text), start=1):
+                yield row_number, _clean_row(row), None
+            return
+
+        row_number = 0
+        for line in text:
+            if not line.strip():
+                continue
+            row_number += 1
+            try:
+                data = json.loads(line)
+            except ValueError as e:
+                yield row_number, None, f"Invalid JSON: {e}"
+                continue
+            if not isinstance(data, dict):
+                yield row_number, None, "Each line must be a JSON object"
+                continue
+            yield row_number, data, None
+    finally:
+        # leave the upload's file object open for its owner
+        text.detach()
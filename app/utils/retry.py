@@ -0,0 +1,13 @@
+import random
+
+BACKOFF_BASE_SECONDS = 0.05
+BACKOFF_CAP_SECONDS = 2.0
+
+
+def backoff_delay(
+    attempt: int,
+    base: float = BACKOFF_BASE_SECONDS,
+    cap: float = BACKOFF_CAP_SECONDS,
+) -> float:
+    # exponential backoff with full jitter
+    return random.uniform(0, min(cap, base * 2**attempt))
@@ -0,0 +1,87 @@
+import json
+import math
+import random
+import sys
+from typing import Iterator, List, Sequence
+
+from app.dto.category_request import CreateCategoryRequest
+from app.models.products import Product
+
+DEFAULT_SEED = 1234
+CATEGORY_COUNT = 20
+CATEGORY_THRESHOLD = 20
+# low-stock SKUs start one unit above their threshold, so a stock out of one
+# unit crosses it and the stock in that follows clears the alert again
+LOW_STOCK_THRESHOLD = 10
+LOW_STOCK_FRACTION = 0.01
+
+
+def sku_id(index: int) -> str:
+    return f"sku-{index:07d}"
+
+
+def category_name(index: int) -> str:
+    return f"Category {index:02d}"
+
+
+def low_stock_count(skus: int) -> int:
+    return min(skus, max(10, int(skus * LOW_STOCK_FRACTION)))
+
+
+def synthetic_categories() -> List[CreateCategoryRequest]:
+    return [
+        CreateCategoryRequest(
+            name=category_name(index),
+            default_threshold=CATEGORY_THRESHOLD,
+            description="benchmark category",
+        )
+        for index in range(CATEGORY_COUNT)
+    ]
+
+
+# The same seed and size always produce the same inventory. The first
+# ``low_stock_count(skus)`` SKUs make up the low-stock pool.
+def synthetic_products(skus: int, seed: int = DEFAULT_SEED) -> Iterator[Product]:
+    rng = random.Random(seed)
+    low_stock = low_stock_count(skus)
+    for index in range(skus):
+        is_low_stock = index < low_stock
+        yield Product(
+            id=sku_id(index),
+            name=f"Benchmark item {index}",
+            price=round(rng.uniform(1, 500), 2),
+            quantity=(
+                LOW_STOCK_THRESHOLD + 1 if is_low_stock else rng.randint(500, 5000)
+            ),
+            category=category_name(rng.randrange(CATEGORY_COUNT)),
+            override_threshold=LOW_STOCK_THRESHOLD if is_low_stock else None,
+            low_stock_alert_sent=False,
+            version=1,
+        )
+
+
+# nearest-rank percentile of an ascending list
+def percentile(sorted_values: Sequence[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def latency_summary(latencies: List[float]) -> dict:
+    ordered = sorted(latencies)
+    return {
+        "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+    }
+
+
+def write_report(report: dict, output: str | None):
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if output is None:
+        sys.stdout.write(text + "\n")
+        return
+    with open(output, "w", encoding="utf-8") as handle:
+        handle.write(text + "\n")
@@ -0,0 +1,414 @@
+import argparse
+import asyncio
+from collections import defaultdict
+from contextlib import contextmanager
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from app.models.user_group import UserGroup
+from benchmarks.common import (
+    DEFAULT_SEED,
+    latency_summary,
+    low_stock_count,
+    sku_id,
+    write_report,
+)
+from benchmarks.local_issuer import LocalIssuer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OPERATIONS = ("listing", "lookup", "stock_in", "stock_out", "low_stock")
+DEFAULT_MIX = "listing=10,lookup=50,stock_in=15,stock_out=15,low_stock=10"
+LISTING_PAGE_SIZE = 50
+
+
+def parse_mix(text: str) -> dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"unknown operation {name!r}")
+        mix[name] = float(weight)
+    if not any(weight > 0 for weight in mix.values()):
+        raise argparse.ArgumentTypeError("the mix needs a positive weight")
+    return mix
+
+
+# accepts plain counts and k/M suffixes: "1k,100k,1M"
+def parse_counts(text: str) -> list[int]:
+    multipliers = {"k": 1_000, "m": 1_000_000}
+    counts = []
+    for part in text.split(","):
+        part = part.strip().lower()
+        multiplier = multipliers.get(part[-1:], 1)
+        counts.append(int(part.rstrip("km")) * multiplier)
+    if not counts or min(counts) < 1:
+        raise argparse.ArgumentTypeError("counts must be positive")
+    return counts
+
+
+class RouteStats:
+    def __init__(self):
+        self.latencies: list[float] = []
+        # 5xx responses and transport failures
+        self.errors = 0
+        # 4xx responses, e.g. a stock out that finds too little stock
+        self.rejected = 0
+
+    def summary(self, duration: float) -> dict:
+        return {
+            "requests": len(self.latencies),
+            "errors": self.errors,
+            "rejected": self.rejected,
+            "rps": round(len(self.latencies) / duration, 2),
+            **latency_summary(self.latencies),
+        }
+
+
+class Workload:
+    def __init__(self, client: httpx.AsyncClient, skus: int, rng: random.Random):
+        self.client = client
+        self.skus = skus
+        self.rng = rng
+        self.low_stock_skus = low_stock_count(skus)
+        self.routes: dict[str, RouteStats] = defaultdict(RouteStats)
+        self.cursor = None
+
+    async def _request(self, route: str, method: str, url: str, **kwargs):
+        stats = self.routes[route]
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            stats.latencies.append(time.perf_counter() - started)
+            stats.errors += 1
+            return None
+
+        stats.latencies.append(time.perf_counter() - started)
+        if response.status_code >= 500:
+            stats.errors += 1
+        elif response.status_code >= 400:
+            stats.rejected += 1
+        return response
+
+    def _regular_sku(self) -> str:
+        if self.low_stock_skus == self.skus:
+            return sku_id(self.rng.randrange(self.skus))
+        return sku_id(self.rng.randrange(self.low_stock_skus, self.skus))
+
+    # walks the listing page by page, starting over after the last page
+    async def listing(self):
+        params = {"limit": LISTING_PAGE_SIZE}
+        if self.cursor:
+            params["cursor"] = self.cursor
+        response = await self._request(
+            "GET /products (page)", "GET", "/products/", params=params
+        )
+        if response is not None and response.status_code == 200:
+            self.cursor = response.json()["data"]["next_cursor"]
+
+    async def lookup(self):
+        await self._request(
+            "GET /products (by id)",
+            "GET",
+            "/products/",
+            params={"product_id": self._regular_sku()},
+        )
+
+    async def stock_in(self):
+        await self._request(
+            "PATCH /products/stockin",
+            "PATCH",
+            "/products/stockin",
+            json={
+                "product_id": self._regular_sku(),
+                "quantity": self.rng.randint(1, 3),
+            },
+        )
+
+    async def stock_out(self):
+        await self._request(
+            "PATCH /products/stockout",
+            "PATCH",
+            "/products/stockout",
+            json={
+                "product_id": self._regular_sku(),
+                "quantity": self.rng.randint(1, 3),
+            },
+        )
+
+    # takes a low-stock SKU across its threshold and back, which raises and
+    # then clears the alert
+    async def low_stock(self):
+        body = {
+            "product_id": sku_id(self.rng.randrange(self.low_stock_skus)),
+            "quantity": 1,
+        }
+        response = await self._request(
+            "PATCH /products/stockout (low-stock)",
+            "PATCH",
+            "/products/stockout",
+            json=body,
+        )
+        if response is not None and response.status_code == 200:
+            await self._request(
+                "PATCH /products/stockin (low-stock)",
+                "PATCH",
+                "/products/stockin",
+                json=body,
+            )
+
+
+async def run_workers(
+    base_url: str,
+    token: str,
+    skus: int,
+    concurrency: int,
+    duration: float,
+    mix: dict[str, float],
+    seed: int,
+) -> list[Workload]:
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    limits = httpx.Limits(
+        max_connections=concurrency, max_keepalive_connections=concurrency
+    )
+
+    async with httpx.AsyncClient(
+        base_url=base_url,
+        headers={"Authorization": f"Bearer {token}"},
+        limits=limits,
+        timeout=30.0,
+    ) as client:
+        workloads = [
+            Workload(client, skus, random.Random(seed * 100_003 + worker))
+            for worker in range(concurrency)
+        ]
+        deadline = time.perf_counter() + duration
+
+        async def worker(workload: Workload):
+            while time.perf_counter() < deadline:
+                operation = workload.rng.choices(names, weights)[0]
+                await getattr(workload, operation)()
+
+        await asyncio.gather(*(worker(workload) for workload in workloads))
+    return workloads
+
+
+def run_level(
+    base_url: str,
+    token: str,
+    skus: int,
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    mix: dict[str, float],
+    seed: int,
+) -> dict:
+    if warmup > 0:
+        asyncio.run(
+            run_workers(base_url, token, skus, concurrency, warmup, mix, seed + 1)
+        )
+
+    started = time.perf_counter()
+    workloads = asyncio.run(
+        run_workers(base_url, token, skus, concurrency, duration, mix, seed)
+    )
+    elapsed = time.perf_counter() - started
+
+    merged: dict[str, RouteStats] = defaultdict(RouteStats)
+    for workload in workloads:
+        for route, stats in workload.routes.items():
+            total = merged[route]
+            total.latencies.extend(stats.latencies)
+            total.errors += stats.errors
+            total.rejected += stats.rejected
+
+    overall = RouteStats()
+    for stats in merged.values():
+        overall.latencies.extend(stats.latencies)
+        overall.errors += stats.errors
+        overall.rejected += stats.rejected
+
+    return {
+        "skus": skus,
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 3),
+        **overall.summary(elapsed),
+        "routes": {
+            route: stats.summary(elapsed) for route, stats in sorted(merged.items())
+        },
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_healthy(base_url: str, process: subprocess.Popen, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"benchmark server exited with {process.returncode}")
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"benchmark server was not healthy after {timeout}s")
+
+
+@contextmanager
+def app_server(
+    skus: int,
+    seed: int,
+    engine: str,
+    data_dir: str,
+    issuer: LocalIssuer,
+    jwks_url: str,
+    startup_timeout: float,
+):
+    port = _free_port()
+    env = {
+        **os.environ,
+        "STORAGE_ENGINE": engine,
+        "COGNITO_ISSUER": issuer.issuer,
+        "JWKS_URL": jwks_url,
+        "SQLITE_PATH": os.path.join(data_dir, f"inventory-{skus}-{seed}.db"),
+    }
+    env.setdefault("ENV", "benchmark")
+    env.setdefault("table_name", "benchmark")
+    env.setdefault("topic_arn", "arn:aws:sns:ap-south-1:000000000000:benchmark")
+
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "benchmarks.http_server",
+            "--port",
+            str(port),
+            "--skus",
+            str(skus),
+            "--seed",
+            str(seed),
+        ],
+        cwd=ROOT,
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        _wait_until_healthy(base_url, process, startup_timeout)
+        yield base_url
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load test the HTTP API on a local storage engine and report "
+        "req/s and latency percentiles per route as JSON."
+    )
+    parser.add_argument("--skus", type=parse_counts, default=parse_counts("1k,10k"))
+    parser.add_argument(
+        "--concurrency", type=parse_counts, default=parse_counts("1,8,32")
+    )
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX))
+    parser.add_argument("--engine", choices=("memory", "sqlite"), default="memory")
+    parser.add_argument(
+        "--data-dir",
+        help="where SQLite inventories are kept; reused when the size and seed "
+        "match (default: a temporary directory)",
+    )
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--startup-timeout", type=float, default=1800.0)
+    parser.add_argument("--output", help="write the JSON report here, not stdout")
+    args = parser.parse_args()
+
+    issuer = LocalIssuer()
+    jwks_url = issuer.serve()
+    token = issuer.mint([UserGroup.MANAGER, UserGroup.STAFF], ttl_seconds=86400)
+    temp_dir = None if args.data_dir else tempfile.TemporaryDirectory()
+    data_dir = args.data_dir or temp_dir.name
+
+    runs = []
+    try:
+        for skus in args.skus:
+            with app_server(
+                skus,
+                args.seed,
+                args.engine,
+                data_dir,
+                issuer,
+                jwks_url,
+                args.startup_timeout,
+            ) as base_url:
+                for concurrency in args.concurrency:
+                    print(
+                        f"{skus} SKUs, concurrency {concurrency} ...", file=sys.stderr
+                    )
+                    runs.append(
+                        run_level(
+                            base_url,
+                            token,
+                            skus,
+                            concurrency,
+                            args.duration,
+                            args.warmup,
+                            args.mix,
+                            args.seed,
+                        )
+                    )
+    finally:
+        issuer.stop()
+        if temp_dir is not None:
+            temp_dir.cleanup()
+
+    write_report(
+        {
+            "benchmark": "http_load",
+            "config": {
+                "engine": args.engine,
+                "mix": args.mix,
+                "seed": args.seed,
+                "duration_s": args.duration,
+                "warmup_s": args.warmup,
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "env": {
+                    name: os.environ[name]
+                    for name in (
+                        "REQUEST_THREADPOOL_SIZE",
+                        "PRODUCT_CACHE_MAX_ENTRIES",
+                        "STOCK_COALESCE_WINDOW_MS",
+                        "PRODUCT_LISTING_SHARDS",
+                        "PRODUCT_LISTING_MODE",
+                    )
+                    if name in os.environ
+                },
+            },
+            "runs": runs,
+        },
+        args.output,
+    )
+
+
+if __name__ == "__main__":
+    main()
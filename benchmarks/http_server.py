@@ -0,0 +1,110 @@
+import argparse
+from contextlib import asynccontextmanager
+from itertools import islice
+
+from app.app import app
+from app.dependencies import get_cognito_config, get_sns_client
+from app.repository.category_repository import CategoryRepository
+from app.repository.product_repository import ProductRepository
+from app.storage.local_table import LocalStorage
+from benchmarks.common import DEFAULT_SEED, synthetic_categories, synthetic_products
+
+SEED_CHUNK_SIZE = 1000
+SEED_MARKER_KEY = {"pk": "BENCHMARK", "sk": "SEED"}
+
+
+# Low-stock crossings would otherwise call Cognito and SNS; these accept the
+# calls without leaving the process.
+class _NullCognito:
+    def list_users_in_group(self, **kwargs):
+        return {
+            "Users": [
+                {"Attributes": [{"Name": "email", "Value": "manager@example.com"}]}
+            ]
+        }
+
+
+class _NullSNS:
+    def publish(self, **kwargs):
+        return {"MessageId": "benchmark"}
+
+
+def _clear_table(table):
+    while items := table.scan(Limit=SEED_CHUNK_SIZE)["Items"]:
+        with table.engine.atomic(), table.batch_writer() as batch:
+            for item in items:
+                batch.delete_item(Key={"pk": item["pk"], "sk": item["sk"]})
+
+
+# A SQLite file that already holds this inventory is reused as is. Any other
+# contents, e.g. an inventory of another size or seed, are dropped first so
+# categories are created afresh and no stale products stay listed.
+def seed_inventory(table, skus: int, seed: int):
+    marker = table.get_item(Key=SEED_MARKER_KEY).get("Item")
+    if marker and int(marker["skus"]) == skus and int(marker["seed"]) == seed:
+        return
+
+    _clear_table(table)
+    category_repo = CategoryRepository(table)
+    for request in synthetic_categories():
+        category_repo.create_category(request)
+
+    product_repo = ProductRepository(table=table)
+    products = synthetic_products(skus, seed)
+    while chunk := list(islice(products, SEED_CHUNK_SIZE)):
+        # one engine transaction per chunk keeps SQLite seeding fast
+        with table.engine.atomic():
+            failed = product_repo.batch_save_products(chunk)
+        if failed:
+            raise RuntimeError(f"failed to seed {len(failed)} products")
+
+    table.put_item(Item={**SEED_MARKER_KEY, "skus": skus, "seed": seed})
+
+
+# Started by benchmarks.http_load in a subprocess; the environment selects the
+# storage engine and points the app at the local JWT issuer.
+def build_app(skus: int, seed: int = DEFAULT_SEED):
+    lifespan = app.router.lifespan_context
+
+    @asynccontextmanager
+    async def seeded_lifespan(app_):
+        async with lifespan(app_) as state:
+            if not isinstance(app_.state.storage, LocalStorage):
+                raise RuntimeError("benchmarks need STORAGE_ENGINE=memory or sqlite")
+            seed_inventory(app_.state.storage.table(app_.state.table_name), skus, seed)
+            yield state
+
+    app.router.lifespan_context = seeded_lifespan
+    app.dependency_overrides[get_sns_client] = lambda: _NullSNS()
+    app.dependency_overrides[get_cognito_config] = lambda: (
+        _NullCognito(),
+        "benchmark-client",
+        "benchmark-pool",
+    )
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve the app on a seeded local storage engine for load tests."
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--skus", type=int, required=True)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    args = parser.parse_args()
+
+    # imported here so the rest of the package works without uvicorn
+    import uvicorn
+
+    uvicorn.run(
+        build_app(args.skus, args.seed),
+        host=args.host,
+        port=args.port,
+        log_level="warning",
+        access_log=False,
+    )
+
+
+if __name__ == "__main__":
+    main()
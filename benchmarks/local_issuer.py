@@ -0,0 +1,84 @@
+import base64
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwt
+
+
+def _b64url_uint(value: int) -> str:
+    raw = value.to_bytes((value.bit_length() + 7) // 8, "big")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+class LocalIssuer:
+    """Signs Cognito-shaped access tokens with a throwaway RSA key and serves
+    the matching JWKS, so the app can verify tokens without a user pool.
+    """
+
+    def __init__(self, issuer: str = "https://benchmark.local/issuer"):
+        self.issuer = issuer
+        self.kid = "benchmark"
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self._private_pem = key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        ).decode("ascii")
+        numbers = key.public_key().public_numbers()
+        self.jwks = {
+            "keys": [
+                {
+                    "kty": "RSA",
+                    "kid": self.kid,
+                    "use": "sig",
+                    "alg": "RS256",
+                    "n": _b64url_uint(numbers.n),
+                    "e": _b64url_uint(numbers.e),
+                }
+            ]
+        }
+        self._server: ThreadingHTTPServer | None = None
+
+    def mint(self, groups: list[str], ttl_seconds: int = 3600, **claims) -> str:
+        now = int(time.time())
+        payload = {
+            "sub": "benchmark-user",
+            "iss": self.issuer,
+            "token_use": "access",
+            "cognito:groups": groups,
+            "iat": now,
+            "exp": now + ttl_seconds,
+            **claims,
+        }
+        return jwt.encode(
+            payload, self._private_pem, algorithm="RS256", headers={"kid": self.kid}
+        )
+
+    # serves the JWKS on every GET path; returns its URL
+    def serve(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        body = json.dumps(self.jwks).encode("utf-8")
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://{host}:{self._server.server_port}/.well-known/jwks.json"
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,224 @@
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Callable
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+
+from app.dto.page_response import PageResponse
+from app.models.products import Product
+from app.models.user_group import UserGroup
+from app.repository.product_repository import ProductRepository
+from app.response.response import APIResponse, _encode_list_envelope
+from app.storage.local_table import LocalStorage
+from app.storage.memory_engine import MemoryEngine
+from app.utils import jwt_verifier
+from benchmarks.common import DEFAULT_SEED, synthetic_products, write_report
+from benchmarks.local_issuer import LocalIssuer
+
+# fixture sizes are fixed so runs stay comparable across changes
+LIST_SIZES = (100, 1000)
+
+
+# The stored META items of ``count`` synthetic products, exactly as the
+# table API returns them (numbers as Decimal, key attributes included).
+def stored_product_items(count: int, seed: int) -> list[dict]:
+    storage = LocalStorage(MemoryEngine())
+    table = storage.table("benchmark")
+    ProductRepository(table=table).batch_save_products(
+        list(synthetic_products(count, seed))
+    )
+    items = [item for item in table.scan()["Items"] if item["sk"] == "META"]
+    storage.close()
+    return items
+
+
+def _verify_access_token_case(seed: int) -> Callable[[], object]:
+    # RSA verification cost depends on the key size, not the key, so a fresh
+    # key per run still gives comparable numbers
+    issuer = LocalIssuer()
+    token = issuer.mint([UserGroup.MANAGER, UserGroup.STAFF])
+    jwks = issuer.jwks
+
+    return lambda: jwt_verifier.verify_access_token(token, jwks, issuer.issuer)
+
+
+def _hydrate_case(size: int):
+    def setup(seed: int):
+        items = stored_product_items(size, seed)
+        return lambda: [Product(**item) for item in items]
+
+    return setup
+
+
+# what a page route does with its return value: validate it against the
+# route's response_model, serialize it and render the JSON body
+def _route_response_case(size: int):
+    def setup(seed: int):
+        from app.app import app
+
+        route = next(
+            route
+            for route in app.routes
+            if getattr(route, "path", None) == "/products/" and "GET" in route.methods
+        )
+        products = list(synthetic_products(size, seed))
+        response = APIResponse(
+            status_code=200,
+            message="Products found",
+            data=PageResponse[Product](items=products, next_cursor="cursor"),
+        )
+        loop = asyncio.new_event_loop()
+
+        def run():
+            content = loop.run_until_complete(
+                serialize_response(
+                    field=route.response_field, response_content=response
+                )
+            )
+            return JSONResponse(content).body
+
+        return run
+
+    return setup
+
+
+def _model_dump_json_case(size: int):
+    def setup(seed: int):
+        response = APIResponse(
+            status_code=200,
+            message="Products found",
+            data=list(synthetic_products(size, seed)),
+        )
+        return response.model_dump_json
+
+    return setup
+
+
+# the streamed full listing
+def _stream_case(size: int):
+    def setup(seed: int):
+        products = list(synthetic_products(size, seed))
+        return lambda: b"".join(_encode_list_envelope(200, "Products found", products))
+
+    return setup
+
+
+CASES: dict[str, Callable[[int], Callable[[], object]]] = {
+    "auth.verify_access_token": _verify_access_token_case,
+}
+for _size in LIST_SIZES:
+    CASES[f"model.product_hydrate[{_size}]"] = _hydrate_case(_size)
+for _size in LIST_SIZES:
+    CASES[f"response.route_page[{_size}]"] = _route_response_case(_size)
+    CASES[f"response.model_dump_json[{_size}]"] = _model_dump_json_case(_size)
+    CASES[f"response.stream[{_size}]"] = _stream_case(_size)
+
+
+# timeit-style: gc off, loops calibrated so one sample lasts at least
+# ``min_time``; reports per-call seconds over ``repeat`` samples
+def measure(func: Callable[[], object], repeat: int, min_time: float) -> dict:
+    func()
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        if time.perf_counter() - started >= min_time:
+            break
+        loops *= 2
+
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for _ in range(loops):
+                func()
+            samples.append((time.perf_counter() - started) / loops)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    median = statistics.median(samples)
+    return {
+        "loops": loops,
+        "repeat": repeat,
+        "min_us": round(min(samples) * 1e6, 3),
+        "median_us": round(median * 1e6, 3),
+        "mean_us": round(statistics.fmean(samples) * 1e6, 3),
+        "stdev_us": round(statistics.pstdev(samples) * 1e6, 3),
+        "ops_per_s": round(1 / median, 1),
+    }
+
+
+# change of each case's median against a previous report; negative is faster
+def compare(cases: dict, baseline: dict) -> dict:
+    changes = {}
+    for name, result in cases.items():
+        previous = baseline.get("cases", {}).get(name)
+        if previous is None:
+            continue
+        changes[name] = {
+            "baseline_median_us": previous["median_us"],
+            "change_pct": round(
+                (result["median_us"] / previous["median_us"] - 1) * 100, 2
+            ),
+        }
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time token verification, product hydration and response "
+        "serialization on fixed fixtures and report the results as JSON."
+    )
+    parser.add_argument("--filter", help="only run cases whose name contains this")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--baseline", help="a previous report to compare against")
+    parser.add_argument("--output", help="write the JSON report here, not stdout")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+
+    results = {}
+    for name, setup in CASES.items():
+        if args.filter and args.filter not in name:
+            continue
+        results[name] = measure(setup(args.seed), args.repeat, args.min_time)
+        print(f"{name}: {results[name]['median_us']} us", file=sys.stderr)
+
+    report = {
+        "benchmark": "micro",
+        "config": {
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "min_time_s": args.min_time,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "cases": results,
+    }
+    if baseline is not None:
+        report["compare"] = compare(results, baseline)
+        for name, change in report["compare"].items():
+            print(f"{name}: {change['change_pct']:+.2f}%", file=sys.stderr)
+    write_report(report, args.output)
+
+
+if __name__ == "__main__":
+    main()
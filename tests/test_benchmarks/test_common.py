@@ -0,0 +1,56 @@
+import unittest
+
+from benchmarks.common import (
+    LOW_STOCK_THRESHOLD,
+    latency_summary,
+    low_stock_count,
+    percentile,
+    synthetic_products,
+)
+from benchmarks.http_load import parse_counts, parse_mix
+
+
+class TestBenchmarkCommon(unittest.TestCase):
+    def test_percentile_uses_nearest_rank(self):
+        values = list(range(1, 101))
+
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile(values, 100), 100)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_latency_summary_reports_milliseconds(self):
+        summary = latency_summary([0.003, 0.001, 0.002])
+
+        self.assertEqual(summary["p50_ms"], 2.0)
+        self.assertEqual(summary["max_ms"], 3.0)
+
+    def test_synthetic_products_are_deterministic(self):
+        first = list(synthetic_products(50, seed=7))
+        again = list(synthetic_products(50, seed=7))
+        other = list(synthetic_products(50, seed=8))
+
+        self.assertEqual(first, again)
+        self.assertNotEqual(first, other)
+        self.assertEqual(len({product.id for product in first}), 50)
+
+    def test_low_stock_pool_sits_one_unit_above_threshold(self):
+        products = list(synthetic_products(20))
+        pool = products[: low_stock_count(20)]
+
+        self.assertTrue(
+            all(product.quantity == LOW_STOCK_THRESHOLD + 1 for product in pool)
+        )
+        self.assertTrue(
+            all(product.quantity > 100 for product in products[len(pool) :])
+        )
+
+    def test_parse_counts_and_mix(self):
+        self.assertEqual(parse_counts("1k, 10,1M"), [1000, 10, 1_000_000])
+        self.assertEqual(parse_mix("lookup=3,listing=1"), {"lookup": 3, "listing": 1})
+        with self.assertRaises(Exception):
+            parse_mix("checkout=1")
+
+
+if __name__ == "__main__":
+    unittest.main()
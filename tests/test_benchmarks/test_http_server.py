@@ -0,0 +1,42 @@
+import os
+import tempfile
+import unittest
+
+from app.storage.local_table import LocalStorage
+from app.storage.sqlite_engine import SQLiteEngine
+from benchmarks.http_server import seed_inventory
+
+
+class TestSeedInventory(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "inventory.db")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def seed(self, skus: int, seed: int) -> set[str]:
+        storage = LocalStorage(SQLiteEngine(self.path))
+        try:
+            table = storage.table("inventory")
+            seed_inventory(table, skus, seed)
+            items = table.scan()["Items"]
+        finally:
+            storage.close()
+        return {item["pk"] for item in items if item["sk"] == "META"}
+
+    def test_reseeding_a_file_with_another_inventory_replaces_it(self):
+        self.seed(30, seed=1)
+
+        products = self.seed(10, seed=2)
+
+        self.assertEqual(len(products), 10)
+
+    def test_matching_file_is_reused(self):
+        first = self.seed(10, seed=1)
+
+        self.assertEqual(self.seed(10, seed=1), first)
+
+
+if __name__ == "__main__":
+    unittest.main()
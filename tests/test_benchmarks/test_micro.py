@@ -0,0 +1,41 @@
+import json
+import unittest
+from decimal import Decimal
+
+from benchmarks.micro import CASES, compare, measure, stored_product_items
+
+
+class TestMicroBenchmarks(unittest.TestCase):
+    def test_every_case_runs(self):
+        for name, setup in CASES.items():
+            with self.subTest(name):
+                self.assertIsNotNone(setup(1)())
+
+    def test_stored_items_come_back_as_the_table_returns_them(self):
+        items = stored_product_items(5, seed=1)
+
+        self.assertEqual(len(items), 5)
+        self.assertIsInstance(items[0]["quantity"], Decimal)
+        self.assertEqual(items[0]["sk"], "META")
+
+    def test_route_case_renders_the_api_envelope(self):
+        body = json.loads(CASES["response.route_page[100]"](1)())
+
+        self.assertEqual(body["status_code"], 200)
+        self.assertEqual(len(body["data"]["items"]), 100)
+
+    def test_measure_and_compare(self):
+        result = measure(lambda: None, repeat=3, min_time=0.001)
+        changes = compare(
+            {"a": {"median_us": 1.5}, "b": {"median_us": 1.0}},
+            {"cases": {"a": {"median_us": 2.0}}},
+        )
+
+        self.assertEqual(result["repeat"], 3)
+        self.assertEqual(
+            changes, {"a": {"baseline_median_us": 2.0, "change_pct": -25.0}}
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+from app.ledger.stock_ledger_writer import StockLedgerWriter
+from app.repository.stock_ledger_repository import entry_timestamp, ledger_entry_item
+
+
+class TestStockLedgerWriter(unittest.TestCase):
+    def setUp(self):
+        self.repo = MagicMock()
+        self.repo.append_entries.return_value = []
+        self.writer = StockLedgerWriter(self.repo, compaction_lag=timedelta(0))
+
+    def test_record_all_writes_before_returning(self):
+        self.writer.record_all([("p1", -2, "stock_out"), ("p2", 5, "stock_in")])
+
+        self.repo.append_entries.assert_called_once()
+        items = self.repo.append_entries.call_args[0][0]
+        self.assertEqual([item["pk"] for item in items], ["LEDGER#p1", "LEDGER#p2"])
+        self.assertEqual(items[0]["delta"], -2)
+        self.assertEqual(self.writer.flush(), 0)
+
+    def test_unwritten_entries_are_logged_and_retried(self):
+        self.repo.append_entries.side_effect = lambda items: list(items)
+
+        with self.assertLogs("app.ledger.stock_ledger_writer", "WARNING") as logs:
+            self.writer.record("p1", 1, "stock_in")
+
+        self.assertEqual(logs.records[0].getMessage(), "ledger_write_deferred")
+        self.assertEqual(self.writer.flush(), 0)
+
+        self.repo.append_entries.side_effect = None
+        self.assertEqual(self.writer.flush(), 1)
+        self.assertEqual(self.writer.flush(), 0)
+
+    def test_late_entries_are_keyed_to_when_they_are_written(self):
+        writer = StockLedgerWriter(self.repo, compaction_lag=timedelta(minutes=1))
+        recorded = datetime.now(timezone.utc) - timedelta(minutes=5)
+        now = datetime.now(timezone.utc)
+        writer._queue.put(ledger_entry_item("p1", 1, "stock_in", recorded, "old"))
+        writer._queue.put(ledger_entry_item("p1", 2, "stock_in", now, "new"))
+
+        writer.flush()
+
+        late, fresh = self.repo.append_entries.call_args[0][0]
+        self.assertGreater(entry_timestamp(late), recorded + timedelta(minutes=4))
+        self.assertTrue(late["sk"].endswith("#old"))
+        self.assertEqual(late["recorded_at"], recorded.isoformat())
+        self.assertTrue(fresh["sk"].startswith(fresh["recorded_at"] + "#"))
+
+    def test_compact_covers_touched_products(self):
+        self.writer.record("p1", 1, "stock_in")
+
+        self.writer.compact()
+        self.writer.compact()
+
+        self.repo.compact.assert_called_once()
+        self.assertEqual(self.repo.compact.call_args[0][0], "p1")
+
+    def test_stop_flushes_remaining_entries(self):
+        self.writer.flush_interval = 60
+        self.writer.start()
+        self.repo.append_entries.side_effect = lambda items: list(items)
+        self.writer.record("p1", 1, "stock_in")
+        self.repo.append_entries.side_effect = None
+
+        self.writer.stop()
+
+        self.assertEqual(self.repo.append_entries.call_count, 2)
+        self.assertEqual(self.writer.flush(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
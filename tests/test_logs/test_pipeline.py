@@ -0,0 +1,118 @@
+import io
+import json
+import logging
+import queue
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.logs.middleware import RequestIdMiddleware
+from app.logs.pipeline import (
+    NonBlockingQueueHandler,
+    configure_logging,
+    parse_logger_levels,
+)
+from app.tracing.tracer import Tracer, activate
+
+
+class ListProcessor:
+    def submit(self, span):
+        pass
+
+
+class TestLogPipeline(unittest.TestCase):
+    def setUp(self):
+        root = logging.getLogger()
+        handlers, level = root.handlers[:], root.level
+        botocore_level = logging.getLogger("botocore").level
+
+        def restore():
+            root.handlers[:] = handlers
+            root.setLevel(level)
+            logging.getLogger("botocore").setLevel(botocore_level)
+            logging.getLogger("app.test").setLevel(logging.NOTSET)
+
+        self.addCleanup(restore)
+        self.stream = io.StringIO()
+
+    def lines(self):
+        return [json.loads(line) for line in self.stream.getvalue().splitlines()]
+
+    def test_records_are_written_as_json_lines_with_trace_id(self):
+        pipeline = configure_logging(stream=self.stream)
+        root = Tracer(ListProcessor(), 1.0).start_trace("GET /x")
+
+        with activate(root):
+            logging.getLogger("app.test").info(
+                "sold %s", "pen", extra={"item": {"sku": "a"}}
+            )
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logging.getLogger("app.test").exception("failed")
+        pipeline.stop()
+
+        sold, failed = self.lines()
+        self.assertEqual(sold["message"], "sold pen")
+        self.assertEqual(sold["logger"], "app.test")
+        self.assertEqual(sold["trace_id"], root.trace_id)
+        self.assertIsNone(sold["request_id"])
+        self.assertEqual(sold["item"], {"sku": "a"})
+        self.assertEqual(failed["level"], "ERROR")
+        self.assertIn("ValueError: boom", failed["exception"])
+
+    def test_per_logger_levels(self):
+        pipeline = configure_logging(
+            level="warning",
+            logger_levels=parse_logger_levels(" app.test=debug , bad"),
+            stream=self.stream,
+        )
+
+        logging.getLogger("app.test").debug("kept")
+        logging.getLogger("app.other").info("filtered")
+        logging.getLogger("botocore.retries").info("filtered")
+        pipeline.stop()
+
+        self.assertEqual([line["message"] for line in self.lines()], ["kept"])
+
+    def test_full_queue_drops_records_without_blocking(self):
+        handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+        logger = logging.getLogger("app.test.drops")
+        logger.propagate = False
+        logger.addHandler(handler)
+        self.addCleanup(setattr, logger, "propagate", True)
+        self.addCleanup(logger.removeHandler, handler)
+
+        logger.warning("first")
+        logger.warning("second")
+
+        self.assertEqual(handler.dropped, 1)
+        self.assertEqual(handler.queue.get_nowait().msg, "first")
+
+    def test_request_id_is_echoed_and_attached_to_records(self):
+        pipeline = configure_logging(stream=self.stream)
+        app = FastAPI()
+        app.add_middleware(RequestIdMiddleware)
+
+        @app.get("/item")
+        def get_item():
+            logging.getLogger("app.test").info("handled")
+            return {}
+
+        client = TestClient(app)
+        given = client.get("/item", headers={"X-Request-Id": "abc-123"})
+        generated = client.get("/item", headers={"X-Request-Id": "bad id\n"})
+        pipeline.stop()
+
+        self.assertEqual(given.headers["X-Request-Id"], "abc-123")
+        self.assertNotEqual(generated.headers["X-Request-Id"], "bad id\n")
+        handled = [line for line in self.lines() if line["message"] == "handled"]
+        self.assertEqual(
+            [line["request_id"] for line in handled],
+            ["abc-123", generated.headers["X-Request-Id"]],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
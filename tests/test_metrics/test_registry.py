@@ -0,0 +1,103 @@
+import tempfile
+import threading
+import unittest
+
+from app.metrics.registry import (
+    MetricsFileStore,
+    MetricsRegistry,
+    merge_snapshots,
+    render,
+)
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_counter_sums_thread_shards(self):
+        counter = self.registry.counter("jobs_total", "Jobs.", ("kind",))
+
+        def work():
+            for _ in range(1000):
+                counter.inc(("a",))
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        counter.inc(("b",), 2)
+
+        self.assertEqual(counter.samples(), {("a",): 4000, ("b",): 2})
+        self.assertIs(self.registry.counter("jobs_total", "Jobs.", ("kind",)), counter)
+
+    def test_shards_of_exited_threads_are_folded_into_a_retired_total(self):
+        counter = self.registry.counter("jobs_total", "Jobs.")
+        histogram = self.registry.histogram("wait_seconds", "Wait.", buckets=(1,))
+
+        def work():
+            counter.inc()
+            histogram.observe(0.5)
+
+        for _ in range(3):
+            thread = threading.Thread(target=work)
+            thread.start()
+            thread.join()
+        counter.inc()
+
+        self.assertEqual(counter.samples(), {(): 4})
+        self.assertEqual(histogram.samples(), {(): [3, 0, 1.5]})
+        # only this thread's shard is still held
+        self.assertEqual(len(counter._shards), 1)
+        self.assertEqual(histogram._shards, [])
+        self.assertEqual(counter.samples(), {(): 4})
+
+    def test_renders_prometheus_text(self):
+        self.registry.counter("jobs_total", "Jobs.", ("kind",)).inc(('say "hi"',))
+        histogram = self.registry.histogram("wait_seconds", "Wait.", buckets=(0.1, 1))
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(3)
+        self.registry.collected("gauge", "depth", "Depth.", (), lambda: {(): 7})
+
+        text = render(self.registry.snapshot())
+
+        self.assertIn('jobs_total{kind="say \\"hi\\""} 1\n', text)
+        self.assertIn('wait_seconds_bucket{le="0.1"} 1\n', text)
+        self.assertIn('wait_seconds_bucket{le="1"} 2\n', text)
+        self.assertIn('wait_seconds_bucket{le="+Inf"} 3\n', text)
+        self.assertIn("wait_seconds_sum 3.55\n", text)
+        self.assertIn("wait_seconds_count 3\n", text)
+        self.assertIn("# TYPE depth gauge\ndepth 7\n", text)
+
+    def test_merge_keeps_counters_of_exited_workers_but_not_gauges(self):
+        def snapshot(count, depth):
+            registry = MetricsRegistry()
+            registry.counter("jobs_total", "Jobs.").inc(amount=count)
+            registry.histogram("wait_seconds", "Wait.", buckets=(1,)).observe(0.5)
+            registry.collected("gauge", "depth", "Depth.", (), lambda: {(): depth})
+            return registry.snapshot()
+
+        merged = merge_snapshots([(snapshot(2, 5), True), (snapshot(3, 9), False)])
+
+        self.assertEqual(merged["jobs_total"]["samples"], [[[], 5]])
+        self.assertEqual(merged["wait_seconds"]["samples"], [[[], [2, 0, 1.0]]])
+        self.assertEqual(merged["depth"]["samples"], [[[], 5]])
+
+    def test_file_store_merges_workers(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        other = MetricsRegistry()
+        other.counter("jobs_total", "Jobs.").inc(amount=4)
+        other_store = MetricsFileStore(directory.name, other, interval=60)
+        other_store.pid = 1
+        other_store.write()
+        self.registry.counter("jobs_total", "Jobs.").inc()
+
+        merged = MetricsFileStore(directory.name, self.registry, interval=60).collect()
+
+        self.assertEqual(merged["jobs_total"]["samples"], [[[], 5]])
+
+
+if __name__ == "__main__":
+    unittest.main()
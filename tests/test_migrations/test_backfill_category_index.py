@@ -0,0 +1,39 @@
+import unittest
+from unittest.mock import MagicMock
+
+from botocore.exceptions import ClientError
+
+from app.migrations.backfill_category_index import backfill_category_index
+
+
+class TestBackfillCategoryIndex(unittest.TestCase):
+    def test_sets_category_key_on_meta_items(self):
+        table = MagicMock()
+        table.scan.side_effect = [
+            {
+                "Items": [{"pk": "PRODUCT#p1", "sk": "META"}],
+                "LastEvaluatedKey": {"pk": "PRODUCT#p1", "sk": "META"},
+            },
+            {"Items": [{"pk": "PRODUCT#p2", "sk": "META"}]},
+        ]
+        table.update_item.side_effect = [
+            None,
+            ClientError(
+                {"Error": {"Code": "ConditionalCheckFailedException"}}, "UpdateItem"
+            ),
+        ]
+
+        updated = backfill_category_index(table)
+
+        self.assertEqual(updated, 1)
+        first = table.update_item.call_args_list[0][1]
+        self.assertEqual(first["Key"], {"pk": "PRODUCT#p1", "sk": "META"})
+        self.assertEqual(first["UpdateExpression"], "SET category_key = category")
+        self.assertEqual(
+            table.scan.call_args_list[1][1]["ExclusiveStartKey"],
+            {"pk": "PRODUCT#p1", "sk": "META"},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+from unittest.mock import MagicMock
+
+from botocore.exceptions import ClientError
+
+from app.migrations.backfill_low_stock_index import backfill_low_stock_index
+
+
+class TestBackfillLowStockIndex(unittest.TestCase):
+    def test_indexes_products_with_raised_alert(self):
+        table = MagicMock()
+        table.scan.return_value = {
+            "Items": [
+                {"pk": "PRODUCT#p1", "sk": "META"},
+                {"pk": "PRODUCT#p2", "sk": "META"},
+            ]
+        }
+        table.update_item.side_effect = [
+            None,
+            ClientError(
+                {"Error": {"Code": "ConditionalCheckFailedException"}}, "UpdateItem"
+            ),
+        ]
+
+        updated = backfill_low_stock_index(table)
+
+        self.assertEqual(updated, 1)
+        kwargs = table.update_item.call_args_list[0][1]
+        self.assertEqual(kwargs["Key"], {"pk": "PRODUCT#p1", "sk": "META"})
+        self.assertEqual(
+            kwargs["ExpressionAttributeValues"][":low_stock_key"], "LOW_STOCK"
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
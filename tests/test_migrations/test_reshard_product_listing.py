@@ -0,0 +1,48 @@
+import unittest
+from unittest.mock import MagicMock
+
+from app.migrations.reshard_product_listing import reshard_product_listing
+from app.repository.product_repository import listing_partition_key
+
+
+class TestReshardProductListing(unittest.TestCase):
+    def setUp(self):
+        self.mock_table = MagicMock()
+        self.batch = self.mock_table.batch_writer.return_value.__enter__.return_value
+
+    def test_moves_legacy_items_to_shards(self):
+        self.mock_table.query.side_effect = [
+            {
+                "Items": [{"pk": "PRODUCTS", "sk": "PRODUCT#p1", "id": "p1"}],
+                "LastEvaluatedKey": {"pk": "PRODUCTS", "sk": "PRODUCT#p1"},
+            },
+            {"Items": [{"pk": "PRODUCTS", "sk": "PRODUCT#p2", "id": "p2"}]},
+        ]
+
+        moved = reshard_product_listing(self.mock_table, 1, 4)
+
+        self.assertEqual(moved, 2)
+        put_item = self.batch.put_item.call_args_list[0][1]["Item"]
+        self.assertEqual(put_item["pk"], listing_partition_key("p1", 4))
+        self.batch.delete_item.assert_any_call(
+            Key={"pk": "PRODUCTS", "sk": "PRODUCT#p2"}
+        )
+        self.assertEqual(
+            self.mock_table.query.call_args_list[1][1]["ExclusiveStartKey"],
+            {"pk": "PRODUCTS", "sk": "PRODUCT#p1"},
+        )
+
+    def test_skips_items_already_in_place(self):
+        pk = listing_partition_key("p1", 2)
+        self.mock_table.query.return_value = {
+            "Items": [{"pk": pk, "sk": "PRODUCT#p1", "id": "p1"}]
+        }
+
+        moved = reshard_product_listing(self.mock_table, 2, 2)
+
+        self.assertEqual(moved, 0)
+        self.batch.put_item.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
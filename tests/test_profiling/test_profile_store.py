@@ -0,0 +1,40 @@
+import os
+import tempfile
+import unittest
+
+from app.profiling.profile_store import ProfileStore
+
+
+class TestProfileStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.store = ProfileStore(self.directory.name, max_profiles=2)
+
+    def save(self, path: str) -> str:
+        profile_id = self.store.new_id()
+        self.store.save({"id": profile_id, "path": path, "stacks": {"a;b": 3}})
+        return profile_id
+
+    def test_keeps_only_the_newest_profiles(self):
+        first = self.save("/one")
+        second = self.save("/two")
+        third = self.save("/three")
+
+        self.assertIsNone(self.store.get(first))
+        self.assertEqual(self.store.get(third)["stacks"], {"a;b": 3})
+        self.assertEqual(
+            [profile["id"] for profile in self.store.list()], [third, second]
+        )
+        self.assertNotIn("stacks", self.store.list()[0])
+        self.assertEqual(len(os.listdir(self.directory.name)), 2)
+
+    def test_rejects_ids_that_are_not_profile_ids(self):
+        self.save("/one")
+
+        self.assertIsNone(self.store.get("../secrets"))
+        self.assertIsNone(self.store.get("0000000000000000000-zzzzzzzz"))
+
+
+if __name__ == "__main__":
+    unittest.main()
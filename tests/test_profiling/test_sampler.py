@@ -0,0 +1,97 @@
+from contextvars import ContextVar
+import threading
+import time
+import unittest
+
+import anyio
+from anyio import to_thread
+
+from app.profiling.sampler import SamplingProfiler
+
+_request: ContextVar[object | None] = ContextVar("request", default=None)
+
+
+def busy_until(event: threading.Event):
+    while not event.is_set():
+        sum(range(1000))
+
+
+class TestSamplingProfiler(unittest.TestCase):
+    def test_records_folded_stacks_of_included_code_only(self):
+        done = threading.Event()
+        worker = threading.Thread(target=busy_until, args=(done,), name="busy")
+        idle = threading.Thread(target=done.wait, name="idle")
+        profiler = SamplingProfiler(0.001, (__file__,))
+
+        worker.start()
+        idle.start()
+        profiler.start()
+        time.sleep(0.05)
+        stacks = profiler.stop()
+        done.set()
+        worker.join()
+        idle.join()
+
+        busy = [stack for stack in stacks if stack.startswith("busy;")]
+        self.assertGreater(profiler.samples, 0)
+        self.assertTrue(busy)
+        self.assertIn("busy_until (tests/test_profiling/test_sampler.py:", busy[0])
+        # the idle thread never runs included code
+        self.assertFalse([stack for stack in stacks if stack.startswith("idle;")])
+
+    def test_keeps_only_worker_jobs_of_the_marked_context(self):
+        done = threading.Event()
+        marker = object()
+        profiler = SamplingProfiler(
+            0.001, (__file__,), context_marker=(_request, marker)
+        )
+        loop_thread = threading.get_ident()
+
+        async def main():
+            async def job(value):
+                _request.set(value)
+                await to_thread.run_sync(busy_until, done)
+
+            async with anyio.create_task_group() as tg:
+                tg.start_soon(job, marker)
+                tg.start_soon(job, object())
+                profiler.start()
+                await anyio.sleep(0.05)
+                stacks = profiler.stop()
+                done.set()
+            return stacks
+
+        stacks = anyio.run(main)
+
+        threads = {stack.split(";", 1)[0] for stack in stacks}
+        self.assertEqual(len(threads), 1)
+        self.assertTrue(all("busy_until" in stack for stack in stacks))
+        self.assertNotIn(str(loop_thread), threads)
+
+    def test_task_thread_keeps_only_stacks_through_include_codes(self):
+        done = threading.Event()
+        other = threading.Thread(target=busy_until, args=(done,), name="other")
+        other.start()
+        profiler = SamplingProfiler(
+            0.001,
+            (__file__,),
+            frozenset(
+                [
+                    TestSamplingProfiler.test_records_folded_stacks_of_included_code_only.__code__
+                ]
+            ),
+            task_thread=other.ident,
+        )
+
+        profiler.start()
+        time.sleep(0.02)
+        stacks = profiler.stop()
+        done.set()
+        other.join()
+
+        # busy code of another task on the loop thread is not this request's
+        self.assertFalse([stack for stack in stacks if stack.startswith("other;")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+
+from app.projector.checkpoint_store import (
+    SHARD_END,
+    DynamoDBCheckpointStore,
+    DynamoDBLease,
+    InMemoryCheckpointStore,
+)
+from app.storage.local_table import LocalStorage
+from app.storage.memory_engine import MemoryEngine
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class CheckpointStoreTests:
+    def make_store(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.store = self.make_store()
+
+    def test_checkpoint_only_moves_forward(self):
+        self.assertTrue(self.store.put("s", "20"))
+        # shorter sequence numbers are smaller, not larger
+        self.assertFalse(self.store.put("s", "3"))
+        self.assertFalse(self.store.put("s", "20"))
+        self.assertTrue(self.store.put("s", "100"))
+
+        self.assertEqual(self.store.get("s"), "100")
+
+    def test_shard_end_is_final(self):
+        self.store.put("s", "5")
+        self.assertTrue(self.store.put("s", SHARD_END))
+
+        self.assertFalse(self.store.put("s", "99999999999999999999999"))
+        self.assertEqual(self.store.get("s"), SHARD_END)
+
+
+class TestInMemoryCheckpointStore(CheckpointStoreTests, unittest.TestCase):
+    def make_store(self):
+        return InMemoryCheckpointStore()
+
+
+class TestDynamoDBCheckpointStore(CheckpointStoreTests, unittest.TestCase):
+    def make_store(self):
+        storage = LocalStorage(MemoryEngine())
+        return DynamoDBCheckpointStore(storage.table("inventory"), "listing")
+
+
+class TestDynamoDBLease(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        table = LocalStorage(MemoryEngine()).table("inventory")
+        self.first = DynamoDBLease(table, "listing", duration=30, clock=self.clock)
+        self.second = DynamoDBLease(table, "listing", duration=30, clock=self.clock)
+
+    def test_one_holder_at_a_time(self):
+        self.assertTrue(self.first.acquire())
+        self.assertFalse(self.second.acquire())
+
+    def test_holder_renews(self):
+        self.first.acquire()
+        self.clock.now += 20
+        self.assertTrue(self.first.acquire())
+
+        self.clock.now += 20
+        self.assertFalse(self.second.acquire())
+
+    def test_expired_lease_is_taken_over(self):
+        self.first.acquire()
+        self.clock.now += 31
+
+        self.assertTrue(self.second.acquire())
+        self.assertFalse(self.first.acquire())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,418 @@
+import unittest
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+from botocore.exceptions import ClientError
+
+from app.projector.change_stream import (
+    LOCAL_STREAM_TRIM_BATCH,
+    DynamoDBChangeStream,
+    LocalChangeStream,
+    ShardPage,
+    StreamShard,
+)
+from app.projector.checkpoint_store import SHARD_END, InMemoryCheckpointStore
+from app.models.products import Product
+from app.projector.listing_projector import ListingProjector
+from app.repository.product_repository import ProductRepository, listing_partition_key
+from app.storage.local_table import LocalStorage
+from app.storage.memory_engine import MemoryEngine
+
+
+def condition_failed():
+    return ClientError(
+        error_response={"Error": {"Code": "ConditionalCheckFailedException"}},
+        operation_name="PutItem",
+    )
+
+
+META = {
+    "pk": "PRODUCT#p1",
+    "sk": "META",
+    "id": "p1",
+    "name": "Pen",
+    "price": Decimal("1.5"),
+    "quantity": Decimal("10"),
+    "category": "STATIONERY",
+}
+
+
+class TestListingProjector(unittest.TestCase):
+    def setUp(self):
+        self.mock_table = MagicMock()
+        self.stream = LocalChangeStream()
+        self.checkpoints = InMemoryCheckpointStore()
+        self.projector = ListingProjector(
+            self.mock_table, self.stream, self.checkpoints, listing_shards=4
+        )
+
+    def test_projects_insert_into_listing_shard(self):
+        self.stream.append("INSERT", {"pk": "PRODUCT#p1", "sk": "META"}, META)
+
+        processed = self.projector.run_once()
+
+        self.assertEqual(processed, 1)
+        item = self.mock_table.put_item.call_args[1]["Item"]
+        self.assertEqual(item["pk"], listing_partition_key("p1", 4))
+        self.assertEqual(item["sk"], "PRODUCT#p1")
+        self.assertEqual(item["quantity"], 10)
+        self.assertEqual(item["source_sequence"], "1".zfill(40))
+        self.assertEqual(self.checkpoints.get(LocalChangeStream.SHARD_ID), "1")
+
+    def test_resumes_from_checkpoint(self):
+        self.stream.append("INSERT", {"pk": "PRODUCT#p1", "sk": "META"}, META)
+        self.projector.run_once()
+        self.stream.append(
+            "MODIFY",
+            {"pk": "PRODUCT#p1", "sk": "META"},
+            dict(META, quantity=Decimal("4")),
+            META,
+        )
+
+        processed = self.projector.run_once()
+
+        self.assertEqual(processed, 1)
+        self.assertEqual(self.mock_table.put_item.call_count, 2)
+        self.assertEqual(self.mock_table.put_item.call_args[1]["Item"]["quantity"], 4)
+        self.assertEqual(self.projector.run_once(), 0)
+
+    def test_replayed_record_is_skipped(self):
+        self.stream.append("INSERT", {"pk": "PRODUCT#p1", "sk": "META"}, META)
+        self.mock_table.put_item.side_effect = condition_failed()
+
+        processed = self.projector.run_once()
+
+        self.assertEqual(processed, 1)
+        self.assertEqual(self.checkpoints.get(LocalChangeStream.SHARD_ID), "1")
+
+    def test_remove_deletes_listing_item(self):
+        self.stream.append("REMOVE", {"pk": "PRODUCT#p1", "sk": "META"}, None, META)
+
+        self.projector.run_once()
+
+        kwargs = self.mock_table.delete_item.call_args[1]
+        self.assertEqual(kwargs["Key"]["sk"], "PRODUCT#p1")
+        self.assertEqual(kwargs["ExpressionAttributeValues"][":seq"], "1".zfill(40))
+
+    def test_ignores_non_product_items(self):
+        self.stream.append(
+            "INSERT",
+            {"pk": "CATEGORY", "sk": "CATEGORY#STATIONERY"},
+            {"pk": "CATEGORY", "sk": "CATEGORY#STATIONERY", "name": "STATIONERY"},
+        )
+
+        self.projector.run_once()
+
+        self.mock_table.put_item.assert_not_called()
+
+    def test_reads_in_batches(self):
+        for _ in range(5):
+            self.stream.append("INSERT", {"pk": "PRODUCT#p1", "sk": "META"}, META)
+        self.projector.batch_size = 2
+
+        processed = self.projector.run_once()
+
+        self.assertEqual(processed, 5)
+        self.assertEqual(self.checkpoints.get(LocalChangeStream.SHARD_ID), "5")
+
+
+def record(sequence: str):
+    return {
+        "eventName": "INSERT",
+        "dynamodb": {
+            "Keys": {"pk": {"S": "PRODUCT#p1"}, "sk": {"S": "META"}},
+            "NewImage": {
+                "pk": {"S": "PRODUCT#p1"},
+                "sk": {"S": "META"},
+                "id": {"S": "p1"},
+                "name": {"S": "Pen"},
+                "price": {"N": "1.5"},
+                "quantity": {"N": "10"},
+                "category": {"S": "STATIONERY"},
+            },
+            "SequenceNumber": sequence,
+        },
+    }
+
+
+class TestListingProjectorShards(unittest.TestCase):
+    def setUp(self):
+        self.mock_table = MagicMock()
+        self.stream = MagicMock()
+        self.checkpoints = InMemoryCheckpointStore()
+        self.projector = ListingProjector(
+            self.mock_table, self.stream, self.checkpoints, listing_shards=4
+        )
+
+    def test_closed_shard_is_read_past_empty_and_short_pages(self):
+        self.stream.shards.return_value = [StreamShard("a", closed=True)]
+        self.stream.read.side_effect = [
+            ShardPage([record("1")]),
+            ShardPage([]),
+            ShardPage([record("2")], exhausted=True),
+        ]
+
+        processed = self.projector.run_once()
+
+        self.assertEqual(processed, 2)
+        afters = [call.args[1] for call in self.stream.read.call_args_list]
+        self.assertEqual(afters, [None, "1", "1"])
+        self.assertEqual(self.checkpoints.get("a"), SHARD_END)
+
+    def test_retired_shard_is_not_read_again(self):
+        self.stream.shards.return_value = [StreamShard("a", closed=True)]
+        self.stream.read.return_value = ShardPage([], exhausted=True)
+
+        self.projector.run_once()
+        self.projector.run_once()
+
+        self.stream.read.assert_called_once()
+
+    def test_open_shard_stops_at_empty_page(self):
+        self.stream.shards.return_value = [StreamShard("a")]
+        self.stream.read.side_effect = [ShardPage([record("1")]), ShardPage([])]
+
+        self.assertEqual(self.projector.run_once(), 1)
+        self.assertEqual(self.checkpoints.get("a"), "1")
+
+    def test_child_waits_for_parent(self):
+        self.stream.shards.return_value = [
+            StreamShard("child", parent_shard_id="parent"),
+            StreamShard("parent"),
+        ]
+        self.stream.read.side_effect = [ShardPage([record("1")]), ShardPage([])]
+
+        self.projector.run_once()
+
+        # the parent is not finished, so the child is not read
+        self.assertEqual(
+            [call.args[0] for call in self.stream.read.call_args_list],
+            ["parent", "parent"],
+        )
+
+    def test_child_is_read_once_parent_ends(self):
+        self.stream.shards.return_value = [
+            StreamShard("child", parent_shard_id="parent"),
+            StreamShard("parent", closed=True),
+        ]
+        self.stream.read.side_effect = [
+            ShardPage([record("1")], exhausted=True),
+            ShardPage([record("2")]),
+            ShardPage([]),
+        ]
+
+        self.assertEqual(self.projector.run_once(), 2)
+        self.assertEqual(
+            [call.args[0] for call in self.stream.read.call_args_list],
+            ["parent", "child", "child"],
+        )
+
+    def test_trimmed_parent_does_not_block_child(self):
+        self.stream.shards.return_value = [StreamShard("child", parent_shard_id="gone")]
+        self.stream.read.return_value = ShardPage([])
+
+        self.projector.run_once()
+
+        self.stream.read.assert_called_once()
+
+    def test_stops_without_the_lease(self):
+        self.projector.lease = MagicMock()
+        self.projector.lease.acquire.return_value = False
+        self.stream.shards.return_value = [StreamShard("a")]
+
+        self.assertEqual(self.projector.run_once(), 0)
+        self.stream.read.assert_not_called()
+
+    def test_stops_when_another_consumer_is_ahead(self):
+        self.checkpoints.put("a", "1")
+        self.stream.shards.return_value = [StreamShard("a")]
+        self.stream.read.side_effect = [ShardPage([record("2")])]
+        # another worker checkpoints past this page while it is applied
+        self.mock_table.put_item.side_effect = lambda **_: self.checkpoints.put(
+            "a", "5"
+        )
+
+        self.assertEqual(self.projector.run_once(), 1)
+        self.assertEqual(self.checkpoints.get("a"), "5")
+        self.stream.read.assert_called_once()
+
+
+class TestLocalProjection(unittest.TestCase):
+    def test_projects_writes_to_a_local_table(self):
+        table = LocalStorage(MemoryEngine()).table("inventory")
+        stream = LocalChangeStream(clock=lambda: 1000)
+        table.attach_stream(stream)
+        repo = ProductRepository(table=table)
+        repo.dual_write_listing = False
+        projector = ListingProjector(
+            table, stream, InMemoryCheckpointStore(), repo.listing_shards
+        )
+
+        repo.save_product(
+            Product(id="p1", name="Pen", price=1, quantity=3, category="C")
+        )
+        repo.save_product(
+            Product(id="p2", name="Ink", price=1, quantity=1, category="C")
+        )
+        repo.stock_in("p1", 2)
+        repo.delete_product("p2")
+        projector.run_once()
+
+        self.assertEqual(
+            [(p.id, p.quantity) for p in repo.iter_products()], [("p1", 5)]
+        )
+        self.assertEqual(
+            stream.read(LocalChangeStream.SHARD_ID, None, 10).records[0]["dynamodb"][
+                "SequenceNumber"
+            ],
+            "1000",
+        )
+
+
+class TestLocalChangeStream(unittest.TestCase):
+    def test_records_read_past_are_dropped(self):
+        stream = LocalChangeStream()
+        for _ in range(LOCAL_STREAM_TRIM_BATCH + 2):
+            stream.append("INSERT", {"pk": "PRODUCT#p1", "sk": "META"}, META)
+
+        page = stream.read(LocalChangeStream.SHARD_ID, str(LOCAL_STREAM_TRIM_BATCH), 5)
+
+        sequences = [r["dynamodb"]["SequenceNumber"] for r in page.records]
+        self.assertEqual(
+            sequences,
+            [str(LOCAL_STREAM_TRIM_BATCH + 1), str(LOCAL_STREAM_TRIM_BATCH + 2)],
+        )
+        self.assertEqual(len(stream._records), 2)
+
+    def test_sequences_follow_the_clock(self):
+        stream = LocalChangeStream(clock=lambda: 500)
+
+        first = stream.append("INSERT", {"pk": "A", "sk": "META"})
+        second = stream.append("INSERT", {"pk": "A", "sk": "META"})
+
+        self.assertEqual((first, second), ("500", "501"))
+
+
+class TestDynamoDBChangeStream(unittest.TestCase):
+    def test_read_after_checkpoint(self):
+        client = MagicMock()
+        client.get_shard_iterator.return_value = {"ShardIterator": "it"}
+        client.get_records.return_value = {
+            "Records": [record("43")],
+            "NextShardIterator": "it-2",
+        }
+        stream = DynamoDBChangeStream(client, "arn:stream")
+
+        page = stream.read("shard-1", "42", 10)
+
+        self.assertEqual(page.records, [record("43")])
+        self.assertFalse(page.exhausted)
+        client.get_shard_iterator.assert_called_once_with(
+            StreamArn="arn:stream",
+            ShardId="shard-1",
+            ShardIteratorType="AFTER_SEQUENCE_NUMBER",
+            SequenceNumber="42",
+        )
+        client.get_records.assert_called_once_with(ShardIterator="it", Limit=10)
+
+    def test_read_follows_next_shard_iterator(self):
+        client = MagicMock()
+        client.get_shard_iterator.return_value = {"ShardIterator": "it"}
+        client.get_records.side_effect = [
+            {"Records": [record("5")], "NextShardIterator": "it-2"},
+            {"Records": [], "NextShardIterator": "it-3"},
+            {"Records": []},
+        ]
+        stream = DynamoDBChangeStream(client, "arn:stream")
+
+        stream.read("shard-1", None, 10)
+        stream.read("shard-1", "5", 10)
+        page = stream.read("shard-1", "5", 10)
+
+        self.assertTrue(page.exhausted)
+        client.get_shard_iterator.assert_called_once()
+        self.assertEqual(
+            [
+                call.kwargs["ShardIterator"]
+                for call in client.get_records.call_args_list
+            ],
+            ["it", "it-2", "it-3"],
+        )
+
+    def test_read_from_another_position_starts_a_new_iterator(self):
+        client = MagicMock()
+        client.get_shard_iterator.return_value = {"ShardIterator": "it"}
+        client.get_records.return_value = {
+            "Records": [record("5")],
+            "NextShardIterator": "it-2",
+        }
+        stream = DynamoDBChangeStream(client, "arn:stream")
+
+        stream.read("shard-1", None, 10)
+        # e.g. the page failed to apply, so the checkpoint did not move
+        stream.read("shard-1", None, 10)
+
+        self.assertEqual(client.get_shard_iterator.call_count, 2)
+
+    def test_expired_iterator_is_renewed(self):
+        client = MagicMock()
+        client.get_shard_iterator.side_effect = [
+            {"ShardIterator": "it"},
+            {"ShardIterator": "fresh"},
+        ]
+        client.get_records.side_effect = [
+            {"Records": [], "NextShardIterator": "it-2"},
+            ClientError(
+                error_response={"Error": {"Code": "ExpiredIteratorException"}},
+                operation_name="GetRecords",
+            ),
+            {"Records": [], "NextShardIterator": "fresh-2"},
+        ]
+        stream = DynamoDBChangeStream(client, "arn:stream")
+
+        stream.read("shard-1", "42", 10)
+        page = stream.read("shard-1", "42", 10)
+
+        self.assertEqual(page.records, [])
+        self.assertEqual(
+            client.get_records.call_args_list[-1].kwargs["ShardIterator"], "fresh"
+        )
+
+    def test_shards_paginates(self):
+        client = MagicMock()
+        client.describe_stream.side_effect = [
+            {
+                "StreamDescription": {
+                    "Shards": [
+                        {
+                            "ShardId": "a",
+                            "SequenceNumberRange": {
+                                "StartingSequenceNumber": "1",
+                                "EndingSequenceNumber": "9",
+                            },
+                        }
+                    ],
+                    "LastEvaluatedShardId": "a",
+                }
+            },
+            {
+                "StreamDescription": {
+                    "Shards": [
+                        {
+                            "ShardId": "b",
+                            "ParentShardId": "a",
+                            "SequenceNumberRange": {"StartingSequenceNumber": "10"},
+                        }
+                    ]
+                }
+            },
+        ]
+
+        self.assertEqual(
+            DynamoDBChangeStream(client, "arn").shards(),
+            [StreamShard("a", None, True), StreamShard("b", "a", False)],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
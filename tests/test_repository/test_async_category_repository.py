@@ -0,0 +1,114 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from botocore.exceptions import ClientError
+
+from app.app_exception.app_exception import AppException
+from app.dto.category_request import CreateCategoryRequest
+from app.repository.async_category_repository import (
+    AsyncCachedCategoryRepository,
+    AsyncCategoryRepository,
+)
+from app.utils.category_snapshot import CategorySnapshot
+
+
+def category_item(name: str, threshold: int = 5):
+    return {
+        "pk": "CATEGORY",
+        "sk": f"CATEGORY#{name}",
+        "name": name,
+        "default_threshold": threshold,
+        "description": None,
+    }
+
+
+def async_table():
+    table = MagicMock()
+    for method in ("get_item", "put_item", "update_item", "delete_item", "query"):
+        setattr(table, method, AsyncMock())
+    return table
+
+
+class TestAsyncCategoryRepository(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.table = async_table()
+        self.repo = AsyncCategoryRepository(self.table)
+
+    async def test_create_category_already_exists(self):
+        self.table.put_item.side_effect = ClientError(
+            {"Error": {"Code": "ConditionalCheckFailedException"}}, "PutItem"
+        )
+
+        with self.assertRaises(AppException) as ctx:
+            await self.repo.create_category(
+                CreateCategoryRequest(name="CAT", default_threshold=5)
+            )
+
+        self.assertEqual(ctx.exception.error_code, "CATEGORY_ALREADY_EXISTS")
+
+    async def test_get_all_categories_paginates(self):
+        self.table.query.side_effect = [
+            {"Items": [category_item("A")], "LastEvaluatedKey": {"sk": "A"}},
+            {"Items": [category_item("B")]},
+        ]
+
+        categories = await self.repo.get_all_categories()
+
+        self.assertEqual([category.name for category in categories], ["A", "B"])
+        self.assertEqual(
+            self.table.query.await_args.kwargs["ExclusiveStartKey"], {"sk": "A"}
+        )
+
+    async def test_delete_missing_category(self):
+        self.table.delete_item.side_effect = ClientError(
+            {"Error": {"Code": "ConditionalCheckFailedException"}}, "DeleteItem"
+        )
+
+        with self.assertRaises(AppException) as ctx:
+            await self.repo.delete_category("CAT")
+
+        self.assertEqual(ctx.exception.error_code, "CATEGORY_NOT_FOUND")
+
+
+class TestAsyncCachedCategoryRepository(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.table = async_table()
+        self.snapshot = CategorySnapshot(check_interval=60)
+        self.repo = AsyncCachedCategoryRepository(self.table, self.snapshot)
+
+    async def test_reload_is_stored_in_the_shared_snapshot(self):
+        self.table.get_item.return_value = {"Item": {"version": 4}}
+        self.table.query.return_value = {"Items": [category_item("CAT", 3)]}
+
+        first = await self.repo.get_category("CAT")
+        second = await self.repo.get_category("CAT")
+
+        self.assertEqual(first.default_threshold, 3)
+        self.assertEqual(second, first)
+        self.table.query.assert_awaited_once()
+        self.assertEqual(self.snapshot.version, 4)
+
+    async def test_reload_skips_storing_while_a_sync_reload_runs(self):
+        self.table.get_item.return_value = {"Item": {"version": 4}}
+        self.table.query.return_value = {"Items": [category_item("CAT")]}
+
+        with self.snapshot.lock:
+            category = await self.repo.get_category("CAT")
+
+        self.assertEqual(category.name, "CAT")
+        self.assertIsNone(self.snapshot.categories)
+
+    async def test_write_bumps_version_and_expires_snapshot(self):
+        self.snapshot.replace(1, {})
+
+        await self.repo.delete_category("CAT")
+
+        self.assertEqual(
+            self.table.update_item.await_args.kwargs["UpdateExpression"],
+            "ADD version :one",
+        )
+        self.assertFalse(self.snapshot.is_fresh())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,232 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+from decimal import Decimal
+
+from botocore.exceptions import ClientError
+
+from app.app_exception.app_exception import AppException
+from app.repository.async_product_repository import (
+    AsyncCachedProductRepository,
+    AsyncProductRepository,
+)
+from app.utils.ttl_cache import TTLCache
+
+
+def ddb_error(code: str):
+    return ClientError(
+        error_response={"Error": {"Code": code, "Message": "error"}},
+        operation_name="UpdateItem",
+    )
+
+
+def product_item(**overrides):
+    item = {
+        "pk": "PRODUCT#p1",
+        "sk": "META",
+        "id": "p1",
+        "name": "Item",
+        "price": Decimal("10"),
+        "quantity": Decimal("10"),
+        "category": "CAT",
+        "version": Decimal("1"),
+    }
+    item.update(overrides)
+    return item
+
+
+def async_table():
+    table = MagicMock()
+    table.name = "test-table"
+    for method in ("get_item", "put_item", "update_item", "delete_item", "query"):
+        setattr(table, method, AsyncMock())
+    table.meta.client.batch_get_item = AsyncMock()
+    table.meta.client.transact_write_items = AsyncMock()
+    return table
+
+
+class TestAsyncProductRepository(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.table = async_table()
+        self.repo = AsyncProductRepository(self.table)
+
+    async def test_get_product_by_id(self):
+        self.table.get_item.return_value = {"Item": product_item()}
+
+        product = await self.repo.get_product_by_id("p1", consistent_read=True)
+
+        self.assertEqual(product.quantity, 10)
+        self.table.get_item.assert_awaited_once_with(
+            Key={"pk": "PRODUCT#p1", "sk": "META"}, ConsistentRead=True
+        )
+
+    async def test_get_product_by_id_not_found(self):
+        self.table.get_item.return_value = {}
+
+        with self.assertRaises(AppException) as ctx:
+            await self.repo.get_product_by_id("p1")
+
+        self.assertEqual(ctx.exception.error_code, "PRODUCT_NOT_FOUND")
+
+    async def test_get_product_by_id_sums_stock_shards(self):
+        self.table.get_item.return_value = {
+            "Item": product_item(quantity=Decimal("0"), stock_shards=Decimal("2"))
+        }
+        self.table.meta.client.batch_get_item.return_value = {
+            "Responses": {
+                "test-table": [
+                    {"pk": "PRODUCT#p1#STOCK#0", "sk": "STOCK", "quantity": 3},
+                    {"pk": "PRODUCT#p1#STOCK#1", "sk": "STOCK", "quantity": 4},
+                ]
+            }
+        }
+
+        product = await self.repo.get_product_by_id("p1")
+
+        self.assertEqual(product.quantity, 7)
+
+    async def test_get_products_page_walks_shards(self):
+        with patch(
+            "app.repository.product_repository.get_product_listing_shards",
+            return_value=2,
+        ):
+            repo = AsyncProductRepository(self.table)
+        self.table.query.side_effect = [
+            {"Items": [product_item(id="a")]},
+            {"Items": [product_item(id="b")], "LastEvaluatedKey": {"pk": "x"}},
+        ]
+
+        products, cursor = await repo.get_products_page(2)
+
+        self.assertEqual([product.id for product in products], ["a", "b"])
+        self.assertIsNotNone(cursor)
+        pks = [
+            call.kwargs["ExpressionAttributeValues"][":pk"]
+            for call in self.table.query.await_args_list
+        ]
+        self.assertEqual(pks, ["PRODUCTS#0", "PRODUCTS#1"])
+
+    async def test_iter_products_merges_shards_read_concurrently(self):
+        with patch(
+            "app.repository.product_repository.get_product_listing_shards",
+            return_value=2,
+        ):
+            repo = AsyncProductRepository(self.table)
+        pages = {
+            ("PRODUCTS#0", None): {
+                "Items": [product_item(id="a"), product_item(id="c")],
+                "LastEvaluatedKey": {"pk": "PRODUCTS#0"},
+            },
+            ("PRODUCTS#0", "PRODUCTS#0"): {"Items": [product_item(id="d")]},
+            ("PRODUCTS#1", None): {"Items": [product_item(id="b")]},
+        }
+
+        async def query(**params):
+            start = params.get("ExclusiveStartKey", {}).get("pk")
+            return pages[(params["ExpressionAttributeValues"][":pk"], start)]
+
+        self.table.query.side_effect = query
+
+        products = [product.id async for product in repo.iter_products()]
+
+        self.assertEqual(products, ["a", "b", "c", "d"])
+        first_two = [
+            call.kwargs["ExpressionAttributeValues"][":pk"]
+            for call in self.table.query.await_args_list[:2]
+        ]
+        self.assertEqual(sorted(first_two), ["PRODUCTS#0", "PRODUCTS#1"])
+
+    async def test_stock_out_writes_meta_and_listing(self):
+        self.table.update_item.side_effect = [
+            {"Attributes": product_item(quantity=Decimal("8"), version=Decimal("2"))},
+            {},
+        ]
+
+        product = await self.repo.stock_out("p1", 2)
+
+        self.assertEqual(product.quantity, 8)
+        meta_call, listing_call = self.table.update_item.await_args_list
+        self.assertEqual(
+            meta_call.kwargs["ConditionExpression"],
+            "attribute_exists(pk) AND attribute_not_exists(stock_shards) "
+            "AND quantity >= :need",
+        )
+        self.assertEqual(listing_call.kwargs["Key"]["sk"], "PRODUCT#p1")
+
+    async def test_stock_out_insufficient_stock(self):
+        error = ddb_error("ConditionalCheckFailedException")
+        error.response["Item"] = {"pk": {"S": "PRODUCT#p1"}, "quantity": {"N": "3"}}
+        self.table.update_item.side_effect = error
+
+        with self.assertRaises(AppException) as ctx:
+            await self.repo.stock_out("p1", 5)
+
+        self.assertEqual(ctx.exception.error_code, "INSUFFICIENT_STOCK")
+        self.assertEqual(ctx.exception.details, {"available_stock": 3})
+
+    async def test_stock_in_discovers_sharded_product(self):
+        error = ddb_error("ConditionalCheckFailedException")
+        error.response["Item"] = {"quantity": {"N": "0"}, "stock_shards": {"N": "2"}}
+        self.table.update_item.side_effect = [error, {}]
+        self.table.get_item.return_value = {
+            "Item": product_item(quantity=Decimal("0"), stock_shards=Decimal("2"))
+        }
+        self.table.meta.client.batch_get_item.return_value = {
+            "Responses": {
+                "test-table": [
+                    {"pk": "PRODUCT#p1#STOCK#0", "sk": "STOCK", "quantity": 5},
+                    {"pk": "PRODUCT#p1#STOCK#1", "sk": "STOCK", "quantity": 2},
+                ]
+            }
+        }
+
+        product = await self.repo.stock_in("p1", 2)
+
+        self.assertEqual(product.quantity, 7)
+        shard_call = self.table.update_item.await_args_list[1]
+        self.assertTrue(shard_call.kwargs["Key"]["pk"].startswith("PRODUCT#p1#STOCK#"))
+
+    async def test_update_low_stock_alert_sent_version_mismatch(self):
+        error = ddb_error("ConditionalCheckFailedException")
+        error.response["Item"] = {"version": {"N": "4"}}
+        self.table.update_item.side_effect = error
+
+        with self.assertRaises(AppException) as ctx:
+            await self.repo.update_low_stock_alert_sent("p1", True, expected_version=3)
+
+        self.assertEqual(ctx.exception.error_code, "VERSION_MISMATCH")
+
+
+class TestAsyncCachedProductRepository(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.table = async_table()
+        self.table.get_item.return_value = {"Item": product_item()}
+        self.cache = TTLCache(max_entries=10, ttl=60)
+        self.repo = AsyncCachedProductRepository(self.table, self.cache)
+
+    async def test_get_product_by_id_reads_through(self):
+        await self.repo.get_product_by_id("p1")
+        await self.repo.get_product_by_id("p1")
+
+        self.table.get_item.assert_awaited_once()
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+    async def test_late_response_keeps_newer_entry(self):
+        self.table.update_item.side_effect = [
+            {"Attributes": product_item(quantity=Decimal("9"), version=Decimal("3"))},
+            {"Attributes": product_item(quantity=Decimal("9"), version=Decimal("3"))},
+        ]
+        await self.repo.stock_in("p1", 1)
+        self.table.get_item.return_value = {"Item": product_item(version=Decimal("2"))}
+
+        await self.repo.get_product_by_id("p1", consistent_read=True)
+
+        self.assertEqual((await self.repo.get_product_by_id("p1")).version, 3)
+
+    async def test_failed_stock_out_drops_entry(self):
+        await self.repo.get_product_by_id("p1")
+        self.table.update_item.side_effect = ddb_error("InternalServerError")
+
+        with self.assertRaises(AppException):
+            await self.repo.stock_out("p1", 1)
+
+        self.assertIsNone(self.cache.get("p1"))
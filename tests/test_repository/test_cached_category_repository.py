@@ -0,0 +1,84 @@
+import unittest
+from unittest.mock import MagicMock
+
+from app.dto.category_request import UpdateCategoryRequest
+from app.repository.cached_category_repository import CachedCategoryRepository
+from app.utils.category_snapshot import CategorySnapshot
+
+ITEMS = [
+    {"name": "ELECTRONICS", "description": None, "default_threshold": 10},
+    {"name": "GROCERY", "description": None, "default_threshold": 5},
+]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCachedCategoryRepository(unittest.TestCase):
+    def setUp(self):
+        self.mock_table = MagicMock()
+        self.mock_table.get_item.return_value = {"Item": {"version": 1}}
+        self.mock_table.query.return_value = {"Items": ITEMS}
+        self.clock = FakeClock()
+        self.snapshot = CategorySnapshot(check_interval=5, clock=self.clock)
+
+        self.repo = CachedCategoryRepository(
+            table=self.mock_table, snapshot=self.snapshot
+        )
+
+    def test_reads_come_from_snapshot(self):
+        self.assertEqual(self.repo.get_category("GROCERY").default_threshold, 5)
+        self.assertIsNone(self.repo.get_category("UNKNOWN"))
+        self.assertEqual(len(self.repo.get_all_categories()), 2)
+
+        self.mock_table.query.assert_called_once()
+        self.mock_table.get_item.assert_called_once()
+
+    def test_unchanged_version_skips_reload(self):
+        self.repo.get_category("GROCERY")
+        self.clock.now += 5
+
+        self.repo.get_category("GROCERY")
+
+        self.assertEqual(self.mock_table.get_item.call_count, 2)
+        self.mock_table.query.assert_called_once()
+
+    def test_version_bump_reloads(self):
+        self.repo.get_category("GROCERY")
+        self.clock.now += 5
+        self.mock_table.get_item.return_value = {"Item": {"version": 2}}
+
+        self.repo.get_category("GROCERY")
+
+        self.assertEqual(self.mock_table.query.call_count, 2)
+
+    def test_write_bumps_version_and_expires_snapshot(self):
+        self.repo.get_category("GROCERY")
+
+        self.repo.update_category(
+            "GROCERY", UpdateCategoryRequest(default_threshold=7, description=None)
+        )
+
+        bump = self.mock_table.update_item.call_args_list[-1][1]
+        self.assertEqual(bump["Key"], {"pk": "CATEGORY_VERSION", "sk": "META"})
+        self.assertEqual(bump["UpdateExpression"], "ADD version :one")
+
+        self.mock_table.get_item.return_value = {"Item": {"version": 2}}
+        self.repo.get_category("GROCERY")
+        self.assertEqual(self.mock_table.query.call_count, 2)
+
+    def test_no_snapshot_reads_table(self):
+        repo = CachedCategoryRepository(table=self.mock_table, snapshot=None)
+        self.mock_table.get_item.return_value = {"Item": ITEMS[0]}
+
+        self.assertEqual(repo.get_category("ELECTRONICS").name, "ELECTRONICS")
+        self.mock_table.update_item.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
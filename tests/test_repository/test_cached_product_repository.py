@@ -0,0 +1,161 @@
+import unittest
+from unittest.mock import MagicMock
+
+from botocore.exceptions import ClientError
+
+from app.app_exception.app_exception import AppException
+from app.models.products import Product
+from app.repository.cached_product_repository import CachedProductRepository
+from app.utils.ttl_cache import LookupStats, TTLCache
+
+ITEM = {"id": "p1", "name": "Pen", "price": 1, "quantity": 5, "category": "C"}
+
+
+class TestCachedProductRepository(unittest.TestCase):
+    def setUp(self):
+        self.mock_table = MagicMock()
+        self.mock_table.name = "test-table"
+        self.mock_table.get_item.return_value = {"Item": ITEM}
+        self.cache = TTLCache(max_entries=10, ttl=60)
+        self.shard_lookups = LookupStats()
+
+        self.repo = CachedProductRepository(
+            table=self.mock_table, cache=self.cache, shard_lookups=self.shard_lookups
+        )
+
+    def test_get_product_by_id_reads_through(self):
+        first = self.repo.get_product_by_id("p1")
+        first.quantity = 0
+        second = self.repo.get_product_by_id("p1")
+
+        self.assertEqual(second.quantity, 5)
+        self.mock_table.get_item.assert_called_once()
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+    def test_consistent_read_bypasses_cache(self):
+        self.repo.get_product_by_id("p1")
+        self.repo.get_product_by_id("p1", consistent_read=True)
+
+        self.assertEqual(self.mock_table.get_item.call_count, 2)
+        self.assertTrue(self.mock_table.get_item.call_args[1]["ConsistentRead"])
+
+    def test_stock_in_refreshes_entry(self):
+        self.repo.get_product_by_id("p1")
+        self.mock_table.update_item.return_value = {
+            "Attributes": {**ITEM, "quantity": 8, "version": 1}
+        }
+
+        self.repo.stock_in("p1", 3)
+
+        self.assertEqual(self.repo.get_product_by_id("p1").quantity, 8)
+        self.mock_table.get_item.assert_called_once()
+
+    def test_out_of_order_writes_keep_newest_version(self):
+        # the version 2 write's response lands after version 3's
+        self.mock_table.update_item.return_value = {
+            "Attributes": {**ITEM, "quantity": 9, "version": 3}
+        }
+        self.repo.stock_in("p1", 1)
+        self.mock_table.update_item.return_value = {
+            "Attributes": {**ITEM, "quantity": 7, "version": 2}
+        }
+        self.repo.stock_out("p1", 1)
+
+        self.assertEqual(self.repo.get_product_by_id("p1").quantity, 9)
+        self.mock_table.get_item.assert_not_called()
+
+    def test_slow_read_does_not_overwrite_newer_write(self):
+        self.mock_table.update_item.return_value = {
+            "Attributes": {**ITEM, "quantity": 8, "version": 2}
+        }
+        self.repo.stock_in("p1", 3)
+        self.mock_table.get_item.return_value = {"Item": {**ITEM, "version": 1}}
+
+        self.repo.get_product_by_id("p1", consistent_read=True)
+
+        self.assertEqual(self.repo.get_product_by_id("p1").version, 2)
+
+    def test_sharded_copies_of_same_version_drop_entry(self):
+        sharded = Product(**ITEM, stock_shards=2, version=1)
+        self.cache.set("p1", sharded)
+
+        self.repo._remember(sharded.model_copy(update={"quantity": 4}))
+
+        self.assertIsNone(self.cache.peek("p1"))
+
+    def test_stock_write_counts_shard_lookups(self):
+        self.mock_table.update_item.return_value = {"Attributes": ITEM}
+
+        self.repo.stock_in("p1", 1)
+        self.repo.stock_in("p1", 1)
+
+        self.assertEqual(
+            self.shard_lookups.stats(), {"hits": 1, "misses": 1, "stale": 0}
+        )
+        # the lookups are not reads of the cached product
+        self.assertEqual(self.cache.stats()["hits"], 0)
+
+    def test_outdated_shard_count_is_counted_stale(self):
+        self.repo.get_product_by_id("p1")
+        resharded = ClientError(
+            {
+                "Error": {"Code": "ConditionalCheckFailedException"},
+                "Item": {"quantity": {"N": "0"}, "stock_shards": {"N": "2"}},
+            },
+            "UpdateItem",
+        )
+        self.mock_table.update_item.side_effect = [resharded, {}]
+        self.mock_table.get_item.return_value = {
+            "Item": {**ITEM, "quantity": 0, "stock_shards": 2}
+        }
+        self.mock_table.meta.client.batch_get_item.return_value = {
+            "Responses": {
+                "test-table": [
+                    {"pk": "PRODUCT#p1#STOCK#0", "sk": "STOCK", "quantity": 4},
+                    {"pk": "PRODUCT#p1#STOCK#1", "sk": "STOCK", "quantity": 2},
+                ]
+            }
+        }
+
+        product = self.repo.stock_in("p1", 1)
+
+        self.assertEqual(product.quantity, 6)
+        self.assertEqual(
+            self.shard_lookups.stats(), {"hits": 1, "misses": 0, "stale": 1}
+        )
+
+    def test_failed_stock_out_drops_entry(self):
+        self.repo.get_product_by_id("p1")
+        self.mock_table.update_item.side_effect = ClientError(
+            {"Error": {"Code": "InternalServerError"}}, "UpdateItem"
+        )
+
+        with self.assertRaises(AppException):
+            self.repo.stock_out("p1", 1)
+
+        self.repo.get_product_by_id("p1")
+        self.assertEqual(self.mock_table.get_item.call_count, 2)
+
+    def test_writes_invalidate_entry(self):
+        self.mock_table.update_item.return_value = {"Attributes": ITEM}
+
+        self.repo.get_product_by_id("p1")
+        self.repo.update_low_stock_alert_sent("p1", True)
+        self.repo.get_product_by_id("p1")
+        self.repo.delete_product("p1")
+        self.repo.get_product_by_id("p1")
+
+        # three cache misses, plus the delete's own read of META
+        self.assertEqual(self.mock_table.get_item.call_count, 4)
+
+    def test_no_cache_configured(self):
+        repo = CachedProductRepository(table=self.mock_table, cache=None)
+
+        repo.get_product_by_id("p1")
+        repo.get_product_by_id("p1")
+
+        self.assertEqual(self.mock_table.get_item.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -127,6 +127,24 @@ class TestCategoryRepository(unittest.TestCase):
 
         self.mock_table.query.assert_called_once()
 
+    def test_get_all_categories_paginates(self):
+        item = {"name": "A", "description": None, "default_threshold": 1}
+        self.mock_table.query.side_effect = [
+            {
+                "Items": [item],
+                "LastEvaluatedKey": {"pk": "CATEGORY", "sk": "CATEGORY#A"},
+            },
+            {"Items": [{**item, "name": "B"}]},
+        ]
+
+        result = self.repo.get_all_categories()
+
+        self.assertEqual([category.name for category in result], ["A", "B"])
+        self.assertEqual(
+            self.mock_table.query.call_args_list[1][1]["ExclusiveStartKey"],
+            {"pk": "CATEGORY", "sk": "CATEGORY#A"},
+        )
+
     def test_get_all_categories_ddb_failure(self):
         self.mock_table.query.side_effect = ddb_error("InternalServerError")
 
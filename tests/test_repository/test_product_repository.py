@@ -1,11 +1,16 @@
+import threading
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 from decimal import Decimal
 from botocore.exceptions import ClientError
 
-from app.repository.product_repository import ProductRepository
+from app.repository.product_repository import (
+    ProductRepository,
+    listing_partition_key,
+)
 from app.models.products import Product
 from app.app_exception.app_exception import AppException
+from app.utils.pagination import decode_cursor, encode_cursor
 
 
 def ddb_tx_error(code: str):
@@ -15,6 +20,21 @@ def ddb_tx_error(code: str):
     )
 
 
+def product_item(**overrides):
+    item = {
+        "pk": "PRODUCT#p1",
+        "sk": "META",
+        "id": "p1",
+        "name": "Item",
+        "price": Decimal("10"),
+        "quantity": Decimal("10"),
+        "category": "CAT",
+        "version": Decimal("1"),
+    }
+    item.update(overrides)
+    return item
+
+
 class TestProductRepository(unittest.TestCase):
     def setUp(self):
         self.mock_table = MagicMock()
@@ -34,16 +54,29 @@ class TestProductRepository(unittest.TestCase):
             category="ELECTRONICS",
             override_threshold=None,
             low_stock_alert_sent=False,
+            version=1,
         )
 
         self.repo.save_product(product)
 
-        self.mock_ddb_client.transact_write_items.assert_called_once()
+        meta_put, listing_put = (
+            action["Put"]
+            for action in self.mock_ddb_client.transact_write_items.call_args[1][
+                "TransactItems"
+            ]
+        )
+        self.assertEqual(meta_put["Item"]["version"], 1)
+        self.assertEqual(meta_put["ConditionExpression"], "attribute_not_exists(pk)")
+        self.assertEqual(listing_put["Item"]["version"], 1)
+        self.mock_table.put_item.assert_not_called()
 
     def test_save_product_already_exists(self):
-        self.mock_ddb_client.transact_write_items.side_effect = ddb_tx_error(
-            "TransactionCanceledException"
-        )
+        error = ddb_tx_error("TransactionCanceledException")
+        error.response["CancellationReasons"] = [
+            {"Code": "ConditionalCheckFailed"},
+            {"Code": "None"},
+        ]
+        self.mock_ddb_client.transact_write_items.side_effect = error
 
         product = Product(
             id="p1",
@@ -61,6 +94,7 @@ class TestProductRepository(unittest.TestCase):
         exc = ctx.exception
         self.assertEqual(exc.status_code, 409)
         self.assertEqual(exc.error_code, "PRODUCT_ALREADY_EXISTS")
+        self.mock_ddb_client.transact_write_items.assert_called_once()
 
     def test_save_product_generic_failure(self):
         self.mock_ddb_client.transact_write_items.side_effect = ddb_tx_error(
@@ -82,7 +116,7 @@ class TestProductRepository(unittest.TestCase):
 
         self.assertEqual(ctx.exception.status_code, 500)
 
-    def test_get_all_products_success(self):
+    def test_iter_products_success(self):
         self.mock_table.query.return_value = {
             "Items": [
                 {
@@ -102,21 +136,351 @@ class TestProductRepository(unittest.TestCase):
             ]
         }
 
-        products = self.repo.get_all_products()
+        products = list(self.repo.iter_products())
 
         self.assertEqual(len(products), 2)
         self.assertIsInstance(products[0], Product)
         self.assertEqual(products[1].id, "p2")
 
-    def test_stock_in_success(self):
-        self.repo.stock_in("p1", 5)
+    def test_iter_products_follows_last_evaluated_key(self):
+        item = {
+            "id": "p1",
+            "name": "Item1",
+            "price": 10,
+            "quantity": 5,
+            "category": "C",
+        }
+        self.mock_table.query.side_effect = [
+            {
+                "Items": [item],
+                "LastEvaluatedKey": {"pk": "PRODUCTS", "sk": "PRODUCT#p1"},
+            },
+            {"Items": [dict(item, id="p2")]},
+        ]
 
-        self.mock_ddb_client.transact_write_items.assert_called_once()
+        products = list(self.repo.iter_products())
 
-    def test_stock_in_failure(self):
-        self.mock_ddb_client.transact_write_items.side_effect = ddb_tx_error(
+        self.assertEqual([p.id for p in products], ["p1", "p2"])
+        second_call = self.mock_table.query.call_args_list[1][1]
+        self.assertEqual(
+            second_call["ExclusiveStartKey"], {"pk": "PRODUCTS", "sk": "PRODUCT#p1"}
+        )
+
+    def test_get_products_page_returns_cursor(self):
+        item = {
+            "id": "p1",
+            "name": "Item1",
+            "price": 10,
+            "quantity": 5,
+            "category": "C",
+        }
+        last_key = {"pk": "PRODUCTS", "sk": "PRODUCT#p1"}
+        self.mock_table.query.return_value = {
+            "Items": [item],
+            "LastEvaluatedKey": last_key,
+        }
+
+        products, cursor = self.repo.get_products_page(1)
+
+        self.assertEqual(len(products), 1)
+        self.assertEqual(decode_cursor(cursor), {"shard": 0, "key": last_key})
+        self.assertEqual(self.mock_table.query.call_args[1]["Limit"], 1)
+
+    def test_get_products_page_fills_short_pages(self):
+        item = {
+            "id": "p1",
+            "name": "Item1",
+            "price": 10,
+            "quantity": 5,
+            "category": "C",
+        }
+        self.mock_table.query.side_effect = [
+            {"Items": [item], "LastEvaluatedKey": {"pk": "PRODUCTS", "sk": "x"}},
+            {"Items": [dict(item, id="p2")]},
+        ]
+
+        products, cursor = self.repo.get_products_page(5)
+
+        self.assertEqual(len(products), 2)
+        self.assertIsNone(cursor)
+        self.assertEqual(self.mock_table.query.call_args_list[1][1]["Limit"], 4)
+
+    def test_save_product_sets_category_index_key(self):
+        product = Product(id="p1", name="Pen", price=1, quantity=1, category="C")
+
+        self.repo.save_product(product)
+
+        meta_put, listing_put = (
+            action["Put"]
+            for action in self.mock_ddb_client.transact_write_items.call_args[1][
+                "TransactItems"
+            ]
+        )
+        self.assertEqual(meta_put["Item"]["category_key"], "C")
+        self.assertNotIn("category_key", listing_put["Item"])
+
+    def test_get_products_by_category_page(self):
+        item = {
+            "id": "p1",
+            "name": "Item1",
+            "price": 10,
+            "quantity": 5,
+            "category": "C",
+        }
+        last_key = {"pk": "PRODUCT#p1", "sk": "META", "category_key": "C", "id": "p1"}
+        self.mock_table.query.return_value = {
+            "Items": [item],
+            "LastEvaluatedKey": last_key,
+        }
+
+        products, cursor = self.repo.get_products_by_category_page("C", 1)
+
+        self.assertEqual(products[0].id, "p1")
+        self.assertEqual(decode_cursor(cursor), last_key)
+        kwargs = self.mock_table.query.call_args[1]
+        self.assertEqual(kwargs["IndexName"], "category-index")
+        self.assertEqual(
+            kwargs["KeyConditionExpression"], "category_key = :category_key"
+        )
+        self.assertEqual(kwargs["ExpressionAttributeValues"], {":category_key": "C"})
+
+    def test_get_products_page_invalid_cursor(self):
+        with self.assertRaises(AppException) as ctx:
+            self.repo.get_products_page(5, "not-a-cursor")
+
+        self.assertEqual(ctx.exception.error_code, "INVALID_CURSOR")
+
+    def test_writes_use_listing_shard(self):
+        self.repo.listing_shards = 4
+        expected_pk = listing_partition_key("p1", 4)
+        self.mock_table.get_item.return_value = {"Item": product_item()}
+
+        self.repo.delete_product("p1")
+
+        actions = self.mock_ddb_client.transact_write_items.call_args[1][
+            "TransactItems"
+        ]
+        self.assertEqual(actions[1]["Delete"]["Key"]["pk"], expected_pk)
+        self.assertTrue(expected_pk.startswith("PRODUCTS#"))
+
+    def test_iter_products_merges_shards(self):
+        self.repo.listing_shards = 3
+
+        def query(**kwargs):
+            shard = kwargs["ExpressionAttributeValues"][":pk"].split("#")[1]
+            return {
+                "Items": [
+                    {
+                        "id": f"p{shard}",
+                        "name": "Item",
+                        "price": 1,
+                        "quantity": 1,
+                        "category": "C",
+                    }
+                ]
+            }
+
+        self.mock_ddb_client.query.side_effect = query
+
+        products = list(self.repo.iter_products())
+
+        self.assertEqual([p.id for p in products], ["p0", "p1", "p2"])
+        self.assertEqual(self.mock_ddb_client.query.call_count, 3)
+        self.mock_table.query.assert_not_called()
+
+    def test_iter_products_reads_shards_concurrently(self):
+        self.repo.listing_shards = 2
+        # each shard's first query waits for the other's, so reading the
+        # shards one after another would break the barrier
+        barrier = threading.Barrier(2, timeout=5)
+        pages = {
+            ("PRODUCTS#0", None): {
+                "Items": [product_item(id="a"), product_item(id="c")],
+                "LastEvaluatedKey": {"pk": "PRODUCTS#0"},
+            },
+            ("PRODUCTS#0", "PRODUCTS#0"): {"Items": [product_item(id="d")]},
+            ("PRODUCTS#1", None): {"Items": [product_item(id="b")]},
+        }
+
+        def query(**kwargs):
+            start = kwargs.get("ExclusiveStartKey", {}).get("pk")
+            if start is None:
+                barrier.wait()
+            return pages[(kwargs["ExpressionAttributeValues"][":pk"], start)]
+
+        self.mock_ddb_client.query.side_effect = query
+
+        products = [product.id for product in self.repo.iter_products()]
+
+        self.assertEqual(products, ["a", "b", "c", "d"])
+
+    def test_get_products_page_moves_to_next_shard(self):
+        self.repo.listing_shards = 2
+        item = {
+            "id": "p1",
+            "name": "Item1",
+            "price": 10,
+            "quantity": 5,
+            "category": "C",
+        }
+        self.mock_table.query.side_effect = [
+            {"Items": [item]},
+            {"Items": [dict(item, id="p2")], "LastEvaluatedKey": {"sk": "x"}},
+        ]
+
+        products, cursor = self.repo.get_products_page(2)
+
+        self.assertEqual([p.id for p in products], ["p1", "p2"])
+        self.assertEqual(decode_cursor(cursor), {"shard": 1, "key": {"sk": "x"}})
+        second_call = self.mock_table.query.call_args_list[1][1]
+        self.assertEqual(second_call["ExpressionAttributeValues"][":pk"], "PRODUCTS#1")
+
+    def test_get_products_page_cursor_out_of_range(self):
+        cursor = encode_cursor({"shard": 5, "key": None})
+
+        with self.assertRaises(AppException) as ctx:
+            self.repo.get_products_page(5, cursor)
+
+        self.assertEqual(ctx.exception.error_code, "INVALID_CURSOR")
+
+    @patch("app.repository.product_repository.time.sleep")
+    def test_batch_get_products_chunks_and_retries(self, mock_sleep):
+        ids = [f"p{i}" for i in range(150)]
+
+        def item(product_id):
+            return {
+                "id": product_id,
+                "name": "Item",
+                "price": 1,
+                "quantity": 1,
+                "category": "C",
+            }
+
+        self.mock_ddb_client.batch_get_item.side_effect = [
+            {
+                "Responses": {"test-table": [item(pid) for pid in ids[:99]]},
+                "UnprocessedKeys": {
+                    "test-table": {"Keys": [{"pk": "PRODUCT#p99", "sk": "META"}]}
+                },
+            },
+            {"Responses": {"test-table": [item("p99")]}},
+            {"Responses": {"test-table": [item(pid) for pid in ids[100:149]]}},
+        ]
+
+        products, missing = self.repo.batch_get_products(ids + ["p0"])
+
+        self.assertEqual(len(products), 149)
+        self.assertEqual(products[0].id, "p0")
+        self.assertEqual(missing, ["p149"])
+        calls = self.mock_ddb_client.batch_get_item.call_args_list
+        self.assertEqual(len(calls[0][1]["RequestItems"]["test-table"]["Keys"]), 100)
+        self.assertEqual(
+            calls[1][1]["RequestItems"]["test-table"]["Keys"],
+            [{"pk": "PRODUCT#p99", "sk": "META"}],
+        )
+        mock_sleep.assert_called_once()
+
+    def test_batch_get_products_can_read_consistently(self):
+        self.mock_ddb_client.batch_get_item.return_value = {
+            "Responses": {"test-table": []}
+        }
+
+        self.repo.batch_get_products(["p1"], consistent_read=True)
+
+        request = self.mock_ddb_client.batch_get_item.call_args[1]["RequestItems"]
+        self.assertTrue(request["test-table"]["ConsistentRead"])
+
+    @patch("app.repository.product_repository.time.sleep")
+    def test_batch_get_products_gives_up_when_throttled(self, _):
+        self.mock_ddb_client.batch_get_item.return_value = {
+            "Responses": {"test-table": []},
+            "UnprocessedKeys": {
+                "test-table": {"Keys": [{"pk": "PRODUCT#p1", "sk": "META"}]}
+            },
+        }
+
+        with self.assertRaises(AppException) as ctx:
+            self.repo.batch_get_products(["p1"])
+
+        self.assertEqual(ctx.exception.status_code, 503)
+        self.assertEqual(ctx.exception.error_code, "DATABASE_THROTTLED")
+
+    @patch("app.repository.product_repository.time.sleep")
+    def test_batch_save_products_chunks_and_reports_unwritten(self, _):
+        products = [
+            Product(id=f"p{i}", name="Item", price=1, quantity=1, category="C")
+            for i in range(13)
+        ]
+        leftover = {"PutRequest": {"Item": {"id": "p12", "pk": "PRODUCT#p12"}}}
+        self.mock_ddb_client.batch_write_item.side_effect = [
+            {},
+            {"UnprocessedItems": {"test-table": [leftover]}},
+        ] + [{"UnprocessedItems": {"test-table": [leftover]}}] * 4
+
+        unwritten = self.repo.batch_save_products(products)
+
+        self.assertEqual(unwritten, ["p12"])
+        calls = self.mock_ddb_client.batch_write_item.call_args_list
+        self.assertEqual(len(calls[0][1]["RequestItems"]["test-table"]), 25)
+        self.assertEqual(len(calls[1][1]["RequestItems"]["test-table"]), 1)
+        self.assertEqual(len(calls), 6)
+
+    def test_batch_save_products_failure(self):
+        self.mock_ddb_client.batch_write_item.side_effect = ddb_tx_error(
             "InternalServerError"
         )
+        product = Product(id="p1", name="Item", price=1, quantity=1, category="C")
+
+        with self.assertRaises(AppException) as ctx:
+            self.repo.batch_save_products([product])
+
+        self.assertEqual(ctx.exception.error_code, "DATABASE_ERROR")
+
+    def test_stock_in_success(self):
+        self.mock_table.update_item.return_value = {
+            "Attributes": {
+                "id": "p1",
+                "name": "Item",
+                "price": Decimal("10"),
+                "quantity": Decimal("15"),
+                "category": "CAT",
+            }
+        }
+
+        product = self.repo.stock_in("p1", 5)
+
+        self.assertEqual(product.quantity, 15)
+        meta_call, listing_call = self.mock_table.update_item.call_args_list
+        self.assertEqual(meta_call[1]["ReturnValues"], "ALL_NEW")
+        self.assertEqual(meta_call[1]["Key"]["pk"], "PRODUCT#p1")
+        self.assertEqual(listing_call[1]["Key"]["sk"], "PRODUCT#p1")
+        self.mock_ddb_client.transact_write_items.assert_not_called()
+
+    def test_stock_in_logs_failed_listing_sync(self):
+        self.mock_table.update_item.side_effect = [
+            {"Attributes": product_item(quantity=Decimal("15"), version=Decimal("2"))},
+            ddb_tx_error("ProvisionedThroughputExceededException"),
+        ]
+
+        with self.assertLogs("app.repository.product_repository", "WARNING") as logs:
+            product = self.repo.stock_in("p1", 5)
+
+        self.assertEqual(product.quantity, 15)
+        self.assertEqual(logs.records[0].getMessage(), "listing_sync_failed")
+        self.assertEqual(logs.records[0].version, 2)
+
+    def test_stock_in_not_found(self):
+        self.mock_table.update_item.side_effect = ddb_tx_error(
+            "ConditionalCheckFailedException"
+        )
+
+        with self.assertRaises(AppException) as ctx:
+            self.repo.stock_in("p1", 5)
+
+        self.assertEqual(ctx.exception.error_code, "PRODUCT_NOT_FOUND")
+
+    def test_stock_in_failure(self):
+        self.mock_table.update_item.side_effect = ddb_tx_error("InternalServerError")
 
         with self.assertRaises(AppException) as ctx:
             self.repo.stock_in("p1", 5)
@@ -124,40 +488,397 @@ class TestProductRepository(unittest.TestCase):
         self.assertEqual(ctx.exception.error_code, "STOCK_IN_FAILED")
 
     def test_stock_out_success(self):
-        self.repo.stock_out("p1", 2)
+        self.mock_table.update_item.side_effect = [
+            {
+                "Attributes": {
+                    "id": "p1",
+                    "name": "Item",
+                    "price": Decimal("10"),
+                    "quantity": Decimal("3"),
+                    "category": "CAT",
+                    "low_stock_alert_sent": False,
+                }
+            },
+            ddb_tx_error("ConditionalCheckFailedException"),
+        ]
 
-        self.mock_ddb_client.transact_write_items.assert_called_once()
+        product = self.repo.stock_out("p1", 2)
 
-    def test_stock_out_insufficient_stock(self):
-        self.mock_ddb_client.transact_write_items.side_effect = ddb_tx_error(
-            "TransactionCanceledException"
+        self.assertEqual(product.quantity, 3)
+        meta_call = self.mock_table.update_item.call_args_list[0][1]
+        self.assertEqual(
+            meta_call["ConditionExpression"],
+            "attribute_exists(pk) AND attribute_not_exists(stock_shards) "
+            "AND quantity >= :need",
         )
 
+    def test_stock_out_insufficient_stock(self):
+        error = ddb_tx_error("ConditionalCheckFailedException")
+        error.response["Item"] = {"pk": {"S": "PRODUCT#p1"}, "quantity": {"N": "3"}}
+        self.mock_table.update_item.side_effect = error
+
         with self.assertRaises(AppException) as ctx:
             self.repo.stock_out("p1", 5)
 
         exc = ctx.exception
         self.assertEqual(exc.status_code, 400)
         self.assertEqual(exc.error_code, "INSUFFICIENT_STOCK")
+        self.assertEqual(exc.details, {"available_stock": 3})
 
-    def test_stock_out_failure(self):
-        self.mock_ddb_client.transact_write_items.side_effect = ddb_tx_error(
-            "InternalServerError"
+    def test_stock_out_version_mismatch(self):
+        error = ddb_tx_error("ConditionalCheckFailedException")
+        error.response["Item"] = {
+            "pk": {"S": "PRODUCT#p1"},
+            "quantity": {"N": "9"},
+            "version": {"N": "5"},
+        }
+        self.mock_table.update_item.side_effect = error
+
+        with self.assertRaises(AppException) as ctx:
+            self.repo.stock_out("p1", 2, expected_version=4)
+
+        exc = ctx.exception
+        self.assertEqual(exc.status_code, 412)
+        self.assertEqual(exc.error_code, "VERSION_MISMATCH")
+        call = self.mock_table.update_item.call_args[1]
+        self.assertEqual(call["UpdateExpression"], "ADD quantity :d, version :one")
+        self.assertIn("version = :expected", call["ConditionExpression"])
+
+    def test_stock_in_if_match_rejected_for_sharded_product(self):
+        error = ddb_tx_error("ConditionalCheckFailedException")
+        error.response["Item"] = {"quantity": {"N": "0"}, "stock_shards": {"N": "2"}}
+        self.mock_table.update_item.side_effect = error
+
+        with self.assertRaises(AppException) as ctx:
+            self.repo.stock_in("p1", 2, expected_version=3)
+
+        self.assertEqual(ctx.exception.error_code, "STOCK_SHARDED")
+        self.mock_table.update_item.assert_called_once()
+
+    def test_stock_out_not_found(self):
+        self.mock_table.update_item.side_effect = ddb_tx_error(
+            "ConditionalCheckFailedException"
         )
 
+        with self.assertRaises(AppException) as ctx:
+            self.repo.stock_out("p1", 5)
+
+        self.assertEqual(ctx.exception.status_code, 404)
+
+    def test_stock_out_failure(self):
+        self.mock_table.update_item.side_effect = ddb_tx_error("InternalServerError")
+
         with self.assertRaises(AppException) as ctx:
             self.repo.stock_out("p1", 5)
 
         self.assertEqual(ctx.exception.error_code, "STOCK_OUT_FAILED")
 
+    def test_apply_stock_deltas_packs_transactions(self):
+        deltas = {f"p{i}": 1 for i in range(60)}
+        deltas["p0"] = 0
+
+        failures = self.repo.apply_stock_deltas(deltas)
+
+        self.assertEqual(failures, {})
+        calls = self.mock_ddb_client.transact_write_items.call_args_list
+        self.assertEqual(len(calls), 2)
+        first = calls[0][1]["TransactItems"]
+        self.assertEqual(len(first), 99)
+        self.assertIn("ConditionCheck", first[0])
+        self.assertEqual(len(calls[1][1]["TransactItems"]), 20)
+
+    def test_apply_stock_deltas_drops_failed_products(self):
+        error = ddb_tx_error("TransactionCanceledException")
+        error.response["CancellationReasons"] = [
+            {"Code": "ConditionalCheckFailed", "Item": {"quantity": {"N": "1"}}},
+            {"Code": "None"},
+            {"Code": "None"},
+            {"Code": "None"},
+            {"Code": "ConditionalCheckFailed"},
+            {"Code": "None"},
+        ]
+        self.mock_ddb_client.transact_write_items.side_effect = [error, {}]
+
+        failures = self.repo.apply_stock_deltas({"p1": -5, "p2": 3, "p3": -1})
+
+        self.assertEqual(
+            failures, {"p1": "INSUFFICIENT_STOCK", "p3": "PRODUCT_NOT_FOUND"}
+        )
+        retry = self.mock_ddb_client.transact_write_items.call_args[1]["TransactItems"]
+        self.assertEqual(len(retry), 2)
+        self.assertEqual(retry[0]["Update"]["Key"]["pk"], "PRODUCT#p2")
+        self.assertEqual(
+            retry[0]["Update"]["ConditionExpression"],
+            "attribute_exists(pk) AND attribute_not_exists(stock_shards)",
+        )
+
+    @patch("app.repository.product_repository.time.sleep")
+    def test_apply_stock_deltas_gives_up_on_conflicts(self, _):
+        error = ddb_tx_error("TransactionCanceledException")
+        error.response["CancellationReasons"] = [
+            {"Code": "TransactionConflict"},
+            {"Code": "None"},
+        ]
+        self.mock_ddb_client.transact_write_items.side_effect = error
+
+        failures = self.repo.apply_stock_deltas({"p1": 2})
+
+        self.assertEqual(failures, {"p1": "STOCK_UPDATE_CONFLICT"})
+
+    def shard_items(self, *quantities):
+        return {
+            "Responses": {
+                "test-table": [
+                    {"pk": f"PRODUCT#p1#STOCK#{shard}", "sk": "STOCK", "quantity": q}
+                    for shard, q in enumerate(quantities)
+                ]
+            }
+        }
+
+    def sharded_meta(self, shards=2):
+        return {
+            "Item": {
+                "id": "p1",
+                "name": "Item",
+                "price": Decimal("10"),
+                "quantity": Decimal("0"),
+                "category": "CAT",
+                "stock_shards": Decimal(str(shards)),
+            }
+        }
+
+    def test_get_product_by_id_sums_stock_shards(self):
+        self.mock_table.get_item.return_value = self.sharded_meta()
+        self.mock_ddb_client.batch_get_item.return_value = self.shard_items(4, 6)
+
+        product = self.repo.get_product_by_id("p1")
+
+        self.assertEqual(product.quantity, 10)
+        keys = self.mock_ddb_client.batch_get_item.call_args[1]["RequestItems"][
+            "test-table"
+        ]["Keys"]
+        self.assertEqual(keys[1], {"pk": "PRODUCT#p1#STOCK#1", "sk": "STOCK"})
+
+    @patch("app.repository.product_repository.random.randrange", return_value=1)
+    def test_stock_in_discovers_sharded_product(self, _):
+        error = ddb_tx_error("ConditionalCheckFailedException")
+        error.response["Item"] = {"quantity": {"N": "0"}, "stock_shards": {"N": "2"}}
+        self.mock_table.update_item.side_effect = [error, {}]
+        self.mock_table.get_item.return_value = self.sharded_meta()
+        self.mock_ddb_client.batch_get_item.return_value = self.shard_items(4, 9)
+
+        product = self.repo.stock_in("p1", 3)
+
+        self.assertEqual(product.quantity, 13)
+        shard_call = self.mock_table.update_item.call_args_list[1][1]
+        self.assertEqual(shard_call["Key"], {"pk": "PRODUCT#p1#STOCK#1", "sk": "STOCK"})
+        self.mock_ddb_client.transact_write_items.assert_not_called()
+
+    @patch("app.repository.product_repository.random.randrange", return_value=0)
+    def test_stock_out_borrows_across_shards(self, _):
+        self.repo._known_stock_shards = lambda product_id: 3
+        error = ddb_tx_error("ConditionalCheckFailedException")
+        error.response["Item"] = {"quantity": {"N": "1"}}
+        self.mock_table.update_item.side_effect = error
+        self.mock_table.get_item.return_value = self.sharded_meta(3)
+        self.mock_ddb_client.batch_get_item.side_effect = [
+            self.shard_items(1, 5, 3),
+            self.shard_items(1, 0, 1),
+        ]
+
+        product = self.repo.stock_out("p1", 7)
+
+        self.assertEqual(product.quantity, 2)
+        actions = self.mock_ddb_client.transact_write_items.call_args[1][
+            "TransactItems"
+        ]
+        takes = {
+            action["Update"]["Key"]["pk"]: action["Update"][
+                "ExpressionAttributeValues"
+            ][":need"]
+            for action in actions
+        }
+        self.assertEqual(
+            takes, {"PRODUCT#p1#STOCK#1": Decimal("5"), "PRODUCT#p1#STOCK#2": 2}
+        )
+
+    @patch("app.repository.product_repository.random.randrange", return_value=0)
+    def test_stock_out_sharded_insufficient_stock(self, _):
+        self.repo._known_stock_shards = lambda product_id: 2
+        error = ddb_tx_error("ConditionalCheckFailedException")
+        error.response["Item"] = {"quantity": {"N": "1"}}
+        self.mock_table.update_item.side_effect = error
+        self.mock_ddb_client.batch_get_item.return_value = self.shard_items(1, 2)
+
+        with self.assertRaises(AppException) as ctx:
+            self.repo.stock_out("p1", 5)
+
+        self.assertEqual(ctx.exception.error_code, "INSUFFICIENT_STOCK")
+        self.assertEqual(ctx.exception.details, {"available_stock": 3})
+
+    def test_set_stock_shards_spreads_quantity(self):
+        self.mock_table.get_item.return_value = {
+            "Item": {
+                "id": "p1",
+                "name": "Item",
+                "price": Decimal("10"),
+                "quantity": Decimal("10"),
+                "category": "CAT",
+            }
+        }
+
+        product = self.repo.set_stock_shards("p1", 3)
+
+        self.assertEqual(product.stock_shards, 3)
+        self.assertEqual(product.quantity, 10)
+        actions = self.mock_ddb_client.transact_write_items.call_args[1][
+            "TransactItems"
+        ]
+        self.assertEqual(product.version, 1)
+        self.assertEqual(
+            actions[0]["Update"]["ConditionExpression"],
+            "attribute_exists(pk) AND attribute_not_exists(version)",
+        )
+        self.assertEqual(
+            actions[1]["Update"]["ExpressionAttributeValues"][":version"], 1
+        )
+        self.assertEqual(
+            [action["Put"]["Item"]["quantity"] for action in actions[2:]], [4, 3, 3]
+        )
+
+    @patch("app.repository.product_repository.time.sleep")
+    def test_set_stock_shards_retries_on_conflict(self, mock_sleep):
+        self.mock_table.get_item.side_effect = [
+            {"Item": product_item(version=Decimal("3"))},
+            {"Item": product_item(version=Decimal("4"))},
+        ]
+        self.mock_ddb_client.transact_write_items.side_effect = [
+            ddb_tx_error("TransactionCanceledException"),
+            None,
+        ]
+
+        product = self.repo.set_stock_shards("p1", 2)
+
+        self.assertEqual(product.version, 5)
+        mock_sleep.assert_called_once()
+        meta = self.mock_ddb_client.transact_write_items.call_args[1]["TransactItems"][
+            0
+        ]["Update"]
+        self.assertEqual(meta["ExpressionAttributeValues"][":expected"], 4)
+
+    def test_set_stock_shards_collapses(self):
+        self.mock_table.get_item.return_value = self.sharded_meta()
+        self.mock_ddb_client.batch_get_item.return_value = self.shard_items(4, 6)
+
+        product = self.repo.set_stock_shards("p1", 1)
+
+        self.assertIsNone(product.stock_shards)
+        self.assertEqual(product.quantity, 10)
+        actions = self.mock_ddb_client.transact_write_items.call_args[1][
+            "TransactItems"
+        ]
+        self.assertEqual(
+            actions[0]["Update"]["UpdateExpression"],
+            "SET quantity = :total REMOVE stock_shards ADD version :one",
+        )
+        self.assertEqual(
+            [action["Delete"]["ExpressionAttributeValues"] for action in actions[2:]],
+            [{":seen": 4}, {":seen": 6}],
+        )
+
+    def test_set_stock_shards_conflict(self):
+        self.mock_table.get_item.return_value = self.sharded_meta()
+        self.mock_ddb_client.batch_get_item.return_value = self.shard_items(4, 6)
+        self.mock_ddb_client.transact_write_items.side_effect = ddb_tx_error(
+            "TransactionCanceledException"
+        )
+
+        with self.assertRaises(AppException) as ctx:
+            self.repo.set_stock_shards("p1", 4)
+
+        self.assertEqual(ctx.exception.error_code, "STOCK_UPDATE_CONFLICT")
+
+    @patch("app.repository.product_repository.random.randrange", return_value=0)
+    def test_apply_stock_deltas_routes_sharded_products(self, _):
+        error = ddb_tx_error("TransactionCanceledException")
+        error.response["CancellationReasons"] = [
+            {
+                "Code": "ConditionalCheckFailed",
+                "Item": {"quantity": {"N": "0"}, "stock_shards": {"N": "2"}},
+            },
+            {"Code": "None"},
+        ]
+        self.mock_ddb_client.transact_write_items.side_effect = error
+        error = ddb_tx_error("ConditionalCheckFailedException")
+        error.response["Item"] = {"quantity": {"N": "0"}, "stock_shards": {"N": "2"}}
+        self.mock_table.update_item.side_effect = [error, {}]
+        self.mock_table.get_item.return_value = self.sharded_meta()
+        self.mock_ddb_client.batch_get_item.return_value = self.shard_items(1, 1)
+
+        failures = self.repo.apply_stock_deltas({"p1": 2})
+
+        self.assertEqual(failures, {})
+        self.assertEqual(
+            self.mock_table.update_item.call_args[1]["Key"]["pk"], "PRODUCT#p1#STOCK#0"
+        )
+
     def test_update_low_stock_alert_success(self):
+        self.mock_table.update_item.return_value = {
+            "Attributes": product_item(version=Decimal("4"), low_stock_alert_sent=True)
+        }
+
+        version = self.repo.update_low_stock_alert_sent("p1", True)
+
+        self.assertEqual(version, 4)
+        meta_call, listing_call = self.mock_table.update_item.call_args_list
+        self.assertTrue(meta_call[1]["UpdateExpression"].endswith("ADD version :one"))
+        self.assertEqual(listing_call[1]["ExpressionAttributeValues"][":version"], 4)
+        self.mock_ddb_client.transact_write_items.assert_not_called()
+
+    def test_update_low_stock_alert_indexes_meta_only(self):
+        self.mock_table.update_item.return_value = {"Attributes": product_item()}
+
         self.repo.update_low_stock_alert_sent("p1", True)
 
-        self.mock_ddb_client.transact_write_items.assert_called_once()
+        meta, listing = [call[1] for call in self.mock_table.update_item.call_args_list]
+        self.assertIn("low_stock_key = :low_stock_key", meta["UpdateExpression"])
+        self.assertEqual(
+            meta["ExpressionAttributeValues"][":low_stock_key"], "LOW_STOCK"
+        )
+        self.assertNotIn("low_stock_key", listing["UpdateExpression"])
+
+    def test_clear_low_stock_alert_removes_index_key(self):
+        self.mock_table.update_item.return_value = {"Attributes": product_item()}
+
+        self.repo.update_low_stock_alert_sent("p1", False)
+
+        meta = self.mock_table.update_item.call_args_list[0][1]
+        self.assertIn("REMOVE low_stock_key", meta["UpdateExpression"])
+        self.assertEqual(meta["ExpressionAttributeValues"], {":sent": False, ":one": 1})
+
+    def test_get_low_stock_products_page(self):
+        item = {
+            "id": "p1",
+            "name": "Item1",
+            "price": 10,
+            "quantity": 1,
+            "category": "C",
+        }
+        self.mock_table.query.return_value = {"Items": [item]}
+
+        products, cursor = self.repo.get_low_stock_products_page(10)
+
+        self.assertEqual(products[0].id, "p1")
+        self.assertIsNone(cursor)
+        kwargs = self.mock_table.query.call_args[1]
+        self.assertEqual(kwargs["IndexName"], "low-stock-index")
+        self.assertEqual(
+            kwargs["ExpressionAttributeValues"], {":low_stock_key": "LOW_STOCK"}
+        )
 
     def test_update_low_stock_alert_not_found(self):
-        self.mock_ddb_client.transact_write_items.side_effect = ddb_tx_error(
-            "TransactionCanceledException"
+        self.mock_table.update_item.side_effect = ddb_tx_error(
+            "ConditionalCheckFailedException"
         )
 
         with self.assertRaises(AppException) as ctx:
@@ -167,29 +888,175 @@ class TestProductRepository(unittest.TestCase):
         self.assertEqual(exc.status_code, 404)
         self.assertEqual(exc.error_code, "PRODUCT_NOT_FOUND")
 
-    def test_update_low_stock_alert_failure(self):
-        self.mock_ddb_client.transact_write_items.side_effect = ddb_tx_error(
-            "InternalServerError"
+    def test_update_low_stock_alert_version_mismatch(self):
+        error = ddb_tx_error("ConditionalCheckFailedException")
+        error.response["Item"] = {"pk": {"S": "PRODUCT#p1"}, "version": {"N": "7"}}
+        self.mock_table.update_item.side_effect = error
+
+        with self.assertRaises(AppException) as ctx:
+            self.repo.update_low_stock_alert_sent("p1", True, expected_version=6)
+
+        exc = ctx.exception
+        self.assertEqual(exc.status_code, 412)
+        self.assertEqual(exc.error_code, "VERSION_MISMATCH")
+        self.assertEqual(exc.details["current_version"], 7)
+        call = self.mock_table.update_item.call_args[1]
+        self.assertEqual(
+            call["ConditionExpression"], "attribute_exists(pk) AND version = :expected"
         )
+        self.assertEqual(call["ExpressionAttributeValues"][":expected"], 6)
+
+    def test_update_low_stock_alert_failure(self):
+        self.mock_table.update_item.side_effect = ddb_tx_error("InternalServerError")
 
         with self.assertRaises(AppException) as ctx:
             self.repo.update_low_stock_alert_sent("p1", True)
 
         self.assertEqual(ctx.exception.error_code, "DATABASE_ERROR")
 
+    def test_projector_mode_writes_only_meta(self):
+        self.repo.dual_write_listing = False
+        product = Product(id="p1", name="Pen", price=1, quantity=1, category="C")
+        self.mock_table.update_item.return_value = {"Attributes": product_item()}
+        self.mock_table.get_item.return_value = {"Item": product_item()}
+
+        self.repo.save_product(product)
+        self.repo.update_low_stock_alert_sent("p1", True)
+        self.repo.delete_product("p1")
+
+        self.mock_ddb_client.transact_write_items.assert_not_called()
+        self.mock_ddb_client.batch_write_item.assert_not_called()
+        self.mock_table.put_item.assert_called_once()
+        self.assertEqual(
+            self.mock_table.put_item.call_args[1]["Item"]["pk"], "PRODUCT#p1"
+        )
+        self.mock_table.update_item.assert_called_once()
+        self.assertEqual(self.mock_table.update_item.call_args[1]["Key"]["sk"], "META")
+        self.assertEqual(self.mock_table.delete_item.call_args[1]["Key"]["sk"], "META")
+
+    def test_projector_mode_save_product_already_exists(self):
+        self.repo.dual_write_listing = False
+        self.mock_table.put_item.side_effect = ddb_tx_error(
+            "ConditionalCheckFailedException"
+        )
+        product = Product(id="p1", name="Pen", price=1, quantity=1, category="C")
+
+        with self.assertRaises(AppException) as ctx:
+            self.repo.save_product(product)
+
+        self.assertEqual(ctx.exception.error_code, "PRODUCT_ALREADY_EXISTS")
+
+    def test_projector_mode_stock_in_skips_listing(self):
+        self.repo.dual_write_listing = False
+        self.mock_table.update_item.return_value = {
+            "Attributes": {
+                "id": "p1",
+                "name": "Pen",
+                "price": 1,
+                "quantity": 2,
+                "category": "C",
+            }
+        }
+
+        self.repo.stock_in("p1", 1)
+
+        self.mock_table.update_item.assert_called_once()
+
     def test_delete_product_success(self):
+        self.mock_table.get_item.return_value = {"Item": product_item()}
+
         self.repo.delete_product("p1")
 
-        self.mock_ddb_client.transact_write_items.assert_called_once()
+        actions = self.mock_ddb_client.transact_write_items.call_args[1][
+            "TransactItems"
+        ]
+        self.assertEqual(
+            [action["Delete"]["Key"]["pk"] for action in actions],
+            ["PRODUCT#p1", "PRODUCTS"],
+        )
+        self.assertEqual(
+            actions[0]["Delete"]["ConditionExpression"],
+            "attribute_exists(pk) AND attribute_not_exists(stock_shards)",
+        )
+        self.assertTrue(self.mock_table.get_item.call_args[1]["ConsistentRead"])
+        self.mock_table.delete_item.assert_not_called()
 
-    def test_delete_product_not_found(self):
+    def test_delete_product_removes_stock_shards_in_same_transaction(self):
+        self.mock_table.get_item.return_value = {
+            "Item": product_item(stock_shards=Decimal("2"))
+        }
+
+        self.repo.delete_product("p1")
+
+        actions = self.mock_ddb_client.transact_write_items.call_args[1][
+            "TransactItems"
+        ]
+        self.assertEqual(
+            [action["Delete"]["Key"]["pk"] for action in actions],
+            ["PRODUCT#p1", "PRODUCTS", "PRODUCT#p1#STOCK#0", "PRODUCT#p1#STOCK#1"],
+        )
+        meta_delete = actions[0]["Delete"]
+        self.assertEqual(
+            meta_delete["ConditionExpression"],
+            "attribute_exists(pk) AND stock_shards = :shards",
+        )
+        self.assertEqual(meta_delete["ExpressionAttributeValues"], {":shards": 2})
+        self.mock_ddb_client.batch_write_item.assert_not_called()
+
+    @patch("app.repository.product_repository.time.sleep")
+    def test_delete_product_retries_when_layout_changes(self, _sleep):
+        self.mock_table.get_item.side_effect = [
+            {"Item": product_item()},
+            {"Item": product_item(stock_shards=Decimal("2"))},
+        ]
+        error = ddb_tx_error("TransactionCanceledException")
+        self.mock_ddb_client.transact_write_items.side_effect = [error, {}]
+
+        self.repo.delete_product("p1")
+
+        last = self.mock_ddb_client.transact_write_items.call_args[1]["TransactItems"]
+        self.assertEqual(len(last), 4)
+
+    def test_delete_product_failure_leaves_product_retryable(self):
+        self.mock_table.get_item.return_value = {"Item": product_item()}
         self.mock_ddb_client.transact_write_items.side_effect = ddb_tx_error(
-            "TransactionCanceledException"
+            "ProvisionedThroughputExceededException"
         )
 
+        with self.assertRaises(AppException) as ctx:
+            self.repo.delete_product("p1")
+
+        self.assertEqual(ctx.exception.error_code, "DATABASE_ERROR")
+        self.mock_table.delete_item.assert_not_called()
+
+    def test_delete_product_if_match_mismatch(self):
+        self.mock_table.get_item.return_value = {"Item": product_item()}
+
+        with self.assertRaises(AppException) as ctx:
+            self.repo.delete_product("p1", expected_version=0)
+
+        exc = ctx.exception
+        self.assertEqual(exc.status_code, 412)
+        self.assertEqual(exc.details["current_version"], 1)
+        self.mock_ddb_client.transact_write_items.assert_not_called()
+
+    def test_delete_product_guards_expected_version(self):
+        self.mock_table.get_item.return_value = {"Item": product_item()}
+
+        self.repo.delete_product("p1", expected_version=1)
+
+        meta_delete = self.mock_ddb_client.transact_write_items.call_args[1][
+            "TransactItems"
+        ][0]["Delete"]
+        self.assertIn("version = :expected", meta_delete["ConditionExpression"])
+
+    def test_delete_product_not_found(self):
+        self.mock_table.get_item.return_value = {}
+
         with self.assertRaises(AppException) as ctx:
             self.repo.delete_product("p1")
 
         exc = ctx.exception
         self.assertEqual(exc.status_code, 404)
         self.assertEqual(exc.error_code, "PRODUCT_NOT_FOUND")
+        self.mock_ddb_client.transact_write_items.assert_not_called()
@@ -0,0 +1,137 @@
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
+
+from botocore.exceptions import ClientError
+
+from app.repository.stock_ledger_repository import (
+    StockLedgerRepository,
+    ledger_entry_item,
+)
+
+
+def entry(sk: str, delta: int) -> dict:
+    return {
+        "pk": "LEDGER#p1",
+        "sk": sk,
+        "product_id": "p1",
+        "delta": delta,
+        "reason": "stock_in",
+        "recorded_at": sk.split("#")[0],
+    }
+
+
+class TestStockLedgerRepository(unittest.TestCase):
+    def setUp(self):
+        self.mock_table = MagicMock()
+        self.mock_ddb_client = MagicMock()
+        self.mock_table.meta.client = self.mock_ddb_client
+        self.mock_table.name = "test-table"
+
+        self.repo = StockLedgerRepository(table=self.mock_table)
+
+    def test_entry_sort_key_is_utc_timestamp(self):
+        item = ledger_entry_item(
+            "p1", -2, "stock_out", datetime(2026, 1, 2, 3, 4, 5), "abc"
+        )
+
+        self.assertEqual(item["pk"], "LEDGER#p1")
+        self.assertEqual(item["sk"], "2026-01-02T03:04:05.000000+00:00#abc")
+
+    def test_append_entries_returns_unprocessed(self):
+        items = [entry(f"2026-01-01T00:00:{i:02d}#x", 1) for i in range(30)]
+        leftover = {"PutRequest": {"Item": items[0]}}
+        self.mock_ddb_client.batch_write_item.side_effect = [
+            {},
+            *[{"UnprocessedItems": {"test-table": [leftover]}}] * 5,
+        ]
+
+        unprocessed = self.repo.append_entries(items)
+
+        self.assertEqual(unprocessed, [items[0]])
+        first = self.mock_ddb_client.batch_write_item.call_args_list[0][1]
+        self.assertEqual(len(first["RequestItems"]["test-table"]), 25)
+
+    def test_append_entries_returns_what_a_failed_call_left(self):
+        items = [entry(f"2026-01-01T00:00:{i:02d}#x", 1) for i in range(2)]
+        leftover = {"PutRequest": {"Item": items[1]}}
+        self.mock_ddb_client.batch_write_item.side_effect = [
+            {"UnprocessedItems": {"test-table": [leftover]}},
+            ClientError({"Error": {"Code": "InternalServerError"}}, "BatchWriteItem"),
+        ]
+
+        with patch("app.repository.stock_ledger_repository.time.sleep"):
+            unprocessed = self.repo.append_entries(items)
+
+        self.assertEqual(unprocessed, [items[1]])
+
+    def test_get_movements_page_newest_first(self):
+        self.mock_table.query.return_value = {
+            "Items": [entry("2026-01-01T00:00:02.000000+00:00#b", 3)],
+            "LastEvaluatedKey": {"pk": "LEDGER#p1", "sk": "x"},
+        }
+
+        entries, cursor = self.repo.get_movements_page(
+            "p1", 1, since=datetime(2026, 1, 1, tzinfo=timezone.utc)
+        )
+
+        self.assertEqual(entries[0].delta, 3)
+        self.assertIsNotNone(cursor)
+        kwargs = self.mock_table.query.call_args[1]
+        self.assertFalse(kwargs["ScanIndexForward"])
+        self.assertEqual(
+            kwargs["ExpressionAttributeValues"],
+            {
+                ":pk": "LEDGER#p1",
+                ":lower": "2026-01-01T00:00:00.000000+00:00",
+                ":upper": "9",
+            },
+        )
+
+    def test_ledger_quantity_is_snapshot_plus_tail(self):
+        self.mock_table.get_item.return_value = {
+            "Item": {"quantity": 10, "as_of": "2026-01-01T00:00:00.000000+00:00#a"}
+        }
+        self.mock_table.query.return_value = {
+            "Items": [
+                entry("2026-01-02T00:00:00.000000+00:00#b", -3),
+                entry("2026-01-03T00:00:00.000000+00:00#c", 5),
+                {"pk": "LEDGER#p1", "sk": "SNAPSHOT", "quantity": 10},
+            ]
+        }
+
+        self.assertEqual(self.repo.ledger_quantity("p1"), 12)
+
+    def test_compact_folds_entries_before_cutoff(self):
+        self.mock_table.get_item.return_value = {}
+        self.mock_table.query.return_value = {
+            "Items": [
+                entry("2026-01-02T00:00:00.000000+00:00#b", 4),
+                entry("2026-01-05T00:00:00.000000+00:00#c", 5),
+            ]
+        }
+
+        folded = self.repo.compact("p1", datetime(2026, 1, 3, tzinfo=timezone.utc))
+
+        self.assertTrue(folded)
+        kwargs = self.mock_table.put_item.call_args[1]
+        self.assertEqual(kwargs["Item"]["quantity"], 4)
+        self.assertEqual(kwargs["Item"]["as_of"], "2026-01-02T00:00:00.000000+00:00#b")
+        self.assertEqual(kwargs["ExpressionAttributeValues"], {":as_of": ""})
+
+    def test_compact_lost_race_is_ignored(self):
+        self.mock_table.get_item.return_value = {}
+        self.mock_table.query.return_value = {
+            "Items": [entry("2026-01-02T00:00:00.000000+00:00#b", 4)]
+        }
+        self.mock_table.put_item.side_effect = ClientError(
+            {"Error": {"Code": "ConditionalCheckFailedException"}}, "PutItem"
+        )
+
+        self.assertFalse(
+            self.repo.compact("p1", datetime(2026, 1, 3, tzinfo=timezone.utc))
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.app_exception.app_exception import AppException
+from app.app import app_exception_handler
+from app.dependencies import get_current_user
+from app.dto.category_response import CategoryResponse
+from app.models.user_group import UserGroup
+from app.routes.async_category import mount_async_category_routes
+from app.routes.category import category_router
+from app.services.async_category_service import get_async_category_service
+
+
+class TestAsyncCategoryRoutes(unittest.TestCase):
+    def setUp(self):
+        self.app = FastAPI()
+        self.app.add_exception_handler(AppException, app_exception_handler)
+        self.app.include_router(category_router)
+        mount_async_category_routes(self.app)
+        self.client = TestClient(self.app)
+
+        self.service = MagicMock()
+        for method in (
+            "create_category",
+            "get_category_by_name",
+            "get_all_category",
+            "update_threshold",
+            "delete_category",
+        ):
+            setattr(self.service, method, AsyncMock())
+        self.app.dependency_overrides[get_async_category_service] = lambda: self.service
+        self.app.dependency_overrides[get_current_user] = lambda: {
+            "sub": "test-user",
+            "cognito:groups": [UserGroup.MANAGER],
+        }
+
+    def test_get_category_by_name(self):
+        self.service.get_category_by_name.return_value = CategoryResponse(
+            name="CAT", description=None, default_threshold=5
+        )
+
+        response = self.client.get("/category/", params={"name": "CAT"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["data"]["default_threshold"], 5)
+        self.service.get_category_by_name.assert_awaited_once_with("CAT")
+
+    def test_missing_category_maps_to_404(self):
+        self.service.get_category_by_name.side_effect = AppException(
+            message="Category CAT not found",
+            error_code="CATEGORY_NOT_FOUND",
+            status_code=404,
+        )
+
+        response = self.client.get("/category/", params={"name": "CAT"})
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_staff_is_rejected(self):
+        self.app.dependency_overrides[get_current_user] = lambda: {
+            "sub": "test-user",
+            "cognito:groups": [UserGroup.STAFF],
+        }
+
+        response = self.client.delete("/category/CAT")
+
+        self.assertEqual(response.status_code, 403)
+        self.service.delete_category.assert_not_awaited()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.app_exception.app_exception import AppException
+from app.app import app_exception_handler
+from app.dependencies import get_current_user
+from app.dto.page_response import PageResponse
+from app.models.products import Product
+from app.models.user_group import UserGroup
+from app.routes.async_products import mount_async_product_routes
+from app.routes.products import products_router
+from app.services.async_product_service import get_async_product_service
+
+PRODUCT = Product(id="p1", name="Item", price=1, quantity=4, category="C", version=3)
+
+
+class TestAsyncProductRoutes(unittest.TestCase):
+    def setUp(self):
+        self.app = FastAPI()
+        self.app.add_exception_handler(AppException, app_exception_handler)
+        self.app.include_router(products_router)
+        mount_async_product_routes(self.app)
+        self.client = TestClient(self.app)
+
+        self.service = MagicMock()
+        for method in (
+            "get_product_by_id",
+            "get_products_page",
+            "get_low_stock_products",
+            "stock_in",
+            "stock_out",
+        ):
+            setattr(self.service, method, AsyncMock())
+        self.app.dependency_overrides[get_async_product_service] = lambda: self.service
+        self.app.dependency_overrides[get_current_user] = lambda: {
+            "sub": "test-user",
+            "cognito:groups": [UserGroup.MANAGER, UserGroup.STAFF],
+        }
+
+    def test_routes_are_mounted_once_in_front(self):
+        mount_async_product_routes(self.app)
+
+        stock_out = [
+            route
+            for route in self.app.router.routes
+            if route.path == "/products/stockout"
+        ]
+        self.assertEqual(len(stock_out), 2)
+        self.assertEqual(stock_out[0].endpoint.__module__, "app.routes.async_products")
+
+    def test_get_product_by_id(self):
+        self.service.get_product_by_id.return_value = PRODUCT
+
+        response = self.client.get(
+            "/products/", params={"product_id": "p1", "consistent_read": "true"}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["ETag"], '"3"')
+        self.service.get_product_by_id.assert_awaited_once_with("p1", True)
+
+    def test_unpaged_listing_streams_from_the_loop(self):
+        async def products():
+            yield PRODUCT
+            yield PRODUCT.model_copy(update={"id": "p2"})
+
+        self.service.iter_products = products
+
+        response = self.client.get("/products/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p["id"] for p in response.json()["data"]], ["p1", "p2"])
+
+    def test_get_products_page(self):
+        self.service.get_products_page.return_value = PageResponse[Product](
+            items=[PRODUCT], next_cursor="next"
+        )
+
+        response = self.client.get("/products/", params={"limit": 1})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["data"]["next_cursor"], "next")
+        self.service.get_products_page.assert_awaited_once_with(1, None)
+
+    def test_stock_out_passes_if_match(self):
+        self.service.stock_out.return_value = PRODUCT
+
+        response = self.client.patch(
+            "/products/stockout",
+            json={"product_id": "p1", "quantity": 1},
+            headers={"If-Match": '"2"'},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["ETag"], '"3"')
+        req, expected_version = self.service.stock_out.await_args.args
+        self.assertEqual(req.product_id, "p1")
+        self.assertEqual(expected_version, 2)
+
+    def test_errors_map_to_app_exception_responses(self):
+        self.service.stock_in.side_effect = AppException(
+            message="Product not found",
+            status_code=404,
+            error_code="PRODUCT_NOT_FOUND",
+        )
+
+        response = self.client.patch(
+            "/products/stockin", json={"product_id": "p1", "quantity": 1}
+        )
+
+        self.assertEqual(response.status_code, 404)
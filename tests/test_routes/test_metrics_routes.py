@@ -0,0 +1,56 @@
+import asyncio
+import unittest
+from unittest.mock import MagicMock
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.app import app
+from app.metrics.instruments import HTTP_REQUESTS
+from app.routes.metrics import metrics_router
+
+
+class TestMetricsRoutes(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.client = TestClient(app)
+
+    def test_metrics_are_exposed_in_prometheus_format(self):
+        before = HTTP_REQUESTS.samples().get(("GET", "/health", "200"), 0)
+        self.client.get("/health")
+        self.client.get("/no-such-route")
+
+        response = self.client.get("/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/plain"))
+        self.assertIn("# TYPE http_request_duration_seconds histogram", response.text)
+        self.assertIn(
+            'http_requests_total{method="GET",route="unmatched",status="404"}',
+            response.text,
+        )
+        self.assertEqual(HTTP_REQUESTS.samples()[("GET", "/health", "200")], before + 1)
+
+    def test_worker_files_are_read_off_the_event_loop(self):
+        on_loop = []
+
+        def collect():
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+            return {}
+
+        metrics_app = FastAPI()
+        metrics_app.include_router(metrics_router)
+        metrics_app.state.metrics_store = MagicMock(collect=collect)
+
+        response = TestClient(metrics_app).get("/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(on_loop, [False])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,6 +3,8 @@ from unittest.mock import MagicMock
 from fastapi.testclient import TestClient
 
 from app.app import app
+from app.dto.page_response import PageResponse
+from app.models.products import Product
 from app.models.user_group import UserGroup
 from app.services.product_service import ProductService
 from app.dependencies import get_current_user
@@ -52,10 +54,12 @@ class TestProductRoutes(unittest.TestCase):
         self.mock_product_service.create_product.assert_called_once()
 
     def test_get_all_products(self):
-        self.mock_product_service.get_all_products.return_value = [
-            {"id": "p1", "name": "Item 1"},
-            {"id": "p2", "name": "Item 2"},
-        ]
+        self.mock_product_service.iter_products.return_value = iter(
+            [
+                Product(id="p1", name="Item 1", price=1, quantity=1, category="C"),
+                Product(id="p2", name="Item 2", price=2, quantity=2, category="C"),
+            ]
+        )
 
         response = self.client.get("/products/")
 
@@ -64,31 +68,165 @@ class TestProductRoutes(unittest.TestCase):
         body = response.json()
         self.assertEqual(body["message"], "Products found")
         self.assertEqual(len(body["data"]), 2)
+        self.assertEqual(body["data"][1]["id"], "p2")
 
-        self.mock_product_service.get_all_products.assert_called_once()
+        self.mock_product_service.iter_products.assert_called_once()
 
-    def test_get_product_by_id(self):
-        self.mock_product_service.get_product_by_id.return_value = {
-            "id": "p1",
-            "name": "Item 1",
+    def test_get_all_products_empty(self):
+        self.mock_product_service.iter_products.return_value = iter([])
+
+        response = self.client.get("/products/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["data"], [])
+
+    def test_get_products_page(self):
+        self.mock_product_service.get_products_page.return_value = PageResponse[
+            Product
+        ](
+            items=[Product(id="p1", name="Item 1", price=1, quantity=1, category="C")],
+            next_cursor="abc",
+        )
+
+        response = self.client.get("/products/?limit=1")
+
+        self.assertEqual(response.status_code, 200)
+
+        body = response.json()
+        self.assertEqual(len(body["data"]["items"]), 1)
+        self.assertEqual(body["data"]["next_cursor"], "abc")
+
+        self.mock_product_service.get_products_page.assert_called_once_with(1, None)
+
+    def test_get_products_by_category(self):
+        self.mock_product_service.get_products_by_category.return_value = {
+            "items": [{"id": "p1"}],
+            "next_cursor": None,
+        }
+
+        response = self.client.get("/products/?category=STATIONERY")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["data"]["items"], [{"id": "p1"}])
+        self.mock_product_service.get_products_by_category.assert_called_once_with(
+            "STATIONERY", 50, None
+        )
+        self.mock_product_service.iter_products.assert_not_called()
+
+    def test_get_low_stock_products(self):
+        self.mock_product_service.get_low_stock_products.return_value = {
+            "items": [{"id": "p1"}],
+            "next_cursor": "abc",
+        }
+
+        response = self.client.get("/products/low-stock?limit=10")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["data"]["next_cursor"], "abc")
+        self.mock_product_service.get_low_stock_products.assert_called_once_with(
+            10, None
+        )
+
+    def test_get_stock_movements(self):
+        self.mock_product_service.get_stock_movements.return_value = {
+            "items": [{"product_id": "p1", "delta": -2}],
+            "next_cursor": None,
         }
 
+        response = self.client.get(
+            "/products/p1/movements?limit=5&since=2026-01-01T00:00:00Z"
+        )
+
+        self.assertEqual(response.status_code, 200)
+        args = self.mock_product_service.get_stock_movements.call_args[0]
+        self.assertEqual(args[:3], ("p1", 5, None))
+        self.assertEqual(args[3].year, 2026)
+
+    def test_get_products_page_rejects_invalid_limit(self):
+        response = self.client.get("/products/?limit=0")
+
+        self.assertEqual(response.status_code, 422)
+
+    def test_get_product_by_id(self):
+        self.mock_product_service.get_product_by_id.return_value = Product(
+            id="p1", name="Item 1", price=1, quantity=1, category="C", version=3
+        )
+
         response = self.client.get("/products/?product_id=p1")
 
         self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["ETag"], '"3"')
 
         body = response.json()
         self.assertEqual(body["message"], "Product found")
         self.assertEqual(body["data"]["id"], "p1")
 
-        self.mock_product_service.get_product_by_id.assert_called_once_with("p1")
+        self.mock_product_service.get_product_by_id.assert_called_once_with("p1", False)
 
-    def test_stock_in_success(self):
-        self.mock_product_service.stock_in.return_value = {
-            "id": "p1",
-            "quantity": 15,
+    def test_get_product_by_id_consistent_read(self):
+        self.mock_product_service.get_product_by_id.return_value = Product(
+            id="p1", name="Item 1", price=1, quantity=1, category="C"
+        )
+
+        response = self.client.get("/products/?product_id=p1&consistent_read=true")
+
+        self.assertEqual(response.status_code, 200)
+        self.mock_product_service.get_product_by_id.assert_called_once_with("p1", True)
+
+    def test_batch_get_products(self):
+        self.mock_product_service.batch_get_products.return_value = {
+            "products": [{"id": "p1", "name": "Item 1"}],
+            "missing_ids": ["p2"],
         }
 
+        response = self.client.post(
+            "/products/batch-get", json={"product_ids": ["p1", "p2"]}
+        )
+
+        self.assertEqual(response.status_code, 200)
+
+        body = response.json()
+        self.assertEqual(body["data"]["missing_ids"], ["p2"])
+        req = self.mock_product_service.batch_get_products.call_args[0][0]
+        self.assertEqual(req.product_ids, ["p1", "p2"])
+
+    def test_batch_get_products_requires_ids(self):
+        response = self.client.post("/products/batch-get", json={"product_ids": []})
+
+        self.assertEqual(response.status_code, 422)
+
+    def test_import_products(self):
+        self.mock_product_service.import_products.return_value = {
+            "total_rows": 1,
+            "imported": 1,
+            "failed": 0,
+            "errors": [],
+        }
+
+        response = self.client.post(
+            "/products/import",
+            files={"file": ("items.csv", b"name,price\n", "text/csv")},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["data"]["imported"], 1)
+        fmt = self.mock_product_service.import_products.call_args[0][1]
+        self.assertEqual(fmt, "csv")
+
+    def test_import_products_unsupported_format(self):
+        response = self.client.post(
+            "/products/import",
+            files={"file": ("items.xlsx", b"", "application/octet-stream")},
+        )
+
+        self.assertEqual(response.status_code, 415)
+        self.mock_product_service.import_products.assert_not_called()
+
+    def test_stock_in_success(self):
+        self.mock_product_service.stock_in.return_value = Product(
+            id="p1", name="Item 1", price=1, quantity=15, category="C", version=2
+        )
+
         payload = {
             "product_id": "p1",
             "quantity": 5,
@@ -101,14 +239,15 @@ class TestProductRoutes(unittest.TestCase):
         body = response.json()
         self.assertEqual(body["message"], "Product's stock updated successfully")
         self.assertEqual(body["data"]["quantity"], 15)
+        self.assertEqual(response.headers["ETag"], '"2"')
 
         self.mock_product_service.stock_in.assert_called_once()
+        self.assertIsNone(self.mock_product_service.stock_in.call_args[0][1])
 
     def test_stock_out_success(self):
-        self.mock_product_service.stock_out.return_value = {
-            "id": "p1",
-            "quantity": 8,
-        }
+        self.mock_product_service.stock_out.return_value = Product(
+            id="p1", name="Item 1", price=1, quantity=8, category="C", version=5
+        )
 
         payload = {
             "product_id": "p1",
@@ -125,6 +264,88 @@ class TestProductRoutes(unittest.TestCase):
 
         self.mock_product_service.stock_out.assert_called_once()
 
+    def test_stock_out_with_if_match(self):
+        self.mock_product_service.stock_out.return_value = Product(
+            id="p1", name="Item 1", price=1, quantity=8, category="C", version=5
+        )
+
+        response = self.client.patch(
+            "/products/stockout",
+            json={"product_id": "p1", "quantity": 2},
+            headers={"If-Match": '"4"'},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["ETag"], '"5"')
+        self.assertEqual(self.mock_product_service.stock_out.call_args[0][1], 4)
+
+    def test_stock_out_rejects_malformed_if_match(self):
+        response = self.client.patch(
+            "/products/stockout",
+            json={"product_id": "p1", "quantity": 2},
+            headers={"If-Match": 'W/"4"'},
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.mock_product_service.stock_out.assert_not_called()
+
+    def test_delete_product_with_if_match(self):
+        response = self.client.delete(
+            "/products/?product_id=p1", headers={"If-Match": '"7"'}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.mock_product_service.delete_product.assert_called_once_with("p1", 7)
+
+    def test_bulk_stock_movements(self):
+        self.mock_product_service.bulk_stock_movements.return_value = {
+            "applied": [{"product_id": "p1", "delta": -2, "quantity": 8}],
+            "failed": [],
+        }
+
+        payload = {
+            "movements": [
+                {"product_id": "p1", "quantity": 2, "direction": "out"},
+            ]
+        }
+
+        response = self.client.post("/products/stock/bulk", json=payload)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["data"]["applied"][0]["quantity"], 8)
+        self.mock_product_service.bulk_stock_movements.assert_called_once()
+
+    def test_set_stock_shards(self):
+        self.mock_product_service.set_stock_shards.return_value = {
+            "id": "p1",
+            "stock_shards": 4,
+        }
+
+        response = self.client.put(
+            "/products/stock/shards", json={"product_id": "p1", "shards": 4}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["data"]["stock_shards"], 4)
+
+    def test_set_stock_shards_rejects_too_many(self):
+        response = self.client.put(
+            "/products/stock/shards", json={"product_id": "p1", "shards": 33}
+        )
+
+        self.assertEqual(response.status_code, 422)
+
+    def test_bulk_stock_movements_invalid_direction(self):
+        payload = {
+            "movements": [
+                {"product_id": "p1", "quantity": 2, "direction": "sideways"},
+            ]
+        }
+
+        response = self.client.post("/products/stock/bulk", json=payload)
+
+        self.assertEqual(response.status_code, 422)
+
 
 if __name__ == "__main__":
     unittest.main()
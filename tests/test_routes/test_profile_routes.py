@@ -0,0 +1,118 @@
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from fastapi.testclient import TestClient
+
+from app.app import app
+from app.dependencies import get_current_user
+from app.models.products import Product
+from app.models.user_group import UserGroup
+from app.profiling.profile_store import ProfileStore
+from app.services.product_service import ProductService
+
+
+def slow_product(product_id, consistent_read):
+    time.sleep(0.03)
+    return Product(id=product_id, name="Pen", price=1, quantity=1, category="C")
+
+
+class TestProfileRoutes(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.client = TestClient(app)
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.store = ProfileStore(self.directory.name, max_profiles=10)
+        app.state.profile_store = self.store
+        app.state.profile_sample_rate = 0.0
+        app.state.profile_interval = 0.001
+        app.state.jwks = {"keys": []}
+        app.state.cognito_issuer = "issuer"
+
+        self.mock_product_service = MagicMock()
+        self.mock_product_service.get_product_by_id.side_effect = slow_product
+        app.dependency_overrides[ProductService] = lambda: self.mock_product_service
+        app.dependency_overrides[get_current_user] = lambda: {
+            "sub": "test-user",
+            "cognito:groups": [UserGroup.MANAGER],
+        }
+
+        verifier = patch(
+            "app.profiling.middleware.jwt_verifier.verify_access_token",
+            return_value={"cognito:groups": [UserGroup.MANAGER]},
+        )
+        self.mock_verify = verifier.start()
+        self.addCleanup(verifier.stop)
+
+    def tearDown(self):
+        app.dependency_overrides = {}
+        for name in (
+            "profile_store",
+            "profile_sample_rate",
+            "profile_interval",
+            "jwks",
+            "cognito_issuer",
+        ):
+            delattr(app.state, name)
+
+    def get_product(self, **headers):
+        return self.client.get(
+            "/products/",
+            params={"product_id": "p1"},
+            headers={"Authorization": "Bearer token", **headers},
+        )
+
+    def test_requests_are_not_profiled_by_default(self):
+        response = self.get_product()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("X-Profile-Id", response.headers)
+        self.assertEqual(self.store.list(), [])
+        self.mock_verify.assert_not_called()
+
+    def test_manager_header_profiles_the_request(self):
+        response = self.get_product(**{"X-Profile": "1"})
+        profile_id = response.headers["X-Profile-Id"]
+
+        listed = self.client.get("/profiles/").json()["data"]
+        folded = self.client.get(f"/profiles/{profile_id}")
+
+        self.assertEqual(listed[0]["id"], profile_id)
+        self.assertEqual(listed[0]["path"], "/products/")
+        self.assertEqual(listed[0]["status_code"], 200)
+        self.assertEqual(listed[0]["trigger"], "header")
+        self.assertEqual(folded.status_code, 200)
+        self.assertIn("get_products_handler (app/routes/products.py:", folded.text)
+
+    def test_header_without_manager_token_is_ignored(self):
+        self.mock_verify.return_value = {"cognito:groups": [UserGroup.STAFF]}
+
+        response = self.get_product(**{"X-Profile": "1"})
+
+        self.assertNotIn("X-Profile-Id", response.headers)
+        self.mock_verify.assert_called_once_with("token", {"keys": []}, "issuer")
+
+    def test_sample_rate_profiles_requests(self):
+        app.state.profile_sample_rate = 1.0
+
+        response = self.get_product()
+        profile = self.client.get(
+            f"/profiles/{response.headers['X-Profile-Id']}", params={"format": "json"}
+        ).json()["data"]
+
+        self.assertEqual(profile["trigger"], "sampled")
+        self.assertGreater(profile["samples"], 0)
+
+    def test_unknown_profile_is_404(self):
+        response = self.client.get("/profiles/0000000000000000001-deadbeef")
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json()["error"], "PROFILE_NOT_FOUND")
+
+
+if __name__ == "__main__":
+    unittest.main()
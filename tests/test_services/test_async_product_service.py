@@ -0,0 +1,121 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.app_exception.app_exception import AppException
+from app.dto.stock_update_request import StockUpdateRequest
+from app.models.category import Category
+from app.models.products import Product
+from app.repository.async_category_repository import AsyncCachedCategoryRepository
+from app.services.async_product_service import AsyncProductService
+from app.utils.category_snapshot import CategorySnapshot
+
+
+def product(**overrides):
+    fields = {
+        "id": "p1",
+        "name": "Item",
+        "price": 10,
+        "quantity": 2,
+        "category": "CAT",
+        "low_stock_alert_sent": False,
+        "version": 2,
+    }
+    fields.update(overrides)
+    return Product(**fields)
+
+
+class TestAsyncProductService(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.product_repo = MagicMock()
+        self.product_repo.stock_in = AsyncMock()
+        self.product_repo.stock_out = AsyncMock()
+        self.product_repo.update_low_stock_alert_sent = AsyncMock(return_value=3)
+        self.category_table = MagicMock()
+        self.category_table.get_item = AsyncMock()
+        self.category_table.query = AsyncMock()
+        self.snapshot = CategorySnapshot(check_interval=60)
+        self.snapshot.replace(
+            1, {"CAT": Category(name="CAT", default_threshold=5, description=None)}
+        )
+        self.cognito_client = MagicMock()
+        self.cognito_client.list_users_in_group.return_value = {"Users": []}
+        self.sns_client = MagicMock()
+        self.stock_ledger = MagicMock()
+
+        self.service = AsyncProductService(
+            cognito_config=(self.cognito_client, "client-id", "pool-id"),
+            product_repo=self.product_repo,
+            category_repo=AsyncCachedCategoryRepository(
+                self.category_table, self.snapshot
+            ),
+            sns_client=self.sns_client,
+            stock_ledger=self.stock_ledger,
+        )
+
+    async def test_stock_out_below_threshold_raises_alert(self):
+        self.product_repo.stock_out.return_value = product()
+
+        result = await self.service.stock_out(
+            StockUpdateRequest(product_id="p1", quantity=3)
+        )
+
+        self.product_repo.stock_out.assert_awaited_once_with("p1", 3, None)
+        self.stock_ledger.record_all.assert_called_once_with([("p1", -3, "stock_out")])
+        self.sns_client.publish.assert_called_once()
+        self.product_repo.update_low_stock_alert_sent.assert_awaited_once_with(
+            "p1", True
+        )
+        self.assertTrue(result.low_stock_alert_sent)
+        self.assertEqual(result.version, 3)
+        # the fresh snapshot answered without a table read
+        self.category_table.get_item.assert_not_awaited()
+
+    async def test_stale_snapshot_is_reloaded_on_the_loop(self):
+        self.snapshot.expire()
+        self.category_table.get_item.return_value = {"Item": {"version": 2}}
+        self.category_table.query.return_value = {
+            "Items": [
+                {
+                    "pk": "CATEGORY",
+                    "sk": "CATEGORY#CAT",
+                    "name": "CAT",
+                    "default_threshold": 1,
+                    "description": None,
+                }
+            ]
+        }
+        self.product_repo.stock_out.return_value = product()
+
+        result = await self.service.stock_out(
+            StockUpdateRequest(product_id="p1", quantity=1)
+        )
+
+        self.category_table.query.assert_awaited_once()
+        self.assertEqual(self.snapshot.version, 2)
+        self.sns_client.publish.assert_not_called()
+        self.assertFalse(result.low_stock_alert_sent)
+
+    async def test_unknown_category_raises_app_exception(self):
+        self.product_repo.stock_out.return_value = product(category="GONE")
+
+        with self.assertRaises(AppException) as ctx:
+            await self.service.stock_out(
+                StockUpdateRequest(product_id="p1", quantity=1)
+            )
+
+        self.assertEqual(ctx.exception.error_code, "CATEGORY_NOT_FOUND")
+
+    async def test_stock_in_clears_alert_above_threshold(self):
+        self.product_repo.stock_in.return_value = product(
+            quantity=9, low_stock_alert_sent=True
+        )
+
+        result = await self.service.stock_in(
+            StockUpdateRequest(product_id="p1", quantity=7), expected_version=1
+        )
+
+        self.product_repo.stock_in.assert_awaited_once_with("p1", 7, 1)
+        self.product_repo.update_low_stock_alert_sent.assert_awaited_once_with(
+            "p1", False
+        )
+        self.assertFalse(result.low_stock_alert_sent)
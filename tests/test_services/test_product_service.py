@@ -1,8 +1,13 @@
+import io
+import json
 import unittest
 from unittest.mock import MagicMock, patch
 
 from app.services.product_service import ProductService
+from app.services.stock_write_coalescer import StockWriteCoalescer
 from app.app_exception.app_exception import AppException
+from app.dto.batch_get_products_request import BatchGetProductsRequest
+from app.dto.bulk_stock_movement_request import BulkStockMovementRequest
 from app.dto.create_product_request import CreateProductRequest
 from app.dto.stock_update_request import StockUpdateRequest
 from app.models.products import Product
@@ -13,6 +18,8 @@ class TestProductService(unittest.TestCase):
         self.mock_product_repo = MagicMock()
         self.mock_category_repo = MagicMock()
         self.mock_cognito_client = MagicMock()
+        self.mock_stock_ledger = MagicMock()
+        self.mock_ledger_repo = MagicMock()
 
         cognito_config = (self.mock_cognito_client, "ap-south-1", "pool-id")
 
@@ -20,6 +27,9 @@ class TestProductService(unittest.TestCase):
             cognito_config=cognito_config,
             product_repo=self.mock_product_repo,
             category_repo=self.mock_category_repo,
+            stock_coalescer=None,
+            stock_ledger=self.mock_stock_ledger,
+            ledger_repo=self.mock_ledger_repo,
         )
 
     def test_create_product_success(self):
@@ -38,16 +48,83 @@ class TestProductService(unittest.TestCase):
         self.assertIsInstance(product, Product)
         self.assertEqual(product.name, "Laptop")
         self.assertFalse(product.low_stock_alert_sent)
+        self.assertEqual(product.version, 1)
 
         self.mock_product_repo.save_product.assert_called_once()
 
-    def test_get_all_products(self):
-        self.mock_product_repo.get_all_products.return_value = ["p1", "p2"]
+    def test_import_products_reports_row_errors(self):
+        self.mock_product_repo.batch_save_products.return_value = []
+        file = io.BytesIO(
+            b"name,price,quantity,category\n"
+            b"Pen,1.5,10,STATIONERY\n"
+            b"Ink,-2,3,STATIONERY\n"
+            b"Pad,2,4,STATIONERY\n"
+        )
+
+        report = self.service.import_products(file, "csv")
+
+        self.assertEqual(report.total_rows, 3)
+        self.assertEqual(report.imported, 2)
+        self.assertEqual(report.failed, 1)
+        self.assertEqual(report.errors[0].row, 2)
+        self.assertIn("price", report.errors[0].errors[0])
+        saved = self.mock_product_repo.batch_save_products.call_args[0][0]
+        self.assertEqual([p.name for p in saved], ["Pen", "Pad"])
+
+    @patch("app.services.product_service.IMPORT_CHUNK_SIZE", 2)
+    def test_import_products_marks_unwritten_rows(self):
+        def save(products):
+            if products[0].name == "A":
+                return [products[1].id]
+            raise AppException(message="Failed to save products", status_code=500)
+
+        self.mock_product_repo.batch_save_products.side_effect = save
+        lines = [
+            {"name": name, "price": 1, "quantity": 1, "category": "C"}
+            for name in ["A", "B", "C"]
+        ]
+        file = io.BytesIO("\n".join(json.dumps(line) for line in lines).encode())
+
+        report = self.service.import_products(file, "ndjson")
 
-        result = self.service.get_all_products()
+        self.assertEqual(report.imported, 1)
+        self.assertEqual([error.row for error in report.errors], [2, 3])
+        self.assertEqual(report.errors[1].errors, ["Failed to save products"])
+
+    def test_iter_products(self):
+        self.mock_product_repo.iter_products.return_value = iter(["p1", "p2"])
+
+        result = list(self.service.iter_products())
 
         self.assertEqual(result, ["p1", "p2"])
-        self.mock_product_repo.get_all_products.assert_called_once()
+        self.mock_product_repo.iter_products.assert_called_once()
+
+    def test_get_products_by_category(self):
+        product = Product(id="p1", name="Item", price=1, quantity=1, category="C")
+        self.mock_product_repo.get_products_by_category_page.return_value = (
+            [product],
+            "next",
+        )
+
+        result = self.service.get_products_by_category("C", 10, None)
+
+        self.assertEqual(result.items, [product])
+        self.assertEqual(result.next_cursor, "next")
+        self.mock_product_repo.get_products_by_category_page.assert_called_once_with(
+            "C", 10, None
+        )
+
+    def test_get_low_stock_products(self):
+        product = Product(id="p1", name="Item", price=1, quantity=1, category="C")
+        self.mock_product_repo.get_low_stock_products_page.return_value = (
+            [product],
+            None,
+        )
+
+        result = self.service.get_low_stock_products(10, None)
+
+        self.assertEqual(result.items, [product])
+        self.assertIsNone(result.next_cursor)
 
     def test_get_product_by_id(self):
         self.mock_product_repo.get_product_by_id.return_value = "product"
@@ -55,7 +132,19 @@ class TestProductService(unittest.TestCase):
         result = self.service.get_product_by_id("pid")
 
         self.assertEqual(result, "product")
-        self.mock_product_repo.get_product_by_id.assert_called_once_with("pid")
+        self.mock_product_repo.get_product_by_id.assert_called_once_with("pid", False)
+
+    def test_batch_get_products(self):
+        product = Product(id="p1", name="Item", price=1, quantity=1, category="C")
+        self.mock_product_repo.batch_get_products.return_value = ([product], ["p2"])
+
+        result = self.service.batch_get_products(
+            BatchGetProductsRequest(product_ids=["p1", "p2"])
+        )
+
+        self.assertEqual(result.products, [product])
+        self.assertEqual(result.missing_ids, ["p2"])
+        self.mock_product_repo.batch_get_products.assert_called_once_with(["p1", "p2"])
 
     def test_stock_in_resets_low_stock_alert(self):
         product = Product(
@@ -70,54 +159,143 @@ class TestProductService(unittest.TestCase):
 
         category = MagicMock(default_threshold=10)
 
-        self.mock_product_repo.get_product_by_id.return_value = product
+        self.mock_product_repo.stock_in.return_value = product
+        self.mock_product_repo.update_low_stock_alert_sent.return_value = 2
         self.mock_category_repo.get_category.return_value = category
 
         req = StockUpdateRequest(product_id="p1", quantity=5)
 
-        self.service.stock_in(req)
+        result = self.service.stock_in(req)
 
-        self.mock_product_repo.stock_in.assert_called_once_with("p1", 5)
+        self.mock_product_repo.stock_in.assert_called_once_with("p1", 5, None)
         self.mock_product_repo.update_low_stock_alert_sent.assert_called_once_with(
             "p1", False
         )
+        self.mock_product_repo.get_product_by_id.assert_not_called()
+        self.assertFalse(result.low_stock_alert_sent)
+        self.assertEqual(result.version, 2)
 
-    def test_stock_out_insufficient_stock(self):
-        product = Product(
+    def test_stock_in_skips_category_when_no_alert_pending(self):
+        self.mock_product_repo.stock_in.return_value = Product(
+            id="p1", name="Item", price=100, quantity=20, category="CAT"
+        )
+
+        result = self.service.stock_in(StockUpdateRequest(product_id="p1", quantity=5))
+
+        self.assertEqual(result.quantity, 20)
+        self.mock_category_repo.get_category.assert_not_called()
+        self.mock_product_repo.update_low_stock_alert_sent.assert_not_called()
+
+    def test_stock_movements_are_recorded(self):
+        self.mock_product_repo.stock_in.return_value = Product(
+            id="p1", name="Item", price=100, quantity=20, category="CAT"
+        )
+
+        self.service.stock_in(StockUpdateRequest(product_id="p1", quantity=5))
+
+        self.mock_stock_ledger.record_all.assert_called_once_with(
+            [("p1", 5, "stock_in")]
+        )
+
+    @patch("app.services.product_service.SNSEventPublisher")
+    def test_stock_movement_is_recorded_even_if_alert_fails(self, mock_sns_cls):
+        self.mock_product_repo.stock_out.return_value = Product(
             id="p1",
             name="Item",
             price=100,
-            quantity=5,
+            quantity=1,
             category="CAT",
-            override_threshold=None,
-            low_stock_alert_sent=False,
+            override_threshold=5,
+        )
+        self.mock_cognito_client.list_users_in_group.return_value = {"Users": []}
+        mock_sns_cls.return_value.publish_event.side_effect = AppException(
+            message="Failed to publish SNS event", error_code="SNS_ERROR"
         )
 
-        self.mock_product_repo.get_product_by_id.return_value = product
-        self.mock_category_repo.get_category.return_value = MagicMock(
-            default_threshold=2
+        with self.assertRaises(AppException):
+            self.service.stock_out(StockUpdateRequest(product_id="p1", quantity=5))
+
+        self.mock_stock_ledger.record_all.assert_called_once_with(
+            [("p1", -5, "stock_out")]
         )
 
-        req = StockUpdateRequest(product_id="p1", quantity=10)
+    def test_coalesced_movements_are_recorded_per_caller_in_one_write(self):
+        self.mock_product_repo.stock_in.return_value = Product(
+            id="p1", name="Item", price=100, quantity=20, category="CAT"
+        )
 
-        with self.assertRaises(AppException) as ctx:
-            self.service.stock_out(req)
+        self.service._apply_stock_delta("p1", [5, -2])
 
-        exc = ctx.exception
-        self.assertEqual(exc.status_code, 400)
-        self.assertEqual(exc.error_code, "INSUFFICIENT_STOCK")
+        self.mock_product_repo.stock_in.assert_called_once_with("p1", 3, None)
+        self.mock_stock_ledger.record_all.assert_called_once_with(
+            [("p1", 5, "stock_in"), ("p1", -2, "stock_out")]
+        )
 
-    def test_stock_out_no_alert(self):
-        product = Product(
+    def test_get_stock_movements(self):
+        self.mock_ledger_repo.get_movements_page.return_value = ([], None)
+
+        result = self.service.get_stock_movements("p1", 10)
+
+        self.assertEqual(result.items, [])
+        self.mock_ledger_repo.get_movements_page.assert_called_once_with(
+            "p1", 10, None, None, None
+        )
+
+    def test_stock_out_goes_through_coalescer(self):
+        self.service.stock_coalescer = StockWriteCoalescer()
+        self.mock_product_repo.stock_out.return_value = Product(
             id="p1",
             name="Item",
             price=100,
             quantity=20,
             category="CAT",
-            override_threshold=None,
-            low_stock_alert_sent=False,
+            override_threshold=5,
+        )
+
+        result = self.service.stock_out(StockUpdateRequest(product_id="p1", quantity=5))
+
+        self.assertEqual(result.quantity, 20)
+        self.mock_product_repo.stock_out.assert_called_once_with("p1", 5, None)
+
+    def test_stock_out_with_if_match_skips_coalescer(self):
+        self.service.stock_coalescer = MagicMock()
+        self.mock_product_repo.stock_out.return_value = Product(
+            id="p1",
+            name="Item",
+            price=100,
+            quantity=20,
+            category="CAT",
+            override_threshold=5,
+            version=4,
+        )
+
+        result = self.service.stock_out(
+            StockUpdateRequest(product_id="p1", quantity=5), expected_version=3
+        )
+
+        self.assertEqual(result.version, 4)
+        self.mock_product_repo.stock_out.assert_called_once_with("p1", 5, 3)
+        self.service.stock_coalescer.submit.assert_not_called()
+
+    def test_stock_out_insufficient_stock(self):
+        self.mock_product_repo.stock_out.side_effect = AppException(
+            message="Insufficient stock for product p1",
+            error_code="INSUFFICIENT_STOCK",
+            status_code=400,
+            details={"available_stock": 5},
         )
 
+        req = StockUpdateRequest(product_id="p1", quantity=10)
+
+        with self.assertRaises(AppException) as ctx:
+            self.service.stock_out(req)
+
+        exc = ctx.exception
+        self.assertEqual(exc.status_code, 400)
+        self.assertEqual(exc.error_code, "INSUFFICIENT_STOCK")
+        self.mock_product_repo.get_product_by_id.assert_not_called()
+
+    def test_stock_out_no_alert(self):
         updated_product = Product(
             id="p1",
             name="Item",
@@ -128,32 +306,37 @@ class TestProductService(unittest.TestCase):
             low_stock_alert_sent=False,
         )
 
-        self.mock_product_repo.get_product_by_id.side_effect = [
-            product,
-            updated_product,
-        ]
+        self.mock_product_repo.stock_out.return_value = updated_product
         self.mock_category_repo.get_category.return_value = MagicMock(
             default_threshold=5
         )
 
         req = StockUpdateRequest(product_id="p1", quantity=5)
 
-        self.service.stock_out(req)
+        result = self.service.stock_out(req)
 
-        self.mock_product_repo.stock_out.assert_called_once_with("p1", 5)
+        self.assertEqual(result.quantity, 15)
+        self.mock_product_repo.stock_out.assert_called_once_with("p1", 5, None)
+        self.mock_product_repo.update_low_stock_alert_sent.assert_not_called()
 
     @patch("app.services.product_service.SNSEventPublisher")
-    def test_stock_out_triggers_low_stock_alert(self, mock_sns_cls):
-        product = Product(
+    def test_stock_out_uses_override_threshold(self, mock_sns_cls):
+        self.mock_product_repo.stock_out.return_value = Product(
             id="p1",
             name="Item",
             price=100,
-            quantity=6,
+            quantity=4,
             category="CAT",
-            override_threshold=None,
-            low_stock_alert_sent=False,
+            override_threshold=3,
         )
 
+        self.service.stock_out(StockUpdateRequest(product_id="p1", quantity=1))
+
+        self.mock_category_repo.get_category.assert_not_called()
+        mock_sns_cls.return_value.publish_event.assert_not_called()
+
+    @patch("app.services.product_service.SNSEventPublisher")
+    def test_stock_out_triggers_low_stock_alert(self, mock_sns_cls):
         updated_product = Product(
             id="p1",
             name="Item",
@@ -164,10 +347,7 @@ class TestProductService(unittest.TestCase):
             low_stock_alert_sent=False,
         )
 
-        self.mock_product_repo.get_product_by_id.side_effect = [
-            product,
-            updated_product,
-        ]
+        self.mock_product_repo.stock_out.return_value = updated_product
 
         self.mock_category_repo.get_category.return_value = MagicMock(
             default_threshold=5
@@ -179,9 +359,70 @@ class TestProductService(unittest.TestCase):
 
         req = StockUpdateRequest(product_id="p1", quantity=3)
 
-        self.service.stock_out(req)
+        result = self.service.stock_out(req)
 
         mock_sns_cls.return_value.publish_event.assert_called_once()
+        payload = mock_sns_cls.return_value.publish_event.call_args[0][0]
+        self.assertEqual(payload["current_quantity"], 3)
+        self.assertEqual(payload["manager_email"], ["manager@test.com"])
         self.mock_product_repo.update_low_stock_alert_sent.assert_called_once_with(
             "p1", True
         )
+        self.assertTrue(result.low_stock_alert_sent)
+
+    @patch("app.services.product_service.SNSEventPublisher")
+    def test_bulk_stock_movements_nets_and_alerts_once(self, mock_sns_cls):
+        self.mock_product_repo.apply_stock_deltas.return_value = {
+            "p3": "PRODUCT_NOT_FOUND"
+        }
+        self.mock_product_repo.batch_get_products.return_value = (
+            [
+                Product(id="p1", name="A", price=1, quantity=2, category="CAT"),
+                Product(
+                    id="p2",
+                    name="B",
+                    price=1,
+                    quantity=50,
+                    category="CAT",
+                    low_stock_alert_sent=True,
+                ),
+            ],
+            [],
+        )
+        self.mock_category_repo.get_category.return_value = MagicMock(
+            default_threshold=5
+        )
+        self.mock_cognito_client.list_users_in_group.return_value = {"Users": []}
+
+        req = BulkStockMovementRequest(
+            movements=[
+                {"product_id": "p1", "quantity": 5, "direction": "out"},
+                {"product_id": "p1", "quantity": 2, "direction": "in"},
+                {"product_id": "p2", "quantity": 10, "direction": "in"},
+                {"product_id": "p3", "quantity": 1, "direction": "in"},
+                {"product_id": "p4", "quantity": 4, "direction": "in"},
+                {"product_id": "p4", "quantity": 4, "direction": "out"},
+            ]
+        )
+
+        result = self.service.bulk_stock_movements(req)
+
+        self.mock_product_repo.apply_stock_deltas.assert_called_once_with(
+            {"p1": -3, "p2": 10, "p3": 1, "p4": 0}
+        )
+        self.mock_product_repo.batch_get_products.assert_called_once_with(
+            ["p1", "p2"], consistent_read=True
+        )
+        self.mock_category_repo.get_category.assert_called_once_with("CAT")
+        mock_sns_cls.return_value.publish_event.assert_called_once()
+        self.mock_product_repo.update_low_stock_alert_sent.assert_any_call("p1", True)
+        self.mock_product_repo.update_low_stock_alert_sent.assert_any_call("p2", False)
+        self.mock_stock_ledger.record_all.assert_called_once_with(
+            [("p1", -3, "bulk"), ("p2", 10, "bulk")]
+        )
+
+        applied = {movement.product_id: movement for movement in result.applied}
+        self.assertEqual(applied["p1"].quantity, 2)
+        self.assertIsNone(applied["p4"].quantity)
+        self.assertEqual(result.failed[0].product_id, "p3")
+        self.assertEqual(result.failed[0].error_code, "PRODUCT_NOT_FOUND")
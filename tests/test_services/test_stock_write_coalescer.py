@@ -0,0 +1,118 @@
+import threading
+import time
+import unittest
+
+from app.app_exception.app_exception import AppException
+from app.models.products import Product
+from app.services.stock_write_coalescer import StockWriteCoalescer, _PendingDelta
+
+
+def insufficient(available: int) -> AppException:
+    return AppException(
+        message="Insufficient stock",
+        error_code="INSUFFICIENT_STOCK",
+        details={"available_stock": available},
+    )
+
+
+class FakeStock:
+    def __init__(self, quantity: int):
+        self.quantity = quantity
+        self.calls: list[int] = []
+
+    def apply(self, product_id: str, deltas: list[int]) -> Product:
+        delta = sum(deltas)
+        self.calls.append(delta)
+        if self.quantity + delta < 0:
+            raise insufficient(self.quantity)
+        self.quantity += delta
+        return Product(
+            id=product_id, name="Pen", price=1, quantity=self.quantity, category="C"
+        )
+
+
+class TestStockWriteCoalescer(unittest.TestCase):
+    def setUp(self):
+        self.coalescer = StockWriteCoalescer()
+
+    def test_single_caller_applies_directly(self):
+        stock = FakeStock(10)
+
+        product = self.coalescer.submit("p1", -3, stock.apply)
+
+        self.assertEqual(product.quantity, 7)
+        self.assertEqual(stock.calls, [-3])
+
+    def test_single_caller_insufficient_stock(self):
+        stock = FakeStock(2)
+
+        with self.assertRaises(AppException) as ctx:
+            self.coalescer.submit("p1", -3, stock.apply)
+
+        self.assertEqual(ctx.exception.error_code, "INSUFFICIENT_STOCK")
+        self.assertEqual(ctx.exception.details, {"available_stock": 2})
+
+    def test_batch_admits_outs_in_arrival_order(self):
+        stock = FakeStock(5)
+        pending = [_PendingDelta(delta) for delta in (-4, 2, -4, -2)]
+
+        self.coalescer._apply_batch("p1", pending, stock.apply)
+
+        self.assertEqual(stock.calls, [-8, -4])
+        self.assertEqual(stock.quantity, 1)
+        self.assertEqual(pending[0].product.quantity, 1)
+        self.assertEqual(pending[2].error.details, {"available_stock": 3})
+        self.assertIsNone(pending[3].error)
+
+    def test_concurrent_callers_share_one_write(self):
+        stock = FakeStock(100)
+        release = threading.Event()
+        first_call = threading.Event()
+
+        def slow_apply(product_id, deltas):
+            first_call.set()
+            release.wait()
+            return stock.apply(product_id, deltas)
+
+        results = []
+        leader = threading.Thread(
+            target=lambda: results.append(self.coalescer.submit("p1", -1, slow_apply))
+        )
+        leader.start()
+        first_call.wait()
+
+        followers = [
+            threading.Thread(
+                target=lambda: results.append(
+                    self.coalescer.submit("p1", -1, slow_apply)
+                )
+            )
+            for _ in range(5)
+        ]
+        for thread in followers:
+            thread.start()
+        while len(self.coalescer._queues["p1"]) < 5:
+            time.sleep(0.001)
+        release.set()
+
+        for thread in [leader, *followers]:
+            thread.join()
+
+        self.assertEqual(stock.calls, [-1, -5])
+        self.assertEqual(len(results), 6)
+        self.assertEqual(stock.quantity, 94)
+        self.assertEqual(self.coalescer._queues, {})
+
+    def test_failure_settles_every_caller(self):
+        def broken(product_id, deltas):
+            raise AppException(message="boom", error_code="STOCK_OUT_FAILED")
+
+        with self.assertRaises(AppException) as ctx:
+            self.coalescer.submit("p1", -1, broken)
+
+        self.assertEqual(ctx.exception.error_code, "STOCK_OUT_FAILED")
+        self.assertEqual(self.coalescer._queues, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
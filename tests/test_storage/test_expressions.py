@@ -0,0 +1,73 @@
+import unittest
+from decimal import Decimal
+
+from app.storage.expressions import ExpressionError, apply_update, matches
+
+
+class TestExpressions(unittest.TestCase):
+    def setUp(self):
+        self.item = {
+            "pk": "PRODUCT#p1",
+            "quantity": Decimal("5"),
+            "low_stock_alert_sent": True,
+        }
+
+    def test_condition_functions_and_precedence(self):
+        self.assertTrue(
+            matches(
+                "attribute_exists(pk) AND (attribute_not_exists(version) "
+                "OR version < :v)",
+                self.item,
+                values={":v": Decimal("2")},
+            )
+        )
+        self.assertFalse(matches("attribute_not_exists(pk)", self.item))
+        self.assertTrue(matches("attribute_not_exists(pk)", None))
+
+    def test_comparisons_respect_types(self):
+        self.assertTrue(matches("quantity >= :n", self.item, values={":n": 5}))
+        self.assertFalse(matches("quantity = :n", self.item, values={":n": "5"}))
+        self.assertFalse(
+            matches("low_stock_alert_sent = :one", self.item, values={":one": 1})
+        )
+        self.assertTrue(matches("missing <> :n", self.item, values={":n": 1}))
+        self.assertFalse(matches("missing < :n", self.item, values={":n": 1}))
+
+    def test_between_begins_with_and_names(self):
+        self.assertTrue(
+            matches(
+                "#q BETWEEN :lo AND :hi AND begins_with(pk, :prefix)",
+                self.item,
+                names={"#q": "quantity"},
+                values={":lo": 1, ":hi": 5, ":prefix": "PRODUCT#"},
+            )
+        )
+
+    def test_update_clauses(self):
+        updated = apply_update(
+            "SET low_stock_alert_sent = :sent, copy = quantity "
+            "REMOVE pk ADD quantity :d, version :one",
+            self.item,
+            values={":sent": False, ":d": Decimal("-2"), ":one": Decimal("1")},
+        )
+
+        self.assertEqual(updated["quantity"], Decimal("3"))
+        self.assertEqual(updated["copy"], Decimal("5"))
+        self.assertEqual(updated["version"], Decimal("1"))
+        self.assertNotIn("pk", updated)
+        self.assertFalse(updated["low_stock_alert_sent"])
+        self.assertEqual(self.item["quantity"], Decimal("5"))
+
+    def test_update_rejects_key_attributes(self):
+        with self.assertRaises(ExpressionError):
+            apply_update(
+                "SET pk = :pk", self.item, values={":pk": "x"}, key_attributes=("pk",)
+            )
+
+    def test_invalid_expression(self):
+        with self.assertRaises(ExpressionError):
+            matches("quantity >= ", self.item)
+
+
+if __name__ == "__main__":
+    unittest.main()
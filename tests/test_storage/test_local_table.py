@@ -0,0 +1,305 @@
+import os
+import tempfile
+import threading
+import unittest
+from decimal import Decimal
+
+from botocore.exceptions import ClientError
+
+from app.app_exception.app_exception import AppException
+from app.models.products import Product
+from app.projector.change_stream import LocalChangeStream
+from app.repository.product_repository import ProductRepository
+from app.storage.local_table import LocalStorage
+from app.storage.memory_engine import MemoryEngine
+from app.storage.sqlite_engine import SQLiteEngine
+
+
+class LocalTableTests:
+    def make_engine(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.storage = LocalStorage(self.make_engine())
+        self.table = self.storage.table("inventory")
+        self.client = self.table.meta.client
+
+    def tearDown(self):
+        self.storage.close()
+
+    def put_products(self, *ids):
+        for product_id in ids:
+            self.table.put_item(
+                Item={"pk": "PRODUCTS", "sk": f"PRODUCT#{product_id}", "id": product_id}
+            )
+
+    def test_put_and_get_round_trip_numbers_as_decimal(self):
+        self.table.put_item(Item={"pk": "A", "sk": "META", "quantity": 3})
+
+        item = self.table.get_item(Key={"pk": "A", "sk": "META"})["Item"]
+
+        self.assertEqual(item["quantity"], Decimal("3"))
+        self.assertEqual(self.table.get_item(Key={"pk": "B", "sk": "META"}), {})
+
+    def test_conditional_put_fails_on_existing_item(self):
+        self.table.put_item(Item={"pk": "A", "sk": "META"})
+
+        with self.assertRaises(ClientError) as ctx:
+            self.table.put_item(
+                Item={"pk": "A", "sk": "META"},
+                ConditionExpression="attribute_not_exists(pk)",
+            )
+
+        self.assertEqual(
+            ctx.exception.response["Error"]["Code"], "ConditionalCheckFailedException"
+        )
+
+    def test_update_returns_new_image_and_old_item_on_failure(self):
+        self.table.put_item(Item={"pk": "A", "sk": "META", "quantity": 3})
+
+        response = self.table.update_item(
+            Key={"pk": "A", "sk": "META"},
+            UpdateExpression="ADD quantity :d",
+            ConditionExpression="quantity >= :need",
+            ExpressionAttributeValues={":d": -2, ":need": 2},
+            ReturnValues="ALL_NEW",
+        )
+        self.assertEqual(response["Attributes"]["quantity"], 1)
+
+        with self.assertRaises(ClientError) as ctx:
+            self.table.update_item(
+                Key={"pk": "A", "sk": "META"},
+                UpdateExpression="ADD quantity :d",
+                ConditionExpression="quantity >= :need",
+                ExpressionAttributeValues={":d": -2, ":need": 2},
+                ReturnValuesOnConditionCheckFailure="ALL_OLD",
+            )
+        self.assertEqual(ctx.exception.response["Item"]["quantity"], {"N": "1"})
+
+    def test_transaction_is_all_or_nothing(self):
+        self.table.put_item(Item={"pk": "A", "sk": "META", "quantity": 1})
+
+        with self.assertRaises(ClientError) as ctx:
+            self.client.transact_write_items(
+                TransactItems=[
+                    {"Put": {"TableName": "inventory", "Item": {"pk": "B", "sk": "X"}}},
+                    {
+                        "Update": {
+                            "TableName": "inventory",
+                            "Key": {"pk": "A", "sk": "META"},
+                            "UpdateExpression": "ADD quantity :d",
+                            "ConditionExpression": "quantity >= :need",
+                            "ExpressionAttributeValues": {":d": -5, ":need": 5},
+                        }
+                    },
+                ]
+            )
+
+        reasons = ctx.exception.response["CancellationReasons"]
+        self.assertEqual(
+            [r["Code"] for r in reasons], ["None", "ConditionalCheckFailed"]
+        )
+        self.assertEqual(self.table.get_item(Key={"pk": "B", "sk": "X"}), {})
+
+    def test_query_paginates_in_both_directions(self):
+        self.put_products("a", "b", "c")
+
+        first = self.table.query(
+            KeyConditionExpression="pk = :pk",
+            ExpressionAttributeValues={":pk": "PRODUCTS"},
+            Limit=2,
+        )
+        rest = self.table.query(
+            KeyConditionExpression="pk = :pk",
+            ExpressionAttributeValues={":pk": "PRODUCTS"},
+            Limit=2,
+            ExclusiveStartKey=first["LastEvaluatedKey"],
+        )
+        newest = self.table.query(
+            KeyConditionExpression="pk = :pk AND sk BETWEEN :lo AND :hi",
+            ExpressionAttributeValues={
+                ":pk": "PRODUCTS",
+                ":lo": "PRODUCT#b",
+                ":hi": "PRODUCT#c",
+            },
+            ScanIndexForward=False,
+        )
+
+        self.assertEqual([item["id"] for item in first["Items"]], ["a", "b"])
+        self.assertEqual([item["id"] for item in rest["Items"]], ["c"])
+        self.assertNotIn("LastEvaluatedKey", rest)
+        self.assertEqual([item["id"] for item in newest["Items"]], ["c", "b"])
+
+    def test_sparse_index_follows_updates(self):
+        for product_id in ("p2", "p1"):
+            self.table.put_item(
+                Item={
+                    "pk": f"PRODUCT#{product_id}",
+                    "sk": "META",
+                    "id": product_id,
+                    "low_stock_key": "LOW_STOCK",
+                }
+            )
+        self.table.update_item(
+            Key={"pk": "PRODUCT#p2", "sk": "META"},
+            UpdateExpression="REMOVE low_stock_key",
+        )
+
+        response = self.table.query(
+            IndexName="low-stock-index",
+            KeyConditionExpression="low_stock_key = :key",
+            ExpressionAttributeValues={":key": "LOW_STOCK"},
+        )
+
+        self.assertEqual([item["id"] for item in response["Items"]], ["p1"])
+
+    def test_scan_applies_filter_after_limit(self):
+        self.put_products("a", "b", "c")
+
+        response = self.table.scan(
+            FilterExpression="id <> :id",
+            ExpressionAttributeValues={":id": "a"},
+            Limit=2,
+        )
+
+        self.assertEqual([item["id"] for item in response["Items"]], ["b"])
+        self.assertEqual(response["LastEvaluatedKey"]["sk"], "PRODUCT#b")
+
+    def test_concurrent_conditional_updates_do_not_oversell(self):
+        self.table.put_item(Item={"pk": "A", "sk": "META", "quantity": 50})
+        sold = []
+
+        def buy():
+            for _ in range(20):
+                try:
+                    self.table.update_item(
+                        Key={"pk": "A", "sk": "META"},
+                        UpdateExpression="ADD quantity :d",
+                        ConditionExpression="quantity >= :need",
+                        ExpressionAttributeValues={":d": -1, ":need": 1},
+                    )
+                    sold.append(1)
+                except ClientError:
+                    pass
+
+        threads = [threading.Thread(target=buy) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(sold), 50)
+        item = self.table.get_item(Key={"pk": "A", "sk": "META"})["Item"]
+        self.assertEqual(item["quantity"], 0)
+
+    def test_product_repository_runs_on_local_storage(self):
+        repo = ProductRepository(table=self.table)
+        repo.save_product(
+            Product(id="p1", name="Pen", price=1, quantity=5, category="C", version=1)
+        )
+
+        repo.stock_out("p1", 2)
+        repo.update_low_stock_alert_sent("p1", True)
+        repo.set_stock_shards("p1", 2)
+        product = repo.stock_in("p1", 4)
+
+        self.assertEqual(product.quantity, 7)
+        self.assertEqual(repo.get_low_stock_products_page(10)[0][0].id, "p1")
+        self.assertEqual(repo.get_products_page(10)[0][0].quantity, 7)
+        with self.assertRaises(AppException) as ctx:
+            repo.stock_out("p1", 8)
+        self.assertEqual(ctx.exception.error_code, "INSUFFICIENT_STOCK")
+
+        repo.delete_product("p1")
+        self.assertEqual(self.table.scan()["Items"], [])
+
+    def attach_stream(self) -> LocalChangeStream:
+        stream = LocalChangeStream()
+        self.table.attach_stream(stream)
+        return stream
+
+    def stream_events(self, stream: LocalChangeStream) -> list[str]:
+        return [
+            record["eventName"]
+            for record in stream.read(LocalChangeStream.SHARD_ID, None, 100).records
+        ]
+
+    def test_attached_stream_records_committed_changes(self):
+        stream = self.attach_stream()
+        key = {"pk": "A", "sk": "META"}
+
+        self.table.put_item(Item={**key, "quantity": 1})
+        self.table.update_item(
+            Key=key,
+            UpdateExpression="SET quantity = :q",
+            ExpressionAttributeValues={":q": 2},
+        )
+        # changes nothing, so it leaves no record
+        self.table.put_item(Item={**key, "quantity": 2})
+        with self.assertRaises(ClientError):
+            self.table.delete_item(
+                Key=key,
+                ConditionExpression="quantity = :q",
+                ExpressionAttributeValues={":q": 5},
+            )
+        self.table.delete_item(Key=key)
+
+        records = stream.read(LocalChangeStream.SHARD_ID, None, 100).records
+        self.assertEqual(self.stream_events(stream), ["INSERT", "MODIFY", "REMOVE"])
+        modify = records[1]["dynamodb"]
+        self.assertEqual(modify["OldImage"]["quantity"], {"N": "1"})
+        self.assertEqual(modify["NewImage"]["quantity"], {"N": "2"})
+        self.assertNotIn("NewImage", records[2]["dynamodb"])
+
+    def test_attached_stream_records_transactions(self):
+        stream = self.attach_stream()
+
+        self.client.transact_write_items(
+            TransactItems=[
+                {"Put": {"TableName": "inventory", "Item": {"pk": "A", "sk": "1"}}},
+                {"Put": {"TableName": "inventory", "Item": {"pk": "B", "sk": "1"}}},
+            ]
+        )
+
+        self.assertEqual(self.stream_events(stream), ["INSERT", "INSERT"])
+
+    def test_attached_stream_matches_what_an_aborted_atomic_left(self):
+        stream = self.attach_stream()
+        key = {"pk": "A", "sk": "META"}
+
+        with self.assertRaises(RuntimeError):
+            with self.table.engine.atomic():
+                self.table.put_item(Item=key)
+                raise RuntimeError("abort")
+
+        # SQLite rolls the write back; the memory engine keeps it
+        stored = "Item" in self.table.get_item(Key=key)
+        self.assertEqual(self.stream_events(stream), ["INSERT"] if stored else [])
+
+
+class TestMemoryEngine(LocalTableTests, unittest.TestCase):
+    def make_engine(self):
+        return MemoryEngine()
+
+
+class TestSQLiteEngine(LocalTableTests, unittest.TestCase):
+    def make_engine(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        return SQLiteEngine(os.path.join(self.directory.name, "inventory.db"))
+
+    def test_data_survives_reopening(self):
+        self.table.put_item(Item={"pk": "A", "sk": "META", "quantity": 3})
+        self.storage.close()
+
+        reopened = LocalStorage(
+            SQLiteEngine(os.path.join(self.directory.name, "inventory.db"))
+        )
+        item = reopened.table("inventory").get_item(Key={"pk": "A", "sk": "META"})
+
+        self.assertEqual(item["Item"]["quantity"], 3)
+        reopened.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
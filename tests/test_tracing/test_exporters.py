@@ -0,0 +1,63 @@
+import json
+import os
+import tempfile
+import unittest
+
+from app.tracing.exporters import (
+    BatchSpanProcessor,
+    JsonLinesExporter,
+    SpanExporter,
+    load_exporter,
+)
+
+
+class ListExporter(SpanExporter):
+    def __init__(self):
+        self.batches = []
+
+    def export(self, spans):
+        self.batches.append(spans)
+
+
+def list_exporter():
+    return ListExporter()
+
+
+class TestExporters(unittest.TestCase):
+    def test_processor_exports_in_the_background_to_json_lines(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "traces.jsonl")
+        processor = BatchSpanProcessor(JsonLinesExporter(path), flush_interval=0.01)
+
+        processor.start()
+        processor.submit({"name": "a"})
+        processor.submit({"name": "b"})
+        processor.stop()
+
+        with open(path, encoding="utf-8") as handle:
+            names = [json.loads(line)["name"] for line in handle]
+        self.assertEqual(names, ["a", "b"])
+
+    def test_full_queue_drops_spans(self):
+        exporter = ListExporter()
+        processor = BatchSpanProcessor(exporter, max_queue_size=1, max_batch_size=10)
+
+        processor.submit({"name": "a"})
+        processor.submit({"name": "b"})
+        processor.flush()
+
+        self.assertEqual(processor.dropped, 1)
+        self.assertEqual(exporter.batches, [[{"name": "a"}]])
+
+    def test_load_exporter(self):
+        self.assertIsInstance(load_exporter("jsonl", "x.jsonl"), JsonLinesExporter)
+        self.assertIsInstance(
+            load_exporter(f"{__name__}:list_exporter", "x.jsonl"), ListExporter
+        )
+        with self.assertRaises(Exception):
+            load_exporter("nope", "x.jsonl")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+import asyncio
+import unittest
+from unittest.mock import MagicMock
+
+from fastapi.testclient import TestClient
+
+from app.app import app
+from app.sns_event_publisher.sns_event_publisher import SNSEventPublisher
+from app.tracing.tracer import Tracer, activate, start_span, trace_methods, traced
+
+
+class ListProcessor:
+    def __init__(self):
+        self.spans = []
+
+    def submit(self, span):
+        self.spans.append(span)
+
+
+@trace_methods
+class Service:
+    def work(self):
+        return self.step()
+
+    def step(self):
+        return "done"
+
+    def fail(self):
+        raise ValueError("boom")
+
+    def _private(self):
+        pass
+
+    def rows(self):
+        yield 1
+
+    async def fetch(self):
+        await asyncio.sleep(0)
+        return self.step()
+
+
+class TestTracer(unittest.TestCase):
+    def setUp(self):
+        self.processor = ListProcessor()
+        self.tracer = Tracer(self.processor, sample_rate=1.0)
+
+    def test_spans_nest_under_the_current_span(self):
+        root = self.tracer.start_trace("GET /x")
+        with activate(root):
+            self.assertEqual(Service().work(), "done")
+            with start_span("manual", attributes={"a": 1}):
+                pass
+        root.end()
+
+        spans = {span["name"]: span for span in self.processor.spans}
+        self.assertEqual(
+            list(spans), ["Service.step", "Service.work", "manual", "GET /x"]
+        )
+        self.assertEqual(
+            spans["Service.step"]["parent_id"], spans["Service.work"]["span_id"]
+        )
+        self.assertEqual(spans["Service.work"]["parent_id"], root.span_id)
+        self.assertEqual({span["trace_id"] for span in spans.values()}, {root.trace_id})
+        self.assertEqual(spans["manual"]["attributes"], {"a": 1})
+
+    def test_errors_are_recorded_and_reraised(self):
+        with activate(self.tracer.start_trace("root")):
+            with self.assertRaises(ValueError):
+                Service().fail()
+
+        self.assertEqual(self.processor.spans[0]["status"], "error")
+        self.assertEqual(self.processor.spans[0]["error"], "ValueError")
+
+    def test_coroutines_are_traced_until_they_finish(self):
+        root = self.tracer.start_trace("root")
+
+        async def run():
+            with activate(root):
+                return await Service().fetch()
+
+        self.assertEqual(asyncio.run(run()), "done")
+
+        spans = {span["name"]: span for span in self.processor.spans}
+        self.assertEqual(list(spans), ["Service.step", "Service.fetch"])
+        self.assertEqual(
+            spans["Service.step"]["parent_id"], spans["Service.fetch"]["span_id"]
+        )
+
+    def test_untraced_code_records_nothing(self):
+        Service().work()
+        traced()(lambda: None)()
+
+        self.assertEqual(self.processor.spans, [])
+        self.assertFalse(hasattr(Service._private, "__wrapped__"))
+        self.assertFalse(hasattr(Service.rows, "__wrapped__"))
+
+    def test_traceparent_decides_sampling_and_continues_the_trace(self):
+        unsampled = Tracer(self.processor, sample_rate=0.0)
+        parent = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+
+        root = unsampled.start_trace("GET /x", parent)
+
+        self.assertEqual(root.trace_id, "0af7651916cd43dd8448eb211c80319c")
+        self.assertEqual(root.parent_id, "b7ad6b7169203331")
+        self.assertIsNone(unsampled.start_trace("GET /x"))
+        self.assertIsNone(self.tracer.start_trace("GET /x", parent[:-1] + "0"))
+        self.assertIsNotNone(self.tracer.start_trace("GET /x", "garbage"))
+
+    def test_sns_events_carry_the_traceparent(self):
+        client = MagicMock()
+        root = self.tracer.start_trace("root")
+
+        with activate(root):
+            SNSEventPublisher(client).publish_event({"event_type": "LOW_STOCK"})
+
+        attributes = client.publish.call_args.kwargs["MessageAttributes"]
+        self.assertEqual(attributes["traceparent"]["StringValue"], root.traceparent)
+
+
+class TestTracingMiddleware(unittest.TestCase):
+    def setUp(self):
+        self.processor = ListProcessor()
+        app.state.tracer = Tracer(self.processor, sample_rate=1.0)
+        self.addCleanup(delattr, app.state, "tracer")
+
+    def test_root_span_is_named_after_the_route(self):
+        response = TestClient(app).get("/health")
+
+        (root,) = self.processor.spans
+        self.assertEqual(response.headers["X-Trace-Id"], root["trace_id"])
+        self.assertEqual(root["name"], "GET /health")
+        self.assertEqual(root["kind"], "server")
+        self.assertEqual(root["attributes"]["http.status_code"], 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
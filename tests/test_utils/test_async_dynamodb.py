@@ -0,0 +1,145 @@
+import json
+import unittest
+from unittest.mock import patch
+
+import boto3
+from botocore.exceptions import ClientError
+import httpx
+
+from app.utils.async_dynamodb import AsyncTable
+from app.utils.aws_call_accounting import _current_calls
+from app.utils.aws_client_manager import AWSClientManager
+
+
+class TestAsyncDynamoDBClient(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.requests = []
+        self.responses = []
+        session = boto3.session.Session(
+            aws_access_key_id="key",
+            aws_secret_access_key="secret",
+            region_name="ap-south-1",
+        )
+        self.manager = AWSClientManager(
+            region_name="ap-south-1", max_pool_connections=2, session=session
+        )
+
+        def handle(request: httpx.Request) -> httpx.Response:
+            self.requests.append(request)
+            status_code, body = self.responses.pop(0)
+            return httpx.Response(status_code, json=body)
+
+        self.client = self.manager.async_dynamodb_client(httpx.MockTransport(handle))
+        self.table = AsyncTable(self.client, "t")
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+
+    async def test_items_go_out_serialized_and_come_back_plain(self):
+        self.responses.append((200, {"Item": {"pk": {"S": "A"}, "qty": {"N": "3"}}}))
+
+        response = await self.table.get_item(Key={"pk": "A"})
+
+        self.assertEqual(response["Item"], {"pk": "A", "qty": 3})
+        request = self.requests[0]
+        self.assertEqual(request.headers["x-amz-target"], "DynamoDB_20120810.GetItem")
+        self.assertIn("Signature=", request.headers["authorization"])
+        self.assertEqual(
+            json.loads(request.content),
+            {"TableName": "t", "Key": {"pk": {"S": "A"}}},
+        )
+
+    async def test_callers_params_are_not_rewritten(self):
+        self.responses.extend([(200, {}), (200, {})])
+        params = {
+            "Key": {"pk": "A"},
+            "UpdateExpression": "SET qty = :q",
+            "ExpressionAttributeValues": {":q": 1},
+        }
+
+        await self.table.update_item(**params)
+        await self.table.update_item(**params)
+
+        self.assertEqual(params["Key"], {"pk": "A"})
+        self.assertEqual(params["ExpressionAttributeValues"], {":q": 1})
+        first, second = (json.loads(request.content) for request in self.requests)
+        self.assertEqual(first, second)
+        self.assertEqual(second["Key"], {"pk": {"S": "A"}})
+
+    async def test_condition_expressions_are_built(self):
+        from boto3.dynamodb.conditions import Attr
+
+        self.responses.append((200, {}))
+
+        await self.table.put_item(
+            Item={"pk": "A"}, ConditionExpression=Attr("pk").not_exists()
+        )
+
+        body = json.loads(self.requests[0].content)
+        self.assertEqual(body["ConditionExpression"], "attribute_not_exists(#n0)")
+        self.assertEqual(body["ExpressionAttributeNames"], {"#n0": "pk"})
+
+    async def test_errors_raise_client_error(self):
+        self.responses.append(
+            (
+                400,
+                {
+                    "__type": "com.amazonaws.dynamodb.v20120810#"
+                    "ConditionalCheckFailedException",
+                    "message": "The conditional request failed",
+                    "Item": {"pk": {"S": "A"}},
+                },
+            )
+        )
+
+        with self.assertRaises(ClientError) as ctx:
+            await self.table.put_item(Item={"pk": "A"})
+
+        error = ctx.exception.response
+        self.assertEqual(error["Error"]["Code"], "ConditionalCheckFailedException")
+        # like boto3, the failed item stays in the attribute-value format
+        self.assertEqual(error["Item"], {"pk": {"S": "A"}})
+
+    @patch("app.utils.async_dynamodb.asyncio.sleep")
+    async def test_throttled_calls_are_retried(self, mock_sleep):
+        self.responses.append(
+            (
+                400,
+                {
+                    "__type": "com.amazonaws.dynamodb.v20120810#"
+                    "ProvisionedThroughputExceededException",
+                    "message": "slow down",
+                },
+            )
+        )
+        self.responses.append((200, {"Item": {"pk": {"S": "A"}}}))
+
+        response = await self.table.get_item(Key={"pk": "A"})
+
+        self.assertEqual(response["Item"], {"pk": "A"})
+        self.assertEqual(response["ResponseMetadata"]["RetryAttempts"], 1)
+        self.assertEqual(len(self.requests), 2)
+        mock_sleep.assert_awaited_once()
+
+    async def test_calls_are_accounted_to_the_request(self):
+        self.responses.append(
+            (
+                200,
+                {
+                    "Item": {"pk": {"S": "A"}},
+                    "ConsumedCapacity": {"TableName": "t", "CapacityUnits": 0.5},
+                },
+            )
+        )
+        calls = []
+        token = _current_calls.set(calls)
+        try:
+            await self.table.get_item(Key={"pk": "A"})
+        finally:
+            _current_calls.reset(token)
+
+        body = json.loads(self.requests[0].content)
+        self.assertEqual(body["ReturnConsumedCapacity"], "TOTAL")
+        self.assertEqual(calls[0]["operation"], "GetItem")
+        self.assertEqual(calls[0]["consumed_capacity"], 0.5)
+        self.assertIsNone(calls[0]["error"])
@@ -0,0 +1,159 @@
+import unittest
+
+from botocore.exceptions import ClientError
+from botocore.stub import Stubber
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.utils.aws_call_accounting import (
+    AWSCallAccountingMiddleware,
+    _current_calls,
+    _on_needs_retry,
+    server_timing,
+)
+from app.utils.aws_client_manager import AWSClientManager
+
+
+class TestAWSCallAccounting(unittest.TestCase):
+    def setUp(self):
+        self.manager = AWSClientManager(
+            region_name="ap-south-1", max_pool_connections=2
+        )
+        self.client = self.manager.client("dynamodb")
+        self.stubber = Stubber(self.client)
+        self.stubber.activate()
+        self.addCleanup(self.stubber.deactivate)
+
+    def stub_get_item(self):
+        self.stubber.add_response(
+            "get_item",
+            {
+                "Item": {"pk": {"S": "A"}},
+                "ConsumedCapacity": {"TableName": "t", "CapacityUnits": 0.5},
+            },
+            expected_params={
+                "TableName": "t",
+                "Key": {"pk": {"S": "A"}},
+                "ReturnConsumedCapacity": "TOTAL",
+            },
+        )
+
+    def test_records_calls_of_the_current_request_only(self):
+        self.stub_get_item()
+        self.stubber.add_client_error(
+            "put_item", service_error_code="ConditionalCheckFailedException"
+        )
+        self.stubber.add_response("get_item", {})
+
+        calls = []
+        token = _current_calls.set(calls)
+        try:
+            self.client.get_item(TableName="t", Key={"pk": {"S": "A"}})
+            with self.assertRaises(ClientError):
+                self.client.put_item(TableName="t", Item={"pk": {"S": "A"}})
+        finally:
+            _current_calls.reset(token)
+        # outside a request nothing is recorded or added to the params
+        self.client.get_item(TableName="t", Key={"pk": {"S": "B"}})
+
+        self.assertEqual(
+            [(c["operation"], c["consumed_capacity"], c["error"]) for c in calls],
+            [
+                ("GetItem", 0.5, None),
+                ("PutItem", None, "ConditionalCheckFailedException"),
+            ],
+        )
+
+    def test_tables_ask_for_consumed_capacity(self):
+        # resource calls go through boto3's param copying handlers first; the
+        # stubber sees the key before the resource serializes it
+        self.stubber.add_response(
+            "get_item",
+            {"ConsumedCapacity": {"TableName": "t", "CapacityUnits": 0.5}},
+            expected_params={
+                "TableName": "t",
+                "Key": {"pk": "A"},
+                "ReturnConsumedCapacity": "TOTAL",
+            },
+        )
+
+        calls = []
+        token = _current_calls.set(calls)
+        try:
+            self.manager.table("t").get_item(Key={"pk": "A"})
+        finally:
+            _current_calls.reset(token)
+
+        self.stubber.assert_no_pending_responses()
+        self.assertEqual(calls[0]["consumed_capacity"], 0.5)
+
+    def test_counts_retries_and_throttles(self):
+        state = {"attempts": 0, "throttles": 0}
+        request_dict = {"context": {"aws_call": state}}
+        throttled = (
+            None,
+            {"Error": {"Code": "ProvisionedThroughputExceededException"}},
+        )
+
+        _on_needs_retry(request_dict=request_dict, response=throttled)
+        _on_needs_retry(request_dict=request_dict, response=(None, {}))
+
+        self.assertEqual(state, {"attempts": 2, "throttles": 1})
+
+    def test_server_timing_totals_per_service(self):
+        header = server_timing(
+            [
+                {
+                    "service": "dynamodb",
+                    "duration_ms": 2.0,
+                    "retries": 1,
+                    "throttles": 1,
+                    "consumed_capacity": 0.5,
+                    "error": None,
+                },
+                {
+                    "service": "dynamodb",
+                    "duration_ms": 3.5,
+                    "retries": 0,
+                    "throttles": 0,
+                    "consumed_capacity": 1.0,
+                    "error": None,
+                },
+                {
+                    "service": "sns",
+                    "duration_ms": 4.0,
+                    "retries": 0,
+                    "throttles": 0,
+                    "consumed_capacity": None,
+                    "error": None,
+                },
+            ]
+        )
+
+        self.assertEqual(
+            header,
+            'dynamodb;dur=5.500;desc="2 calls, 1 retries, 1 throttles, 1.5 CU", '
+            'sns;dur=4.000;desc="1 calls, 0 retries, 0 throttles"',
+        )
+
+    def test_middleware_adds_server_timing_and_logs(self):
+        app = FastAPI()
+        app.add_middleware(AWSCallAccountingMiddleware)
+        app.state.aws_call_accounting = True
+
+        @app.get("/item")
+        def get_item():
+            # sync handlers run in the threadpool with the request's context
+            self.client.get_item(TableName="t", Key={"pk": {"S": "A"}})
+            return {}
+
+        self.stub_get_item()
+        with self.assertLogs("app.aws_calls", level="INFO") as logs:
+            response = TestClient(app).get("/item")
+
+        self.assertTrue(response.headers["server-timing"].startswith("dynamodb;dur="))
+        self.assertEqual(logs.records[0].calls[0]["operation"], "GetItem")
+
+
+if __name__ == "__main__":
+    unittest.main()
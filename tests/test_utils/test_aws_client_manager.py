@@ -0,0 +1,61 @@
+import threading
+import unittest
+
+from app.utils.aws_client_manager import AWSClientManager, _PoolStats
+
+
+class TestAWSClientManager(unittest.TestCase):
+    def setUp(self):
+        self.manager = AWSClientManager(
+            region_name="ap-south-1", max_pool_connections=8
+        )
+
+    def test_clients_are_shared_and_sized(self):
+        client = self.manager.client("dynamodb")
+
+        self.assertIs(self.manager.client("dynamodb"), client)
+        self.assertEqual(client.meta.config.max_pool_connections, 8)
+        self.assertTrue(client.meta.config.tcp_keepalive)
+        self.assertEqual(client.meta.config.retries["mode"], "standard")
+
+    def test_tables_are_per_thread_on_one_client(self):
+        table = self.manager.table("inventory")
+        other = []
+        thread = threading.Thread(
+            target=lambda: other.append(self.manager.table("inventory"))
+        )
+        thread.start()
+        thread.join()
+
+        self.assertIs(self.manager.table("inventory"), table)
+        self.assertIsNot(other[0], table)
+        self.assertIs(other[0].meta.client, table.meta.client)
+        self.assertIs(table.meta.client, self.manager.client("dynamodb"))
+
+    def test_pool_stats_count_overflow(self):
+        stats = _PoolStats(max_pool_connections=1)
+
+        stats.on_before_send()
+        stats.on_before_send()
+        stats.on_attempt_done()
+        stats.on_attempt_done()
+
+        self.assertEqual(
+            stats.snapshot(),
+            {
+                "max_pool_connections": 1,
+                "in_flight": 0,
+                "peak_in_flight": 2,
+                "requests": 2,
+                "overflow_requests": 1,
+            },
+        )
+
+    def test_pool_stats_are_reported_per_client(self):
+        self.manager.client("sns")
+
+        self.assertIn("sns:ap-south-1", self.manager.pool_stats())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,31 @@
+import unittest
+
+from app.app_exception.app_exception import AppException
+from app.utils.pagination import decode_cursor, encode_cursor
+
+
+class TestPagination(unittest.TestCase):
+    def test_round_trip(self):
+        key = {"pk": "PRODUCTS", "sk": "PRODUCT#p1"}
+
+        cursor = encode_cursor(key)
+
+        self.assertIsInstance(cursor, str)
+        self.assertEqual(decode_cursor(cursor), key)
+
+    def test_empty_key_has_no_cursor(self):
+        self.assertIsNone(encode_cursor(None))
+        self.assertIsNone(encode_cursor({}))
+        self.assertIsNone(decode_cursor(None))
+
+    def test_invalid_cursor(self):
+        for cursor in ["%%%", "bm90LWpzb24=", encode_cursor({"a": 1})[:-4] + "WzFd"]:
+            with self.assertRaises(AppException) as ctx:
+                decode_cursor(cursor)
+
+            self.assertEqual(ctx.exception.status_code, 400)
+            self.assertEqual(ctx.exception.error_code, "INVALID_CURSOR")
+
+
+if __name__ == "__main__":
+    unittest.main()
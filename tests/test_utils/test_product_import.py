@@ -0,0 +1,61 @@
+import io
+import unittest
+
+from app.app_exception.app_exception import AppException
+from app.utils.product_import import detect_import_format, iter_import_rows
+
+
+class TestProductImport(unittest.TestCase):
+    def test_detect_format(self):
+        self.assertEqual(detect_import_format("items.csv", None), "csv")
+        self.assertEqual(detect_import_format(None, "application/x-ndjson"), "ndjson")
+        self.assertEqual(
+            detect_import_format("items.csv", "application/octet-stream", "ndjson"),
+            "ndjson",
+        )
+
+    def test_detect_format_unsupported(self):
+        with self.assertRaises(AppException) as ctx:
+            detect_import_format("items.xlsx", "application/octet-stream")
+
+        self.assertEqual(ctx.exception.status_code, 415)
+
+    def test_iter_csv_rows(self):
+        file = io.BytesIO(
+            b"\xef\xbb\xbfname,price,quantity,category,override_threshold\n"
+            b"Pen,1.5,10,STATIONERY,\n"
+            b"Ink,2,3,STATIONERY,1\n"
+        )
+
+        rows = list(iter_import_rows(file, "csv"))
+
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(
+            rows[0],
+            (
+                1,
+                {
+                    "name": "Pen",
+                    "price": "1.5",
+                    "quantity": "10",
+                    "category": "STATIONERY",
+                },
+                None,
+            ),
+        )
+        self.assertEqual(rows[1][1]["override_threshold"], "1")
+        self.assertFalse(file.closed)
+
+    def test_iter_ndjson_rows(self):
+        file = io.BytesIO(b'{"name": "Pen"}\n\nnot json\n[1, 2]\n')
+
+        rows = list(iter_import_rows(file, "ndjson"))
+
+        self.assertEqual(rows[0], (1, {"name": "Pen"}, None))
+        self.assertIsNone(rows[1][1])
+        self.assertIn("Invalid JSON", rows[1][2])
+        self.assertEqual(rows[2][2], "Each line must be a JSON object")
+
+
+if __name__ == "__main__":
+    unittest.main()
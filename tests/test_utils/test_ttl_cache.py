@@ -0,0 +1,86 @@
+import unittest
+
+from app.utils.ttl_cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = TTLCache(max_entries=2, ttl=10, clock=self.clock)
+
+    def test_hit_and_miss(self):
+        self.cache.set("a", 1)
+
+        self.assertEqual(self.cache.get("a"), 1)
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        self.assertEqual(self.cache.stats()["misses"], 1)
+
+    def test_peek_is_not_counted(self):
+        self.cache.set("a", 1)
+
+        self.assertEqual(self.cache.peek("a"), 1)
+        self.assertIsNone(self.cache.peek("b"))
+        self.assertEqual(self.cache.stats()["hits"], 0)
+        self.assertEqual(self.cache.stats()["misses"], 0)
+
+        self.clock.now = 10
+        self.assertIsNone(self.cache.peek("a"))
+
+    def test_entries_expire(self):
+        self.cache.set("a", 1)
+        self.clock.now = 10
+
+        self.assertIsNone(self.cache.get("a"))
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+    def test_evicts_least_recently_used(self):
+        self.cache.set("a", 1)
+        self.cache.set("b", 2)
+        self.cache.get("a")
+        self.cache.set("c", 3)
+
+        self.assertEqual(self.cache.get("a"), 1)
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+
+    def test_invalidate(self):
+        self.cache.set("a", 1)
+        self.cache.invalidate("a")
+        self.cache.invalidate("missing")
+
+        self.assertIsNone(self.cache.get("a"))
+
+    def test_compute_sees_live_entry_only(self):
+        self.cache.set("a", 1)
+        self.cache.compute("a", lambda current: current + 1)
+        self.assertEqual(self.cache.peek("a"), 2)
+
+        self.clock.now = 10
+        self.cache.compute("a", lambda current: 5 if current is None else current)
+        self.assertEqual(self.cache.peek("a"), 5)
+
+    def test_compute_keeps_or_drops(self):
+        self.cache.set("a", 1)
+        self.clock.now = 5
+        self.cache.compute("a", lambda current: current)
+
+        # keeping the value keeps its expiry too
+        self.clock.now = 10
+        self.assertIsNone(self.cache.peek("a"))
+
+        self.cache.set("b", 2)
+        self.cache.compute("b", lambda current: None)
+        self.assertIsNone(self.cache.peek("b"))
+
+
+if __name__ == "__main__":
+    unittest.main()